@@ -1,62 +1,87 @@
 """
 Main application file for Code with Morais
 A gamified Python learning platform for teenagers
+
+create_app() builds and wires the Flask app. Blueprints and services are
+imported inside it, and the heavy clients (firebase_admin, gRPC Firestore,
+google-auth, requests, psutil) are imported and connected on first use, so
+a worker boots without paying for them. `app` below is what
+`gunicorn app:app` serves. Run
+`python scripts/development/run_benchmarks.py importtime` to see what boot
+still imports.
 """
 import os
 import logging
 import re
-import mimetypes
-from flask import Flask, request, jsonify, render_template, flash, redirect, url_for
+from flask import Flask, request, jsonify, render_template, session, current_app
 from flask_caching import Cache
 from config import get_config, setup_logging
-from services.firebase_service import FirebaseService
-from flask_login import LoginManager, login_user, logout_user, current_user, login_required
 
-# CRITICAL: Fix MIME types for JavaScript modules
-mimetypes.add_type('application/javascript', '.js')
-mimetypes.add_type('text/javascript', '.js')
-mimetypes.add_type('application/javascript', '.mjs')
-mimetypes.add_type('text/css', '.css')
+logger = logging.getLogger(__name__)
 
-# Get configuration based on environment
-config = get_config()
+# Template fragment cache, bound to the app in create_app()
+cache = Cache()
 
-# Set up logging
-setup_logging(config)
-logger = logging.getLogger(__name__)
 
-# Initialize Flask app
-app = Flask(__name__)
-app.secret_key = config.SECRET_KEY
+def create_app(config=None) -> Flask:
+    """Application factory: configure, wire services and register routes"""
+    config = config or get_config()
+    setup_logging(config)
 
-# Enhanced MIME type handler for ES6 modules
-@app.after_request
-def fix_mime_types(response):
-    """Fix MIME types for static files and ES6 modules"""
-    if hasattr(response, 'direct_passthrough') and response.direct_passthrough:
-        return response
-        
-    # Fix JavaScript MIME types - critical for ES6 modules
-    if response.headers.get('Content-Type') == 'application/json' and \
-       any(request.path.endswith(ext) for ext in ['.js', '.mjs']):
-        response.headers['Content-Type'] = 'application/javascript; charset=utf-8'
-    elif request.path.endswith('.js') or request.path.endswith('.mjs'):
-        response.headers['Content-Type'] = 'application/javascript; charset=utf-8'
-    elif request.path.endswith('.css'):
-        response.headers['Content-Type'] = 'text/css; charset=utf-8'
-    
-    return response
+    # Initialize Flask app
+    app = Flask(__name__)
+    app.secret_key = config.SECRET_KEY
+
+    _init_extensions(app, config)
+    _init_services(app, config)
+    _register_blueprints(app)
+    _register_app_routes(app, config)
+    return app
+
+
+def _init_extensions(app, config):
+    """Request instrumentation, response encoding, caching and static files"""
+    # Fast JSON serialization and compression for API responses
+    from utils.json_provider import init_json_provider
+    from utils.compression import init_compression
+    init_json_provider(app)
+    init_compression(app, config.API_COMPRESSION)
+
+    # Request latency, status and in-flight metrics for /api/system/metrics
+    from utils.metrics import init_metrics
+    init_metrics(app)
 
-# Initialize caching
-app.config.update(config.TEMPLATE_CACHE_CONFIG)
-cache = Cache(app, config={'CACHE_TYPE': 'simple'})
-logger.info("Template caching initialized")
+    # Opt-in per-request profiling, exported from /api/system/profiles
+    from utils.profiler import init_profiler
+    init_profiler(app, config.PROFILER)
+
+    # Per-request Firestore reads/writes/time, reported via Server-Timing
+    from utils.firestore_budget import init_firestore_budget
+    init_firestore_budget(app, config.FIRESTORE_BUDGET)
+
+    # Per-request Firestore deadlines and per-collection circuit breakers
+    from utils.resilience import init_resilience
+    init_resilience(app, config.RESILIENCE)
+
+    # Initialize caching
+    app.config.update(config.TEMPLATE_CACHE_CONFIG)
+    cache.init_app(app, config={'CACHE_TYPE': 'simple'})
+    logger.info("Template caching initialized")
+
+    # Make cache available to templates
+    app.jinja_env.globals['cache'] = cache
+
+    # Fingerprinted static assets (built by scripts/deployment/build_assets.py)
+    from utils.assets import init_assets
+    init_assets(app)
+
+    # Static files: precompressed variants, hot-asset cache, fixed MIME table
+    from utils.static_files import init_static_files
+    init_static_files(app)
+
+    app.add_template_filter(markdown_filter, 'markdown')
 
-# Make cache available to templates
-app.jinja_env.globals['cache'] = cache
 
-# Add template filters
-@app.template_filter('markdown')
 def markdown_filter(text):
     """Simple markdown filter for basic formatting"""
     if not text:
@@ -79,370 +104,432 @@ def markdown_filter(text):
     
     return text
 
-# Initialize Firebase service
-firebase_service = None
-try:
-    # Force load environment variables
-    from dotenv import load_dotenv
-    load_dotenv()
-    
-    # Check DEV_MODE directly from environment
-    dev_mode = os.environ.get('DEV_MODE', 'True').lower() == 'true'
-    logger.info(f"DEV_MODE from environment: {dev_mode}")
-    
-    # Initialize Firebase even in dev mode for Google OAuth to work
-    if config.validate_firebase_config():
-        firebase_service = FirebaseService(config.FIREBASE_CONFIG)
-        logger.info("Firebase service initialized successfully")
-    else:
-        logger.warning("Firebase configuration invalid - Google OAuth will not work")
-        logger.info("Required Firebase env vars: FIREBASE_PROJECT_ID, FIREBASE_PRIVATE_KEY, FIREBASE_CLIENT_EMAIL, etc.")
-except Exception as e:
-    logger.error(f"Failed to initialize Firebase service: {str(e)}")
+def _init_services(app, config):
+    """Create the Firebase services (connected on first use) and inject them"""
+    from services.firebase_service import FirebaseService, set_firebase_service
+    from services.async_firebase_service import (AsyncFirebaseService, set_async_firebase_service,
+                                                 defer_async_firebase_service)
+
     firebase_service = None
+    try:
+        # Force load environment variables
+        from dotenv import load_dotenv
+        load_dotenv()
+        
+        # Check DEV_MODE directly from environment
+        dev_mode = os.environ.get('DEV_MODE', 'True').lower() == 'true'
+        logger.info(f"DEV_MODE from environment: {dev_mode}")
+        
+        # Initialize Firebase even in dev mode for Google OAuth to work; the
+        # client itself is created by the first request that needs it
+        if config.validate_firebase_config():
+            firebase_service = FirebaseService(config.FIREBASE_CONFIG, lazy=True)
+            logger.info("Firebase service configured (connects on first use)")
+        else:
+            logger.warning("Firebase configuration invalid - Google OAuth will not work")
+            logger.info("Required Firebase env vars: FIREBASE_PROJECT_ID, FIREBASE_PRIVATE_KEY, FIREBASE_CLIENT_EMAIL, etc.")
+    except Exception as e:
+        logger.error(f"Failed to initialize Firebase service: {str(e)}")
+        firebase_service = None
 
-# Make Firebase service available to routes
-app.config['firebase_service'] = firebase_service
+    # Make Firebase service available to routes
+    app.config['firebase_service'] = firebase_service
 
-# Set global firebase service for backward compatibility
-from services.firebase_service import set_firebase_service
-set_firebase_service(firebase_service)
+    # Set global firebase service for backward compatibility
+    set_firebase_service(firebase_service)
 
-# Inject Firebase service into models
-if firebase_service:
-    from models.user import set_firebase_service as set_user_firebase_service
-    from models.lesson import set_firebase_service as set_lesson_firebase_service  
-    from models.quiz import set_firebase_service as set_quiz_firebase_service
-    
-    set_user_firebase_service(firebase_service)
-    set_lesson_firebase_service(firebase_service)
-    set_quiz_firebase_service(firebase_service)
-    logger.info("Firebase service injected into all models")
-else:
-    logger.warning("Firebase service not available - models will use fallback data")
-
-# Register blueprints with error handling
-try:
-    # Import and register all route blueprints
-    from routes.main_routes import main_bp
-    from routes.auth_routes import auth_bp
-    from routes.lesson_routes import lesson_bp
-    from routes.dashboard_api import dashboard_api_bp
-    from routes.lesson_api import lesson_api_bp
-    from routes.docs_routes import docs_bp
-    from routes.firebase_check import firebase_check_bp
-    from routes.system_api import system_api_bp
-    from routes.recommendation_api import recommendation_api_bp
-    from routes.profile_routes_api import profile_bp
-    from routes.quiz_api import quiz_api
-    
-    app.register_blueprint(main_bp)
-    app.register_blueprint(auth_bp, url_prefix='/auth')
-    app.register_blueprint(lesson_bp)
-    app.register_blueprint(dashboard_api_bp)
-    app.register_blueprint(lesson_api_bp)
-    app.register_blueprint(docs_bp)
-    app.register_blueprint(firebase_check_bp)
-    app.register_blueprint(system_api_bp)
-    app.register_blueprint(recommendation_api_bp)
-    app.register_blueprint(profile_bp)
-    app.register_blueprint(quiz_api)
-    
-    logger.info("Blueprints registered successfully")
-except Exception as e:
-    logger.error(f"Failed to register blueprints: {str(e)}")
-    raise
+    # Async Firestore client for the achievement and profile paths, built
+    # after the sync client has initialized the Firebase app
+    def build_async_firebase_service():
+        if firebase_service is None or firebase_service.db is None:
+            return None
+        async_service = AsyncFirebaseService(config.FIREBASE_CONFIG)
+        return async_service if async_service.is_available() else None
 
-# Register API route for code execution with security validation
-from services.code_execution import execute_python_code
+    # (not under gevent: grpc.aio and the bridge's event loop thread need real threads)
+    from utils.gevent_compat import cooperative_worker
+    if firebase_service and not cooperative_worker():
+        defer_async_firebase_service(build_async_firebase_service)
+    else:
+        set_async_firebase_service(None)
 
-@app.route('/run_python', methods=['POST'])
-def run_python():
-    """Run Python code submitted by the user with security validation"""
-    try:
-        # Validate request
-        if not request.is_json:
-            logger.warning("Invalid request format - not JSON")
-            return jsonify({'error': 'Request must be JSON'}), 400
-        
-        data = request.json
-        code = data.get('code', '')
-        inputs = data.get('inputs', '')
-        
-        # Security validation
-        if len(code) > config.MAX_CODE_LENGTH:
-            logger.warning(f"Code length exceeded limit: {len(code)}")
-            return jsonify({'error': 'Code length exceeds maximum limit'}), 400
-        
-        if not code.strip():
-            return jsonify({'error': 'Code cannot be empty'}), 400
-        
-        # Execute the code
-        result = execute_python_code(code, inputs)
-        
-        # Log successful execution (without exposing code content)
-        logger.info(f"Code execution completed - status: {result.get('status', 'unknown')}")
-        
-        return jsonify(result)
+    # Read-only snapshot of the catalog for when Firestore is unreachable
+    from services.content_snapshot import init_content_snapshot
+    init_content_snapshot(firebase_service, config.CONTENT_SNAPSHOT)
+
+    # Background threads (resource sampler, snapshot refresher) start in
+    # the process that serves requests, and again in each forked worker
+    app.before_request(start_background_services)
+
+    # Inject Firebase service into models
+    if firebase_service:
+        from models.user import set_firebase_service as set_user_firebase_service
+        from models.lesson import set_firebase_service as set_lesson_firebase_service  
+        from models.quiz import set_firebase_service as set_quiz_firebase_service
+        from models.activity import set_firebase_service as set_activity_firebase_service
         
-    except Exception as e:
-        logger.error(f"Error in code execution endpoint: {str(e)}")
-        return jsonify({'error': 'Internal server error'}), 500
+        set_user_firebase_service(firebase_service)
+        set_lesson_firebase_service(firebase_service)
+        set_quiz_firebase_service(firebase_service)
+        set_activity_firebase_service(firebase_service)
+        logger.info("Firebase service injected into all models")
+    else:
+        logger.warning("Firebase service not available - models will use fallback data")
+
+
+def start_background_services():
+    """Start this process's sampler and snapshot refresher threads (no-op once running)"""
+    from services.resource_sampler import get_resource_sampler
+    from services.content_snapshot import get_content_snapshot
+    get_resource_sampler()
+    get_content_snapshot()
 
-# Debug endpoint for Google OAuth
-@app.route('/debug_google_oauth')
-def debug_google_oauth():
-    """Debug endpoint to check Google OAuth client ID and environment."""
+
+def _register_blueprints(app):
+    """Import and register all route blueprints"""
     try:
-        from dotenv import load_dotenv
-        load_dotenv()
+        from routes.main_routes import main_bp
+        from routes.auth_routes import auth_bp
+        from routes.lesson_routes import lesson_bp
+        from routes.dashboard_api import dashboard_api_bp
+        from routes.lesson_api import lesson_api_bp
+        from routes.docs_routes import docs_bp
+        from routes.firebase_check import firebase_check_bp
+        from routes.system_api import system_api_bp
+        from routes.recommendation_api import recommendation_api_bp
+        from routes.profile_routes_api import profile_bp
+        from routes.quiz_api import quiz_api
         
-        debug_info = {
-            'GOOGLE_CLIENT_ID_env': os.environ.get('GOOGLE_CLIENT_ID'),
-            'GOOGLE_CLIENT_ID_length': len(os.environ.get('GOOGLE_CLIENT_ID', '')),
-            'host': os.environ.get('HOST'),
-            'port': os.environ.get('PORT'),
-            'dev_mode': config.DEV_MODE,
-            'flask_env': os.environ.get('FLASK_ENV'),
-            'cwd': os.getcwd(),
-            'env_file_exists': os.path.exists('.env'),
-            'all_env_vars': {k: v for k, v in os.environ.items() if 'GOOGLE' in k or 'CLIENT' in k}
-        }
-        return jsonify(debug_info)
+        app.register_blueprint(main_bp)
+        app.register_blueprint(auth_bp, url_prefix='/auth')
+        app.register_blueprint(lesson_bp)
+        app.register_blueprint(dashboard_api_bp)
+        app.register_blueprint(lesson_api_bp)
+        app.register_blueprint(docs_bp)
+        app.register_blueprint(firebase_check_bp)
+        app.register_blueprint(system_api_bp)
+        app.register_blueprint(recommendation_api_bp)
+        app.register_blueprint(profile_bp)
+        app.register_blueprint(quiz_api)
+        
+        logger.info("Blueprints registered successfully")
     except Exception as e:
-        return jsonify({'error': str(e), 'type': type(e).__name__})
+        logger.error(f"Failed to register blueprints: {str(e)}")
+        raise
 
-# Debug endpoint to check what data is being passed to the template
-@app.route('/debug_template')
-def debug_template():
-    """Debug what the template receives for google_client_id"""
-    try:
-        from routes.main_routes import get_current_user
-        user = get_current_user()
-        google_client_id = os.environ.get('GOOGLE_CLIENT_ID')
-        
-        debug_info = {
-            'google_client_id_passed_to_template': google_client_id,
-            'google_client_id_length': len(google_client_id) if google_client_id else 0,
-            'user': user,
-            'template_context': {
+
+def _register_app_routes(app, config):
+    """Code execution, health, favicon, debug routes, error handlers and security headers"""
+    from services.code_execution import execute_python_code
+    from services.user_stats import code_execution_deltas
+    from services.resource_sampler import get_latest_resources
+
+    # Register API route for code execution with security validation
+    @app.route('/run_python', methods=['POST'])
+    def run_python():
+        """Run Python code submitted by the user with security validation"""
+        try:
+            # Validate request
+            if not request.is_json:
+                logger.warning("Invalid request format - not JSON")
+                return jsonify({'error': 'Request must be JSON'}), 400
+
+            data = request.json
+            code = data.get('code', '')
+            inputs = data.get('inputs', '')
+
+            # Security validation
+            if len(code) > config.MAX_CODE_LENGTH:
+                logger.warning(f"Code length exceeded limit: {len(code)}")
+                return jsonify({'error': 'Code length exceeds maximum limit'}), 400
+
+            if not code.strip():
+                return jsonify({'error': 'Code cannot be empty'}), 400
+
+            # Execute the code
+            result = execute_python_code(code, inputs)
+
+            user_id = session.get('user_id')
+            firebase_service = current_app.config.get('firebase_service')
+            if user_id and firebase_service and firebase_service.is_available():
+                firebase_service.record_user_stats(user_id, code_execution_deltas(result.get('success', False)))
+
+            # Log successful execution (without exposing code content)
+            logger.info(f"Code execution completed - status: {result.get('status', 'unknown')}")
+
+            return jsonify(result)
+
+        except Exception as e:
+            logger.error(f"Error in code execution endpoint: {str(e)}")
+            return jsonify({'error': 'Internal server error'}), 500
+
+    # Debug endpoint for Google OAuth
+    @app.route('/debug_google_oauth')
+    def debug_google_oauth():
+        """Debug endpoint to check Google OAuth client ID and environment."""
+        try:
+            from dotenv import load_dotenv
+            load_dotenv()
+
+            debug_info = {
+                'GOOGLE_CLIENT_ID_env': os.environ.get('GOOGLE_CLIENT_ID'),
+                'GOOGLE_CLIENT_ID_length': len(os.environ.get('GOOGLE_CLIENT_ID', '')),
+                'host': os.environ.get('HOST'),
+                'port': os.environ.get('PORT'),
+                'dev_mode': config.DEV_MODE,
+                'flask_env': os.environ.get('FLASK_ENV'),
+                'cwd': os.getcwd(),
+                'env_file_exists': os.path.exists('.env'),
+                'all_env_vars': {k: v for k, v in os.environ.items() if 'GOOGLE' in k or 'CLIENT' in k}
+            }
+            return jsonify(debug_info)
+        except Exception as e:
+            return jsonify({'error': str(e), 'type': type(e).__name__})
+
+    # Debug endpoint to check what data is being passed to the template
+    @app.route('/debug_template')
+    def debug_template():
+        """Debug what the template receives for google_client_id"""
+        try:
+            from routes.main_routes import get_current_user
+            user = get_current_user()
+            google_client_id = os.environ.get('GOOGLE_CLIENT_ID')
+
+            debug_info = {
+                'google_client_id_passed_to_template': google_client_id,
+                'google_client_id_length': len(google_client_id) if google_client_id else 0,
                 'user': user,
-                'google_client_id': google_client_id
+                'template_context': {
+                    'user': user,
+                    'google_client_id': google_client_id
+                }
             }
-        }
-        return jsonify(debug_info)
-    except Exception as e:
-        return jsonify({'error': str(e), 'type': type(e).__name__})
+            return jsonify(debug_info)
+        except Exception as e:
+            return jsonify({'error': str(e), 'type': type(e).__name__})
 
-# Debug endpoint to check the actual rendered HTML and see what client ID is in the data-client_id attribute
-@app.route('/debug_rendered_html')
-def debug_rendered_html():
-    """Debug the actual rendered HTML to see the client ID in context"""
-    try:
-        from routes.main_routes import get_current_user
-        
-        user = get_current_user()
-        google_client_id = os.environ.get('GOOGLE_CLIENT_ID')
-        
-        # Get a snippet of the actual rendered template
-        rendered = render_template('pages/index.html', user=user, google_client_id=google_client_id)
-        
-        # Extract just the relevant part with the client ID
-        client_id_matches = re.findall(r'data-client_id="([^"]*)"', rendered)
-        
-        debug_info = {
-            'client_id_in_html': client_id_matches,
-            'client_id_count': len(client_id_matches),
-            'google_client_id_env': google_client_id,
-            'html_snippet': rendered[rendered.find('data-client_id'):rendered.find('data-client_id')+200] if 'data-client_id' in rendered else 'NOT FOUND'
-        }
-        return jsonify(debug_info)
-    except Exception as e:
-        return jsonify({'error': str(e), 'type': type(e).__name__})
+    # Debug endpoint to check the actual rendered HTML and see what client ID is in the data-client_id attribute
+    @app.route('/debug_rendered_html')
+    def debug_rendered_html():
+        """Debug the actual rendered HTML to see the client ID in context"""
+        try:
+            from routes.main_routes import get_current_user
 
-# Debug endpoints for troubleshooting
-@app.route('/debug_firebase_status')
-def debug_firebase_status():
-    """Debug endpoint to check Firebase initialization status"""
-    try:
-        import firebase_admin
-        from firebase_admin import auth as firebase_auth
-        
-        status = {
-            'firebase_apps_initialized': len(firebase_admin._apps) > 0,
-            'firebase_service_available': firebase_service is not None,
-            'firebase_service_is_available': firebase_service.is_available() if firebase_service else False,
-            'dev_mode': config.DEV_MODE,
-            'firebase_config_valid': config.validate_firebase_config(),
-            'firebase_project_id': config.FIREBASE_CONFIG.get('project_id', 'Not set'),
-            'firebase_client_email': config.FIREBASE_CONFIG.get('client_email', 'Not set')
-        }
-        
-        # Test Firebase Auth directly
+            user = get_current_user()
+            google_client_id = os.environ.get('GOOGLE_CLIENT_ID')
+
+            # Get a snippet of the actual rendered template
+            rendered = render_template('pages/index.html', user=user, google_client_id=google_client_id)
+
+            # Extract just the relevant part with the client ID
+            client_id_matches = re.findall(r'data-client_id="([^"]*)"', rendered)
+
+            debug_info = {
+                'client_id_in_html': client_id_matches,
+                'client_id_count': len(client_id_matches),
+                'google_client_id_env': google_client_id,
+                'html_snippet': rendered[rendered.find('data-client_id'):rendered.find('data-client_id')+200] if 'data-client_id' in rendered else 'NOT FOUND'
+            }
+            return jsonify(debug_info)
+        except Exception as e:
+            return jsonify({'error': str(e), 'type': type(e).__name__})
+
+    # Debug endpoints for troubleshooting
+    @app.route('/debug_firebase_status')
+    def debug_firebase_status():
+        """Debug endpoint to check Firebase initialization status"""
         try:
-            # Try to verify a dummy token to test if auth is working
-            # This will fail but tells us if the service is accessible
-            firebase_auth.verify_id_token("dummy_token")
+            import firebase_admin
+            from firebase_admin import auth as firebase_auth
+
+            firebase_service = current_app.config.get('firebase_service')
+            status = {
+                'firebase_apps_initialized': len(firebase_admin._apps) > 0,
+                'firebase_service_available': firebase_service is not None,
+                'firebase_service_is_available': firebase_service.is_available() if firebase_service else False,
+                'dev_mode': config.DEV_MODE,
+                'firebase_config_valid': config.validate_firebase_config(),
+                'firebase_project_id': config.FIREBASE_CONFIG.get('project_id', 'Not set'),
+                'firebase_client_email': config.FIREBASE_CONFIG.get('client_email', 'Not set')
+            }
+
+            # Test Firebase Auth directly
+            try:
+                # Try to verify a dummy token to test if auth is working
+                # This will fail but tells us if the service is accessible
+                firebase_auth.verify_id_token("dummy_token")
+            except Exception as e:
+                status['firebase_auth_test_error'] = str(e)
+                status['firebase_auth_error_type'] = type(e).__name__
+
+            return jsonify(status)
         except Exception as e:
-            status['firebase_auth_test_error'] = str(e)
-            status['firebase_auth_error_type'] = type(e).__name__
-        
-        return jsonify(status)
-    except Exception as e:
-        return jsonify({'error': str(e), 'type': type(e).__name__})
+            return jsonify({'error': str(e), 'type': type(e).__name__})
 
-@app.route('/debug_env_vars')
-def debug_env_vars():
-    """Debug endpoint to check environment variables (safely)"""
-    try:
-        env_status = {
-            'DEV_MODE': os.environ.get('DEV_MODE'),
-            'FLASK_ENV': os.environ.get('FLASK_ENV'),
-            'GOOGLE_CLIENT_ID': os.environ.get('GOOGLE_CLIENT_ID', 'Not set'),
-            'FIREBASE_PROJECT_ID': os.environ.get('FIREBASE_PROJECT_ID', 'Not set'),
-            'FIREBASE_CLIENT_EMAIL': os.environ.get('FIREBASE_CLIENT_EMAIL', 'Not set'),
-            'FIREBASE_PRIVATE_KEY_SET': 'Yes' if os.environ.get('FIREBASE_PRIVATE_KEY') else 'No',
-            'FIREBASE_CLIENT_ID_SET': 'Yes' if os.environ.get('FIREBASE_CLIENT_ID') else 'No'
-        }
-        return jsonify(env_status)
-    except Exception as e:
-        return jsonify({'error': str(e)})
-
-# Error handlers
-@app.errorhandler(404)
-def not_found(error):
-    logger.info(f"404 error: {request.url}")
-    return jsonify({'error': 'Resource not found'}), 404
-
-@app.errorhandler(500)
-def internal_error(error):
-    logger.error(f"500 error: {str(error)}")
-    return jsonify({'error': 'Internal server error'}), 500
-
-@app.errorhandler(Exception)
-def handle_exception(e):
-    logger.error(f"Unhandled exception: {str(e)}", exc_info=True)
-    return jsonify({'error': 'An unexpected error occurred'}), 500
-
-# Health check endpoint
-@app.route('/health')
-def health_check():
-    """Health check endpoint for monitoring"""
-    try:
-        health_status = {
-            'status': 'healthy',
-            'dev_mode': config.DEV_MODE,
-            'firebase_available': firebase_service is not None and firebase_service.is_available() if firebase_service else False,
-            'timestamp': logging.time.time()
+    @app.route('/debug_env_vars')
+    def debug_env_vars():
+        """Debug endpoint to check environment variables (safely)"""
+        try:
+            env_status = {
+                'DEV_MODE': os.environ.get('DEV_MODE'),
+                'FLASK_ENV': os.environ.get('FLASK_ENV'),
+                'GOOGLE_CLIENT_ID': os.environ.get('GOOGLE_CLIENT_ID', 'Not set'),
+                'FIREBASE_PROJECT_ID': os.environ.get('FIREBASE_PROJECT_ID', 'Not set'),
+                'FIREBASE_CLIENT_EMAIL': os.environ.get('FIREBASE_CLIENT_EMAIL', 'Not set'),
+                'FIREBASE_PRIVATE_KEY_SET': 'Yes' if os.environ.get('FIREBASE_PRIVATE_KEY') else 'No',
+                'FIREBASE_CLIENT_ID_SET': 'Yes' if os.environ.get('FIREBASE_CLIENT_ID') else 'No'
+            }
+            return jsonify(env_status)
+        except Exception as e:
+            return jsonify({'error': str(e)})
+
+    # Error handlers
+    @app.errorhandler(404)
+    def not_found(error):
+        logger.info(f"404 error: {request.url}")
+        return jsonify({'error': 'Resource not found'}), 404
+
+    @app.errorhandler(500)
+    def internal_error(error):
+        logger.error(f"500 error: {str(error)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+    @app.errorhandler(Exception)
+    def handle_exception(e):
+        logger.error(f"Unhandled exception: {str(e)}", exc_info=True)
+        return jsonify({'error': 'An unexpected error occurred'}), 500
+
+    # Health check endpoint
+    @app.route('/health')
+    def health_check():
+        """Health check endpoint for monitoring"""
+        try:
+            firebase_service = current_app.config.get('firebase_service')
+            health_status = {
+                'status': 'healthy',
+                'dev_mode': config.DEV_MODE,
+                'firebase_available': firebase_service is not None and firebase_service.is_available() if firebase_service else False,
+                'timestamp': logging.time.time()
+            }
+            sample = get_latest_resources()
+            health_status['resources'] = {
+                'cpu_percent': sample['cpu_percent'],
+                'memory_percent': sample['memory_percent'],
+                'rss': sample['rss']
+            }
+            return jsonify(health_status)
+        except Exception as e:
+            logger.error(f"Health check failed: {str(e)}")
+            return jsonify({'status': 'unhealthy', 'error': str(e)}), 500
+
+    # Favicon route to prevent 404 errors
+    @app.route('/favicon.ico')
+    def favicon():
+        """Serve favicon to prevent 404 errors"""
+        from flask import send_from_directory, abort
+        import os
+
+        favicon_path = os.path.join(app.root_path, 'static', 'favicon.ico')
+        if os.path.exists(favicon_path):
+            return send_from_directory(os.path.join(app.root_path, 'static'), 'favicon.ico')
+        else:
+            # Return 204 No Content to prevent browser from logging 404 error
+            from flask import Response
+            return Response(status=204)
+            from flask import Response
+            return Response(status=204)
+
+    # Security headers middleware
+    @app.after_request
+    def add_security_headers(response):
+        """Add security headers to all responses"""
+        # Standard security headers
+        response.headers['X-Content-Type-Options'] = 'nosniff'
+        response.headers['X-Frame-Options'] = 'SAMEORIGIN'  # Changed from DENY to allow Google OAuth popups
+        response.headers['X-XSS-Protection'] = '1; mode=block'
+
+        # Fix CORS issues for Google OAuth
+        response.headers['Cross-Origin-Opener-Policy'] = 'unsafe-none'
+        response.headers['Cross-Origin-Embedder-Policy'] = 'unsafe-none'
+
+        # Cache control for better performance
+        if 'Cache-Control' not in response.headers:
+            response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
+
+        if not config.DEV_MODE:
+            response.headers['Strict-Transport-Security'] = 'max-age=31536000; includeSubDomains'
+
+        return response
+
+    # Template context processor to make google_client_id available globally
+    @app.context_processor
+    def inject_google_client_id():
+        """Make google_client_id available to all templates"""
+        return {
+            'google_client_id': os.environ.get('GOOGLE_CLIENT_ID')
         }
-        return jsonify(health_status)
-    except Exception as e:
-        logger.error(f"Health check failed: {str(e)}")
-        return jsonify({'status': 'unhealthy', 'error': str(e)}), 500
-
-# Favicon route to prevent 404 errors
-@app.route('/favicon.ico')
-def favicon():
-    """Serve favicon to prevent 404 errors"""
-    from flask import send_from_directory, abort
-    import os
-    
-    favicon_path = os.path.join(app.root_path, 'static', 'favicon.ico')
-    if os.path.exists(favicon_path):
-        return send_from_directory(os.path.join(app.root_path, 'static'), 'favicon.ico')
-    else:
-        # Return 204 No Content to prevent browser from logging 404 error
-        from flask import Response
-        return Response(status=204)
-        from flask import Response
-        return Response(status=204)
-
-# Security headers middleware
-@app.after_request
-def add_security_headers(response):
-    """Add security headers to all responses"""
-    # Standard security headers
-    response.headers['X-Content-Type-Options'] = 'nosniff'
-    response.headers['X-Frame-Options'] = 'SAMEORIGIN'  # Changed from DENY to allow Google OAuth popups
-    response.headers['X-XSS-Protection'] = '1; mode=block'
-    
-    # Fix CORS issues for Google OAuth
-    response.headers['Cross-Origin-Opener-Policy'] = 'unsafe-none'
-    response.headers['Cross-Origin-Embedder-Policy'] = 'unsafe-none'
-    
-    # Cache control for better performance
-    if 'Cache-Control' not in response.headers:
-        response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
-    
-    if not config.DEV_MODE:
-        response.headers['Strict-Transport-Security'] = 'max-age=31536000; includeSubDomains'
-    
-    return response
-
-# Template context processor to make google_client_id available globally
-@app.context_processor
-def inject_google_client_id():
-    """Make google_client_id available to all templates"""
-    return {
-        'google_client_id': os.environ.get('GOOGLE_CLIENT_ID')
-    }
-
-# Debug endpoint to test token verification with a sample token
-@app.route('/debug_test_token', methods=['POST'])
-def debug_test_token():
-    """Debug endpoint to test token verification with a sample token"""
-    try:
-        data = request.get_json()
-        test_token = data.get('token', '') if data else ''
-        
-        if not test_token:
-            return jsonify({'error': 'Please provide a token in the request body'}), 400
-        
-        logger.info(f"Testing token verification with token length: {len(test_token)}")
-        
+
+    # Debug endpoint to test token verification with a sample token
+    @app.route('/debug_test_token', methods=['POST'])
+    def debug_test_token():
+        """Debug endpoint to test token verification with a sample token"""
         try:
-            from firebase_admin import auth as firebase_auth
-            decoded_token = firebase_auth.verify_id_token(test_token)
-            
-            return jsonify({
-                'success': True,
-                'decoded_token': {
-                    'uid': decoded_token.get('uid'),
-                    'email': decoded_token.get('email'),
-                    'name': decoded_token.get('name'),
-                    'iss': decoded_token.get('iss'),
-                    'aud': decoded_token.get('aud'),
-                    'exp': decoded_token.get('exp'),
-                    'iat': decoded_token.get('iat'),
-                    'auth_time': decoded_token.get('auth_time'),
-                    'firebase': decoded_token.get('firebase', {})
-                }
-            })
+            data = request.get_json()
+            test_token = data.get('token', '') if data else ''
+
+            if not test_token:
+                return jsonify({'error': 'Please provide a token in the request body'}), 400
+
+            logger.info(f"Testing token verification with token length: {len(test_token)}")
+
+            try:
+                from firebase_admin import auth as firebase_auth
+                decoded_token = firebase_auth.verify_id_token(test_token)
+
+                return jsonify({
+                    'success': True,
+                    'decoded_token': {
+                        'uid': decoded_token.get('uid'),
+                        'email': decoded_token.get('email'),
+                        'name': decoded_token.get('name'),
+                        'iss': decoded_token.get('iss'),
+                        'aud': decoded_token.get('aud'),
+                        'exp': decoded_token.get('exp'),
+                        'iat': decoded_token.get('iat'),
+                        'auth_time': decoded_token.get('auth_time'),
+                        'firebase': decoded_token.get('firebase', {})
+                    }
+                })
+            except Exception as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e),
+                    'error_type': type(e).__name__
+                })
         except Exception as e:
-            return jsonify({
-                'success': False,
-                'error': str(e),
-                'error_type': type(e).__name__
-            })
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+            return jsonify({'error': str(e)}), 500
+
+    # Lesson route moved to lesson_routes.py blueprint for ES6 modular system
+    # @app.route('/lesson/<lesson_id>')
+    # @login_required 
+    # def lesson(lesson_id):
+    #     # This route has been moved to routes/lesson_routes.py
+    #     # to support the new ES6 modular lesson system
+    #     pass
+
+    @app.route('/test_logout')
+    def test_logout_page():
+        """Test page for logout functionality"""
+        return render_template('test_logout.html')
 
-# Lesson route moved to lesson_routes.py blueprint for ES6 modular system
-# @app.route('/lesson/<lesson_id>')
-# @login_required 
-# def lesson(lesson_id):
-#     # This route has been moved to routes/lesson_routes.py
-#     # to support the new ES6 modular lesson system
-#     pass
 
-@app.route('/test_logout')
-def test_logout_page():
-    """Test page for logout functionality"""
-    return render_template('test_logout.html')
+app = create_app()
 
 # Main entry point
 if __name__ == '__main__':
     try:
+        config = get_config()
+        firebase_service = app.config.get('firebase_service')
         logger.info("Starting Code with Morais application")
         logger.info(f"Environment: {'Development' if config.DEV_MODE else 'Production'}")
         logger.info(f"Firebase available: {firebase_service is not None and firebase_service.is_available() if firebase_service else False}")
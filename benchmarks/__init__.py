@@ -0,0 +1,8 @@
+"""
+Benchmark and load-test suite for Code with Morais
+
+Boots the Flask app against an in-memory Firestore stand-in (or the
+Firestore emulator), seeds it from firebase_data/*.json scaled to N users and
+lessons, and drives realistic request mixes with a concurrent load generator.
+Run it through scripts/development/run_benchmarks.py.
+"""
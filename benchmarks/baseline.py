@@ -0,0 +1,107 @@
+"""
+Stored benchmark baselines and regression comparison
+
+Baselines live in benchmarks/baselines/<name>.json next to the run settings
+they were taken with. compare() checks a new run against one, route by
+route, and flags latency, throughput, error-rate or Firestore-per-request
+changes beyond the tolerances.
+"""
+import json
+import os
+import platform
+import subprocess
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baselines')
+
+DEFAULT_TOLERANCES = {
+    'p50_ms': 0.20,            # relative increase allowed
+    'p95_ms': 0.25,
+    'p99_ms': 0.35,
+    'rps': 0.15,               # relative decrease allowed
+    'error_rate': 0.01,        # absolute increase allowed
+    'firestore_reads_per_request': 0.05,
+    'firestore_writes_per_request': 0.05,
+}
+
+# Latencies under this many ms are too noisy to compare relatively
+MIN_LATENCY_MS = 2.0
+
+# Routes with fewer samples than this in either run are only reported, not compared
+MIN_ROUTE_REQUESTS = 50
+
+
+def baseline_path(name: str) -> str:
+    return os.path.join(BASELINE_DIR, f"{name}.json")
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(BASELINE_DIR)).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_baseline(name: str, summary: Dict[str, Any], settings: Dict[str, Any]) -> str:
+    """Write a run as the named baseline"""
+    os.makedirs(BASELINE_DIR, exist_ok=True)
+    path = baseline_path(name)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'name': name,
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'revision': _git_revision(),
+            'python': platform.python_version(),
+            'settings': settings,
+            'summary': summary,
+        }, f, indent=2, sort_keys=True)
+    return path
+
+
+def load_baseline(name: str) -> Dict[str, Any]:
+    path = name if os.path.isfile(name) else baseline_path(name)
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _compare_stats(scope: str, old: Dict[str, Any], new: Dict[str, Any],
+                   tolerances: Dict[str, float]) -> List[Dict[str, Any]]:
+    findings = []
+    for metric, tolerance in tolerances.items():
+        if metric not in old or metric not in new:
+            continue
+        before, after = old[metric], new[metric]
+        if metric == 'rps':
+            regressed = before > 0 and after < before * (1 - tolerance)
+        elif metric == 'error_rate':
+            regressed = after > before + tolerance
+        elif metric.endswith('_ms'):
+            regressed = after > MIN_LATENCY_MS and after > before * (1 + tolerance)
+        else:
+            regressed = after > before * (1 + tolerance) + 1e-9
+        if regressed:
+            change = (after - before) / before * 100 if before else float('inf')
+            findings.append({'scope': scope, 'metric': metric, 'baseline': before, 'current': after,
+                             'change_pct': round(change, 1)})
+    return findings
+
+
+def compare(baseline: Dict[str, Any], summary: Dict[str, Any],
+            tolerances: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """Regressions of a run against a baseline (overall and per route)"""
+    tolerances = {**DEFAULT_TOLERANCES, **(tolerances or {})}
+    old = baseline['summary']
+    regressions = _compare_stats('overall', old['overall'], summary['overall'], tolerances)
+    # Route throughput just follows the mix, so only the overall RPS is compared
+    route_tolerances = {metric: value for metric, value in tolerances.items() if metric != 'rps'}
+    missing = []
+    for route, stats in old.get('routes', {}).items():
+        current = summary.get('routes', {}).get(route)
+        if current is None:
+            missing.append(route)
+        elif min(stats['requests'], current['requests']) >= MIN_ROUTE_REQUESTS:
+            regressions.extend(_compare_stats(route, stats, current, route_tolerances))
+    return {'baseline': baseline.get('name'), 'revision': baseline.get('revision'),
+            'regressions': regressions, 'missing_routes': missing, 'passed': not regressions}
@@ -0,0 +1,471 @@
+"""
+In-memory Firestore stand-in for benchmarks and tests
+
+FakeFirestoreClient implements the subset of google.cloud.firestore.Client
+that FirebaseService and the models use: collections, documents, where /
+order_by / limit / start_after / select queries, batches, bulk writers,
+transactions (usable with firestore.transactional) and the SERVER_TIMESTAMP / Increment / ArrayUnion / ArrayRemove / DELETE_FIELD
+transforms. Data is deep-copied on every read and write, like a real
+round trip, and an optional per-call latency emulates the network.
+
+InMemoryFirebaseService runs the real FirebaseService methods against it, so
+benchmarks exercise the same code paths (and the same metrics and budget
+instrumentation) as production.
+"""
+import copy
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, List, Tuple
+
+from google.cloud import firestore as gcloud_firestore
+from google.cloud.firestore_v1 import transforms
+
+from services.firebase_service import FirebaseService
+
+EMULATOR_PROJECT_ID = 'demo-codewithmorais'
+
+# Firestore's cross-type ordering: null < bool < number < timestamp < string < bytes < array < map
+_TYPE_RANK = ((type(None), 0), (bool, 1), (int, 2), (float, 2), (datetime, 3), (str, 4),
+              (bytes, 5), (list, 7), (dict, 8))
+
+
+def _order_key(value):
+    for value_type, rank in _TYPE_RANK:
+        if isinstance(value, value_type):
+            if rank == 3 and value.tzinfo is None:
+                value = value.replace(tzinfo=timezone.utc)
+            if rank in (7, 8):
+                return (rank, str(value))
+            return (rank, value)
+    return (9, str(value))
+
+
+def _get_field(data: Dict[str, Any], path: str):
+    """Value at a dotted field path, or a sentinel when missing"""
+    value = data
+    for part in path.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+_MISSING = object()
+
+_OPERATORS = {
+    '==': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+    '<': lambda a, b: _order_key(a) < _order_key(b),
+    '<=': lambda a, b: _order_key(a) <= _order_key(b),
+    '>': lambda a, b: _order_key(a) > _order_key(b),
+    '>=': lambda a, b: _order_key(a) >= _order_key(b),
+    'in': lambda a, b: a in b,
+    'not-in': lambda a, b: a not in b,
+    'array_contains': lambda a, b: isinstance(a, list) and b in a,
+    'array_contains_any': lambda a, b: isinstance(a, list) and any(item in a for item in b),
+}
+
+
+class FakeSnapshot:
+    """DocumentSnapshot lookalike"""
+
+    def __init__(self, reference: 'FakeDocument', data: Optional[Dict[str, Any]]):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return copy.deepcopy(self._data)
+
+    def get(self, field: str):
+        value = _get_field(self._data or {}, field)
+        return None if value is _MISSING else copy.deepcopy(value)
+
+
+class FakeStore:
+    """Documents keyed by collection path, with simulated latency"""
+
+    def __init__(self, latency_ms: float = 0.0, per_document_ms: float = 0.0):
+        self.collections: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.latency = latency_ms / 1000
+        self.per_document = per_document_ms / 1000
+        self.lock = threading.RLock()
+        self.rpc_count = 0
+
+    def round_trip(self, documents: int = 1):
+        self.rpc_count += 1
+        delay = self.latency + self.per_document * documents
+        if delay > 0:
+            time.sleep(delay)
+
+    @staticmethod
+    def _resolve(value, current):
+        """Apply Firestore transforms against the current field value"""
+        if value is gcloud_firestore.SERVER_TIMESTAMP:
+            return datetime.now(timezone.utc)
+        if isinstance(value, transforms.Increment):
+            return (current if isinstance(current, (int, float)) and not isinstance(current, bool) else 0) + value.value
+        if isinstance(value, transforms.ArrayUnion):
+            result = list(current) if isinstance(current, list) else []
+            for item in value.values:
+                if item not in result:
+                    result.append(item)
+            return result
+        if isinstance(value, transforms.ArrayRemove):
+            return [item for item in (current if isinstance(current, list) else []) if item not in value.values]
+        if isinstance(value, dict):
+            return {key: FakeStore._resolve(item, (current or {}).get(key) if isinstance(current, dict) else None)
+                    for key, item in value.items()}
+        return copy.deepcopy(value)
+
+    @staticmethod
+    def _merge(target: Dict[str, Any], data: Dict[str, Any]):
+        """set(merge=True): nested maps merge key by key at every depth"""
+        for key, value in data.items():
+            if value is gcloud_firestore.DELETE_FIELD:
+                target.pop(key, None)
+            elif isinstance(value, dict) and isinstance(target.get(key), dict):
+                FakeStore._merge(target[key], value)
+            else:
+                target[key] = FakeStore._resolve(value, target.get(key))
+
+    def write(self, collection: str, doc_id: str, data: Dict[str, Any], mode: str):
+        """mode: 'set', 'merge' or 'update'"""
+        with self.lock:
+            documents = self.collections.setdefault(collection, {})
+            current = documents.get(doc_id)
+            if mode == 'update' and current is None:
+                raise ValueError(f"No document to update: {collection}/{doc_id}")
+            if mode == 'set':
+                documents[doc_id] = self._resolve(data, None)
+                return
+            target = copy.deepcopy(current) if current is not None else {}
+            if mode == 'merge':
+                self._merge(target, data)
+                documents[doc_id] = target
+                return
+            for path, value in data.items():
+                parts = path.split('.')
+                parent = target
+                for part in parts[:-1]:
+                    if not isinstance(parent.get(part), dict):
+                        parent[part] = {}
+                    parent = parent[part]
+                if value is gcloud_firestore.DELETE_FIELD:
+                    parent.pop(parts[-1], None)
+                else:
+                    parent[parts[-1]] = self._resolve(value, parent.get(parts[-1]))
+            documents[doc_id] = target
+
+    def delete(self, collection: str, doc_id: str):
+        with self.lock:
+            self.collections.get(collection, {}).pop(doc_id, None)
+
+
+class FakeQuery:
+    """Immutable query over one collection"""
+
+    def __init__(self, store: FakeStore, path: str, filters=(), orders=(), limit_count=None, cursor=None,
+                 projection=None):
+        self._store = store
+        self._path = path
+        self._filters = filters
+        self._orders = orders
+        self._limit = limit_count
+        self._cursor = cursor
+        self._projection = projection
+
+    def _copy(self, **changes) -> 'FakeQuery':
+        params = dict(filters=self._filters, orders=self._orders, limit_count=self._limit, cursor=self._cursor,
+                      projection=self._projection)
+        params.update(changes)
+        return FakeQuery(self._store, self._path, **params)
+
+    def where(self, field_path: str = None, op_string: str = None, value=None, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return self._copy(filters=self._filters + ((field_path, op_string, value),))
+
+    def select(self, field_paths):
+        return self._copy(projection=tuple(field_paths))
+
+    def order_by(self, field_path: str, direction: str = 'ASCENDING'):
+        return self._copy(orders=self._orders + ((field_path, direction),))
+
+    def limit(self, count: int):
+        return self._copy(limit_count=count)
+
+    def start_after(self, document_fields):
+        if isinstance(document_fields, FakeSnapshot):
+            document_fields = {'__name__': document_fields.id, **(document_fields.to_dict() or {})}
+        return self._copy(cursor=document_fields)
+
+    def _sort_values(self, doc_id: str, data: Dict[str, Any]) -> Tuple:
+        values = []
+        for field, _ in self._orders:
+            values.append(doc_id if field == '__name__' else _get_field(data, field))
+        return tuple(values)
+
+    def _after_cursor(self, values: Tuple) -> bool:
+        for (field, direction), value in zip(self._orders, values):
+            if field not in self._cursor:
+                break
+            value_key, cursor_key = _order_key(value), _order_key(self._cursor[field])
+            if value_key != cursor_key:
+                descending = str(direction).upper().startswith('DESC')
+                return value_key < cursor_key if descending else value_key > cursor_key
+        return False
+
+    def _matching(self) -> List[Tuple[str, Dict[str, Any]]]:
+        with self._store.lock:
+            documents = list(self._store.collections.get(self._path, {}).items())
+        results = []
+        for doc_id, data in documents:
+            if all(_get_field(data, field) is not _MISSING
+                   and _OPERATORS[op](_get_field(data, field), value) for field, op, value in self._filters):
+                # Like Firestore, documents missing an order_by field are excluded
+                if all(field == '__name__' or _get_field(data, field) is not _MISSING for field, _ in self._orders):
+                    results.append((doc_id, data))
+        for index in reversed(range(len(self._orders))):
+            field, direction = self._orders[index]
+            results.sort(key=lambda item: _order_key(self._sort_values(*item)[index]),
+                         reverse=str(direction).upper().startswith('DESC'))
+        if self._cursor is not None and self._orders:
+            # Positional, like Firestore: the cursor document itself need not exist
+            results = [item for item in results if self._after_cursor(self._sort_values(*item))]
+        if self._limit is not None:
+            results = results[:self._limit]
+        return results
+
+    def stream(self, transaction=None):
+        results = self._matching()
+        self._store.round_trip(max(1, len(results)))
+        for doc_id, data in results:
+            if self._projection is not None:
+                data = {field: data[field] for field in self._projection if field in data}
+            yield FakeSnapshot(FakeDocument(self._store, self._path, doc_id), copy.deepcopy(data))
+
+    def get(self, transaction=None) -> List[FakeSnapshot]:
+        return list(self.stream())
+
+
+class FakeCollection(FakeQuery):
+    """CollectionReference lookalike"""
+
+    def __init__(self, store: FakeStore, path: str):
+        super().__init__(store, path)
+        self.id = path.rsplit('/', 1)[-1]
+
+    def document(self, document_id: Optional[str] = None) -> 'FakeDocument':
+        return FakeDocument(self._store, self._path, document_id or uuid.uuid4().hex[:20])
+
+    def add(self, document_data: Dict[str, Any], document_id: Optional[str] = None):
+        reference = self.document(document_id)
+        reference.set(document_data)
+        return datetime.now(timezone.utc), reference
+
+    def list_documents(self):
+        """Like Firestore, includes missing documents that only hold subcollections"""
+        prefix = self._path + '/'
+        with self._store.lock:
+            ids = list(self._store.collections.get(self._path, {}))
+            for path, documents in self._store.collections.items():
+                if path.startswith(prefix) and documents:
+                    doc_id = path[len(prefix):].split('/', 1)[0]
+                    if doc_id not in ids:
+                        ids.append(doc_id)
+        return [self.document(doc_id) for doc_id in ids]
+
+
+class FakeDocument:
+    """DocumentReference lookalike"""
+
+    def __init__(self, store: FakeStore, collection: str, document_id: str):
+        self._store = store
+        self._collection = collection
+        self.id = document_id
+        self.path = f"{collection}/{document_id}"
+
+    def get(self, field_paths=None, transaction=None) -> FakeSnapshot:
+        self._store.round_trip()
+        with self._store.lock:
+            data = self._store.collections.get(self._collection, {}).get(self.id)
+            return FakeSnapshot(self, copy.deepcopy(data))
+
+    def set(self, document_data: Dict[str, Any], merge: bool = False):
+        self._store.round_trip()
+        self._store.write(self._collection, self.id, document_data, 'merge' if merge else 'set')
+
+    def update(self, field_updates: Dict[str, Any]):
+        self._store.round_trip()
+        self._store.write(self._collection, self.id, field_updates, 'update')
+
+    def delete(self):
+        self._store.round_trip()
+        self._store.delete(self._collection, self.id)
+
+    def collection(self, collection_id: str) -> FakeCollection:
+        return FakeCollection(self._store, f"{self.path}/{collection_id}")
+
+
+class FakeWriteBatch:
+    """WriteBatch lookalike; writes are applied on commit"""
+
+    def __init__(self, store: FakeStore):
+        self._store = store
+        self._writes: List[Tuple] = []
+
+    def set(self, reference: FakeDocument, document_data: Dict[str, Any], merge: bool = False):
+        self._writes.append(('merge' if merge else 'set', reference, document_data))
+
+    def update(self, reference: FakeDocument, field_updates: Dict[str, Any]):
+        self._writes.append(('update', reference, field_updates))
+
+    def delete(self, reference: FakeDocument):
+        self._writes.append(('delete', reference, None))
+
+    def commit(self):
+        self._store.round_trip(len(self._writes))
+        with self._store.lock:
+            for mode, reference, data in self._writes:
+                if mode == 'delete':
+                    self._store.delete(reference._collection, reference.id)
+                else:
+                    self._store.write(reference._collection, reference.id, data, mode)
+        results = [object() for _ in self._writes]
+        self._writes = []
+        return results
+
+    def __len__(self):
+        return len(self._writes)
+
+
+class FakeBulkWriter(FakeWriteBatch):
+    """BulkWriter lookalike that flushes every 20 writes"""
+
+    def _maybe_flush(self):
+        if len(self._writes) >= 20:
+            self.commit()
+
+    def set(self, reference, document_data, merge=False):
+        super().set(reference, document_data, merge)
+        self._maybe_flush()
+
+    def update(self, reference, field_updates):
+        super().update(reference, field_updates)
+        self._maybe_flush()
+
+    def delete(self, reference):
+        super().delete(reference)
+        self._maybe_flush()
+
+    def flush(self):
+        if self._writes:
+            self.commit()
+
+    def close(self):
+        self.flush()
+
+
+class FakeTransaction(FakeWriteBatch):
+    """Transaction lookalike usable with firestore.transactional
+
+    Transactions hold the store lock from _begin to _commit, so they are
+    serialized against each other and against every other read and write.
+    """
+
+    _read_only = False
+    _max_attempts = 5
+
+    def __init__(self, store: FakeStore):
+        super().__init__(store)
+        self._id = None
+        self._locked = False
+
+    def _clean_up(self):
+        self._writes = []
+        self._id = None
+
+    def _begin(self, retry_id=None):
+        self._store.lock.acquire()
+        self._locked = True
+        self._id = uuid.uuid4().bytes
+
+    def _release(self):
+        if self._locked:
+            self._locked = False
+            self._store.lock.release()
+
+    def _commit(self):
+        try:
+            return self.commit()
+        finally:
+            self._clean_up()
+            self._release()
+
+    def _rollback(self):
+        self._clean_up()
+        self._release()
+
+    def get(self, ref_or_query):
+        """Like the real client, a generator of snapshots even for one document"""
+        if isinstance(ref_or_query, FakeDocument):
+            return iter([ref_or_query.get()])
+        return ref_or_query.stream()
+
+
+class FakeFirestoreClient:
+    """google.cloud.firestore.Client lookalike backed by a FakeStore"""
+
+    def __init__(self, latency_ms: float = 0.0, per_document_ms: float = 0.0):
+        self.store = FakeStore(latency_ms, per_document_ms)
+
+    def collection(self, collection_path: str) -> FakeCollection:
+        return FakeCollection(self.store, collection_path)
+
+    def document(self, document_path: str) -> FakeDocument:
+        collection, _, document_id = document_path.rpartition('/')
+        return FakeDocument(self.store, collection, document_id)
+
+    def batch(self) -> FakeWriteBatch:
+        return FakeWriteBatch(self.store)
+
+    def bulk_writer(self) -> FakeBulkWriter:
+        return FakeBulkWriter(self.store)
+
+    def transaction(self, **kwargs) -> FakeTransaction:
+        return FakeTransaction(self.store)
+
+    def count(self, collection_path: str) -> int:
+        with self.store.lock:
+            return len(self.store.collections.get(collection_path, {}))
+
+
+class InMemoryFirebaseService(FirebaseService):
+    """FirebaseService running its real methods against FakeFirestoreClient"""
+
+    def __init__(self, latency_ms: float = 0.0, per_document_ms: float = 0.0):
+        self.config = {}
+        self.app = None
+        self.db = FakeFirestoreClient(latency_ms, per_document_ms)
+
+    def verify_id_token(self, id_token: str) -> Optional[Dict[str, Any]]:
+        return None
+
+
+class EmulatorFirebaseService(FirebaseService):
+    """FirebaseService against the Firestore emulator (FIRESTORE_EMULATOR_HOST)"""
+
+    def __init__(self, project_id: str = EMULATOR_PROJECT_ID):
+        if not os.environ.get('FIRESTORE_EMULATOR_HOST'):
+            raise RuntimeError("FIRESTORE_EMULATOR_HOST is not set")
+        self.config = {'project_id': project_id}
+        self.app = None
+        self.db = gcloud_firestore.Client(project=project_id)
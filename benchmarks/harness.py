@@ -0,0 +1,169 @@
+"""
+Boot the application against a local Firestore stand-in
+
+build_app() imports app.py the normal way, then swaps the FirebaseService it
+created (usually none, without credentials) for an InMemoryFirebaseService
+or, when FIRESTORE_EMULATOR_HOST is set and backend='emulator', the
+Firestore emulator. The service is injected through the same setters app.py
+uses, so routes and models take their production code paths.
+
+Code execution goes to a local Piston stub instead of emkc.org, and a
+/__bench__/login/<uid> route lets the load generator obtain a signed session
+cookie for any seeded user. Both exist only in benchmark processes.
+
+create_application() builds the same app for WSGI servers:
+
+    gunicorn -c gunicorn.conf.py 'benchmarks.harness:create_application()'
+"""
+import json
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, Optional, Tuple
+
+from benchmarks import seed
+from benchmarks.fake_firestore import InMemoryFirebaseService, EmulatorFirebaseService
+
+logger = logging.getLogger(__name__)
+
+BENCH_LOGIN_PATH = '/__bench__/login/'
+
+
+class _PistonStubHandler(BaseHTTPRequestHandler):
+    """Answers the two Piston endpoints code_execution calls"""
+
+    latency = 0.0
+
+    def _reply(self, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self._reply([{'language': 'python', 'version': '3.10.0', 'aliases': ['py']}])
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(length)
+        if self.latency:
+            time.sleep(self.latency)
+        self._reply({'language': 'python', 'version': '3.10.0',
+                     'run': {'stdout': 'ok\n', 'stderr': '', 'code': 0, 'output': 'ok\n'}})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_piston_stub(latency_ms: float = 0.0) -> Tuple[ThreadingHTTPServer, str]:
+    """Local Piston API on a free port; returns (server, base URL)"""
+    handler = type('PistonStubHandler', (_PistonStubHandler,), {'latency': latency_ms / 1000})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='piston-stub', daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/api/v2/piston"
+
+
+def install_firebase_service(app_module, service):
+    """Inject a service exactly where app.py does"""
+    from services.firebase_service import set_firebase_service
+    from services.async_firebase_service import set_async_firebase_service
+    from models.user import set_firebase_service as set_user_firebase_service
+    from models.lesson import set_firebase_service as set_lesson_firebase_service
+    from models.quiz import set_firebase_service as set_quiz_firebase_service
+    from models.activity import set_firebase_service as set_activity_firebase_service
+
+    app_module.firebase_service = service
+    app_module.app.config['firebase_service'] = service
+    set_firebase_service(service)
+    # The async client needs a real Firestore; the sync paths are the fallback
+    set_async_firebase_service(None)
+    set_user_firebase_service(service)
+    set_lesson_firebase_service(service)
+    set_quiz_firebase_service(service)
+    set_activity_firebase_service(service)
+
+
+def register_bench_routes(app):
+    """Session login for seeded users, used by the load generator"""
+    from flask import session, jsonify
+
+    @app.route(BENCH_LOGIN_PATH + '<uid>', methods=['POST'])
+    def bench_login(uid):
+        session.clear()
+        session['user_id'] = uid
+        session['authenticated'] = True
+        return jsonify({'success': True, 'user_id': uid})
+
+
+def build_app(backend: str = 'memory', users: int = 200, lessons: int = 30,
+              activities_per_user: int = 10, seed_value: int = 42,
+              firestore_latency_ms: float = 0.0, piston_latency_ms: float = 50.0,
+              options: Optional[Dict[str, Any]] = None):
+    """Import, seed and wire the app; returns (flask app, info dict)"""
+    _, piston_url = start_piston_stub(piston_latency_ms)
+    os.environ['PISTON_API_URL'] = piston_url
+    # Production code paths: no dev-mode mocks, and no dev user fallback
+    os.environ['DEV_MODE'] = 'False'
+    os.environ.setdefault('FLASK_ENV', 'development')
+
+    import app as app_module
+
+    if backend == 'emulator':
+        service = EmulatorFirebaseService()
+    else:
+        service = InMemoryFirebaseService(latency_ms=firestore_latency_ms)
+    install_firebase_service(app_module, service)
+    register_bench_routes(app_module.app)
+
+    started = time.perf_counter()
+    dataset = seed.build_dataset(users, lessons, activities_per_user, seed_value)
+    counts = seed.seed_database(service.db, dataset)
+    info = {
+        'backend': backend,
+        'users': users,
+        'lessons': lessons,
+        'seed': seed_value,
+        'documents': counts,
+        'seed_seconds': round(time.perf_counter() - started, 2),
+        'firestore_latency_ms': firestore_latency_ms,
+        'piston_latency_ms': piston_latency_ms,
+        **(options or {}),
+    }
+    logger.info(f"Benchmark app ready: {info}")
+    return app_module.app, info
+
+
+def create_application():
+    """WSGI factory configured from BENCH_* environment variables"""
+    flask_app, _ = build_app(
+        backend=os.environ.get('BENCH_BACKEND', 'memory'),
+        users=int(os.environ.get('BENCH_USERS', 200)),
+        lessons=int(os.environ.get('BENCH_LESSONS', 30)),
+        seed_value=int(os.environ.get('BENCH_SEED', 42)),
+        firestore_latency_ms=float(os.environ.get('BENCH_FIRESTORE_LATENCY_MS', 0)),
+        piston_latency_ms=float(os.environ.get('BENCH_PISTON_LATENCY_MS', 50)),
+    )
+    return flask_app
+
+
+def serve(host: str = '127.0.0.1', port: int = 8090, ready_file: Optional[str] = None, **kwargs):
+    """Run the seeded app on werkzeug's threaded server until interrupted"""
+    from werkzeug.serving import make_server
+
+    flask_app, info = build_app(**kwargs)
+    server = make_server(host, port, flask_app, threaded=True)
+    info['url'] = f"http://{host}:{server.server_port}"
+    if ready_file:
+        with open(ready_file, 'w') as f:
+            json.dump(info, f)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,131 @@
+"""
+Import-time profile of application boot
+
+Runs a fresh interpreter with `-X importtime` that imports the app (which
+builds it through create_app()), parses the per-module timings from stderr
+and reduces several runs to median self/cumulative microseconds per
+module. The report lists the slowest modules and the self time per
+top-level package, and compare() checks a run against a stored baseline
+(benchmarks/baselines/<name>.json, same layout as load baselines).
+
+    python scripts/development/run_benchmarks.py importtime --runs 5
+    python scripts/development/run_benchmarks.py importtime --save-baseline boot
+    python scripts/development/run_benchmarks.py importtime --compare boot
+"""
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# "import time:       self [us] |  cumulative | imported package"
+_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$')
+
+# Modules the app is meant to import on first use, not at boot
+DEFERRED_MODULES = ('firebase_admin', 'google.cloud.firestore', 'grpc', 'google.oauth2',
+                    'requests', 'psutil', 'redis')
+
+DEFAULT_TOLERANCES = {
+    'boot_ms': 0.25,       # relative increase of the whole import + create_app
+    'package_ms': 0.50,    # relative increase of one package's self time
+}
+MIN_PACKAGE_MS = 5.0       # packages below this are too noisy to compare
+
+_BOOT_SCRIPT = (
+    "import sys, time\n"
+    "started = time.perf_counter()\n"
+    "import {module}\n"
+    "elapsed = time.perf_counter() - started\n"
+    "deferred = [name for name in {deferred!r} if name in sys.modules]\n"
+    "print('BOOT', elapsed, ','.join(deferred))\n"
+)
+
+
+def parse_importtime(text: str) -> List[Dict[str, Any]]:
+    """Entries of -X importtime output in import order, with nesting depth"""
+    entries = []
+    for line in text.splitlines():
+        match = _LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            entries.append({'module': module, 'self_us': int(self_us), 'cumulative_us': int(cumulative_us),
+                            'depth': (len(indent) - 1) // 2})
+    return entries
+
+
+def run_once(module: str = 'app', env: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Import module in a fresh interpreter; returns its import entries and boot time"""
+    script = _BOOT_SCRIPT.format(module=module, deferred=DEFERRED_MODULES)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', script], cwd=ROOT,
+                            capture_output=True, text=True, env={**os.environ, **(env or {})})
+    boot = [line for line in result.stdout.splitlines() if line.startswith('BOOT ')]
+    if result.returncode != 0 or not boot:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    _, elapsed, deferred = (boot[-1].split(' ') + [''])[:3]
+    return {'entries': parse_importtime(result.stderr), 'boot_ms': float(elapsed) * 1000,
+            'deferred_loaded': [name for name in deferred.split(',') if name]}
+
+
+def summarize(runs: List[Dict[str, Any]], top: int = 25) -> Dict[str, Any]:
+    """Median timings across runs: slowest modules and self time per top-level package"""
+    self_us: Dict[str, List[int]] = {}
+    cumulative_us: Dict[str, List[int]] = {}
+    depth: Dict[str, int] = {}
+    for run in runs:
+        for entry in run['entries']:
+            self_us.setdefault(entry['module'], []).append(entry['self_us'])
+            cumulative_us.setdefault(entry['module'], []).append(entry['cumulative_us'])
+            depth.setdefault(entry['module'], entry['depth'])
+
+    modules = [{'module': name, 'self_ms': round(statistics.median(self_us[name]) / 1000, 2),
+                'cumulative_ms': round(statistics.median(cumulative_us[name]) / 1000, 2),
+                'depth': depth[name]} for name in self_us]
+    packages: Dict[str, float] = {}
+    for item in modules:
+        package = item['module'].split('.')[0]
+        packages[package] = packages.get(package, 0.0) + item['self_ms']
+
+    modules.sort(key=lambda item: item['cumulative_ms'], reverse=True)
+    return {
+        'runs': len(runs),
+        'boot_ms': round(statistics.median(run['boot_ms'] for run in runs), 2),
+        'modules_imported': len(modules),
+        'deferred_loaded': sorted({name for run in runs for name in run['deferred_loaded']}),
+        'slowest_modules': modules[:top],
+        'packages': {name: round(ms, 2) for name, ms in
+                     sorted(packages.items(), key=lambda item: item[1], reverse=True)},
+    }
+
+
+def measure(module: str = 'app', runs: int = 5, top: int = 25,
+            env: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Import-time report over several fresh interpreters (the first one warms .pyc files)"""
+    run_once(module, env)
+    started = time.perf_counter()
+    results = [run_once(module, env) for _ in range(runs)]
+    summary = summarize(results, top)
+    summary['module'] = module
+    summary['wall_seconds'] = round(time.perf_counter() - started, 2)
+    return summary
+
+
+def compare(baseline: Dict[str, Any], summary: Dict[str, Any],
+            tolerances: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """Boot-time regressions of a report against a stored one"""
+    tolerances = {**DEFAULT_TOLERANCES, **(tolerances or {})}
+    old = baseline['summary']
+    regressions = []
+    if summary['boot_ms'] > old['boot_ms'] * (1 + tolerances['boot_ms']):
+        regressions.append({'scope': 'boot', 'baseline': old['boot_ms'], 'current': summary['boot_ms']})
+    for package, current in summary['packages'].items():
+        before = old['packages'].get(package, 0.0)
+        if current >= MIN_PACKAGE_MS and current > before * (1 + tolerances['package_ms']):
+            regressions.append({'scope': package, 'baseline': before, 'current': current})
+    newly_loaded = [name for name in summary['deferred_loaded'] if name not in old.get('deferred_loaded', [])]
+    return {'baseline': baseline.get('name'), 'revision': baseline.get('revision'),
+            'regressions': regressions, 'newly_loaded': newly_loaded,
+            'passed': not regressions and not newly_loaded}
@@ -0,0 +1,192 @@
+"""
+Concurrent load generator and result statistics
+
+Worker threads each hold a keep-alive requests.Session and replay actions
+from a Mix until the request or time limit is reached. Every response is
+recorded with its latency and the Firestore totals the app reports in its
+Server-Timing header (see utils/firestore_budget.py), so the report can
+show Firestore reads/writes per request next to RPS and percentiles.
+"""
+import math
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, Any, List, Optional
+
+import requests
+
+from benchmarks.harness import BENCH_LOGIN_PATH
+from benchmarks.scenarios import Mix
+
+SERVER_TIMING_FIRESTORE = re.compile(
+    r'firestore;dur=(?P<dur>[\d.]+);desc="reads=(?P<reads>\d+) writes=(?P<writes>\d+) calls=(?P<calls>\d+)"')
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of unsorted values"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def parse_server_timing(header: Optional[str]) -> Optional[Dict[str, float]]:
+    """Firestore totals from a Server-Timing header, if present"""
+    match = SERVER_TIMING_FIRESTORE.search(header or '')
+    if not match:
+        return None
+    return {'firestore_ms': float(match.group('dur')), 'reads': int(match.group('reads')),
+            'writes': int(match.group('writes')), 'calls': int(match.group('calls'))}
+
+
+def route_key(method: str, path: str) -> str:
+    """Group /lesson/<id> style paths under one name"""
+    parts = [re.sub(r'^bench-(user|lesson|quiz)-\d+$', '<id>', part) for part in path.split('/')]
+    return f"{method} {'/'.join(parts)}"
+
+
+class Results:
+    """Thread-safe sample collection"""
+
+    def __init__(self):
+        self.samples: List[Dict[str, Any]] = []
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def add(self, sample: Dict[str, Any]):
+        with self._lock:
+            self.samples.append(sample)
+
+    def summary(self) -> Dict[str, Any]:
+        """Totals, per-route and per-scenario statistics"""
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        with self._lock:
+            samples = list(self.samples)
+        routes = defaultdict(list)
+        scenarios = defaultdict(list)
+        for sample in samples:
+            routes[sample['route']].append(sample)
+            scenarios[sample['scenario']].append(sample)
+        return {
+            'duration_s': round(elapsed, 2),
+            'overall': _stats(samples, elapsed),
+            'routes': {name: _stats(items, elapsed) for name, items in sorted(routes.items())},
+            'scenarios': {name: _stats(items, elapsed) for name, items in sorted(scenarios.items())},
+        }
+
+
+def _stats(samples: List[Dict[str, Any]], elapsed: float) -> Dict[str, Any]:
+    latencies = [sample['latency_ms'] for sample in samples]
+    errors = sum(1 for sample in samples if sample['status'] >= 500 or sample['status'] == 0)
+    timed = [sample['firestore'] for sample in samples if sample['firestore']]
+    count = len(samples)
+    return {
+        'requests': count,
+        'errors': errors,
+        'error_rate': round(errors / count, 4) if count else 0.0,
+        'rps': round(count / elapsed, 2) if elapsed > 0 else 0.0,
+        'mean_ms': round(sum(latencies) / count, 2) if count else 0.0,
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'max_ms': round(max(latencies), 2) if latencies else 0.0,
+        'firestore_reads_per_request': round(sum(t['reads'] for t in timed) / len(timed), 2) if timed else 0.0,
+        'firestore_writes_per_request': round(sum(t['writes'] for t in timed) / len(timed), 2) if timed else 0.0,
+        'firestore_calls_per_request': round(sum(t['calls'] for t in timed) / len(timed), 2) if timed else 0.0,
+        'firestore_ms_per_request': round(sum(t['firestore_ms'] for t in timed) / len(timed), 2) if timed else 0.0,
+    }
+
+
+class LoadGenerator:
+    """Closed-loop load: each worker sends its next request when the last one returns"""
+
+    def __init__(self, base_url: str, mix: Mix, concurrency: int = 8, duration: Optional[float] = 30.0,
+                 max_requests: Optional[int] = None, warmup: float = 2.0, timeout: float = 30.0):
+        self.base_url = base_url.rstrip('/')
+        self.mix = mix
+        self.concurrency = concurrency
+        self.duration = duration
+        self.max_requests = max_requests
+        self.warmup = warmup
+        self.timeout = timeout
+        self.results = Results()
+        self._cookies: Dict[str, Dict[str, str]] = {}
+        self._issued = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def login(self, http: requests.Session, uid: str) -> Dict[str, str]:
+        """Session cookie for a seeded user, minted once per user"""
+        cookies = self._cookies.get(uid)
+        if cookies is None:
+            response = http.post(f"{self.base_url}{BENCH_LOGIN_PATH}{uid}", timeout=self.timeout)
+            response.raise_for_status()
+            cookies = dict(response.cookies)
+            http.cookies.clear()
+            self._cookies[uid] = cookies
+        return cookies
+
+    def _take_ticket(self) -> bool:
+        with self._lock:
+            if self.max_requests is not None and self._issued >= self.max_requests:
+                return False
+            self._issued += 1
+            return True
+
+    def _request(self, http: requests.Session, method: str, path: str, body, cookies, record: bool,
+                 scenario: str):
+        start = time.perf_counter()
+        status = 0
+        firestore = None
+        try:
+            response = http.request(method, f"{self.base_url}{path}", json=body, cookies=cookies,
+                                    timeout=self.timeout, allow_redirects=False)
+            response.content
+            status = response.status_code
+            firestore = parse_server_timing(response.headers.get('Server-Timing'))
+        except requests.RequestException:
+            pass
+        finally:
+            http.cookies.clear()  # the next request may act as another user
+        if record:
+            self.results.add({
+                'scenario': scenario,
+                'route': route_key(method, path),
+                'status': status,
+                'latency_ms': (time.perf_counter() - start) * 1000,
+                'firestore': firestore,
+            })
+
+    def _worker(self, worker: int, record_after: float):
+        ctx = self.mix.worker_context(worker)
+        with requests.Session() as http:
+            while not self._stop.is_set():
+                scenario, steps, uid = self.mix.next_action(ctx)
+                cookies = self.login(http, uid)
+                for method, path, body in steps:
+                    record = time.perf_counter() >= record_after
+                    if record and not self._take_ticket():
+                        self._stop.set()
+                        return
+                    self._request(http, method, path, body, cookies, record, scenario)
+                    if self._stop.is_set():
+                        return
+
+    def run(self) -> Dict[str, Any]:
+        record_after = time.perf_counter() + self.warmup
+        threads = [threading.Thread(target=self._worker, args=(worker, record_after), daemon=True)
+                   for worker in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        time.sleep(self.warmup)
+        self.results.started = time.perf_counter()
+        deadline = self.results.started + self.duration if self.duration else None
+        while any(thread.is_alive() for thread in threads):
+            if deadline and time.perf_counter() >= deadline:
+                self._stop.set()
+            time.sleep(0.05)
+        self.results.finished = time.perf_counter()
+        return self.results.summary()
@@ -0,0 +1,127 @@
+"""
+Request mixes for the load generator
+
+Each scenario is one user action and may issue several requests (a page
+load plus the API calls its JavaScript makes). A Mix picks scenarios by
+weight with a seeded RNG, so the same --seed replays the same sequence.
+"""
+import random
+import time
+from typing import Dict, Any, List, Tuple, Callable
+
+from benchmarks import seed
+
+# (method, path, json body) issued in order for one action
+Step = Tuple[str, str, Any]
+
+SAMPLE_PROGRAMS = [
+    "print('Hello, World!')",
+    "numbers = [x ** 2 for x in range(10)]\nprint(sum(numbers))",
+    "def greet(name):\n    return f'Hi {name}'\n\nprint(greet('Morais'))",
+]
+
+
+class ScenarioContext:
+    """Dataset dimensions a scenario draws ids from"""
+
+    def __init__(self, users: int, lessons: int, rng: random.Random):
+        self.users = users
+        self.lessons = lessons
+        self.rng = rng
+
+    def lesson_index(self) -> int:
+        # A few early lessons get most of the traffic, like a real course
+        return min(int(self.rng.paretovariate(1.2)) - 1, self.lessons - 1)
+
+
+def dashboard(ctx: ScenarioContext, uid: str) -> List[Step]:
+    return [
+        ('GET', '/dashboard', None),
+        ('GET', '/api/dashboard/stats', None),
+        ('GET', '/api/dashboard/activity-feed', None),
+        ('GET', '/api/dashboard/daily-challenge', None),
+        ('GET', '/api/dashboard/leaderboard', None),
+    ]
+
+
+def lesson_view(ctx: ScenarioContext, uid: str) -> List[Step]:
+    lesson = seed.lesson_id(ctx.lesson_index())
+    return [
+        ('GET', f'/lesson/{lesson}', None),
+        ('GET', f'/api/lessons/{lesson}/progress', None),
+    ]
+
+
+def subtopic_completion(ctx: ScenarioContext, uid: str) -> List[Step]:
+    index = ctx.lesson_index()
+    subtopic = ctx.rng.choice(['Introduction', 'Variables', 'Data Types', 'Practice', 'Parameters'])
+    return [('POST', '/api/lesson/complete-subtopic', {'lesson_id': seed.lesson_id(index), 'subtopic_id': subtopic})]
+
+
+def code_run(ctx: ScenarioContext, uid: str) -> List[Step]:
+    return [('POST', '/run_python', {'code': ctx.rng.choice(SAMPLE_PROGRAMS)})]
+
+
+def quiz_submit(ctx: ScenarioContext, uid: str) -> List[Step]:
+    quiz = seed.quiz_id(ctx.lesson_index())
+    score = ctx.rng.randint(0, 5)
+    return [
+        ('GET', f'/api/quiz/{quiz}', None),
+        ('POST', f'/api/quiz/{quiz}/submit', {
+            'userId': uid,
+            'answers': {f'q{n}': ctx.rng.randint(0, 3) for n in range(1, 6)},
+            'score': score,
+            'percentage': score * 20,
+            'duration': ctx.rng.randint(30, 300),
+            'timestamp': time.time() * 1000,
+        }),
+    ]
+
+
+SCENARIOS: Dict[str, Callable[[ScenarioContext, str], List[Step]]] = {
+    'dashboard': dashboard,
+    'lesson_view': lesson_view,
+    'subtopic_completion': subtopic_completion,
+    'code_run': code_run,
+    'quiz_submit': quiz_submit,
+}
+
+MIXES: Dict[str, Dict[str, int]] = {
+    'default': {'dashboard': 30, 'lesson_view': 35, 'subtopic_completion': 15, 'code_run': 10, 'quiz_submit': 10},
+    'read_heavy': {'dashboard': 45, 'lesson_view': 50, 'quiz_submit': 5},
+    'write_heavy': {'subtopic_completion': 40, 'quiz_submit': 40, 'dashboard': 20},
+}
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    """A named mix, or 'dashboard=30,lesson_view=70'"""
+    if value in MIXES:
+        return dict(MIXES[value])
+    weights = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(f"Unknown scenario '{name}' (choose from {', '.join(SCENARIOS)})")
+        weights[name] = int(weight or 1)
+    return weights
+
+
+class Mix:
+    """Weighted scenario picker"""
+
+    def __init__(self, weights: Dict[str, int], users: int, lessons: int, seed_value: int = 0):
+        self.names = [name for name, weight in weights.items() if weight > 0]
+        self.weights = [weights[name] for name in self.names]
+        self.users = users
+        self.lessons = lessons
+        self.seed = seed_value
+
+    def worker_context(self, worker: int) -> ScenarioContext:
+        return ScenarioContext(self.users, self.lessons, random.Random(self.seed * 1000 + worker))
+
+    def next_action(self, ctx: ScenarioContext) -> Tuple[str, List[Step], str]:
+        """(scenario name, steps, acting user id)"""
+        name = ctx.rng.choices(self.names, self.weights)[0]
+        uid = seed.user_id(ctx.rng.randrange(self.users))
+        return name, SCENARIOS[name](ctx, uid), uid
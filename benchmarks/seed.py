@@ -0,0 +1,149 @@
+"""
+Deterministic benchmark data scaled from firebase_data/*.json
+
+The seed files hold a handful of users, lessons and quizzes. build_dataset()
+clones them into N users and M lessons (one quiz per lesson) with stable ids
+and a seeded RNG, so two runs with the same arguments produce the same data
+and their results can be compared against a stored baseline.
+"""
+import copy
+import json
+import os
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List
+
+from services.streaks import compute_streak_state
+from services.user_stats import lesson_category, stats_from_user_doc
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEED_DIR = os.path.join(PROJECT_ROOT, 'firebase_data')
+
+BATCH_SIZE = 400  # below Firestore's 500 writes per batch
+
+
+def load_seed_file(name: str) -> Dict[str, Any]:
+    """Top-level mapping of a firebase_data seed file ({'users': {...}} -> {...})"""
+    with open(os.path.join(SEED_DIR, name), 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return next(iter(data.values()))
+
+
+def user_id(index: int) -> str:
+    return f"bench-user-{index:05d}"
+
+
+def lesson_id(index: int) -> str:
+    return f"bench-lesson-{index:04d}"
+
+
+def quiz_id(index: int) -> str:
+    return f"bench-quiz-{index:04d}"
+
+
+def build_dataset(users: int = 200, lessons: int = 30, activities_per_user: int = 10,
+                  seed: int = 42) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """Collections -> {doc_id: data} for the requested scale"""
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    lesson_templates = list(load_seed_file('enhanced_lessons.json').values())
+    quiz_templates = list(load_seed_file('quizzes.json').values())
+    user_templates = list(load_seed_file('users.json').values())
+    activity_templates = list(load_seed_file('user_activities.json').values())
+    challenge_templates = list(load_seed_file('daily_challenges.json').values())
+
+    dataset = {name: {} for name in ('lessons', 'quizzes', 'users', 'user_stats', 'activities',
+                                         'daily_challenges')}
+
+    for index in range(lessons):
+        lesson = copy.deepcopy(lesson_templates[index % len(lesson_templates)])
+        lesson.update({
+            'id': lesson_id(index),
+            'title': f"{lesson['title']} ({index + 1})",
+            'order': index + 1,
+            'quiz_id': quiz_id(index),
+            'prerequisites': [lesson_id(index - 1)] if index else [],
+            'created_at': now,
+            'updated_at': now,
+        })
+        dataset['lessons'][lesson['id']] = lesson
+
+        quiz = copy.deepcopy(quiz_templates[index % len(quiz_templates)])
+        quiz.update({'id': quiz_id(index), 'lesson_id': lesson['id'], 'created_at': now})
+        dataset['quizzes'][quiz['id']] = quiz
+
+    lesson_ids = list(dataset['lessons'])
+    categories = {lid: lesson_category(lesson) for lid, lesson in dataset['lessons'].items()}
+    for index in range(users):
+        user = copy.deepcopy(user_templates[index % len(user_templates)])
+        uid = user_id(index)
+        completed = rng.sample(lesson_ids, rng.randint(0, min(len(lesson_ids), 10)))
+        xp = rng.randint(0, 5000)
+        user.update({
+            'uid': uid,
+            'email': f"{uid}@bench.codewithmorais.com",
+            'username': uid,
+            'display_name': f"Bench User {index}",
+            'xp': xp,
+            'total_xp': xp,
+            'pycoins': rng.randint(0, 1000),
+            'is_admin': False,
+            'completed_lessons': completed,
+            'lesson_progress': {
+                lid: {
+                    'completed': True,
+                    'progress': 100,
+                    'score': rng.randint(60, 100),
+                    'completed_subtopics': list(dataset['lessons'][lid].get('subtopics', [])),
+                    'completed_at': (now - timedelta(days=rng.randint(0, 60))).isoformat(),
+                } for lid in completed
+            },
+            'quiz_scores': {dataset['lessons'][lid]['quiz_id']: rng.randint(50, 100) for lid in completed},
+            'created_at': now - timedelta(days=90),
+            'updated_at': now,
+            'last_login': now - timedelta(hours=rng.randint(0, 72)),
+        })
+        dataset['users'][uid] = user
+
+        active_days = set()
+        day_counts = {}
+        for number in range(activities_per_user):
+            activity = copy.deepcopy(activity_templates[(index + number) % len(activity_templates)])
+            activity['user_id'] = uid
+            activity['timestamp'] = now - timedelta(minutes=rng.randint(0, 60 * 24 * 30))
+            if 'lesson_id' in activity and lesson_ids:
+                activity['lesson_id'] = rng.choice(lesson_ids)
+            dataset['activities'][f"{uid}-activity-{number:03d}"] = activity
+            active_days.add(activity['timestamp'].date())
+            day = activity['timestamp'].date().isoformat()
+            day_counts[day] = day_counts.get(day, 0) + 1
+        # Streak fields as the backfill job would leave them
+        user.update(compute_streak_state(active_days))
+        # Counters as the user_stats rebuild job would leave them
+        dataset['user_stats'][uid] = stats_from_user_doc(user, categories)
+        # Day rollups for the seeded activities
+        dataset[f"user_rollups/{uid}/days"] = {
+            day: {'date': day, 'activities': count} for day, count in day_counts.items()
+        }
+
+    for offset, template in enumerate([None] + challenge_templates):
+        challenge = copy.deepcopy(template or challenge_templates[0])
+        date_str = (now - timedelta(days=offset)).strftime('%Y-%m-%d')
+        challenge['date'] = date_str
+        dataset['daily_challenges'][date_str] = challenge
+
+    return dataset
+
+
+def seed_database(db, dataset: Dict[str, Dict[str, Dict[str, Any]]]) -> Dict[str, int]:
+    """Write a dataset through a Firestore (or fake) client in batches"""
+    counts = {}
+    for collection, documents in dataset.items():
+        items: List = list(documents.items())
+        for start in range(0, len(items), BATCH_SIZE):
+            batch = db.batch()
+            for doc_id, data in items[start:start + BATCH_SIZE]:
+                batch.set(db.collection(collection).document(doc_id), data)
+            batch.commit()
+        counts[collection] = len(items)
+    return counts
@@ -21,8 +21,8 @@ const CSS_BUNDLES = {
             'static/css/base/reset.css',
             'static/css/base/variables.css',
             'static/css/base/layout.css',
-            'static/css/components/header-modern.css',
-            'static/css/components/buttons-enhanced.css'
+            'static/css/components/header.css',
+            'static/css/components.css'
         ],
         priority: 'high',
         loadStrategy: 'async'
@@ -31,7 +31,7 @@ const CSS_BUNDLES = {
     // Page-specific CSS bundles
     dashboard: {
         files: [
-            'static/css/components/dashboard-consolidated.css'
+            'static/css/components/dashboard.css'
         ],
         priority: 'medium',
         loadStrategy: 'lazy',
@@ -40,11 +40,7 @@ const CSS_BUNDLES = {
     
     lessons: {
         files: [
-            'static/css/components/lesson.css',
-            'static/css/components/lesson-block-types.css',
-            'static/css/components/lesson-blocks-enhanced.css',
-            'static/css/components/lesson-progress-enhanced.css',
-            'static/css/components/lesson-content-blocks.css'
+            'static/css/lessons.css'
         ],
         priority: 'medium',
         loadStrategy: 'lazy',
@@ -53,7 +49,7 @@ const CSS_BUNDLES = {
     
     auth: {
         files: [
-            'static/css/components/auth-enhanced.css',
+            'static/css/components/auth.css',
             'static/css/components/modal.css'
         ],
         priority: 'medium',
@@ -64,8 +60,7 @@ const CSS_BUNDLES = {
     // UI Components - Can be loaded lazily
     ui: {
         files: [
-            'static/css/components/skeleton.css',
-            'static/css/components/responsive-enhancements.css'
+            'static/css/components/responsive.css'
         ],
         priority: 'low',
         loadStrategy: 'lazy'
@@ -75,8 +70,7 @@ const CSS_BUNDLES = {
     utils: {
         files: [
             'static/css/utils/helpers.css',
-            'static/css/utils/animations.css',
-            'static/css/utils/responsive.css'
+            'static/css/utils/animations.css'
         ],
         priority: 'low',
         loadStrategy: 'lazy'
@@ -37,12 +37,63 @@ class Config:
     # Logging Configuration
     LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
     LOG_FILE = os.environ.get('LOG_FILE', 'logs/app.log')
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text').lower()  # 'text' or 'json' (needs structlog)
+    LOG_ROTATION = os.environ.get('LOG_ROTATION', 'size').lower()  # 'size' or 'time'
+    LOG_MAX_BYTES = int(os.environ.get('LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+    LOG_ROTATION_WHEN = os.environ.get('LOG_ROTATION_WHEN', 'midnight')
+    LOG_BACKUP_COUNT = int(os.environ.get('LOG_BACKUP_COUNT', '5'))
+    LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', '10000'))
+    # Keep 1 in N INFO records for noisy loggers ("logger=rate" or "logger:function=rate")
+    LOG_SAMPLING = os.environ.get('LOG_SAMPLING', 'app:transform_lesson_to_blocks=0.1')
+    # Write-time sampling of activity types ("type=rate", 0 drops the type)
+    ACTIVITY_SAMPLING = os.environ.get('ACTIVITY_SAMPLING', 'dashboard_refresh=0')
     
     # Application Settings
     MAX_CODE_LENGTH = 10000  # Maximum characters for code submission
     MAX_XP_PER_ACTION = 1000  # Maximum XP that can be earned in one action
     SESSION_TIMEOUT = 3600  # Session timeout in seconds
     
+    # API Response Compression (gzip/brotli for /api/* above min_size bytes)
+    API_COMPRESSION = {
+        'enabled': os.environ.get('API_COMPRESSION_ENABLED', 'True').lower() == 'true',
+        'min_size': int(os.environ.get('API_COMPRESSION_MIN_SIZE', '1024')),
+        'gzip_level': int(os.environ.get('API_COMPRESSION_GZIP_LEVEL', '6')),
+        'brotli_quality': int(os.environ.get('API_COMPRESSION_BROTLI_QUALITY', '4')),
+    }
+    
+    # Request profiler (admin X-Profile header / __profile flag, or 1-in-N sampling)
+    PROFILER = {
+        'enabled': os.environ.get('PROFILER_ENABLED', 'True').lower() == 'true',
+        'sample_rate': int(os.environ.get('PROFILER_SAMPLE_RATE', '0')),
+        'sample_interval_ms': float(os.environ.get('PROFILER_SAMPLE_INTERVAL_MS', '5')),
+        'max_profiles': int(os.environ.get('PROFILER_MAX_PROFILES', '50')),
+        'token': os.environ.get('PROFILER_TOKEN') or None,
+    }
+    
+    # Per-request Firestore accounting (Server-Timing header, slow-query log)
+    FIRESTORE_BUDGET = {
+        'enabled': os.environ.get('FIRESTORE_BUDGET_ENABLED', 'True').lower() == 'true',
+        'max_reads': int(os.environ.get('FIRESTORE_BUDGET_MAX_READS', '50')),
+        'max_firestore_ms': float(os.environ.get('FIRESTORE_BUDGET_MAX_MS', '300')),
+        'max_request_ms': float(os.environ.get('FIRESTORE_BUDGET_MAX_REQUEST_MS', '1000')),
+    }
+    
+    # Firestore deadlines and per-collection circuit breakers
+    RESILIENCE = {
+        'enabled': os.environ.get('FIRESTORE_BREAKERS_ENABLED', 'True').lower() == 'true',
+        'call_timeout_ms': float(os.environ.get('FIRESTORE_CALL_TIMEOUT_MS', '3000')),
+        'request_budget_ms': float(os.environ.get('FIRESTORE_REQUEST_BUDGET_MS', '6000')),
+        'failure_threshold': int(os.environ.get('FIRESTORE_BREAKER_FAILURES', '5')),
+        'reset_timeout_seconds': float(os.environ.get('FIRESTORE_BREAKER_RESET_SECONDS', '30')),
+    }
+    
+    # Local snapshot of lessons/quizzes/challenges served read-only while Firestore is down
+    CONTENT_SNAPSHOT = {
+        'enabled': os.environ.get('CONTENT_SNAPSHOT_ENABLED', 'True').lower() == 'true',
+        'path': os.environ.get('CONTENT_SNAPSHOT_PATH', ''),
+        'refresh_seconds': float(os.environ.get('CONTENT_SNAPSHOT_REFRESH_SECONDS', '900')),
+    }
+    
     # Template Caching Configuration
     TEMPLATE_CACHE_CONFIG = {
         'CACHE_TYPE': 'simple',
@@ -60,7 +111,7 @@ class Config:
 class DevelopmentConfig(Config):
     """Development configuration."""
     DEBUG = True
-    DEV_MODE = True
+    DEV_MODE = os.environ.get('DEV_MODE', 'True').lower() == 'true'
 
 
 class ProductionConfig(Config):
@@ -81,7 +132,7 @@ class ProductionConfig(Config):
 class TestingConfig(Config):
     """Testing configuration."""
     TESTING = True
-    DEV_MODE = True
+    DEV_MODE = os.environ.get('DEV_MODE', 'True').lower() == 'true'
     
 
 def get_config() -> Config:
@@ -99,32 +150,21 @@ def get_config() -> Config:
 
 
 def setup_logging(config: Config):
-    """Set up application logging."""
+    """Set up application logging through the non-blocking queue pipeline."""
+    from utils.log_pipeline import install_logging_pipeline, parse_sampling
+
     log_level = getattr(logging, config.LOG_LEVEL.upper(), logging.INFO)
-    
-    # Create formatters
-    file_formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
-    console_formatter = logging.Formatter(
-        '%(levelname)s: %(message)s'
-    )
-    
-    # Set up file handler
-    file_handler = logging.FileHandler(config.LOG_FILE)
-    file_handler.setLevel(log_level)
-    file_handler.setFormatter(file_formatter)
-    
-    # Set up console handler
-    console_handler = logging.StreamHandler()
-    console_handler.setLevel(log_level)
-    console_handler.setFormatter(console_formatter)
-    
-    # Configure root logger
-    logging.basicConfig(
-        level=log_level,
-        handlers=[file_handler, console_handler]
-    )
+    install_logging_pipeline({
+        'level': log_level,
+        'file': config.LOG_FILE,
+        'format': config.LOG_FORMAT,
+        'rotation': config.LOG_ROTATION,
+        'max_bytes': config.LOG_MAX_BYTES,
+        'when': config.LOG_ROTATION_WHEN,
+        'backup_count': config.LOG_BACKUP_COUNT,
+        'queue_size': config.LOG_QUEUE_SIZE,
+        'sampling': parse_sampling(config.LOG_SAMPLING),
+    })
     
     # Suppress noisy loggers in development
     if config.DEV_MODE:
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Backfill Streaks
+Code with Morais - Rebuilds streak, max_streak and streak_last_active on
+every users/{uid} document from the activities collection
+
+Run once before relying on the denormalized streak fields, and again after
+importing historical activities:
+    python firebase_data/backfill_streaks.py [--dry-run]
+"""
+import sys
+import os
+import argparse
+import logging
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.firebase_service import FirebaseService
+from services.streaks import StreakBackfillJob
+from config import get_config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Backfill denormalized user streaks from activities")
+    parser.add_argument('--page-size', type=int, default=1000,
+                        help="Documents fetched per page while scanning")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="Compute and count changes without writing")
+    return parser.parse_args()
+
+
+def main():
+    """Run the streak backfill job"""
+    args = parse_args()
+
+    print("🔥 Backfilling user streaks...")
+    print("=" * 50)
+
+    try:
+        config = get_config()
+        firebase_service = FirebaseService(config.FIREBASE_CONFIG)
+
+        if not firebase_service.is_available():
+            print("❌ Firebase not available. Check your configuration.")
+            return 1
+
+        print("✅ Connected to Firebase project")
+
+    except Exception as e:
+        print(f"❌ Failed to initialize Firebase: {e}")
+        return 1
+
+    try:
+        metrics = StreakBackfillJob(firebase_service, page_size=args.page_size, dry_run=args.dry_run).run()
+    except Exception as e:
+        print(f"❌ Streak backfill failed: {e}")
+        return 1
+
+    action = "would be updated" if args.dry_run else "updated"
+    print(f"\n🎉 {metrics['users_updated']} of {metrics['users_scanned']} users {action}")
+    print(f"📄 {metrics['activities_scanned']} activities scanned in {metrics['elapsed_seconds']:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Compact Rollups
+Code with Morais - Folds user_rollups/{uid}/days documents older than the
+retention window into weekly and monthly buckets
+
+Schedule daily (any time of day; it only touches whole weeks past retention):
+    python firebase_data/compact_rollups.py [--retention-days 90] [--dry-run]
+"""
+import sys
+import os
+import argparse
+import logging
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.firebase_service import FirebaseService
+from services.rollups import RollupCompactionJob, DEFAULT_RETENTION_DAYS, FOLD_PAGE_SIZE
+from config import get_config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Fold old daily rollups into weeks and months")
+    parser.add_argument('--retention-days', type=int, default=DEFAULT_RETENTION_DAYS,
+                        help="Days kept at daily granularity")
+    parser.add_argument('--page-size', type=int, default=FOLD_PAGE_SIZE,
+                        help=f"Days folded per batch (at most {FOLD_PAGE_SIZE})")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="Count days that would be folded without writing")
+    return parser.parse_args()
+
+
+def main():
+    """Run the rollup compaction job"""
+    args = parse_args()
+
+    print("🗜️  Compacting rollups...")
+    print("=" * 50)
+
+    try:
+        config = get_config()
+        firebase_service = FirebaseService(config.FIREBASE_CONFIG)
+
+        if not firebase_service.is_available():
+            print("❌ Firebase not available. Check your configuration.")
+            return 1
+
+        print("✅ Connected to Firebase project")
+
+    except Exception as e:
+        print(f"❌ Failed to initialize Firebase: {e}")
+        return 1
+
+    try:
+        metrics = RollupCompactionJob(firebase_service, retention_days=args.retention_days,
+                                      page_size=args.page_size, dry_run=args.dry_run).run()
+    except Exception as e:
+        print(f"❌ Rollup compaction failed: {e}")
+        return 1
+
+    action = "would be folded" if args.dry_run else "folded"
+    print(f"\n🎉 {metrics['days_compacted']} days of {metrics['users_compacted']} users {action}")
+    print(f"📄 {metrics['users_scanned']} users scanned in {metrics['elapsed_seconds']:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Precompute Recommendations
+Code with Morais - Offline batch job that writes top-K recommendations for
+every user into recommendations/{uid}
+
+Run manually or from a scheduler (cron / Cloud Scheduler):
+    python firebase_data/precompute_recommendations.py --top-k 5 --workers 4
+"""
+import sys
+import os
+import argparse
+import logging
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.firebase_service import FirebaseService
+from services.recommendation_precompute import (
+    RecommendationPrecomputeJob, DEFAULT_TOP_K, DEFAULT_CHUNK_SIZE
+)
+from models.lesson import set_firebase_service as set_lesson_firebase_service
+from config import get_config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Precompute lesson recommendations for all users")
+    parser.add_argument('--top-k', type=int, default=DEFAULT_TOP_K,
+                        help="Number of recommendations stored per user")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Worker processes (defaults to CPU count)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="Users computed and flushed per checkpoint")
+    parser.add_argument('--checkpoint', default='logs/recommendation_precompute.checkpoint.json',
+                        help="Checkpoint file used to resume an interrupted run")
+    parser.add_argument('--restart', action='store_true',
+                        help="Ignore any existing checkpoint and start from the first user")
+    return parser.parse_args()
+
+
+def main():
+    """Run the recommendation precompute job"""
+    args = parse_args()
+
+    print("🚀 Precomputing recommendations...")
+    print("=" * 50)
+
+    try:
+        config = get_config()
+        firebase_service = FirebaseService(config.FIREBASE_CONFIG)
+
+        if not firebase_service.is_available():
+            print("❌ Firebase not available. Check your configuration.")
+            return 1
+
+        set_lesson_firebase_service(firebase_service)
+        print("✅ Connected to Firebase project")
+
+    except Exception as e:
+        print(f"❌ Failed to initialize Firebase: {e}")
+        return 1
+
+    job = RecommendationPrecomputeJob(
+        firebase_service,
+        top_k=args.top_k,
+        workers=args.workers,
+        chunk_size=args.chunk_size,
+        checkpoint_path=args.checkpoint
+    )
+
+    try:
+        metrics = job.run(resume=not args.restart)
+    except KeyboardInterrupt:
+        print(f"\n⚠️  Interrupted - rerun to resume from {args.checkpoint}")
+        return 130
+    except Exception as e:
+        print(f"❌ Recommendation precompute failed: {e}")
+        return 1
+
+    print(f"\n🎉 Precomputed recommendations for {metrics['users_processed']} users")
+    print(f"⏱️  {metrics['elapsed_seconds']:.1f}s ({metrics['users_per_second']:.1f} users/sec)")
+    if metrics['users_failed']:
+        print(f"⚠️  {metrics['users_failed']} users failed - see log for details")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
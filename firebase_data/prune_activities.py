@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Prune Activities
+Code with Morais - Archives expired activities to gzip NDJSON and deletes
+them, per the retention policy in services/activity_retention.py
+
+Run daily; pass --legacy once to stamp activities written before expire_at:
+    python firebase_data/prune_activities.py [--archive-dir DIR] [--legacy] [--dry-run]
+"""
+import sys
+import os
+import argparse
+import logging
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.firebase_service import FirebaseService
+from services.activity_retention import ActivityRetentionJob, RETENTION_PAGE_SIZE
+from config import get_config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Archive and delete expired activities")
+    parser.add_argument('--archive-dir', default=os.path.join('backups', 'activities'),
+                        help="Directory for the compressed NDJSON archives")
+    parser.add_argument('--page-size', type=int, default=RETENTION_PAGE_SIZE,
+                        help="Activities fetched per page")
+    parser.add_argument('--legacy', action='store_true',
+                        help="Also sweep old activities that have no expire_at field")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="Count what would be pruned without archiving or deleting")
+    return parser.parse_args()
+
+
+def main():
+    """Run the activity retention job"""
+    args = parse_args()
+
+    print("🧹 Pruning expired activities...")
+    print("=" * 50)
+
+    try:
+        config = get_config()
+        firebase_service = FirebaseService(config.FIREBASE_CONFIG)
+
+        if not firebase_service.is_available():
+            print("❌ Firebase not available. Check your configuration.")
+            return 1
+
+        print("✅ Connected to Firebase project")
+
+    except Exception as e:
+        print(f"❌ Failed to initialize Firebase: {e}")
+        return 1
+
+    try:
+        metrics = ActivityRetentionJob(firebase_service, archive_dir=args.archive_dir, page_size=args.page_size,
+                                       dry_run=args.dry_run, legacy=args.legacy).run()
+    except Exception as e:
+        print(f"❌ Activity pruning failed: {e}")
+        return 1
+
+    action = "would be deleted" if args.dry_run else "deleted"
+    print(f"\n🎉 {metrics['activities_deleted']} of {metrics['activities_scanned']} scanned activities {action}")
+    if metrics['activities_stamped']:
+        print(f"🏷️  {metrics['activities_stamped']} legacy activities stamped with expire_at")
+    if metrics['archive_path']:
+        print(f"📦 Archived to {metrics['archive_path']}")
+    print(f"⏱️  Finished in {metrics['elapsed_seconds']:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Rebuild User Stats
+Code with Morais - Recomputes every user_stats/{uid} counter document from
+the users, quiz_results and lessons collections
+
+Run once before relying on the materialized counters, and again whenever
+they are suspected to have drifted:
+    python firebase_data/rebuild_user_stats.py [--dry-run] [--workers 4]
+"""
+import sys
+import os
+import argparse
+import logging
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.firebase_service import FirebaseService
+from services.user_stats import UserStatsRebuildJob
+from config import get_config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Rebuild materialized user_stats counters")
+    parser.add_argument('--page-size', type=int, default=1000,
+                        help="Documents fetched per page while scanning")
+    parser.add_argument('--workers', type=int, default=4,
+                        help="Collections streamed concurrently")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="Compute and count changes without writing")
+    return parser.parse_args()
+
+
+def main():
+    """Run the user stats rebuild job"""
+    args = parse_args()
+
+    print("📊 Rebuilding user stats...")
+    print("=" * 50)
+
+    try:
+        config = get_config()
+        firebase_service = FirebaseService(config.FIREBASE_CONFIG)
+
+        if not firebase_service.is_available():
+            print("❌ Firebase not available. Check your configuration.")
+            return 1
+
+        print("✅ Connected to Firebase project")
+
+    except Exception as e:
+        print(f"❌ Failed to initialize Firebase: {e}")
+        return 1
+
+    try:
+        metrics = UserStatsRebuildJob(firebase_service, page_size=args.page_size,
+                                      dry_run=args.dry_run, workers=args.workers).run()
+    except Exception as e:
+        print(f"❌ User stats rebuild failed: {e}")
+        return 1
+
+    action = "would be updated" if args.dry_run else "updated"
+    print(f"\n🎉 {metrics['users_updated']} of {metrics['users_scanned']} users {action}")
+    print(f"📄 {metrics['quiz_results_scanned']} quiz results scanned in {metrics['elapsed_seconds']:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Snapshot Content
+Code with Morais - Writes the local snapshot of lessons, quizzes and daily
+challenges that the app serves read-only while Firestore is unreachable
+
+Run from cron (or after seeding content); running app workers pick up the
+new file within a few seconds:
+    python firebase_data/snapshot_content.py [--path FILE]
+"""
+import sys
+import os
+import argparse
+import logging
+
+# Add parent directory to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.firebase_service import FirebaseService
+from services.content_snapshot import ContentSnapshotJob, DEFAULT_SNAPSHOT_PATH
+from config import get_config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def parse_args():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="Write the local content snapshot")
+    parser.add_argument('--path', default=None,
+                        help="Snapshot file (defaults to CONTENT_SNAPSHOT_PATH or data/content_snapshot.bin)")
+    return parser.parse_args()
+
+
+def main():
+    """Run the content snapshot job"""
+    args = parse_args()
+
+    print("📸 Snapshotting lessons, quizzes and daily challenges...")
+    print("=" * 50)
+
+    try:
+        config = get_config()
+        firebase_service = FirebaseService(config.FIREBASE_CONFIG)
+
+        if not firebase_service.is_available():
+            print("❌ Firebase not available. Check your configuration.")
+            return 1
+
+        print("✅ Connected to Firebase project")
+
+    except Exception as e:
+        print(f"❌ Failed to initialize Firebase: {e}")
+        return 1
+
+    path = args.path or config.CONTENT_SNAPSHOT.get('path') or DEFAULT_SNAPSHOT_PATH
+    try:
+        metrics = ContentSnapshotJob(firebase_service, path).run()
+    except Exception as e:
+        print(f"❌ Content snapshot failed: {e}")
+        return 1
+
+    counts = ', '.join(f"{count} {name}" for name, count in metrics['documents'].items())
+    print(f"\n🎉 Snapshot written to {path}: {counts}")
+    print(f"📦 {metrics['bytes']} bytes in {metrics['elapsed_seconds']:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
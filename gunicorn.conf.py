@@ -0,0 +1,76 @@
+"""
+Gunicorn configuration for Code with Morais
+Loaded automatically from the working directory by `gunicorn app:app`
+
+Defaults suit an App Engine F2 / small container instance and can be
+overridden from the environment:
+    GUNICORN_WORKERS            worker processes (default 4, or WEB_CONCURRENCY)
+    GUNICORN_WORKER_CLASS       gthread (default), sync or gevent
+    GUNICORN_THREADS            threads per gthread worker (default 8)
+    GUNICORN_WORKER_CONNECTIONS concurrent requests per gevent worker (default 200)
+    GUNICORN_MAX_REQUESTS       recycle a worker after this many requests (default 1000,
+                                plus up to GUNICORN_MAX_REQUESTS_JITTER, default 100)
+    GUNICORN_PRELOAD            build the app once in the master and fork (default true)
+    GUNICORN_TIMEOUT            seconds before a silent worker is killed (default 30)
+
+With preload, the master builds shared read-only state (utils/preload.py)
+before the first fork and workers re-create clients and threads post-fork.
+gevent workers are monkey-patched right here, before the app is imported
+(utils/gevent_compat.py).
+"""
+import os
+import shutil
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+workers = int(os.environ.get('GUNICORN_WORKERS', os.environ.get('WEB_CONCURRENCY', '4')))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.environ.get('GUNICORN_THREADS', '8'))
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', '200'))
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '1000'))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', '100'))
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() == 'true'
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', '5'))
+
+
+
+def _reset_metrics_directory():
+    """Start every deploy with an empty Prometheus multiprocess directory
+
+    Runs while this file loads: with preload, gunicorn imports the app (and
+    its multiprocess gauges) before calling any server hook.
+    """
+    directory = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if directory and os.environ.get('GUNICORN_METRICS_DIR_RESET') != directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+        # A config reload (SIGHUP) must not wipe the running workers' files
+        os.environ['GUNICORN_METRICS_DIR_RESET'] = directory
+
+
+_reset_metrics_directory()
+
+if worker_class == 'gevent':
+    from utils.gevent_compat import patch_for_gevent
+    patch_for_gevent()
+
+
+def when_ready(server):
+    """Build shared read-only state in the preloaded master before forking workers"""
+    if server.cfg.preload_app:
+        from utils.preload import warm_shared_state
+        warm_shared_state(server.app.wsgi())
+
+
+def post_fork(server, worker):
+    """Re-create per-process clients and background threads in the new worker"""
+    if server.cfg.preload_app:
+        from utils.preload import after_worker_fork
+        after_worker_fork()
+
+
+def child_exit(server, worker):
+    """Drop live gauges of exited workers from the aggregated metrics"""
+    from utils.metrics import mark_worker_dead
+    mark_worker_dead(worker.pid)
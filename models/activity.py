@@ -3,7 +3,11 @@ Activity model for Code with Morais
 """
 import logging
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+
+from services.activity_feed import (activity_page_cache, encode_cursor, decode_cursor, page_size,
+                                    DEFAULT_PAGE_SIZE)
+from services.activity_retention import should_record
 
 logger = logging.getLogger(__name__)
 
@@ -29,16 +33,18 @@ def track_activity(user_id: str, activity_type: str, details: Dict[str, Any]) ->
             logger.warning("Firebase not available for activity tracking")
             return False
         
-        activity_data = {
-            'user_id': user_id,
-            'type': activity_type,
-            'details': details,
-            'timestamp': firebase_service.get_server_timestamp(),
-            'created_at': datetime.now()
-        }
+        # Low-value types are sampled or dropped (ACTIVITY_SAMPLING); a skipped
+        # activity still advances the streak and counts in user_stats and rollups
+        store = should_record(activity_type, getattr(config, 'ACTIVITY_SAMPLING', ''))
         
-        firebase_service.db.collection('activities').add(activity_data)
-        logger.info(f"Tracked activity {activity_type} for user {user_id}")
+        # Adds the activity and advances the user's streak in one transaction
+        if not firebase_service.record_activity(user_id, activity_type, details, store=store):
+            return False
+        if store:
+            activity_page_cache.invalidate(user_id)
+            logger.info(f"Tracked activity {activity_type} for user {user_id}")
+        else:
+            logger.debug(f"Counted sampled-out activity {activity_type} for user {user_id}")
         return True
         
     except Exception as e:
@@ -89,26 +95,51 @@ def get_recent_activity(user_id: str, limit: int = 10) -> List[Dict[str, Any]]:
         if not firebase_service or not firebase_service.is_available():
             return []
         
-        # Get activities from Firebase
-        activities_ref = firebase_service.db.collection('activities')
-        query = activities_ref.where('user_id', '==', user_id).order_by('timestamp', direction='DESCENDING').limit(limit)
-        
-        activities = []
-        for doc in query.stream():
-            activity_data = doc.to_dict()
-            activities.append({
-                'type': activity_data.get('type', 'unknown'),
-                'message': activity_data.get('details', {}).get('message', 'Activity'),
-                'timestamp': activity_data.get('timestamp'),
-                'icon': get_activity_icon(activity_data.get('type', 'unknown'))
-            })
-        
-        return activities
+        return get_activity_page(user_id, limit=limit)['activities']
         
     except Exception as e:
         logger.error(f"Error getting recent activity: {str(e)}")
         return []
 
+def get_activity_page(user_id: str, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE) -> Dict[str, Any]:
+    """Get one page of a user's activity feed after an opaque cursor.
+
+    Raises ValueError for a cursor this module did not issue.
+    """
+    limit = page_size(limit)
+    after = decode_cursor(cursor) if cursor else None
+
+    from config import get_config
+    if get_config().DEV_MODE:
+        return {'activities': [] if cursor else get_recent_activity(user_id), 'next_cursor': None, 'has_more': False}
+
+    cached = activity_page_cache.get(user_id, cursor, limit)
+    if cached is not None:
+        return cached
+
+    if not firebase_service or not firebase_service.is_available():
+        return {'activities': [], 'next_cursor': None, 'has_more': False}
+
+    docs, has_more = firebase_service.get_user_activities_page(user_id, limit=limit, after=after)
+    activities = []
+    for activity_data in docs:
+        activity_type = activity_data.get('type', 'unknown')
+        activities.append({
+            'id': activity_data['id'],
+            'type': activity_type,
+            'message': (activity_data.get('details') or {}).get('message', 'Activity'),
+            'details': activity_data.get('details') or {},
+            'timestamp': activity_data.get('timestamp'),
+            'icon': get_activity_icon(activity_type)
+        })
+
+    next_cursor = None
+    if has_more and activities and activities[-1]['timestamp']:
+        next_cursor = encode_cursor(activities[-1]['timestamp'], activities[-1]['id'])
+    page = {'activities': activities, 'next_cursor': next_cursor, 'has_more': next_cursor is not None}
+    activity_page_cache.set(user_id, cursor, limit, page)
+    return page
+
 def get_activity_icon(activity_type: str) -> str:
     """Get icon for activity type"""
     icons = {
@@ -2,7 +2,9 @@
 Challenge model for Code with Morais
 """
 from datetime import datetime
-from services.firebase_service import db
+from services.firebase_service import db, get_firebase_service
+from services.content_snapshot import get_content_snapshot
+from utils.resilience import circuit_open
 from config import get_config
 
 def get_daily_challenge():
@@ -20,7 +22,18 @@ def get_daily_challenge():
             'difficulty': 'medium'
         }
     
-    # In production, fetch from Firestore
+    # In production, fetch from Firestore unless its circuit breaker is failing fast
+    firebase_service = get_firebase_service()
+    if firebase_service and firebase_service.is_available() and not circuit_open('daily_challenges'):
+        challenge = firebase_service.get_daily_challenge(today)
+        if challenge:
+            return challenge
+    
+    # Local snapshot of the catalog (read-only degraded mode)
+    challenge = get_content_snapshot().get('daily_challenges', today)
+    if challenge:
+        return challenge
+    
     if db:
         challenge_ref = db.collection('daily_challenges').document(today)
         challenge = challenge_ref.get()
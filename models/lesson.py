@@ -3,6 +3,9 @@ Lesson model for Code with Morais
 """
 import logging
 from typing import Optional, List, Dict, Any
+from services.user_stats import lesson_category
+from services.content_snapshot import get_content_snapshot
+from utils.resilience import circuit_open
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +16,35 @@ def set_firebase_service(service):
     """Set the Firebase service instance"""
     global firebase_service
     firebase_service = service
+    bump_lesson_catalog_version()
+
+# Bumped whenever this process changes the lesson catalog
+_catalog_version = 0
+
+def get_lesson_catalog_version() -> int:
+    """Get the local lesson catalog version"""
+    return _catalog_version
+
+def bump_lesson_catalog_version() -> int:
+    """Mark the lesson catalog as changed so derived indexes rebuild"""
+    global _catalog_version
+    _catalog_version += 1
+    return _catalog_version
+
+# (catalog version, {category: lesson count}) for profile progress bars
+_category_totals = (None, {})
+
+def get_lesson_category_totals() -> Dict[str, int]:
+    """Number of lessons per category, recounted when the catalog version changes"""
+    global _category_totals
+    version, totals = _category_totals
+    if version != _catalog_version:
+        totals = {}
+        for lesson in get_all_lessons():
+            category = lesson_category(lesson)
+            totals[category] = totals.get(category, 0) + 1
+        _category_totals = (_catalog_version, totals)
+    return totals
 
 def get_mock_lessons():
     """Get mock lessons for development"""
@@ -157,19 +189,26 @@ def get_mock_lesson(lesson_id):
     return lessons.get(lesson_id)
 
 def get_lesson(lesson_id: str) -> Optional[Dict[str, Any]]:
-    """Get lesson from Firebase or fallback to mock"""
+    """Get lesson from Firebase, the content snapshot or mock"""
     
-    # Try Firebase first
-    if firebase_service and firebase_service.is_available():
+    # Try Firebase first, unless its circuit breaker is failing fast
+    if firebase_service and firebase_service.is_available() and not circuit_open('lessons'):
         lesson_data = firebase_service.get_lesson(lesson_id)
         if lesson_data:
             _enhance_lesson_data(lesson_data)
             logger.info(f"Loaded lesson {lesson_id} from Firebase")
             return lesson_data
         else:
-            logger.warning(f"Lesson {lesson_id} not found in Firebase, trying mock data")
+            logger.warning(f"Lesson {lesson_id} not found in Firebase, trying the content snapshot")
     else:
-        logger.warning(f"Firebase not available, using mock data for lesson {lesson_id}")
+        logger.warning(f"Firebase not available, using the content snapshot for lesson {lesson_id}")
+    
+    # Local snapshot of the catalog (read-only degraded mode)
+    lesson_data = get_content_snapshot().get('lessons', lesson_id)
+    if lesson_data:
+        _enhance_lesson_data(lesson_data)
+        logger.info(f"Loaded lesson {lesson_id} from the content snapshot")
+        return lesson_data
     
     # Fallback to mock data
     lesson_data = get_mock_lesson(lesson_id)
@@ -199,10 +238,10 @@ def get_lesson(lesson_id: str) -> Optional[Dict[str, Any]]:
     }
 
 def get_all_lessons() -> List[Dict[str, Any]]:
-    """Get all lessons from Firebase or mock"""
+    """Get all lessons from Firebase, the content snapshot or mock"""
     
-    # Try Firebase first
-    if firebase_service and firebase_service.is_available():
+    # Try Firebase first, unless its circuit breaker is failing fast
+    if firebase_service and firebase_service.is_available() and not circuit_open('lessons'):
         lessons = firebase_service.get_all_lessons()
         if lessons:
             # Enhance lessons with missing fields needed for the template
@@ -211,7 +250,15 @@ def get_all_lessons() -> List[Dict[str, Any]]:
             logger.info(f"Loaded {len(lessons)} lessons from Firebase")
             return lessons
         else:
-            logger.warning("No lessons found in Firebase, using mock data")
+            logger.warning("No lessons found in Firebase, trying the content snapshot")
+    
+    # Local snapshot of the catalog (read-only degraded mode)
+    lessons = get_content_snapshot().all('lessons')
+    if lessons:
+        for lesson in lessons:
+            _enhance_lesson_data(lesson)
+        logger.info(f"Loaded {len(lessons)} lessons from the content snapshot")
+        return lessons
     
     # Fallback to mock
     lessons = get_mock_lessons()
@@ -269,7 +316,10 @@ def _enhance_lesson_data(lesson: Dict[str, Any]) -> None:
 def save_lesson(lesson_id: str, lesson_data: Dict[str, Any]) -> bool:
     """Save lesson to Firebase"""
     if firebase_service and firebase_service.is_available():
-        return firebase_service.save_lesson(lesson_id, lesson_data)
+        saved = firebase_service.save_lesson(lesson_id, lesson_data)
+        if saved:
+            bump_lesson_catalog_version()
+        return saved
     else:
         logger.warning("Firebase not available, cannot save lesson")
         return False
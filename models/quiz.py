@@ -4,6 +4,8 @@ Quiz model for Code with Morais
 import logging
 from typing import Optional, Dict, Any
 from datetime import datetime
+from services.content_snapshot import get_content_snapshot
+from utils.resilience import circuit_open
 
 logger = logging.getLogger(__name__)
 
@@ -14,18 +16,38 @@ def set_firebase_service(service):
     """Set the Firebase service instance"""
     global firebase_service
     firebase_service = service
+    bump_quiz_catalog_version()
+
+# Bumped whenever this process changes quiz content
+_catalog_version = 0
+
+def get_quiz_catalog_version() -> int:
+    """Get the local quiz catalog version"""
+    return _catalog_version
+
+def bump_quiz_catalog_version() -> int:
+    """Mark quiz content as changed so cached responses revalidate"""
+    global _catalog_version
+    _catalog_version += 1
+    return _catalog_version
 
 def get_quiz(quiz_id: str) -> Optional[Dict[str, Any]]:
-    """Get quiz from Firebase or fallback to mock"""
+    """Get quiz from Firebase, the content snapshot or mock"""
     
-    # Try Firebase first
-    if firebase_service and firebase_service.is_available():
+    # Try Firebase first, unless its circuit breaker is failing fast
+    if firebase_service and firebase_service.is_available() and not circuit_open('quizzes'):
         quiz_data = firebase_service.get_quiz(quiz_id)
         if quiz_data:
             logger.info(f"Loaded quiz {quiz_id} from Firebase")
             return quiz_data
         else:
-            logger.warning(f"Quiz {quiz_id} not found in Firebase, trying mock data")
+            logger.warning(f"Quiz {quiz_id} not found in Firebase, trying the content snapshot")
+    
+    # Local snapshot of the catalog (read-only degraded mode)
+    quiz_data = get_content_snapshot().get('quizzes', quiz_id)
+    if quiz_data:
+        logger.info(f"Loaded quiz {quiz_id} from the content snapshot")
+        return quiz_data
     
     # Fallback to mock data
     quiz_data = get_mock_quiz(quiz_id)
@@ -39,7 +61,10 @@ def get_quiz(quiz_id: str) -> Optional[Dict[str, Any]]:
 def save_quiz(quiz_id: str, quiz_data: Dict[str, Any]) -> bool:
     """Save quiz to Firebase"""
     if firebase_service and firebase_service.is_available():
-        return firebase_service.save_quiz(quiz_id, quiz_data)
+        saved = firebase_service.save_quiz(quiz_id, quiz_data)
+        if saved:
+            bump_quiz_catalog_version()
+        return saved
     else:
         logger.warning("Firebase not available, cannot save quiz")
         return False
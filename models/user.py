@@ -4,7 +4,8 @@ User model for Code with Morais
 import logging
 from datetime import datetime
 from flask import session
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
+from services.user_stats import lesson_progress_deltas, lesson_category, xp_deltas
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +17,28 @@ def set_firebase_service(service):
     global firebase_service
     firebase_service = service
 
+# Per-user progress versions, bumped when this process writes progress
+_progress_versions: Dict[str, int] = {}
+
+def get_user_progress_version(user_id: str) -> Tuple[int, str]:
+    """
+    Get the progress version for a user, shared by every worker process.
+    
+    Progress is written through FirebaseService.update_user, which stamps the
+    user document's updated_at; the local counter covers dev-mode writes that
+    never reach Firestore.
+    """
+    updated_at = ''
+    if firebase_service and firebase_service.is_available():
+        user_data = firebase_service.get_user(user_id) or {}
+        updated_at = str(user_data.get('updated_at') or '')
+    return _progress_versions.get(user_id, 0), updated_at
+
+def bump_user_progress_version(user_id: str) -> int:
+    """Mark a user's progress as changed so cached responses revalidate"""
+    _progress_versions[user_id] = _progress_versions.get(user_id, 0) + 1
+    return _progress_versions[user_id]
+
 # Mock user for development
 DEV_USER = {
     'uid': 'dev-user-001',
@@ -98,8 +121,8 @@ def get_current_user() -> Optional[Dict[str, Any]]:
     logger.error(f"User {user_id} not found anywhere")
     return None
 
-def update_user_data(user_id: str, data: Dict[str, Any]) -> bool:
-    """Update user data in Firebase"""
+def update_user_data(user_id: str, data: Dict[str, Any], stats_deltas: Optional[Dict[str, Any]] = None) -> bool:
+    """Update user data (and optional user_stats deltas) in Firebase"""
     
     # Update dev user in dev mode
     from config import get_config
@@ -111,7 +134,7 @@ def update_user_data(user_id: str, data: Dict[str, Any]) -> bool:
     
     # Update in Firebase
     if firebase_service and firebase_service.is_available():
-        return firebase_service.update_user(user_id, data)
+        return firebase_service.update_user(user_id, data, stats_deltas=stats_deltas)
     else:
         logger.warning("Firebase not available, cannot update user data")
         return False
@@ -145,7 +168,7 @@ def award_xp_and_coins(user_id: str, xp: int = 0, coins: int = 0) -> Optional[Di
             'last_activity': datetime.now()
         }
         
-        if update_user_data(user_id, update_data):
+        if update_user_data(user_id, update_data, stats_deltas=xp_deltas(xp)):
             logger.info(f"Awarded {xp} XP and {coins} coins to user {user_id}")
             return {'xp': new_xp, 'coins': new_coins, 'level': new_level}
         else:
@@ -158,6 +181,7 @@ def award_xp_and_coins(user_id: str, xp: int = 0, coins: int = 0) -> Optional[Di
 
 def update_user_progress(user_id: str, lesson_id: str, progress_data: Dict[str, Any]) -> bool:
     """Update user's lesson progress"""
+    bump_user_progress_version(user_id)
     if firebase_service and firebase_service.is_available():
         return firebase_service.update_user_progress(user_id, lesson_id, progress_data)
     else:
@@ -197,12 +221,25 @@ def get_user_progress(user_id):
             return user_data.get('lesson_progress', {})
     return {}
 
+def _lesson_progress_stats(lesson_id: str, previous: Dict[str, Any], progress_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """user_stats deltas between a lesson's previous and new progress entries"""
+    completed_before = previous.get('completed_subtopics') or []
+    new_subtopics = len([s for s in progress_data.get('completed_subtopics') or [] if s not in completed_before])
+    newly_completed = bool(progress_data.get('completed')) and not previous.get('completed')
+    added_time = (progress_data.get('time_spent', 0) or 0) - (previous.get('time_spent', 0) or 0)
+    if not new_subtopics and not newly_completed and added_time <= 0:
+        return None
+    from models.lesson import get_lesson
+    return lesson_progress_deltas(lesson_category(get_lesson(lesson_id)), subtopics=new_subtopics,
+                                  lesson_completed=newly_completed, time_spent=added_time)
+
 def update_lesson_progress(user_id: str, lesson_id: str, progress: int, completed: bool, completed_subtopics: list, time_spent: int = 0, assessment_scores: dict = None, assessment_attempts: dict = None) -> bool:
     """Update lesson progress for a user"""
     from config import get_config
     config = get_config()
     
     try:
+        bump_user_progress_version(user_id)
         progress_data = {
             'progress': progress,
             'completed': completed,
@@ -231,8 +268,12 @@ def update_lesson_progress(user_id: str, lesson_id: str, progress: int, complete
             if user_data:
                 if 'lesson_progress' not in user_data:
                     user_data['lesson_progress'] = {}
+                previous = user_data['lesson_progress'].get(lesson_id) or {}
                 user_data['lesson_progress'][lesson_id] = progress_data
-                return firebase_service.update_user(user_id, {'lesson_progress': user_data['lesson_progress']})
+                return firebase_service.update_user(
+                    user_id, {'lesson_progress': user_data['lesson_progress']},
+                    stats_deltas=_lesson_progress_stats(lesson_id, previous, progress_data)
+                )
         
         return False
         
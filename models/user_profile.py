@@ -1,6 +1,7 @@
 from datetime import datetime
 from dataclasses import dataclass
 from typing import Dict, List, Optional, Any
+from services.streaks import streak_for_display
 
 @dataclass
 class UserProfile:
@@ -76,6 +77,7 @@ class UserStats:
     current_streak: int = 0
     max_streak: int = 0
     achievements_unlocked: int = 0
+    perfect_quiz_scores: int = 0
     last_activity: Optional[datetime] = None
     join_date: Optional[datetime] = None
     
@@ -93,6 +95,7 @@ class UserStats:
             'current_streak': self.current_streak,
             'max_streak': self.max_streak,
             'achievements_unlocked': self.achievements_unlocked,
+            'perfect_quiz_scores': self.perfect_quiz_scores,
             'last_activity': self.last_activity.isoformat() if self.last_activity else None,
             'join_date': self.join_date.isoformat() if self.join_date else None
         }
@@ -112,10 +115,45 @@ class UserStats:
             current_streak=data.get('current_streak', 0),
             max_streak=data.get('max_streak', 0),
             achievements_unlocked=data.get('achievements_unlocked', 0),
+            perfect_quiz_scores=data.get('perfect_quiz_scores', 0),
             last_activity=datetime.fromisoformat(data['last_activity']) if data.get('last_activity') else None,
             join_date=datetime.fromisoformat(data['join_date']) if data.get('join_date') else None
         )
     
+    @classmethod
+    def from_user_doc(cls, user_id: str, user_data: Dict[str, Any]) -> 'UserStats':
+        """Derive stats from a users/{uid} document"""
+        lesson_progress = user_data.get('lesson_progress', {}) or {}
+        return cls(
+            user_id=user_id,
+            xp=user_data.get('xp', 0),
+            level=user_data.get('level', 1),
+            lessons_completed=len([p for p in lesson_progress.values() if p.get('completed')]),
+            quizzes_completed=len(user_data.get('quiz_scores', {}) or {}),
+            code_executions=user_data.get('code_executions', 0),
+            current_streak=streak_for_display(user_data),
+            max_streak=user_data.get('max_streak', 0),
+            achievements_unlocked=len(user_data.get('achievements', []) or [])
+        )
+
+    @classmethod
+    def from_stats_doc(cls, user_id: str, stats_data: Dict[str, Any]) -> 'UserStats':
+        """Build stats from a materialized user_stats/{uid} document"""
+        stats = cls(
+            user_id=user_id,
+            xp=stats_data.get('xp_earned', 0),
+            lessons_completed=stats_data.get('lessons_completed', 0),
+            quizzes_completed=stats_data.get('quizzes_completed', 0),
+            code_executions=stats_data.get('code_executions', 0),
+            study_time_minutes=stats_data.get('total_time_spent', 0),
+            current_streak=streak_for_display(stats_data),
+            max_streak=stats_data.get('max_streak', 0),
+            achievements_unlocked=stats_data.get('achievements_unlocked', 0),
+            perfect_quiz_scores=stats_data.get('perfect_quiz_scores', 0)
+        )
+        stats.level = stats.calculate_level()
+        return stats
+
     def calculate_level(self) -> int:
         """Calculate user level based on XP"""
         if self.xp < 100:
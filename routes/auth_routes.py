@@ -4,11 +4,14 @@ Handles Google OAuth authentication and user sessions
 """
 import os
 from flask import Blueprint, request, jsonify, session, current_app, render_template
-from firebase_admin import auth as firebase_auth
 import logging
 from typing import Optional, Dict, Any
-from google.oauth2 import id_token
-from google.auth.transport import requests as google_requests
+from services.streaks import is_valid_timezone
+from utils.lazy_imports import lazy_module
+
+# google-auth (and the requests stack under it) is loaded on the first sign-in
+id_token = lazy_module('google.oauth2.id_token')
+google_requests = lazy_module('google.auth.transport.requests')
 
 logger = logging.getLogger(__name__)
 auth_bp = Blueprint('auth', __name__)
@@ -288,11 +291,15 @@ def update_user_profile():
         firebase_service = get_firebase_service()
         if firebase_service and firebase_service.is_available():
             # Only allow updating certain fields
-            allowed_fields = ['username', 'display_name', 'bio']
+            allowed_fields = ['username', 'display_name', 'bio', 'timezone']
             update_data = {k: v for k, v in data.items() if k in allowed_fields}
             
             if not update_data:
                 return jsonify({'success': False, 'error': 'No valid fields to update'}), 400
+            
+            # Streak days are counted in this timezone
+            if 'timezone' in update_data and not is_valid_timezone(update_data['timezone']):
+                return jsonify({'success': False, 'error': 'Invalid timezone'}), 400
                 
             # Add timestamp
             update_data['updated_at'] = firebase_service.get_server_timestamp()
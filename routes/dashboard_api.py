@@ -5,8 +5,10 @@ Provides API endpoints for dashboard data with Firebase integration
 from flask import Blueprint, jsonify, request, current_app, session
 from models.user import get_current_user, get_user_progress
 from models.lesson import get_all_lessons, calculate_overall_progress
-from models.activity import get_recent_activity, track_activity
-from services.firebase_service import FirebaseService
+from models.activity import get_activity_page, track_activity
+from services.firebase_service import FirebaseService, get_firebase_service as get_global_firebase_service
+from services.rollups import GRANULARITIES, rollup_day
+from utils.http_cache import cached_json
 from config import get_config
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
@@ -276,16 +278,22 @@ def get_exam_objectives():
 
 @dashboard_api_bp.route('/activity-feed')
 def get_activity_feed():
-    """Get user's activity feed"""
+    """Get one page of the user's activity feed (?cursor= from the previous page's next_cursor)"""
     try:
         user = get_current_user()
         if not user:
-            return jsonify({'activities': [], 'guest_mode': True})
+            return jsonify({'activities': [], 'guest_mode': True, 'next_cursor': None, 'has_more': False})
         
-        activities = get_recent_activity(user['uid'])
+        try:
+            page = get_activity_page(user['uid'], cursor=request.args.get('cursor') or None,
+                                     limit=request.args.get('limit', 20))
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor'}), 400
         
         return jsonify({
-            'activities': activities,
+            'activities': page['activities'],
+            'next_cursor': page['next_cursor'],
+            'has_more': page['has_more'],
             'timestamp': datetime.now().isoformat()
         })
         
@@ -293,6 +301,37 @@ def get_activity_feed():
         logger.error(f"Error getting activity feed: {str(e)}")
         return jsonify({'error': 'Failed to load activity feed'}), 500
 
+@dashboard_api_bp.route('/progress-chart')
+def get_progress_chart():
+    """Get XP and activity counters per day, week or month from the user's rollups"""
+    try:
+        user = get_current_user()
+        if not user or not user.get('uid'):
+            return jsonify({'error': 'Not authenticated'}), 401
+        
+        granularity = request.args.get('granularity', 'day')
+        if granularity not in GRANULARITIES:
+            return jsonify({'error': f"granularity must be one of {', '.join(GRANULARITIES)}"}), 400
+        try:
+            days = max(1, min(int(request.args.get('days', 30)), 3 * 365))
+        except ValueError:
+            return jsonify({'error': 'days must be an integer'}), 400
+        
+        firebase_service = get_global_firebase_service()
+        if not (firebase_service and firebase_service.is_available()):
+            return jsonify({'error': 'Progress history unavailable'}), 503
+        
+        end = rollup_day(user)
+        chart = firebase_service.get_rollup_series(user['uid'], end - timedelta(days=days - 1), end, granularity)
+        if chart is None:
+            return jsonify({'error': 'Failed to load progress chart'}), 500
+        
+        return jsonify(chart)
+        
+    except Exception as e:
+        logger.error(f"Error getting progress chart: {str(e)}")
+        return jsonify({'error': 'Failed to load progress chart'}), 500
+
 @dashboard_api_bp.route('/leaderboard')
 def get_leaderboard():
     """Get leaderboard data"""
@@ -408,6 +447,7 @@ def get_leaderboard():
         return jsonify({'error': 'Failed to load leaderboard'}), 500
 
 @dashboard_api_bp.route('/daily-challenge')
+@cached_json(lambda **kwargs: datetime.now().strftime('%Y-%m-%d'), max_age=300)
 def get_daily_challenge_api():
     """Get daily challenge"""
     try:
@@ -5,6 +5,7 @@ Provides access to component documentation and testing interface
 
 from flask import Blueprint, render_template, jsonify, request
 from utils.component_registry import component_registry, ComponentType
+from utils.http_cache import cached_json
 import json
 
 docs_bp = Blueprint('docs', __name__, url_prefix='/docs')
@@ -42,6 +43,7 @@ def component_showcase():
 
 
 @docs_bp.route('/api/components')
+@cached_json(lambda **kwargs: component_registry.content_version, max_age=3600)
 def component_registry_api():
     """API endpoint for component registry data"""
     try:
@@ -2,18 +2,26 @@
 Lesson API routes for Code with Morais
 Provides API endpoints for lesson data
 """
-from flask import Blueprint, jsonify, request, current_app
-from models.user import get_current_user, get_user_progress, update_lesson_progress
-from models.lesson import get_all_lessons, get_lesson, calculate_overall_progress
-from models.quiz import get_quiz
+from flask import Blueprint, jsonify, request, current_app, session
+from models.user import get_current_user, get_user_progress, update_lesson_progress, get_user_progress_version, DEV_USER
+from models.lesson import get_all_lessons, get_lesson, calculate_overall_progress, get_lesson_catalog_version
+from models.quiz import get_quiz, get_quiz_catalog_version
 from services.firebase_service import FirebaseService
+from services.lesson_search import get_lesson_search_index
+from utils.http_cache import cached_json
 from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 lesson_api_bp = Blueprint('lesson_api', __name__, url_prefix='/api')
 
+def _lesson_progress_version(**kwargs):
+    """Lesson catalog plus the caller's progress, which both shape lesson responses"""
+    user_id = session.get('user_id') or DEV_USER['uid']
+    return (get_lesson_catalog_version(), get_user_progress_version(user_id))
+
 @lesson_api_bp.route('/lessons')
+@cached_json(_lesson_progress_version, private=True)
 def get_lessons_api():
     """Get all lessons with progress information"""
     try:
@@ -61,6 +69,7 @@ def get_lessons_api():
         return jsonify({'error': 'Failed to load lessons'}), 500
 
 @lesson_api_bp.route('/lessons/<lesson_id>')
+@cached_json(_lesson_progress_version, private=True)
 def get_lesson_api(lesson_id):
     """Get specific lesson with detailed information"""
     try:
@@ -186,6 +195,7 @@ def update_lesson_progress(lesson_id):
         return jsonify({'error': 'Failed to update progress'}), 500
 
 @lesson_api_bp.route('/categories')
+@cached_json(lambda **kwargs: get_lesson_catalog_version(), max_age=300)
 def get_lesson_categories():
     """Get all lesson categories with counts"""
     try:
@@ -220,51 +230,25 @@ def get_lesson_categories():
 
 @lesson_api_bp.route('/search')
 def search_lessons():
-    """Search lessons by title, description, or tags"""
+    """Search lessons by title, description, tags or block text"""
     try:
         query = request.args.get('q', '').lower()
         category = request.args.get('category', '')
         difficulty = request.args.get('difficulty', '')
+        limit = request.args.get('limit', type=int)
         
         if not query and not category and not difficulty:
             return jsonify({'error': 'No search criteria provided'}), 400
         
-        lessons = get_all_lessons()
-        filtered_lessons = []
-        
-        for lesson in lessons:
-            # Text search
-            text_match = True
-            if query:
-                title_match = query in lesson.get('title', '').lower()
-                desc_match = query in lesson.get('description', '').lower()
-                tags_match = any(query in tag.lower() for tag in lesson.get('tags', []))
-                text_match = title_match or desc_match or tags_match
-            
-            # Category filter
-            category_match = True
-            if category:
-                category_match = lesson.get('category', '') == category
-            
-            # Difficulty filter
-            difficulty_match = True
-            if difficulty:
-                difficulty_match = lesson.get('difficulty', '') == difficulty
-            
-            if text_match and category_match and difficulty_match:
-                filtered_lessons.append({
-                    'id': lesson.get('id'),
-                    'title': lesson.get('title'),
-                    'description': lesson.get('description'),
-                    'category': lesson.get('category'),
-                    'difficulty': lesson.get('difficulty'),
-                    'duration': lesson.get('duration'),
-                    'xp_reward': lesson.get('xp_reward')
-                })
+        # Index is rebuilt incrementally when the catalog version changes
+        search_index = get_lesson_search_index()
+        search_index.ensure_current(get_all_lessons, get_lesson_catalog_version())
+        results = search_index.search(query, category=category, difficulty=difficulty, limit=limit)
         
         return jsonify({
-            'lessons': filtered_lessons,
-            'total_count': len(filtered_lessons),
+            'lessons': results['lessons'],
+            'total_count': results['total_count'],
+            'facets': results['facets'],
             'search_query': query,
             'filters': {
                 'category': category,
@@ -493,6 +477,7 @@ def get_next_lesson(lesson_id):
 
 # Add quiz API endpoint
 @lesson_api_bp.route('/quiz/<quiz_id>')
+@cached_json(lambda **kwargs: get_quiz_catalog_version(), max_age=300)
 def get_quiz_api(quiz_id):
     """Get quiz data by ID"""
     try:
@@ -4,9 +4,10 @@ Lesson routes for Code with Morais
 import traceback
 from datetime import datetime
 from flask import Blueprint, render_template, request, jsonify, session, current_app
-from models.user import get_current_user, get_user_progress
+from models.user import get_current_user, get_user_progress, bump_user_progress_version
 from models.lesson import get_lesson, get_all_lessons, calculate_overall_progress
 from models.activity import track_activity
+from services.user_stats import lesson_category
 from config import get_config
 
 lesson_bp = Blueprint('lesson', __name__)
@@ -205,62 +206,34 @@ def complete_subtopic():
                 'lesson_completed': False
             })
         
-        # Update user progress using Firebase service
-        user_data = firebase_service.get_user(user['uid'])
-        if not user_data:
+        # Check and write inside one transaction so concurrent submits award XP once
+        lesson_data = get_lesson(lesson_id)
+        total_subtopics = len(lesson_data.get('subtopics', [])) if lesson_data else 3
+        result = firebase_service.complete_subtopic(
+            user['uid'], lesson_id, subtopic_id, total_subtopics,
+            lesson_xp=lesson_data.get('xp_reward', 100) if lesson_data else 100,
+            category=lesson_category(lesson_data)
+        )
+        if result is None:
+            return jsonify({'error': 'Failed to update progress'}), 500
+        if not result['user_found']:
             return jsonify({'error': 'User not found'}), 404
         
-        # Get or create lesson progress
-        lesson_progress = user_data.get('lesson_progress', {})
-        if lesson_id not in lesson_progress:
-            lesson_progress[lesson_id] = {
-                'completed': False,
-                'completed_subtopics': [],
-                'progress': 0
-            }
-        
-        # Add subtopic if not already completed
-        if subtopic_id not in lesson_progress[lesson_id]['completed_subtopics']:
-            lesson_progress[lesson_id]['completed_subtopics'].append(subtopic_id)
-            
-            # Calculate progress - get lesson info
-            lesson_data = get_lesson(lesson_id)
-            total_subtopics = len(lesson_data.get('subtopics', [])) if lesson_data else 3
-            completed_count = len(lesson_progress[lesson_id]['completed_subtopics'])
-            progress = int((completed_count / total_subtopics) * 100) if total_subtopics > 0 else 0
-            
-            lesson_progress[lesson_id]['progress'] = progress
-            
-            # Check if lesson is complete
-            lesson_completed = completed_count >= total_subtopics
-            if lesson_completed:
-                lesson_progress[lesson_id]['completed'] = True
-                xp_earned = lesson_data.get('xp_reward', 100) if lesson_data else 100
-            else:
-                xp_earned = 50  # XP for subtopic completion
-            
-            # Update user data
-            update_data = {
-                'lesson_progress': lesson_progress,
-                'xp': user_data.get('xp', 0) + xp_earned
-            }
+        if result['added']:
+            bump_user_progress_version(user['uid'])
+            # Track activity
+            track_activity(user['uid'], 'subtopic_completed', {
+                'lesson_id': lesson_id,
+                'subtopic_id': subtopic_id,
+                'xp_earned': result['xp_earned']
+            })
             
-            if firebase_service.update_user(user['uid'], update_data):
-                # Track activity
-                track_activity(user['uid'], 'subtopic_completed', {
-                    'lesson_id': lesson_id,
-                    'subtopic_id': subtopic_id,
-                    'xp_earned': xp_earned
-                })
-                
-                return jsonify({
-                    'success': True,
-                    'xp_earned': xp_earned,
-                    'new_progress': progress,
-                    'lesson_completed': lesson_completed
-                })
-            else:
-                return jsonify({'error': 'Failed to update progress'}), 500
+            return jsonify({
+                'success': True,
+                'xp_earned': result['xp_earned'],
+                'new_progress': result['progress'],
+                'lesson_completed': result['lesson_completed']
+            })
         
         # Subtopic already completed
         return jsonify({
@@ -1,10 +1,100 @@
 from flask import Blueprint, request, jsonify, render_template, redirect, url_for, session
 from models.user import get_current_user
-from datetime import datetime
+from services.async_firebase_service import get_async_firebase_service, run_async
+from services.achievement_service import achievement_service
+from services.firebase_service import get_firebase_service
+from services.rollups import rollup_day, regroup_series, DEFAULT_RETENTION_DAYS
+from services.user_stats import stats_summary
+from services.streaks import streak_for_display
+from models.lesson import get_lesson_category_totals
+from models.activity import get_activity_page
+from datetime import datetime, timedelta
 import json
+import re
+import logging
+
+logger = logging.getLogger(__name__)
 
 profile_bp = Blueprint('profile', __name__, url_prefix='/api/profile')
 
+def _materialized_stats(counters):
+    """Profile stats fields from a user_stats document"""
+    summary = stats_summary(counters)
+    totals = get_lesson_category_totals()
+    return {
+        'lessons_completed': summary['lessons_completed'],
+        'total_xp': summary['xp_earned'],
+        'current_streak': streak_for_display(summary),
+        'max_streak': summary.get('max_streak', 0),
+        'total_time_spent': summary['total_time_spent'],
+        'code_executions': summary['code_executions'],
+        'quizzes_completed': summary['quizzes_completed'],
+        'quizzes_passed': summary['quizzes_passed'],
+        'achievements_unlocked': summary['achievements_unlocked'],
+        'progress_by_category': {
+            category: {**progress, 'total': max(totals.get(category, 0), progress['completed'])}
+            for category, progress in summary['progress_by_category'].items()
+        }
+    }
+
+def _sync_firebase_service():
+    """The sync FirebaseService, for workers running without the async one (gevent)"""
+    firebase_service = get_firebase_service()
+    return firebase_service if firebase_service and firebase_service.is_available() else None
+
+def _profile_activity(activity, position):
+    """Profile feed entry from an activity page item (dev mock items have no id, so use their position)"""
+    timestamp = activity.get('timestamp')
+    activity_type = activity.get('type', 'unknown')
+    return {
+        'id': activity.get('id', position),
+        'type': activity_type,
+        'title': activity_type.replace('_', ' ').title(),
+        'description': activity.get('message', 'Activity'),
+        'timestamp': timestamp.isoformat() if hasattr(timestamp, 'isoformat') else timestamp
+    }
+
+def _range_days(time_range):
+    """Days covered by a '7d' / '30d' style range parameter (default 7, at most a year)"""
+    match = re.fullmatch(r'(\d{1,3})d', time_range or '')
+    return max(1, min(int(match.group(1)), 365)) if match else 7
+
+def _rollup_charts(user, days):
+    """Daily and weekly chart series for the last `days` days from user_rollups"""
+    firebase_service = get_firebase_service()
+    if not (firebase_service and firebase_service.is_available() and user.get('uid')):
+        return None
+    end = rollup_day(user)
+    start = end - timedelta(days=days - 1)
+    daily = firebase_service.get_rollup_series(user['uid'], start, end, 'day')
+    if daily is None:
+        return None
+    if days <= DEFAULT_RETENTION_DAYS:
+        weekly = regroup_series(daily, 'week')
+    else:
+        weekly = firebase_service.get_rollup_series(user['uid'], start, end, 'week') or regroup_series(daily, 'week')
+    recent = daily['series']
+    last_week = slice(-7, None)
+    return {
+        'recent_lessons': sum(recent['lessons_completed'][last_week]),
+        'recent_executions': sum(recent['code_executions'][last_week]),
+        'recent_time': sum(recent['time_spent'][last_week]),
+        'daily_progress': [
+            {'date': label, 'lessons_completed': recent['lessons_completed'][i],
+             'time_spent': recent['time_spent'][i], 'xp': recent['xp'][i]}
+            for i, label in enumerate(daily['labels'])
+        ],
+        'activity_heatmap': [
+            {'date': label, 'activity_count': recent['activities'][i]}
+            for i, label in enumerate(daily['labels'])
+        ],
+        'weekly_activity': [
+            {'week': i + 1, 'week_start': label, 'total_time': weekly['series']['time_spent'][i],
+             'xp': weekly['series']['xp'][i]}
+            for i, label in enumerate(weekly['labels'])
+        ]
+    }
+
 @profile_bp.route('/')
 def get_profile():
     """Get user profile data"""
@@ -29,12 +119,28 @@ def get_profile():
             'created_at': user.get('created_at', datetime.now().isoformat())
         }
         
+        # The user document is already loaded; the bundle only adds its user_stats counters
+        counters = None
+        async_service = get_async_firebase_service()
+        sync_service = None if async_service else _sync_firebase_service()
+        if (async_service or sync_service) and user.get('uid'):
+            try:
+                if async_service:
+                    bundle = run_async(async_service.get_profile_bundle(user['uid'], user_data=user))
+                else:
+                    bundle = sync_service.get_profile_bundle(user['uid'], user_data=user)
+                user = {**user, 'achievements_unlocked': bundle['stats'].achievements_unlocked,
+                        'completed_lessons_count': bundle['stats'].lessons_completed}
+                counters = bundle['user_stats']
+            except Exception as e:
+                logger.error(f"Error loading profile bundle: {str(e)}")
+        
         # Create stats data structure
         stats_data = {
             'user_id': user.get('uid'),
             'lessons_completed': user.get('completed_lessons_count', 0),
             'total_xp': user.get('xp', 0),
-            'current_streak': user.get('streak', 0),
+            'current_streak': streak_for_display(user),
             'max_streak': user.get('max_streak', 0),
             'total_time_spent': user.get('total_time_spent', 0),
             'code_executions': user.get('code_executions', 0),
@@ -42,12 +148,13 @@ def get_profile():
             'recent_lessons': 5,
             'recent_executions': 12,
             'recent_time': 180,
-            'progress_by_category': {
-                'ES6 Basics': {'completed': 8, 'total': 10, 'time_spent': 120},
-                'Advanced Features': {'completed': 3, 'total': 8, 'time_spent': 90},
-                'Async Programming': {'completed': 2, 'total': 6, 'time_spent': 60}
-            }
+            'progress_by_category': {}
         }
+        if counters is not None:
+            stats_data.update(_materialized_stats(counters))
+        charts = _rollup_charts(user, 7)
+        if charts:
+            stats_data.update({key: charts[key] for key in ('recent_lessons', 'recent_executions', 'recent_time')})
         
         return jsonify({
             'success': True,
@@ -110,12 +217,28 @@ def get_stats():
         # Get time range parameter
         time_range = request.args.get('range', '7d')
         
-        # Mock stats data based on time range
+        # Counters come from the materialized user_stats document
+        counters = None
+        async_service = get_async_firebase_service()
+        sync_service = None if async_service else _sync_firebase_service()
+        if (async_service or sync_service) and user.get('uid'):
+            try:
+                if async_service:
+                    counters = run_async(async_service.get_user_stats_doc(user['uid']))
+                else:
+                    counters = sync_service.get_user_stats_doc(user['uid'])
+            except Exception as e:
+                logger.error(f"Error loading user stats: {str(e)}")
+        summary = _materialized_stats(counters) if counters is not None else {}
+        
+        # Fallback sample data, replaced by rollup series below when Firestore is available
         stats_data = {
-            'lessons_completed': user.get('completed_lessons_count', 0),
-            'code_executions': user.get('code_executions', 0),
-            'total_time': user.get('total_time_spent', 0),
-            'current_streak': user.get('streak', 0),
+            'lessons_completed': summary.get('lessons_completed', user.get('completed_lessons_count', 0)),
+            'code_executions': summary.get('code_executions', user.get('code_executions', 0)),
+            'total_time': summary.get('total_time_spent', user.get('total_time_spent', 0)),
+            'current_streak': summary.get('current_streak', streak_for_display(user)),
+            'quizzes_completed': summary.get('quizzes_completed', 0),
+            'progress_by_category': summary.get('progress_by_category', {}),
             'recent_lessons': 5,
             'recent_executions': 12,
             'recent_time': 180,
@@ -142,6 +265,9 @@ def get_stats():
                 {'week': 3, 'total_time': 160}
             ]
         }
+        charts = _rollup_charts(user, _range_days(time_range))
+        if charts:
+            stats_data.update(charts)
         
         return jsonify({
             'success': True,
@@ -159,6 +285,29 @@ def get_achievements():
         if not user:
             return jsonify({'success': False, 'error': 'User not authenticated'}), 401
         
+        async_service = get_async_firebase_service()
+        sync_service = None if async_service else _sync_firebase_service()
+        if (async_service or sync_service) and user.get('uid'):
+            try:
+                if async_service:
+                    achievements = run_async(achievement_service.get_user_achievements_with_progress(user['uid']))
+                else:
+                    achievements = achievement_service.get_user_achievements_with_progress_sync(user['uid'])
+                progress = {
+                    ach['id']: {
+                        'unlocked': bool(ach.get('unlocked')),
+                        'progress': ach.get('current_progress', ach.get('progress', 0))
+                    }
+                    for ach in achievements
+                }
+                return jsonify({
+                    'success': True,
+                    'achievements': achievements,
+                    'progress': progress
+                })
+            except Exception as e:
+                logger.error(f"Error loading achievements: {str(e)}")
+        
         # Mock achievements data
         achievements = [
             {
@@ -237,12 +386,17 @@ def check_achievements():
         data = request.get_json()
         action = data.get('action')
         
-        # Mock achievement checking logic
-        # In a real app, this would check against actual achievement requirements
+        new_achievements = []
+        if user.get('uid') and action:
+            if get_async_firebase_service():
+                unlocked = run_async(achievement_service.check_achievements(user['uid'], action))
+            else:
+                unlocked = achievement_service.check_achievements_sync(user['uid'], action)
+            new_achievements = [ach.to_dict() for ach in unlocked]
         
         return jsonify({
             'success': True,
-            'new_achievements': [],
+            'new_achievements': new_achievements,
             'updated_progress': {}
         })
         
@@ -251,12 +405,27 @@ def check_achievements():
 
 @profile_bp.route('/activity')
 def get_activity():
-    """Get user activity feed"""
+    """Get one page of the user activity feed (?cursor= from the previous page's next_cursor)"""
     try:
         user = get_current_user()
         if not user:
             return jsonify({'success': False, 'error': 'User not authenticated'}), 401
         
+        firebase_service = get_firebase_service()
+        if firebase_service and firebase_service.is_available():
+            try:
+                page = get_activity_page(user['uid'], cursor=request.args.get('cursor') or None,
+                                         limit=request.args.get('limit', 20))
+            except ValueError:
+                return jsonify({'success': False, 'error': 'Invalid cursor'}), 400
+            return jsonify({
+                'success': True,
+                'activities': [_profile_activity(activity, position)
+                               for position, activity in enumerate(page['activities'], start=1)],
+                'next_cursor': page['next_cursor'],
+                'has_more': page['has_more']
+            })
+        
         # Mock activity data
         activities = [
             {
@@ -291,7 +460,9 @@ def get_activity():
         
         return jsonify({
             'success': True,
-            'activities': activities
+            'activities': activities,
+            'next_cursor': None,
+            'has_more': False
         })
         
     except Exception as e:
@@ -5,7 +5,9 @@ Provides personalized learning suggestions based on user progress
 from flask import Blueprint, jsonify, request, current_app
 from models.user import get_current_user, get_user_progress
 from models.lesson import get_all_lessons, calculate_overall_progress
-from services.firebase_service import FirebaseService
+from services.firebase_service import get_firebase_service as get_global_firebase_service
+from services.recommendation_engine import RecommendationEngine
+from services.recommendation_precompute import get_precomputed_recommendations, STORED_FIELDS
 from datetime import datetime
 import random
 import logging
@@ -14,10 +16,8 @@ logger = logging.getLogger(__name__)
 recommendation_api_bp = Blueprint('recommendation_api', __name__, url_prefix='/api/recommendations')
 
 def get_firebase_service():
-    """Get Firebase service instance"""
-    from config import get_config
-    config = get_config()
-    return FirebaseService(config.FIREBASE_CONFIG if hasattr(config, 'FIREBASE_CONFIG') else {})
+    """Get the app's shared Firebase service instance"""
+    return get_global_firebase_service()
 
 @recommendation_api_bp.route('/next-steps')
 def get_next_steps():
@@ -124,3 +124,45 @@ def get_next_steps():
             'icon': 'fas fa-book-reader',
             'action_url': '/lessons'
         })
+
+@recommendation_api_bp.route('/personalized')
+def get_personalized_recommendations():
+    """Get top-K recommendations, served from the nightly precompute when fresh"""
+    try:
+        user = get_current_user()
+        if not user:
+            return jsonify({
+                'recommendations': [],
+                'guest_mode': True,
+                'message': 'Login to get personalized recommendations'
+            })
+        
+        limit = min(int(request.args.get('limit', 5)), 20)
+        
+        # Read the precomputed doc first; it is served while the user's progress is unchanged
+        recommendations = get_precomputed_recommendations(
+            get_firebase_service(), user['uid'], lesson_progress=user.get('lesson_progress') or {}
+        )
+        source = 'precomputed'
+        
+        # Fall back to live compute when missing or stale
+        if recommendations is None:
+            engine = RecommendationEngine()
+            live = engine.generate_personalized_recommendations(
+                user['uid'], get_user_progress(user['uid']), get_all_lessons(), limit=limit
+            )
+            recommendations = [{field: rec.get(field) for field in STORED_FIELDS} for rec in live]
+            source = 'live'
+        
+        return jsonify({
+            'recommendations': recommendations[:limit],
+            'source': source,
+            'timestamp': datetime.now().isoformat()
+        })
+        
+    except Exception as e:
+        logger.error(f"Error getting personalized recommendations: {str(e)}")
+        return jsonify({
+            'error': 'Failed to load recommendations',
+            'recommendations': []
+        }), 500
@@ -2,14 +2,21 @@
 System API - Backend system-level operations and monitoring
 Provides endpoints for system status, health checks, and system management
 """
-from flask import Blueprint, jsonify, request, current_app
+from flask import Blueprint, jsonify, request, current_app, Response
 import platform
-import psutil
 import os
 import sys
 import logging
 from datetime import datetime
 import time
+from services.resource_sampler import get_resource_sampler, get_latest_resources, DEFAULT_WINDOWS
+from utils.log_reader import LogReader, LogFilter
+from utils.log_pipeline import get_logging_stats
+from utils.metrics import metrics_available, render_metrics
+from utils.profiler import get_profiler, summarize_profile, top_functions, collapsed_text, functions_from_stacks
+from utils.firestore_budget import get_firestore_budget
+from utils.resilience import get_resilience_status
+from services.content_snapshot import get_content_snapshot
 
 logger = logging.getLogger(__name__)
 system_api_bp = Blueprint('system_api', __name__, url_prefix='/api/system')
@@ -17,6 +24,13 @@ system_api_bp = Blueprint('system_api', __name__, url_prefix='/api/system')
 # System startup time
 STARTUP_TIME = datetime.now()
 
+def get_log_file_path():
+    """Absolute path of the active application log (Config.LOG_FILE)"""
+    log_file = os.environ.get('LOG_FILE', 'logs/app.log')
+    if not os.path.isabs(log_file):
+        log_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), log_file)
+    return log_file
+
 @system_api_bp.route('/status', methods=['GET'])
 def system_status():
     """Get comprehensive system status information"""
@@ -32,11 +46,26 @@ def system_status():
             'platform': platform.platform()
         }
         
-        # System resources
+        # System resources from the background sampler (no blocking psutil calls here)
+        sample = get_latest_resources()
         system_resources = {
-            'cpu_usage': psutil.cpu_percent(interval=0.1),
-            'memory_usage': dict(psutil.virtual_memory()._asdict()),
-            'disk_usage': dict(psutil.disk_usage('/')._asdict())
+            'cpu_usage': sample['cpu_percent'],
+            'memory_usage': {
+                'total': sample['memory_total'],
+                'available': sample['memory_available'],
+                'used': sample['memory_used'],
+                'percent': sample['memory_percent']
+            },
+            'disk_usage': {
+                'total': sample['disk_total'],
+                'used': sample['disk_used'],
+                'free': sample['disk_free'],
+                'percent': sample['disk_percent']
+            },
+            'open_fds': sample['open_fds'],
+            'process_rss': sample['rss'],
+            'workers_rss': sample['workers_rss'],
+            'sampled_at': datetime.fromtimestamp(sample['timestamp']).isoformat()
         }
         
         # Service status
@@ -54,7 +83,8 @@ def system_status():
             'timestamp': datetime.now().isoformat(),
             'app_info': app_info,
             'system_resources': system_resources,
-            'services': services_status
+            'services': services_status,
+            'logging': get_logging_stats()
         })
     except Exception as e:
         logger.error(f"Error getting system status: {str(e)}")
@@ -71,6 +101,7 @@ def health_check():
     try:
         # Check services that are critical for operation
         firebase_service = current_app.config.get('firebase_service')
+        resilience = get_resilience_status()
         
         # Only check firebase if we're not in dev mode
         if not current_app.config.get('DEV_MODE', False):
@@ -78,14 +109,29 @@ def health_check():
                 return jsonify({
                     'status': 'degraded',
                     'message': 'Firebase service unavailable',
-                    'timestamp': datetime.now().isoformat()
+                    'timestamp': datetime.now().isoformat(),
+                    'circuit_breakers': resilience,
+                    'content_snapshot': get_content_snapshot().status()
                 }), 200  # Still return 200 to prevent cascading failures
         
-        # All checks passed
+        if resilience['open_circuits']:
+            status, message = 'degraded', f"Serving cached data for: {', '.join(resilience['open_circuits'])}"
+        else:
+            status, message = 'healthy', 'All systems operational'
+        
+        sample = get_latest_resources()
         return jsonify({
-            'status': 'healthy',
-            'message': 'All systems operational',
-            'timestamp': datetime.now().isoformat()
+            'status': status,
+            'message': message,
+            'timestamp': datetime.now().isoformat(),
+            'circuit_breakers': resilience,
+            'content_snapshot': get_content_snapshot().status(),
+            'resources': {
+                'cpu_percent': sample['cpu_percent'],
+                'memory_percent': sample['memory_percent'],
+                'disk_percent': sample['disk_percent'],
+                'sample_age_seconds': round(time.time() - sample['timestamp'], 3)
+            }
         })
     except Exception as e:
         logger.error(f"Health check failed: {str(e)}")
@@ -95,6 +141,53 @@ def health_check():
             'timestamp': datetime.now().isoformat()
         }), 500
 
+@system_api_bp.route('/metrics/history', methods=['GET'])
+def metrics_history():
+    """Get min/avg/max resource usage over recent windows"""
+    try:
+        windows_param = request.args.get('windows')
+        if windows_param:
+            windows = [int(w) for w in windows_param.split(',') if w.strip()]
+        else:
+            windows = list(DEFAULT_WINDOWS)
+        if not windows or any(w <= 0 for w in windows):
+            return jsonify({'status': 'error', 'message': 'windows must be positive integers (seconds)'}), 400
+
+        sampler = get_resource_sampler()
+        response = {
+            'status': 'success',
+            'timestamp': datetime.now().isoformat(),
+            'interval_seconds': sampler.interval,
+            'windows': sampler.history(windows)
+        }
+        if request.args.get('samples', 'false').lower() == 'true':
+            response['samples'] = sampler.samples(max(windows))
+        return jsonify(response)
+    except ValueError:
+        return jsonify({'status': 'error', 'message': 'windows must be positive integers (seconds)'}), 400
+    except Exception as e:
+        logger.error(f"Error getting metrics history: {str(e)}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@system_api_bp.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus text-format metrics aggregated across workers"""
+    if not metrics_available():
+        return jsonify({
+            'status': 'error',
+            'message': 'prometheus_client not installed',
+            'timestamp': datetime.now().isoformat()
+        }), 503
+    token = os.environ.get('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return jsonify({'status': 'error', 'message': 'Unauthorized access'}), 401
+    try:
+        body, content_type = render_metrics()
+        return Response(body, mimetype=None, headers={'Content-Type': content_type, 'Cache-Control': 'no-store'})
+    except Exception as e:
+        logger.error(f"Error rendering metrics: {str(e)}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
 @system_api_bp.route('/logs', methods=['GET'])
 def get_logs():
     """Get recent application logs"""
@@ -110,30 +203,54 @@ def get_logs():
                 'timestamp': datetime.now().isoformat()
             }), 403
         
-        # Log files location
-        log_file = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'app.log')
-        
-        # Lines to retrieve (default 100, max 1000)
-        lines = min(int(request.args.get('lines', 100)), 1000)
-        
-        if os.path.exists(log_file):
-            with open(log_file, 'r') as f:
-                # Get the last 'lines' lines
-                recent_logs = ''.join(f.readlines()[-lines:])
-                
+        try:
+            log_filter = LogFilter(
+                level=request.args.get('level'),
+                logger_name=request.args.get('logger'),
+                pattern=request.args.get('pattern')
+            )
+            # Lines to retrieve (default 100, max 1000)
+            lines = max(1, min(int(request.args.get('lines', 100)), 1000))
+        except ValueError as e:
             return jsonify({
-                'status': 'success',
-                'log_file': log_file,
-                'lines': lines,
-                'logs': recent_logs,
+                'status': 'error',
+                'message': str(e),
                 'timestamp': datetime.now().isoformat()
-            })
-        else:
+            }), 400
+
+        reader = LogReader(get_log_file_path())
+        if not reader.files():
             return jsonify({
                 'status': 'error',
                 'message': 'Log file not found',
                 'timestamp': datetime.now().isoformat()
             }), 404
+
+        cursor = request.args.get('cursor')
+        try:
+            if cursor:
+                # Incremental tail: records written since the previous response
+                result = reader.read_from(cursor, max_lines=lines, log_filter=log_filter)
+            else:
+                result = reader.tail(lines, log_filter=log_filter)
+        except ValueError as e:
+            return jsonify({
+                'status': 'error',
+                'message': str(e),
+                'timestamp': datetime.now().isoformat()
+            }), 400
+
+        records = result['records']
+        return jsonify({
+            'status': 'success',
+            'log_file': reader.path,
+            'lines': lines,
+            'logs': '\n'.join(record.text for record in records),
+            'entries': [record.to_dict() for record in records],
+            'cursor': result['cursor'],
+            'truncated': result['truncated'],
+            'timestamp': datetime.now().isoformat()
+        })
     except Exception as e:
         logger.error(f"Error retrieving logs: {str(e)}")
         return jsonify({
@@ -143,6 +260,135 @@ def get_logs():
         }), 500
 
 
+def _admin_error():
+    """Error response unless the caller is an admin (session or user) or holds the profiler token"""
+    from flask import session
+    from models.user import get_current_user
+    profiler = get_profiler()
+    token = profiler.settings.get('token') if profiler else None
+    if token and request.headers.get('X-Profile-Token') == token:
+        return None
+    if session.get('is_admin'):
+        return None
+    user = get_current_user()
+    if not user or not user.get('is_admin', False):
+        return jsonify({
+            'status': 'error',
+            'message': 'Unauthorized access',
+            'timestamp': datetime.now().isoformat()
+        }), 403
+    return None
+
+def _export_profile(stacks, functions):
+    """Render stacks/functions as ?format=collapsed|top|json"""
+    export_format = request.args.get('format', 'top')
+    if export_format == 'collapsed':
+        return Response(collapsed_text(stacks), mimetype='text/plain')
+    limit = max(1, min(int(request.args.get('limit', 30)), 500))
+    rows = top_functions(functions, limit=limit, sort=request.args.get('sort', 'self'))
+    if export_format == 'json':
+        return jsonify({'status': 'success', 'functions': rows, 'stacks': dict(stacks.most_common(limit))})
+    return jsonify({'status': 'success', 'functions': rows})
+
+@system_api_bp.route('/profiles', methods=['GET', 'DELETE'])
+def list_profiles():
+    """List recent request profiles and per-route aggregates (DELETE clears them)"""
+    try:
+        error = _admin_error()
+        if error:
+            return error
+        profiler = get_profiler()
+        if profiler is None:
+            return jsonify({'status': 'error', 'message': 'Profiler not initialized'}), 503
+        if request.method == 'DELETE':
+            profiler.store.clear()
+            return jsonify({'status': 'success', 'message': 'Profiles cleared'})
+        return jsonify({'status': 'success', 'settings': {
+            'sample_rate': profiler.settings['sample_rate'],
+            'sample_interval_ms': profiler.settings['sample_interval_ms'],
+            'max_profiles': profiler.settings['max_profiles']
+        }, **profiler.store.list()})
+    except Exception as e:
+        logger.error(f"Error listing profiles: {str(e)}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@system_api_bp.route('/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """One profile as a top-N table (default), collapsed stacks or JSON"""
+    try:
+        error = _admin_error()
+        if error:
+            return error
+        profiler = get_profiler()
+        profile = profiler.store.get(profile_id) if profiler else None
+        if profile is None:
+            return jsonify({'status': 'error', 'message': 'Profile not found'}), 404
+        response = _export_profile(profile['stacks'], profile['functions'])
+        if request.args.get('format', 'top') == 'collapsed':
+            return response
+        data = response.get_json()
+        data['profile'] = summarize_profile(profile)
+        return jsonify(data)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error exporting profile {profile_id}: {str(e)}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+@system_api_bp.route('/profiles/routes/<endpoint>', methods=['GET'])
+def get_route_profile(endpoint):
+    """Aggregated profile of one endpoint across all stored requests"""
+    try:
+        error = _admin_error()
+        if error:
+            return error
+        profiler = get_profiler()
+        route = profiler.store.route(endpoint) if profiler else None
+        if route is None:
+            return jsonify({'status': 'error', 'message': 'No profiles for this endpoint'}), 404
+        response = _export_profile(route.stacks, functions_from_stacks(route.stacks))
+        if request.args.get('format', 'top') == 'collapsed':
+            return response
+        data = response.get_json()
+        data['route'] = route.summary()
+        return jsonify(data)
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error exporting route profile {endpoint}: {str(e)}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
+@system_api_bp.route('/firestore-budget', methods=['GET', 'DELETE'])
+def firestore_budget_report():
+    """Per-endpoint Firestore reads/writes/time and recent over-budget requests (this worker)"""
+    try:
+        error = _admin_error()
+        if error:
+            return error
+        budget = get_firestore_budget()
+        if budget is None:
+            return jsonify({'status': 'error', 'message': 'Firestore budget tracking disabled'}), 503
+        if request.method == 'DELETE':
+            budget.report.clear()
+            return jsonify({'status': 'success', 'message': 'Firestore budget report cleared'})
+        report = budget.report.report()
+        limit = max(1, min(int(request.args.get('slow_limit', 20)), 100))
+        return jsonify({
+            'status': 'success',
+            'timestamp': datetime.now().isoformat(),
+            'pid': os.getpid(),
+            'budgets': {key: budget.settings[key] for key in ('max_reads', 'max_firestore_ms', 'max_request_ms')},
+            'endpoints': report['endpoints'],
+            'slow_requests': report['slow_requests'][:limit]
+        })
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error building Firestore budget report: {str(e)}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
 @system_api_bp.route('/js-errors', methods=['POST'])
 def log_js_error():
     """Log JavaScript errors from client-side"""
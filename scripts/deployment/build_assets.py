@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Static Asset Build
+Code with Morais - Python Learning Platform
+
+Builds fingerprinted, minified and precompressed CSS bundles (from
+config/css-bundles.js) and classic scripts into static/dist, plus the
+manifest used by the asset_url() template helper, then writes .gz/.br
+siblings for the remaining static files.
+
+Usage:
+    python scripts/deployment/build_assets.py [--css-only] [--no-precompress]
+"""
+
+import argparse
+import os
+import sys
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from utils.assets import build_assets, precompress_static, brotli, rjsmin
+
+
+def format_size(size):
+    """Human readable byte size."""
+    return f"{size / 1024:.1f}KB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build fingerprinted static assets")
+    parser.add_argument('--css-only', action='store_true', help="Skip classic script processing")
+    parser.add_argument('--no-precompress', action='store_true',
+                        help="Skip writing .gz/.br siblings for unbuilt static files")
+    args = parser.parse_args()
+
+    print("📦 Building static assets")
+    print("=" * 50)
+    if brotli is None:
+        print("⚠️  brotli not installed - skipping .br output (pip install brotli)")
+    if rjsmin is None and not args.css_only:
+        print("⚠️  rjsmin not installed - scripts are fingerprinted but not minified (pip install rjsmin)")
+
+    try:
+        manifest = build_assets(include_js=not args.css_only)
+        precompressed = None if args.no_precompress else precompress_static()
+    except Exception as e:
+        print(f"❌ Asset build failed: {e}")
+        return 1
+
+    total = total_gzip = 0
+    for logical_path, entry in sorted(manifest['assets'].items()):
+        total += entry['size']
+        total_gzip += entry['gzip_size']
+        if logical_path.startswith('css/'):
+            print(f"  ✅ {logical_path} -> {entry['file']} "
+                  f"({format_size(entry['size'])}, gzip {format_size(entry['gzip_size'])})")
+
+    print()
+    print(f"🎉 Built {len(manifest['assets'])} assets: {format_size(total)} "
+          f"({format_size(total_gzip)} gzipped)")
+    if precompressed:
+        print(f"🗜️  Precompressed {precompressed['written']} static files "
+              f"({precompressed['skipped']} already up to date)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+JSON Serialization & Compression Benchmark
+Code with Morais - Python Learning Platform
+
+Compares the stdlib and orjson providers and gzip/brotli levels on real
+payloads: every lesson in firebase_data/enhanced_lessons.json and a
+dashboard-style payload built from the seed users and activities.
+
+Usage:
+    python scripts/development/benchmark_json.py [--iterations 200]
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+
+# Add project root to path
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(ROOT)
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from utils.json_provider import OrjsonProvider, orjson
+from utils.compression import brotli
+
+
+def load_payloads():
+    """Real lesson and dashboard payloads from the seed data."""
+    with open(os.path.join(ROOT, 'firebase_data', 'enhanced_lessons.json'), encoding='utf-8') as f:
+        lessons = json.load(f)['lessons']
+    with open(os.path.join(ROOT, 'firebase_data', 'users.json'), encoding='utf-8') as f:
+        users = json.load(f)
+    with open(os.path.join(ROOT, 'firebase_data', 'user_activities.json'), encoding='utf-8') as f:
+        activities = json.load(f)['user_activities']
+
+    lesson_list = list(lessons.values()) if isinstance(lessons, dict) else lessons
+    payloads = {}
+    largest = max(lesson_list, key=lambda lesson: len(json.dumps(lesson)))
+    payloads[f"lesson ({largest.get('id', 'largest')})"] = largest
+    payloads['all lessons'] = {'lessons': lesson_list, 'total_count': len(lesson_list)}
+
+    user = next(iter(users.values())) if isinstance(users, dict) else users[0]
+    payloads['dashboard'] = {
+        'user': user,
+        'activities': list(activities.values()) * 5,
+        'lessons': [{k: lesson.get(k) for k in ('id', 'title', 'description', 'difficulty', 'category')}
+                    for lesson in lesson_list],
+    }
+    return payloads
+
+
+def time_call(func, iterations):
+    """Mean milliseconds per call."""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON serialization and compression")
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    providers = {'stdlib': DefaultJSONProvider(app)}
+    if orjson is not None:
+        providers['orjson'] = OrjsonProvider(app)
+    else:
+        print("⚠️  orjson not installed - only the stdlib provider is measured")
+
+    print("📊 JSON serialization & compression benchmark")
+    print("=" * 72)
+
+    with app.app_context():
+        for name, payload in load_payloads().items():
+            print(f"\n📦 {name}")
+            body = None
+            for provider_name, provider in providers.items():
+                ms = time_call(lambda: provider.response(payload).get_data(), args.iterations)
+                body = provider.response(payload).get_data()
+                print(f"  {provider_name:<8} serialize {ms:8.3f} ms   {len(body):>9,} bytes")
+
+            for level in (1, 6, 9):
+                ms = time_call(lambda: gzip.compress(body, compresslevel=level, mtime=0), args.iterations)
+                size = len(gzip.compress(body, compresslevel=level, mtime=0))
+                print(f"  gzip -{level}  compress  {ms:8.3f} ms   {size:>9,} bytes ({size / len(body):.0%})")
+            if brotli is not None:
+                for quality in (1, 4, 11):
+                    iterations = max(1, args.iterations // (20 if quality == 11 else 1))
+                    ms = time_call(lambda: brotli.compress(body, quality=quality), iterations)
+                    size = len(brotli.compress(body, quality=quality))
+                    print(f"  br q{quality:<4} compress  {ms:8.3f} ms   {size:>9,} bytes ({size / len(body):.0%})")
+
+    print("\n✅ Benchmark complete")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
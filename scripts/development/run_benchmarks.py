@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Load Test & Benchmark Suite
+Code with Morais - Python Learning Platform
+
+Boots the app against an in-memory Firestore stand-in (or the emulator),
+seeds it from firebase_data/*.json scaled to --users/--lessons, drives a
+weighted request mix (dashboard, lesson view, subtopic completion, code run,
+quiz submit) and reports RPS, p50/p95/p99 and Firestore ops per request.
+
+Usage:
+    # Boot a seeded server in a subprocess, load it, tear it down
+    python scripts/development/run_benchmarks.py run --users 500 --duration 60
+
+    # Record or check a baseline
+    python scripts/development/run_benchmarks.py run --save-baseline main
+    python scripts/development/run_benchmarks.py run --compare main
+
+    # Keep a seeded server up (e.g. to profile it) or load an existing one,
+    # such as gunicorn running 'benchmarks.harness:create_application()'
+    python scripts/development/run_benchmarks.py serve --port 8090
+    python scripts/development/run_benchmarks.py run --target http://127.0.0.1:8090
+
+    # Same load against gunicorn with each worker class (sync, gthread, gevent)
+    python scripts/development/run_benchmarks.py workers --firestore-latency-ms 20 --concurrency 64
+
+    # Import-time profile of worker boot (import app + create_app)
+    python scripts/development/run_benchmarks.py importtime --runs 5 --save-baseline boot
+    python scripts/development/run_benchmarks.py importtime --compare boot
+
+Exit code is 1 when --compare finds a regression.
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+# Add project root to path
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(ROOT)
+
+from benchmarks import baseline
+from benchmarks.scenarios import Mix, parse_mix
+
+
+def add_dataset_arguments(parser):
+    parser.add_argument('--backend', choices=['memory', 'emulator'], default='memory',
+                        help="Firestore stand-in (emulator needs FIRESTORE_EMULATOR_HOST)")
+    parser.add_argument('--users', type=int, default=200)
+    parser.add_argument('--lessons', type=int, default=30)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--firestore-latency-ms', type=float, default=0.0,
+                        help="Simulated round-trip time per in-memory Firestore call")
+    parser.add_argument('--piston-latency-ms', type=float, default=50.0,
+                        help="Simulated latency of the local Piston stub")
+
+
+def serve_command(args):
+    from benchmarks.harness import serve
+    print(f"🚀 Seeding {args.users} users / {args.lessons} lessons ({args.backend})")
+    serve(host=args.host, port=args.port, ready_file=args.ready_file, backend=args.backend,
+          users=args.users, lessons=args.lessons, seed_value=args.seed,
+          firestore_latency_ms=args.firestore_latency_ms, piston_latency_ms=args.piston_latency_ms)
+    return 0
+
+
+def start_server(args):
+    """Launch `serve` in a subprocess so the load generator does not share its GIL"""
+    workdir = tempfile.mkdtemp(prefix='cwm-bench-')
+    ready_file = os.path.join(workdir, 'ready.json')
+    server_log = open(os.path.join(workdir, 'server.log'), 'w')
+    command = [sys.executable, os.path.abspath(__file__), 'serve', '--port', '0', '--ready-file', ready_file,
+               '--backend', args.backend, '--users', str(args.users), '--lessons', str(args.lessons),
+               '--seed', str(args.seed), '--firestore-latency-ms', str(args.firestore_latency_ms),
+               '--piston-latency-ms', str(args.piston_latency_ms)]
+    process = subprocess.Popen(command, cwd=ROOT, stdout=server_log, stderr=subprocess.STDOUT)
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Benchmark server exited with code {process.returncode}, see {server_log.name}")
+        if os.path.exists(ready_file) and os.path.getsize(ready_file):
+            with open(ready_file) as f:
+                settings = json.load(f)
+            settings['server_log'] = server_log.name
+            return process, settings
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Benchmark server did not start within 120s")
+
+
+def start_gunicorn(args, worker_class):
+    """gunicorn with gunicorn.conf.py serving the seeded harness app with one worker class"""
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    log_path = os.path.join(tempfile.mkdtemp(prefix='cwm-bench-'), f'gunicorn-{worker_class}.log')
+    env = {**os.environ,
+           'GUNICORN_WORKER_CLASS': worker_class, 'GUNICORN_WORKERS': str(args.workers),
+           'GUNICORN_THREADS': str(args.threads), 'GUNICORN_WORKER_CONNECTIONS': str(args.worker_connections),
+           'BENCH_BACKEND': args.backend, 'BENCH_USERS': str(args.users), 'BENCH_LESSONS': str(args.lessons),
+           'BENCH_SEED': str(args.seed), 'BENCH_FIRESTORE_LATENCY_MS': str(args.firestore_latency_ms),
+           'BENCH_PISTON_LATENCY_MS': str(args.piston_latency_ms)}
+    command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '-b', f'127.0.0.1:{port}',
+               'benchmarks.harness:create_application()']
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=open(log_path, 'w'), stderr=subprocess.STDOUT)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn ({worker_class}) exited with code {process.returncode}, see {log_path}")
+        try:
+            with urllib.request.urlopen(f"{url}/health", timeout=2):
+                return process, url, log_path
+        except OSError:
+            time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError(f"gunicorn ({worker_class}) did not start within 120s, see {log_path}")
+
+
+def print_summary(summary):
+    header = f"  {'':<44} {'req':>6} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'err':>5} {'reads':>6} {'writes':>6}"
+    for title, rows in (('Scenarios', summary['scenarios']), ('Routes', summary['routes'])):
+        print(f"\n📊 {title}")
+        print(header)
+        for name, stats in list(rows.items()) + [('TOTAL', summary['overall'])]:
+            print(f"  {name[:44]:<44} {stats['requests']:>6} {stats['rps']:>8.1f} "
+                  f"{stats['p50_ms']:>7.1f}ms {stats['p95_ms']:>6.1f}ms {stats['p99_ms']:>6.1f}ms "
+                  f"{stats['errors']:>5} {stats['firestore_reads_per_request']:>6.1f} "
+                  f"{stats['firestore_writes_per_request']:>6.1f}")
+
+
+def run_command(args):
+    from benchmarks.loadgen import LoadGenerator
+
+    try:
+        weights = parse_mix(args.mix)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 2
+
+    process = None
+    if args.target:
+        settings = {'target': args.target, 'users': args.users, 'lessons': args.lessons, 'seed': args.seed}
+        base_url = args.target
+    else:
+        print(f"🚀 Starting benchmark server ({args.users} users, {args.lessons} lessons, {args.backend})")
+        process, settings = start_server(args)
+        base_url = settings['url']
+        print(f"   Seeded in {settings['seed_seconds']}s at {base_url} (log: {settings['server_log']})")
+
+    settings.update({'mix': weights, 'concurrency': args.concurrency, 'duration': args.duration,
+                     'requests': args.requests, 'label': args.label})
+    try:
+        mix = Mix(weights, args.users, args.lessons, args.seed)
+        generator = LoadGenerator(base_url, mix, concurrency=args.concurrency,
+                                  duration=None if args.requests else args.duration,
+                                  max_requests=args.requests, warmup=args.warmup)
+        limit = f"{args.requests} requests" if args.requests else f"{args.duration}s"
+        print(f"🔥 {args.concurrency} workers, {limit}, mix {weights}")
+        summary = generator.run()
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+
+    print_summary(summary)
+    result = {'settings': settings, 'summary': summary}
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+    if args.save_baseline:
+        path = baseline.save_baseline(args.save_baseline, summary, settings)
+        print(f"\n💾 Baseline saved: {path}")
+
+    if args.compare:
+        report = baseline.compare(baseline.load_baseline(args.compare), summary)
+        if report['passed']:
+            print(f"\n✅ No regressions against baseline '{report['baseline']}' ({report['revision']})")
+        else:
+            print(f"\n❌ {len(report['regressions'])} regression(s) against baseline '{report['baseline']}':")
+            for item in report['regressions']:
+                print(f"   {item['scope']}: {item['metric']} {item['baseline']} -> {item['current']} "
+                      f"({item['change_pct']:+.1f}%)")
+        for route in report['missing_routes']:
+            print(f"⚠️  Route in baseline but not in this run: {route}")
+        return 0 if report['passed'] else 1
+    return 0
+
+
+def workers_command(args):
+    from benchmarks.loadgen import LoadGenerator
+
+    try:
+        weights = parse_mix(args.mix)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 2
+
+    classes = [name.strip() for name in args.worker_classes.split(',') if name.strip()]
+    results = {}
+    for worker_class in classes:
+        print(f"\n🚀 gunicorn -k {worker_class}: {args.workers} workers "
+              f"({args.threads} threads / {args.worker_connections} connections)")
+        try:
+            process, url, log_path = start_gunicorn(args, worker_class)
+        except RuntimeError as e:
+            print(f"❌ {e}")
+            continue
+        try:
+            generator = LoadGenerator(url, Mix(weights, args.users, args.lessons, args.seed),
+                                      concurrency=args.concurrency, duration=args.duration, warmup=args.warmup)
+            results[worker_class] = generator.run()
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()  # graceful shutdown still waiting on slow in-flight requests
+                process.wait()
+        overall = results[worker_class]['overall']
+        print(f"   {overall['requests']} requests, {overall['rps']:.1f} rps, p95 {overall['p95_ms']:.1f}ms, "
+              f"{overall['errors']} errors (log: {log_path})")
+
+    if not results:
+        return 1
+    print(f"\n📊 Worker classes at concurrency {args.concurrency}, Firestore {args.firestore_latency_ms}ms, "
+          f"Piston {args.piston_latency_ms}ms")
+    print(f"  {'':<10} {'req':>7} {'rps':>8} {'p50':>9} {'p95':>9} {'p99':>9} {'err':>6}")
+    for worker_class, summary in results.items():
+        stats = summary['overall']
+        print(f"  {worker_class:<10} {stats['requests']:>7} {stats['rps']:>8.1f} {stats['p50_ms']:>7.1f}ms "
+              f"{stats['p95_ms']:>7.1f}ms {stats['p99_ms']:>7.1f}ms {stats['errors']:>6}")
+
+    if args.output:
+        settings = {key: getattr(args, key) for key in ('workers', 'threads', 'worker_connections', 'concurrency',
+                                                        'duration', 'users', 'lessons', 'seed',
+                                                        'firestore_latency_ms', 'piston_latency_ms')}
+        settings['mix'] = weights
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'settings': settings, 'worker_classes': results}, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+    return 0
+
+
+def importtime_command(args):
+    from benchmarks import importtime
+
+    print(f"⏱️  Importing '{args.module}' in {args.runs} fresh interpreters (-X importtime)")
+    summary = importtime.measure(args.module, runs=args.runs, top=args.top)
+
+    print(f"\n📦 Boot {summary['boot_ms']:.1f}ms, {summary['modules_imported']} modules (median of {summary['runs']})")
+    print(f"  {'module':<56} {'self':>9} {'cumulative':>11}")
+    for item in summary['slowest_modules']:
+        name = '  ' * item['depth'] + item['module']
+        print(f"  {name[:56]:<56} {item['self_ms']:>7.1f}ms {item['cumulative_ms']:>9.1f}ms")
+    print("\n📊 Self time by package")
+    for package, ms in list(summary['packages'].items())[:args.top]:
+        print(f"  {package:<56} {ms:>7.1f}ms")
+    if summary['deferred_loaded']:
+        print(f"\n⚠️  Imported at boot although deferred: {', '.join(summary['deferred_loaded'])}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2)
+        print(f"\n💾 Results written to {args.output}")
+
+    if args.save_baseline:
+        path = baseline.save_baseline(args.save_baseline, summary, {'module': args.module, 'runs': args.runs})
+        print(f"\n💾 Baseline saved: {path}")
+
+    if args.compare:
+        report = importtime.compare(baseline.load_baseline(args.compare), summary)
+        if report['passed']:
+            print(f"\n✅ No boot regressions against baseline '{report['baseline']}' ({report['revision']})")
+        else:
+            print(f"\n❌ Boot regressed against baseline '{report['baseline']}':")
+            for item in report['regressions']:
+                print(f"   {item['scope']}: {item['baseline']}ms -> {item['current']}ms")
+            for name in report['newly_loaded']:
+                print(f"   {name} is imported at boot again")
+        return 0 if report['passed'] else 1
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test and benchmark Code with Morais")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = commands.add_parser('serve', help="Run a seeded benchmark server")
+    add_dataset_arguments(serve_parser)
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=8090)
+    serve_parser.add_argument('--ready-file', help=argparse.SUPPRESS)
+
+    run_parser = commands.add_parser('run', help="Generate load and report")
+    add_dataset_arguments(run_parser)
+    run_parser.add_argument('--target', help="Load an already running benchmark server instead")
+    run_parser.add_argument('--mix', default='default',
+                            help="default, read_heavy, write_heavy or 'dashboard=30,lesson_view=70'")
+    run_parser.add_argument('--concurrency', type=int, default=8)
+    run_parser.add_argument('--duration', type=float, default=30.0, help="Seconds of measured load")
+    run_parser.add_argument('--requests', type=int, help="Stop after this many measured requests instead")
+    run_parser.add_argument('--warmup', type=float, default=2.0, help="Seconds of unmeasured warm-up")
+    run_parser.add_argument('--label', help="Free-form note stored with the results")
+    run_parser.add_argument('--output', help="Write the full results as JSON")
+    run_parser.add_argument('--save-baseline', metavar='NAME')
+    run_parser.add_argument('--compare', metavar='NAME', help="Baseline name or JSON path")
+
+    workers_parser = commands.add_parser('workers', help="Compare gunicorn worker classes under the same load")
+    add_dataset_arguments(workers_parser)
+    workers_parser.add_argument('--worker-classes', default='sync,gthread,gevent')
+    workers_parser.add_argument('--workers', type=int, default=2, help="gunicorn worker processes")
+    workers_parser.add_argument('--threads', type=int, default=8, help="Threads per gthread worker")
+    workers_parser.add_argument('--worker-connections', type=int, default=200,
+                                help="Concurrent requests per gevent worker")
+    workers_parser.add_argument('--mix', default='default')
+    workers_parser.add_argument('--concurrency', type=int, default=64)
+    workers_parser.add_argument('--duration', type=float, default=20.0, help="Seconds of measured load per class")
+    workers_parser.add_argument('--warmup', type=float, default=2.0)
+    workers_parser.add_argument('--output', help="Write the per-class results as JSON")
+
+    importtime_parser = commands.add_parser('importtime', help="Profile module imports at boot")
+    importtime_parser.add_argument('--module', default='app', help="Module whose import boots the app")
+    importtime_parser.add_argument('--runs', type=int, default=5)
+    importtime_parser.add_argument('--top', type=int, default=25, help="Modules and packages to list")
+    importtime_parser.add_argument('--output', help="Write the report as JSON")
+    importtime_parser.add_argument('--save-baseline', metavar='NAME')
+    importtime_parser.add_argument('--compare', metavar='NAME', help="Baseline name or JSON path")
+
+    args = parser.parse_args()
+    if args.command == 'serve':
+        return serve_command(args)
+    if args.command == 'workers':
+        return workers_command(args)
+    if args.command == 'importtime':
+        return importtime_command(args)
+    return run_command(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
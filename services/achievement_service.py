@@ -1,14 +1,70 @@
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Callable, Tuple
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
 from datetime import datetime
 from models.user_profile import Achievement, UserStats, UserActivity
-from services.firebase_service import firebase_service
+from services.async_firebase_service import get_async_firebase_service
+from services.firebase_service import get_firebase_service
+import asyncio
+import threading
+import time
 import uuid
 
+# Per-user snapshot cache settings
+SNAPSHOT_TTL_SECONDS = 300
+SNAPSHOT_CACHE_SIZE = 5000
+
+# Requirement key -> action that can change its outcome
+REQUIREMENT_ACTIONS = {
+    'lesson_completed': 'lesson_completed',
+    'lessons_completed': 'lesson_completed',
+    'early_lesson': 'lesson_completed',
+    'late_lesson': 'lesson_completed',
+    'fast_lesson': 'lesson_completed',
+    'quiz_completed': 'quiz_completed',
+    'perfect_quiz_score': 'quiz_completed',
+    'perfect_quiz_scores': 'quiz_completed',
+    'code_executed': 'code_executed',
+    'code_executions': 'code_executed',
+    'errors_fixed': 'error_fixed',
+    'streak_days': 'streak_updated',
+    'xp_earned': 'xp_earned',
+}
+
+# Requirement key -> check(server-side stats, threshold)
+# Only counters from user_stats/{uid} are trusted; the client's action data is not
+REQUIREMENT_EVALUATORS: Dict[str, Callable[[UserStats, Any], bool]] = {
+    'lesson_completed': lambda stats, n: stats.lessons_completed >= n,
+    'lessons_completed': lambda stats, n: stats.lessons_completed >= n,
+    'early_lesson': lambda stats, n: stats.lessons_completed >= 1 and datetime.now().hour < 8,
+    'late_lesson': lambda stats, n: stats.lessons_completed >= 1 and datetime.now().hour >= 22,
+    'fast_lesson': lambda stats, n: False,  # no server-side record of completion times yet
+    'quiz_completed': lambda stats, n: stats.quizzes_completed >= n,
+    'perfect_quiz_score': lambda stats, n: stats.perfect_quiz_scores >= 1,
+    'perfect_quiz_scores': lambda stats, n: stats.perfect_quiz_scores >= n,
+    'code_executed': lambda stats, n: stats.code_executions >= n,
+    'code_executions': lambda stats, n: stats.code_executions >= n,
+    'errors_fixed': lambda stats, n: False,  # no server-side record of fixed errors yet
+    'streak_days': lambda stats, n: stats.current_streak >= n,
+    'xp_earned': lambda stats, n: stats.xp >= n,
+}
+
+
+@dataclass
+class AchievementSnapshot:
+    """Cached set of a user's unlocked achievement IDs"""
+    unlocked_ids: set
+    loaded_at: float = field(default_factory=time.monotonic)
+
+
 class AchievementService:
     """Service for managing user achievements and gamification"""
     
     def __init__(self):
         self.achievement_definitions = self._load_achievement_definitions()
+        self.requirement_index = self._build_requirement_index()
+        self._snapshots: "OrderedDict[str, AchievementSnapshot]" = OrderedDict()
+        self._snapshot_lock = threading.Lock()
     
     def _load_achievement_definitions(self) -> Dict[str, Achievement]:
         """Load achievement definitions"""
@@ -214,98 +270,137 @@ class AchievementService:
         }
         return achievements
     
-    async def check_achievements(self, user_id: str, action: str, data: Dict[str, Any]) -> List[Achievement]:
-        """Check if user has unlocked any achievements"""
-        unlocked_achievements = []
+    def _build_requirement_index(self) -> Dict[str, List[Tuple[Achievement, str, Any]]]:
+        """Bucket achievement definitions by the action their requirement depends on"""
+        index: Dict[str, List[Tuple[Achievement, str, Any]]] = {}
+        for achievement in self.achievement_definitions.values():
+            for requirement_key, threshold in (achievement.requirement or {}).items():
+                action = REQUIREMENT_ACTIONS.get(requirement_key)
+                if action is None:
+                    continue
+                index.setdefault(action, []).append((achievement, requirement_key, threshold))
+        return index
+    
+    def _cached_snapshot(self, user_id: str) -> Optional[AchievementSnapshot]:
+        """A user's unexpired snapshot, if cached"""
+        with self._snapshot_lock:
+            snapshot = self._snapshots.get(user_id)
+            if snapshot and time.monotonic() - snapshot.loaded_at < SNAPSHOT_TTL_SECONDS:
+                self._snapshots.move_to_end(user_id)
+                return snapshot
+        return None
+    
+    def _store_snapshot(self, user_id: str, user_achievements: list) -> AchievementSnapshot:
+        snapshot = AchievementSnapshot(
+            unlocked_ids={ach['id'] for ach in user_achievements if ach.get('unlocked')},
+            loaded_at=time.monotonic()
+        )
+        with self._snapshot_lock:
+            self._snapshots[user_id] = snapshot
+            self._snapshots.move_to_end(user_id)
+            while len(self._snapshots) > SNAPSHOT_CACHE_SIZE:
+                self._snapshots.popitem(last=False)
+        return snapshot
+    
+    async def _load_state(self, user_id: str) -> Tuple[AchievementSnapshot, UserStats]:
+        """
+        The user's unlocked set (cached) and current stats (always re-read).
         
-        # Get user's current achievements and stats
-        user_achievements = await firebase_service.get_user_achievements(user_id)
-        user_stats = await firebase_service.get_user_stats(user_id)
+        Stats come from the materialized user_stats document, which every
+        progress write updates in the same transaction, so one document read
+        reflects the action being checked without trusting the client.
+        """
+        service = get_async_firebase_service()
+        if not service:
+            return AchievementSnapshot(unlocked_ids=set()), UserStats(user_id=user_id)
         
-        # Convert to dict for easier checking
-        unlocked_ids = {ach['id'] for ach in user_achievements if ach.get('unlocked')}
+        snapshot = self._cached_snapshot(user_id)
+        if snapshot:
+            return snapshot, await service.get_user_stats(user_id)
         
-        # Check each achievement
-        for achievement_id, achievement in self.achievement_definitions.items():
-            if achievement_id in unlocked_ids:
+        # Achievements and stats are independent reads; overlap them
+        user_achievements, user_stats = await asyncio.gather(
+            service.get_user_achievements(user_id),
+            service.get_user_stats(user_id)
+        )
+        return self._store_snapshot(user_id, user_achievements), user_stats
+    
+    def invalidate_snapshot(self, user_id: str):
+        """Drop a user's cached snapshot so the next check reloads it"""
+        with self._snapshot_lock:
+            self._snapshots.pop(user_id, None)
+    
+    def _evaluate(self, snapshot: AchievementSnapshot, user_stats: UserStats, action: str) -> List[Achievement]:
+        """Locked definitions depending on the action that the stats now satisfy"""
+        unlocked_achievements = []
+        for achievement, requirement_key, threshold in self.requirement_index.get(action, []):
+            if achievement.id in snapshot.unlocked_ids:
                 continue  # Already unlocked
             
-            # Check if requirements are met
-            if self._check_achievement_requirements(achievement, user_stats, action, data):
-                # Unlock achievement
-                achievement.unlocked = True
-                achievement.unlocked_at = datetime.now()
-                achievement.progress = achievement.max_progress
-                
-                # Save to Firebase
-                await firebase_service.unlock_achievement(user_id, achievement.to_dict())
-                
-                # Add XP reward
-                await firebase_service.add_user_xp(user_id, achievement.points)
-                
-                # Create activity
-                await self._create_achievement_activity(user_id, achievement)
-                
-                unlocked_achievements.append(achievement)
-        
+            evaluator = REQUIREMENT_EVALUATORS[requirement_key]
+            if evaluator(user_stats, threshold):
+                unlocked = replace(
+                    achievement,
+                    unlocked=True,
+                    unlocked_at=datetime.now(),
+                    progress=achievement.max_progress
+                )
+                unlocked_achievements.append(unlocked)
         return unlocked_achievements
     
-    def _check_achievement_requirements(self, achievement: Achievement, user_stats: UserStats, action: str, data: Dict[str, Any]) -> bool:
-        """Check if achievement requirements are met"""
-        requirement = achievement.requirement
-        
-        if not requirement:
-            return False
-        
-        # Check based on action type
-        if action == 'lesson_completed':
-            if 'lesson_completed' in requirement:
-                return user_stats.lessons_completed >= requirement['lesson_completed']
-            if 'lessons_completed' in requirement:
-                return user_stats.lessons_completed >= requirement['lessons_completed']
-            if 'early_lesson' in requirement:
-                current_hour = datetime.now().hour
-                return current_hour < 8
-            if 'late_lesson' in requirement:
-                current_hour = datetime.now().hour
-                return current_hour >= 22
-            if 'fast_lesson' in requirement:
-                completion_time = data.get('completion_time', 0)
-                return completion_time < 300  # 5 minutes
+    def _unlock_writes(self, user_id: str, unlocked_achievements: List[Achievement]) -> Tuple[list, list]:
+        """Achievement records and activities to commit together"""
+        return ([ach.to_dict() for ach in unlocked_achievements],
+                [self._build_achievement_activity(user_id, ach).to_dict() for ach in unlocked_achievements])
+    
+    def _record_commit(self, user_id: str, snapshot: AchievementSnapshot,
+                       unlocked_achievements: List[Achievement], committed: Optional[list]) -> List[Achievement]:
+        """Update the cached snapshot; returns the achievements this check actually unlocked"""
+        if committed is None:
+            self.invalidate_snapshot(user_id)
+            return []
         
-        elif action == 'quiz_completed':
-            if 'quiz_completed' in requirement:
-                return user_stats.quizzes_completed >= requirement['quiz_completed']
-            if 'perfect_quiz_score' in requirement:
-                return data.get('score', 0) >= 100
-            if 'perfect_quiz_scores' in requirement:
-                perfect_scores = data.get('perfect_scores_count', 0)
-                return perfect_scores >= requirement['perfect_quiz_scores']
+        with self._snapshot_lock:
+            snapshot.unlocked_ids.update(ach.id for ach in unlocked_achievements)
         
-        elif action == 'code_executed':
-            if 'code_executed' in requirement:
-                return user_stats.code_executions >= requirement['code_executed']
-            if 'code_executions' in requirement:
-                return user_stats.code_executions >= requirement['code_executions']
+        # The transaction skips any that a concurrent check already awarded
+        return [ach for ach in unlocked_achievements if ach.id in committed]
+    
+    async def check_achievements(self, user_id: str, action: str) -> List[Achievement]:
+        """Check if user has unlocked any achievements"""
+        # The action only narrows which definitions are re-evaluated
+        if action not in self.requirement_index:
+            return []
         
-        elif action == 'error_fixed':
-            if 'errors_fixed' in requirement:
-                errors_fixed = data.get('errors_fixed_count', 0)
-                return errors_fixed >= requirement['errors_fixed']
+        snapshot, user_stats = await self._load_state(user_id)
+        unlocked_achievements = self._evaluate(snapshot, user_stats, action)
+        if not unlocked_achievements:
+            return []
         
-        elif action == 'streak_updated':
-            if 'streak_days' in requirement:
-                return user_stats.current_streak >= requirement['streak_days']
+        # Commit unlocks, XP and activities together
+        service = get_async_firebase_service()
+        committed = (await service.commit_achievement_unlocks(user_id, *self._unlock_writes(user_id, unlocked_achievements))
+                     if service else None)
+        return self._record_commit(user_id, snapshot, unlocked_achievements, committed)
+    
+    def check_achievements_sync(self, user_id: str, action: str) -> List[Achievement]:
+        """check_achievements() through the sync FirebaseService, for workers without the async one"""
+        service = get_firebase_service()
+        if action not in self.requirement_index or not (service and service.is_available()):
+            return []
         
-        elif action == 'xp_earned':
-            if 'xp_earned' in requirement:
-                return user_stats.xp >= requirement['xp_earned']
+        snapshot = self._cached_snapshot(user_id) or self._store_snapshot(
+            user_id, service.get_user_achievements(user_id))
+        unlocked_achievements = self._evaluate(snapshot, service.get_user_stats(user_id), action)
+        if not unlocked_achievements:
+            return []
         
-        return False
+        committed = service.commit_achievement_unlocks(user_id, *self._unlock_writes(user_id, unlocked_achievements))
+        return self._record_commit(user_id, snapshot, unlocked_achievements, committed)
     
-    async def _create_achievement_activity(self, user_id: str, achievement: Achievement):
-        """Create achievement unlock activity"""
-        activity = UserActivity(
+    def _build_achievement_activity(self, user_id: str, achievement: Achievement) -> UserActivity:
+        """Build achievement unlock activity"""
+        return UserActivity(
             id=str(uuid.uuid4()),
             user_id=user_id,
             activity_type='achievement_unlocked',
@@ -320,18 +415,9 @@ class AchievementService:
             },
             created_at=datetime.now()
         )
-        
-        await firebase_service.add_user_activity(user_id, activity.to_dict())
     
-    async def get_achievement_progress(self, user_id: str, achievement_id: str) -> Dict[str, Any]:
-        """Get progress for a specific achievement"""
-        if achievement_id not in self.achievement_definitions:
-            return {'error': 'Achievement not found'}
-        
-        achievement = self.achievement_definitions[achievement_id]
-        user_stats = await firebase_service.get_user_stats(user_id)
-        
-        # Calculate current progress
+    def _progress(self, achievement: Achievement, user_stats: UserStats) -> Dict[str, Any]:
+        """Progress of a locked achievement from the user's stats"""
         current_progress = 0
         requirement = achievement.requirement
         
@@ -339,6 +425,8 @@ class AchievementService:
             current_progress = min(user_stats.lessons_completed, achievement.max_progress)
         elif 'quiz_completed' in requirement:
             current_progress = min(user_stats.quizzes_completed, achievement.max_progress)
+        elif 'perfect_quiz_scores' in requirement:
+            current_progress = min(user_stats.perfect_quiz_scores, achievement.max_progress)
         elif 'code_executions' in requirement:
             current_progress = min(user_stats.code_executions, achievement.max_progress)
         elif 'streak_days' in requirement:
@@ -347,15 +435,22 @@ class AchievementService:
             current_progress = min(user_stats.xp, achievement.max_progress)
         
         return {
-            'achievement_id': achievement_id,
+            'achievement_id': achievement.id,
             'current_progress': current_progress,
             'max_progress': achievement.max_progress,
             'percentage': (current_progress / achievement.max_progress) * 100 if achievement.max_progress > 0 else 0
         }
     
-    async def get_user_achievements_with_progress(self, user_id: str) -> List[Dict[str, Any]]:
-        """Get all achievements with progress for a user"""
-        user_achievements = await firebase_service.get_user_achievements(user_id)
+    async def get_achievement_progress(self, user_id: str, achievement_id: str) -> Dict[str, Any]:
+        """Get progress for a specific achievement"""
+        if achievement_id not in self.achievement_definitions:
+            return {'error': 'Achievement not found'}
+        
+        _, user_stats = await self._load_state(user_id)
+        return self._progress(self.achievement_definitions[achievement_id], user_stats)
+    
+    def _with_progress(self, user_achievements: list, user_stats: UserStats) -> List[Dict[str, Any]]:
+        """Every definition, merged with the user's unlock record or its progress"""
         unlocked_dict = {ach['id']: ach for ach in user_achievements if ach.get('unlocked')}
         
         achievements_with_progress = []
@@ -367,14 +462,32 @@ class AchievementService:
                 # Achievement is unlocked
                 achievement_data.update(unlocked_dict[achievement_id])
             else:
-                # Get progress for locked achievement
-                progress = await self.get_achievement_progress(user_id, achievement_id)
-                achievement_data.update(progress)
+                # Progress of the locked achievement
+                achievement_data.update(self._progress(achievement, user_stats))
             
             achievements_with_progress.append(achievement_data)
         
         return achievements_with_progress
     
+    async def get_user_achievements_with_progress(self, user_id: str) -> List[Dict[str, Any]]:
+        """Get all achievements with progress for a user"""
+        service = get_async_firebase_service()
+        if service:
+            user_achievements, user_stats = await asyncio.gather(
+                service.get_user_achievements(user_id),
+                service.get_user_stats(user_id)
+            )
+        else:
+            user_achievements, user_stats = [], UserStats(user_id=user_id)
+        return self._with_progress(user_achievements, user_stats)
+    
+    def get_user_achievements_with_progress_sync(self, user_id: str) -> List[Dict[str, Any]]:
+        """get_user_achievements_with_progress() through the sync FirebaseService"""
+        service = get_firebase_service()
+        if not (service and service.is_available()):
+            return self._with_progress([], UserStats(user_id=user_id))
+        return self._with_progress(service.get_user_achievements(user_id), service.get_user_stats(user_id))
+    
     def get_achievement_by_id(self, achievement_id: str) -> Optional[Achievement]:
         """Get achievement definition by ID"""
         return self.achievement_definitions.get(achievement_id)
@@ -0,0 +1,62 @@
+"""
+Achievement unlock writes for Code with Morais
+The transaction body shared by FirebaseService and AsyncFirebaseService
+commit_achievement_unlocks: each service reads users/{uid} inside its own
+(sync or async) transaction and hands the snapshot to
+stage_achievement_unlocks(), which stages every write of the unlock
+"""
+from datetime import datetime
+from typing import Any, Dict, List
+
+from utils.lazy_imports import lazy_module
+from services.activity_retention import EXPIRY_FIELD, activity_expiry
+from services.streaks import streak_update_for_activity
+from services.user_stats import stage_stats_writes, streak_mirror, achievement_deltas
+
+gcloud_firestore = lazy_module('google.cloud.firestore')
+
+
+def stage_achievement_unlocks(db, transaction, user_ref, user_doc, user_id: str,
+                              achievements: List[Dict[str, Any]], activities: List[Dict[str, Any]]) -> List[str]:
+    """
+    Stage achievement records, their XP, activities, streak and user_stats in a transaction.
+
+    Achievements already in the user's `achievements` array are skipped, so
+    concurrent checks award XP once. Returns the IDs staged.
+    """
+    user_data = (user_doc.to_dict() or {}) if user_doc.exists else {}
+    already_unlocked = set(user_data.get('achievements') or [])
+    new_achievements = [a for a in achievements if a['id'] not in already_unlocked]
+    if not new_achievements:
+        return []
+    new_activities = [a for a in activities
+                      if (a.get('data') or {}).get('achievement_id') not in already_unlocked]
+
+    for achievement in new_achievements:
+        achievement_ref = db.collection('user_achievements').document(f"{user_id}_{achievement['id']}")
+        transaction.set(achievement_ref, {**achievement, 'user_id': user_id})
+
+    for activity in new_activities:
+        transaction.set(db.collection('activities').document(), {
+            'user_id': user_id,
+            'type': activity['activity_type'],
+            'details': {**activity.get('data', {}), 'message': activity.get('title', '')},
+            'timestamp': gcloud_firestore.SERVER_TIMESTAMP,
+            'created_at': datetime.now(),
+            EXPIRY_FIELD: activity_expiry(activity['activity_type'])
+        })
+
+    user_update = {
+        'xp': gcloud_firestore.Increment(sum(a.get('points', 0) for a in new_achievements)),
+        'achievements': gcloud_firestore.ArrayUnion([a['id'] for a in new_achievements]),
+        'updated_at': datetime.now()
+    }
+    streak_update = {}
+    if new_activities and user_doc.exists:
+        streak_update = streak_update_for_activity(user_data)
+        user_update.update(streak_update)
+    transaction.update(user_ref, user_update)
+    stage_stats_writes(db, transaction, user_id, achievement_deltas(new_achievements),
+                       mirrored=streak_mirror(user_data, streak_update),
+                       activities=len(new_activities), user_data=user_data)
+    return [a['id'] for a in new_achievements]
@@ -0,0 +1,101 @@
+"""
+Cursor pagination for activity feeds in Code with Morais
+Pages are keyed by the (timestamp, id) of the last activity shown, so page N
+costs one limit(page_size + 1) query however deep the user has scrolled
+
+Cursors are opaque to clients: urlsafe base64 of the last activity's
+timestamp and document ID. Pages are kept in a short-lived per-process cache
+that is dropped for a user whenever this process records an activity for them;
+other workers see new activities once their entries expire.
+"""
+import base64
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 50
+PAGE_CACHE_TTL_SECONDS = 15
+PAGE_CACHE_MAX_ENTRIES = 2048
+CURSOR_VERSION = 1
+
+
+def encode_cursor(timestamp, activity_id: str) -> str:
+    """Opaque cursor positioned after the given activity"""
+    if isinstance(timestamp, datetime):
+        if timestamp.tzinfo is None:
+            timestamp = timestamp.replace(tzinfo=timezone.utc)
+        timestamp = timestamp.isoformat()
+    payload = json.dumps({'v': CURSOR_VERSION, 't': timestamp, 'id': activity_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """(timestamp, activity_id) of a cursor; ValueError when it was not issued by encode_cursor"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if payload.get('v') != CURSOR_VERSION or not isinstance(payload.get('id'), str):
+            raise ValueError("unsupported cursor")
+        return datetime.fromisoformat(payload['t']), payload['id']
+    except (TypeError, KeyError, UnicodeError, json.JSONDecodeError, ValueError) as e:
+        raise ValueError(f"Invalid activity cursor: {str(e)}")
+
+
+def page_size(value, default: int = DEFAULT_PAGE_SIZE) -> int:
+    """Clamp a requested page size"""
+    try:
+        return max(1, min(int(value), MAX_PAGE_SIZE))
+    except (TypeError, ValueError):
+        return default
+
+
+class ActivityPageCache:
+    """Per-user TTL cache of feed pages keyed by (user, cursor, limit)"""
+
+    def __init__(self, ttl_seconds: float = PAGE_CACHE_TTL_SECONDS, max_entries: int = PAGE_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str, int], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str, cursor: Optional[str], limit: int) -> Optional[Dict[str, Any]]:
+        """A cached page, or None when missing or expired"""
+        key = (user_id, cursor or '', limit)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, page = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return page
+
+    def set(self, user_id: str, cursor: Optional[str], limit: int, page: Dict[str, Any]):
+        """Cache a page for ttl_seconds"""
+        with self._lock:
+            self._entries[(user_id, cursor or '', limit)] = (time.monotonic() + self.ttl_seconds, page)
+            self._entries.move_to_end((user_id, cursor or '', limit))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: str):
+        """Drop every cached page of a user"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == user_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+activity_page_cache = ActivityPageCache()
@@ -0,0 +1,190 @@
+"""
+Activity retention for Code with Morais
+Keeps the activities collection, and its (user_id, timestamp) index, at a
+steady size instead of growing with every XP award and dashboard refresh
+
+Every activity is written with an expire_at field computed from a per-type
+TTL (ACTIVITY_TTL_DAYS). ActivityRetentionJob queries expired activities by
+that field, appends them to a gzip-compressed NDJSON archive and deletes them
+with a BulkWriter; a page is only deleted after it is flushed to the archive.
+Activities written before expire_at existed are stamped by a legacy pass.
+
+Low-value types can also be sampled or dropped at write time with
+ACTIVITY_SAMPLING ('dashboard_refresh=0,xp_gain=0.5'), see should_record().
+Sampling only skips the activity document: the streak, user_stats and day
+rollup writes of a skipped activity still happen.
+Projects that need no archive can instead enable a Firestore TTL policy on
+activities.expire_at and skip the job.
+
+Streaks, user_stats and rollups are maintained at write time, so pruning
+activities does not change them; StreakBackfillJob only sees what is left.
+"""
+import gzip
+import json
+import logging
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from utils.log_pipeline import parse_sampling
+
+logger = logging.getLogger(__name__)
+
+# Days an activity is kept, by type; other types use DEFAULT_TTL_DAYS
+ACTIVITY_TTL_DAYS = {
+    'dashboard_refresh': 7,
+    'xp_gain': 30,
+    'lesson_started': 90,
+    'subtopic_completed': 180,
+}
+DEFAULT_TTL_DAYS = 365
+EXPIRY_FIELD = 'expire_at'
+RETENTION_PAGE_SIZE = 500
+
+
+def activity_ttl_days(activity_type: Optional[str]) -> int:
+    """Retention of an activity type in days"""
+    return ACTIVITY_TTL_DAYS.get(activity_type, DEFAULT_TTL_DAYS)
+
+
+def activity_expiry(activity_type: Optional[str], timestamp: Optional[datetime] = None) -> datetime:
+    """When an activity of this type recorded at timestamp (default now) expires"""
+    timestamp = timestamp or datetime.now(timezone.utc)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp + timedelta(days=activity_ttl_days(activity_type))
+
+
+@lru_cache(maxsize=8)
+def sampling_rates(spec: str) -> Dict[str, float]:
+    """Parsed ACTIVITY_SAMPLING spec"""
+    return parse_sampling(spec)
+
+
+def should_record(activity_type: str, spec: Optional[str]) -> bool:
+    """Whether to write an activity under the write-time sampling spec (rate 0 drops the type)"""
+    rate = sampling_rates(spec or '').get(activity_type, 1.0)
+    return rate >= 1 or (rate > 0 and random.random() < rate)
+
+
+def _archive_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+class ActivityRetentionJob:
+    """
+    Archives and deletes expired activities.
+
+    Only expired documents are read, through the single-field expire_at
+    index, so each run costs reads proportional to what it removes. With
+    legacy=True it first scans activities older than the shortest TTL that
+    lack expire_at, deleting the expired ones and stamping the rest.
+    """
+
+    def __init__(self, firebase_service, archive_dir: Optional[str] = None, page_size: int = RETENTION_PAGE_SIZE,
+                 dry_run: bool = False, legacy: bool = False, now: Optional[datetime] = None):
+        self.firebase_service = firebase_service
+        self.archive_dir = archive_dir
+        self.page_size = page_size
+        self.dry_run = dry_run
+        self.legacy = legacy
+        self.now = now
+        self.metrics = {
+            'activities_scanned': 0,
+            'activities_archived': 0,
+            'activities_deleted': 0,
+            'activities_stamped': 0,
+            'archive_path': None,
+            'elapsed_seconds': 0.0,
+        }
+
+    def run(self) -> Dict[str, Any]:
+        """Run the retention pass to completion and return its metrics"""
+        if not self.firebase_service or not self.firebase_service.is_available():
+            raise RuntimeError("Firebase not available, cannot prune activities")
+
+        started = time.perf_counter()
+        now = self.now or datetime.now(timezone.utc)
+        activities = self.firebase_service.db.collection('activities')
+        writer = None if self.dry_run else self.firebase_service.db.bulk_writer()
+        archive = self._open_archive(now)
+
+        try:
+            if self.legacy:
+                oldest_kept = now - timedelta(days=min([DEFAULT_TTL_DAYS, *ACTIVITY_TTL_DAYS.values()]))
+                self._sweep(activities.where('timestamp', '<', oldest_kept), 'timestamp', now, writer, archive)
+            self._sweep(activities.where(EXPIRY_FIELD, '<', now), EXPIRY_FIELD, now, writer, archive)
+        finally:
+            if archive is not None:
+                archive.close()
+            if writer is not None:
+                writer.close()
+
+        self.metrics['elapsed_seconds'] = time.perf_counter() - started
+        logger.info(
+            f"Activity retention finished: {self.metrics['activities_deleted']} of "
+            f"{self.metrics['activities_scanned']} activities deleted, "
+            f"{self.metrics['activities_stamped']} stamped in {self.metrics['elapsed_seconds']:.1f}s"
+        )
+        return self.metrics
+
+    def _open_archive(self, now: datetime):
+        if self.dry_run or not self.archive_dir:
+            return None
+        os.makedirs(self.archive_dir, exist_ok=True)
+        path = os.path.join(self.archive_dir, f"activities-{now.strftime('%Y%m%dT%H%M%S')}.ndjson.gz")
+        self.metrics['archive_path'] = path
+        return gzip.open(path, 'at', encoding='utf-8')
+
+    def _sweep(self, query, field: str, now: datetime, writer, archive):
+        query = query.order_by(field).order_by('__name__')
+        cursor = None
+        while True:
+            page = query.limit(self.page_size)
+            if cursor is not None:
+                page = page.start_after(cursor)
+            docs = list(page.stream())
+            if not docs:
+                break
+
+            expired, unstamped = [], []
+            for doc in docs:
+                self.metrics['activities_scanned'] += 1
+                data = doc.to_dict() or {}
+                expire_at = data.get(EXPIRY_FIELD)
+                if expire_at is None:
+                    expire_at = activity_expiry(data.get('type'), data.get('timestamp'))
+                    if expire_at >= now:
+                        unstamped.append((doc, expire_at))
+                        continue
+                elif field != EXPIRY_FIELD:
+                    # Already stamped: the expire_at sweep decides
+                    continue
+                expired.append((doc, data))
+            self._apply(expired, unstamped, writer, archive)
+
+            if len(docs) < self.page_size:
+                break
+            last = docs[-1]
+            cursor = {field: (last.to_dict() or {}).get(field), '__name__': last.id}
+
+    def _apply(self, expired: list, unstamped: list, writer, archive):
+        self.metrics['activities_deleted'] += len(expired)
+        self.metrics['activities_stamped'] += len(unstamped)
+        if writer is None:
+            return
+        if archive is not None and expired:
+            for doc, data in expired:
+                archive.write(json.dumps({'id': doc.id, **data}, default=_archive_default) + '\n')
+            archive.flush()
+            self.metrics['activities_archived'] += len(expired)
+        for doc, _ in expired:
+            writer.delete(doc.reference)
+        for doc, expire_at in unstamped:
+            writer.update(doc.reference, {EXPIRY_FIELD: expire_at})
+        writer.flush()
@@ -0,0 +1,293 @@
+"""
+Async Firestore data access for Code with Morais.
+
+Built on google.cloud.firestore.AsyncClient so multi-read paths (profile
+pages, achievement checks) can fan out with asyncio.gather. Flask routes call
+into it through run_async(), which schedules coroutines on one long-lived
+background event loop per process instead of creating a loop per request.
+
+Set FIRESTORE_EMULATOR_HOST to run against the Firestore emulator.
+"""
+import asyncio
+import logging
+import os
+import threading
+from typing import Optional, Dict, Any
+
+from models.user_profile import UserStats
+from services.achievement_unlocks import stage_achievement_unlocks
+from services.user_stats import USER_STATS_COLLECTION
+from utils.metrics import instrument_firebase_service
+from utils.resilience import guard_firebase_service, fast_failing, report_firestore_error
+from utils.firestore_budget import bind_request_context
+from utils.lazy_imports import lazy_module
+
+firebase_admin = lazy_module('firebase_admin')
+gcloud_firestore = lazy_module('google.cloud.firestore')
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BRIDGE_TIMEOUT = 10.0  # seconds a Flask request waits on a coroutine
+EMULATOR_PROJECT_ID = 'demo-codewithmorais'
+
+
+class AsyncFirebaseService:
+    """Async counterpart of FirebaseService for the achievement and profile paths."""
+
+    def __init__(self, config: Dict[str, Any]):
+        """Create the AsyncClient from the initialized Firebase app or the emulator."""
+        self.config = config
+        self.db: Optional['gcloud_firestore.AsyncClient'] = None
+        self._initialize_client()
+
+    def _initialize_client(self):
+        """Initialize the AsyncClient with proper error handling."""
+        try:
+            if os.environ.get('FIRESTORE_EMULATOR_HOST'):
+                project_id = self.config.get('project_id') or EMULATOR_PROJECT_ID
+                self.db = gcloud_firestore.AsyncClient(project=project_id)
+                logger.info(f"Async Firestore client using emulator at {os.environ['FIRESTORE_EMULATOR_HOST']}")
+                return
+
+            if not firebase_admin._apps:
+                logger.warning("Firebase app not initialized - async Firestore client unavailable")
+                return
+
+            app = firebase_admin.get_app()
+            self.db = gcloud_firestore.AsyncClient(
+                project=app.project_id or self.config.get('project_id'),
+                credentials=app.credential.get_credential()
+            )
+            logger.info("Async Firestore client initialized")
+
+        except Exception as e:
+            logger.error(f"Failed to initialize async Firestore client: {str(e)}")
+            self.db = None
+
+    def is_available(self) -> bool:
+        """Check if the async client is available."""
+        return self.db is not None and not fast_failing()
+
+    async def get_user(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get user data with error handling."""
+        if not self.is_available():
+            logger.warning("Async Firebase not available, cannot get user")
+            return None
+
+        try:
+            user_doc = await self.db.collection('users').document(user_id).get()
+            if user_doc.exists:
+                return user_doc.to_dict()
+            logger.info(f"User {user_id} not found")
+            return None
+
+        except Exception as e:
+            report_firestore_error(e)
+            logger.error(f"Error retrieving user {user_id}: {str(e)}")
+            return None
+
+    async def get_user_achievements(self, user_id: str) -> list:
+        """Get a user's achievement records from user_achievements."""
+        if not self.is_available():
+            logger.warning("Async Firebase not available, cannot get user achievements")
+            return []
+
+        try:
+            query = self.db.collection('user_achievements').where('user_id', '==', user_id)
+            return [doc.to_dict() async for doc in query.stream()]
+
+        except Exception as e:
+            report_firestore_error(e)
+            logger.error(f"Error retrieving user achievements: {str(e)}")
+            return []
+
+    async def get_user_stats_doc(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get the materialized user_stats document for a user."""
+        if not self.is_available():
+            logger.warning("Async Firebase not available, cannot get user stats")
+            return None
+
+        try:
+            stats_doc = await self.db.collection(USER_STATS_COLLECTION).document(user_id).get()
+            if stats_doc.exists:
+                return stats_doc.to_dict()
+            return None
+
+        except Exception as e:
+            report_firestore_error(e)
+            logger.error(f"Error retrieving user stats for {user_id}: {str(e)}")
+            return None
+
+    async def get_user_stats(self, user_id: str) -> UserStats:
+        """Get aggregate user statistics used by achievement checks."""
+        stats_data = await self.get_user_stats_doc(user_id)
+        if stats_data is not None:
+            return UserStats.from_stats_doc(user_id, stats_data)
+        # Not materialized yet (before the rebuild job has run for this user)
+        return UserStats.from_user_doc(user_id, await self.get_user(user_id) or {})
+
+    async def get_user_activities(self, user_id: str, limit: int = 10) -> list:
+        """Get user's recent activities."""
+        if not self.is_available():
+            logger.warning("Async Firebase not available, cannot get user activities")
+            return []
+
+        try:
+            query = (self.db.collection('activities')
+                     .where('user_id', '==', user_id)
+                     .order_by('timestamp', direction=gcloud_firestore.Query.DESCENDING)
+                     .limit(limit))
+
+            activities = []
+            async for doc in query.stream():
+                activity_data = doc.to_dict()
+                activity_data['id'] = doc.id
+                activities.append(activity_data)
+            return activities
+
+        except Exception as e:
+            report_firestore_error(e)
+            logger.error(f"Error retrieving user activities: {str(e)}")
+            return []
+
+    async def get_profile_bundle(self, user_id: str, user_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """The user and user_stats documents a profile page needs (pass user_data to skip its read)."""
+        if user_data is None:
+            user_data, stats_data = await asyncio.gather(self.get_user(user_id), self.get_user_stats_doc(user_id))
+            user_data = user_data or {}
+        else:
+            stats_data = await self.get_user_stats_doc(user_id)
+        return {
+            'user': user_data,
+            'stats': (UserStats.from_stats_doc(user_id, stats_data) if stats_data is not None
+                      else UserStats.from_user_doc(user_id, user_data)),
+            'user_stats': stats_data
+        }
+
+    async def commit_achievement_unlocks(self, user_id: str, achievements: list, activities: list) -> Optional[list]:
+        """Write achievement unlocks, their XP, activities and streak in one transaction.
+
+        Returns the IDs actually unlocked (achievements already in the user's
+        `achievements` array are skipped, so concurrent checks award XP once),
+        or None when the write failed.
+        """
+        if not self.is_available():
+            logger.warning("Async Firebase not available, cannot commit achievement unlocks")
+            return None
+
+        if not achievements:
+            return []
+
+        try:
+            user_ref = self.db.collection('users').document(user_id)
+
+            @gcloud_firestore.async_transactional
+            async def commit_in_transaction(transaction):
+                # Read first: transactions must read before they write
+                user_doc = await user_ref.get(transaction=transaction)
+                return stage_achievement_unlocks(self.db, transaction, user_ref, user_doc, user_id,
+                                                 achievements, activities)
+
+            committed = await commit_in_transaction(self.db.transaction())
+            logger.info(f"Committed {len(committed)} achievement unlocks for user {user_id}")
+            return committed
+
+        except Exception as e:
+            report_firestore_error(e)
+            logger.error(f"Error committing achievement unlocks for {user_id}: {str(e)}")
+            return None
+
+
+# Count reads/writes/latency per collection for /api/system/metrics
+instrument_firebase_service(AsyncFirebaseService)
+guard_firebase_service(AsyncFirebaseService)
+
+
+class AsyncBridge:
+    """Runs coroutines from sync Flask code on one background event loop."""
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        """Start the loop thread lazily, and again in forked workers."""
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=loop.run_forever, name='async-firestore-loop', daemon=True
+                )
+                thread.start()
+                self._loop = loop
+                self._pid = os.getpid()
+            return self._loop
+
+    def run(self, coro, timeout: Optional[float] = DEFAULT_BRIDGE_TIMEOUT):
+        """Run a coroutine on the background loop and wait for its result."""
+        # Firestore calls made by the coroutine are billed to the calling request
+        future = asyncio.run_coroutine_threadsafe(bind_request_context(coro), self._ensure_loop())
+        try:
+            return future.result(timeout)
+        except Exception:
+            future.cancel()
+            raise
+
+
+_bridge = AsyncBridge()
+
+
+def run_async(coro, timeout: Optional[float] = DEFAULT_BRIDGE_TIMEOUT):
+    """Run a coroutine from sync code without creating an event loop per call."""
+    return _bridge.run(coro, timeout)
+
+
+# Global async service instance, set from app.py
+async_firebase_service = None
+_async_service_factory = None
+_deferred_factory = None    # kept to rebuild the service in forked workers
+_built_pid = None
+_factory_lock = threading.Lock()
+
+def get_async_firebase_service():
+    """Get the global async firebase service instance (built on first use when deferred)."""
+    if _async_service_factory is not None:
+        _build_deferred_service()
+    return async_firebase_service
+
+def _build_deferred_service():
+    global async_firebase_service, _async_service_factory, _built_pid
+    with _factory_lock:
+        factory = _async_service_factory
+        if factory is None:
+            return
+        try:
+            async_firebase_service = factory()
+        except Exception as e:
+            logger.error(f"Failed to build async Firebase service: {str(e)}")
+            async_firebase_service = None
+        _async_service_factory = None
+        _built_pid = os.getpid()
+
+def set_async_firebase_service(service):
+    """Set the global async firebase service instance."""
+    global async_firebase_service, _async_service_factory, _deferred_factory
+    async_firebase_service = service
+    _async_service_factory = None
+    _deferred_factory = None
+
+def defer_async_firebase_service(factory):
+    """Build the global async service with factory() on first use instead of at boot."""
+    global async_firebase_service, _async_service_factory, _deferred_factory
+    async_firebase_service = None
+    _async_service_factory = factory
+    _deferred_factory = factory
+
+def reset_async_firebase_service_after_fork():
+    """Rebuild a deferred service on first use if it was built before this process forked."""
+    global async_firebase_service, _async_service_factory, _factory_lock
+    _factory_lock = threading.Lock()
+    if _deferred_factory is not None and _built_pid not in (None, os.getpid()):
+        async_firebase_service = None
+        _async_service_factory = _deferred_factory
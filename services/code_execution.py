@@ -1,12 +1,16 @@
 """
 Secure code execution service for Code with Morais
 """
-import requests
 import json
 import logging
 import re
+import time
 from typing import Dict, Any, Optional
 from config import get_config
+from utils.lazy_imports import lazy_module
+from utils.metrics import record_code_execution
+
+requests = lazy_module('requests')
 
 logger = logging.getLogger(__name__)
 config = get_config()
@@ -65,6 +69,7 @@ def execute_python_code(code: str, inputs: Optional[str] = None) -> Dict[str, An
     try:
         # Validate inputs
         if not code or len(code.strip()) == 0:
+            record_code_execution('validation', 'empty', 0)
             return {
                 'success': False,
                 'error': 'Code cannot be empty',
@@ -75,6 +80,7 @@ def execute_python_code(code: str, inputs: Optional[str] = None) -> Dict[str, An
         is_safe, error_msg = validate_code_security(code)
         if not is_safe:
             logger.warning(f"Security validation failed: {error_msg}")
+            record_code_execution('validation', 'unsafe', 0)
             return {
                 'success': False,
                 'error': error_msg,
@@ -83,6 +89,7 @@ def execute_python_code(code: str, inputs: Optional[str] = None) -> Dict[str, An
         
         # Length validation
         if len(code) > config.MAX_CODE_LENGTH:
+            record_code_execution('validation', 'too_long', 0)
             return {
                 'success': False,
                 'error': f'Code too long (max {config.MAX_CODE_LENGTH} characters)',
@@ -90,10 +97,14 @@ def execute_python_code(code: str, inputs: Optional[str] = None) -> Dict[str, An
             }
         
         # Execute based on mode
+        mode = 'mock' if config.DEV_MODE else 'remote'
+        start = time.perf_counter()
         if config.DEV_MODE:
-            return _execute_mock(code, inputs)
+            result = _execute_mock(code, inputs)
         else:
-            return _execute_remote(code, inputs)
+            result = _execute_remote(code, inputs)
+        record_code_execution(mode, _execution_outcome(result), time.perf_counter() - start)
+        return result
             
     except Exception as e:
         logger.error(f"Code execution error: {str(e)}")
@@ -103,6 +114,16 @@ def execute_python_code(code: str, inputs: Optional[str] = None) -> Dict[str, An
             'output': ''
         }
 
+def _execution_outcome(result: Dict[str, Any]) -> str:
+    """Metrics label for an execution result"""
+    if result.get('success'):
+        return 'success'
+    return {
+        'Code execution timed out': 'timeout',
+        'Code execution service unavailable': 'unavailable',
+        'Code execution failed': 'failed',
+    }.get(result.get('error'), 'program_error')
+
 def _execute_mock(code: str, inputs: Optional[str]) -> Dict[str, Any]:
     """
     Mock execution for development mode with security restrictions.
@@ -166,7 +187,7 @@ def _execute_remote(code: str, inputs: Optional[str]) -> Dict[str, Any]:
         # Get latest Python version from Piston
         try:
             runtimes_response = requests.get(
-                'https://emkc.org/api/v2/piston/runtimes',
+                config.PISTON_API_URL + '/runtimes',
                 timeout=5
             )
             runtimes_response.raise_for_status()
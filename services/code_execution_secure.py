@@ -1,12 +1,14 @@
 """
 Secure code execution service for Code with Morais
 """
-import requests
 import json
 import logging
 import re
 from typing import Dict, Any, Optional
 from config import get_config
+from utils.lazy_imports import lazy_module
+
+requests = lazy_module('requests')
 
 logger = logging.getLogger(__name__)
 config = get_config()
@@ -166,7 +168,7 @@ def _execute_remote(code: str, inputs: Optional[str]) -> Dict[str, Any]:
         # Get latest Python version from Piston
         try:
             runtimes_response = requests.get(
-                'https://emkc.org/api/v2/piston/runtimes',
+                config.PISTON_API_URL + '/runtimes',
                 timeout=5
             )
             runtimes_response.raise_for_status()
@@ -0,0 +1,350 @@
+"""
+Local content snapshot for Code with Morais
+A compact on-disk copy of lessons, quizzes and daily challenges, so the
+course keeps working read-only while Firestore is unreachable
+
+File layout (memory-mapped on load, so opening it reads only the index):
+    b'CWMSNAP1' | header length (4 bytes, big endian) | header JSON | documents
+The header holds the codec and, per collection, [doc_id, offset, length] of
+every document in catalog order. Each document is zlib-compressed msgpack
+(JSON when msgpack is not installed) and decoded only when asked for, so
+every read returns a fresh copy callers may modify.
+
+ContentSnapshotJob writes the file atomically (readers keep the old mapping
+until they notice the new one). The refresher thread rewrites it when it is
+older than the refresh interval; a flock on <file>.lock lets only one worker
+process refresh at a time. firebase_data/snapshot_content.py does the same
+from cron. The models layer serves from the snapshot when Firebase is
+not configured yet, when a collection's circuit breaker is open, or when
+Firestore returns nothing.
+"""
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from datetime import datetime, date
+from typing import Any, Dict, List, Optional
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import fcntl
+except ImportError:  # Windows: refreshes are not serialized across processes
+    fcntl = None
+
+from utils.resilience import circuit_open
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_COLLECTIONS = ('lessons', 'quizzes', 'daily_challenges')
+MAGIC = b'CWMSNAP1'
+_HEADER_LENGTH = struct.Struct('>I')
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SNAPSHOT_PATH = os.path.join(PROJECT_ROOT, 'data', 'content_snapshot.bin')
+DEFAULT_REFRESH_SECONDS = 900
+RELOAD_CHECK_SECONDS = 5.0
+
+
+def _plain(value: Any) -> Any:
+    """Firestore values as msgpack/JSON-safe data (timestamps become ISO strings)"""
+    if isinstance(value, dict):
+        return {str(key): _plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if hasattr(value, 'path'):
+        return value.path  # DocumentReference
+    return str(value)
+
+
+def _encode(codec: str, document: Dict[str, Any]) -> bytes:
+    if codec == 'msgpack':
+        return zlib.compress(msgpack.packb(document, use_bin_type=True))
+    return zlib.compress(json.dumps(document, separators=(',', ':')).encode('utf-8'))
+
+
+def _decode(codec: str, blob: bytes) -> Dict[str, Any]:
+    raw = zlib.decompress(blob)
+    if codec == 'msgpack':
+        return msgpack.unpackb(raw, raw=False)
+    return json.loads(raw)
+
+
+def write_snapshot(path: str, collections: Dict[str, List[Dict[str, Any]]]) -> int:
+    """Atomically write {collection: [documents with 'id']} to path; returns the file size"""
+    codec = 'msgpack' if msgpack is not None else 'json'
+    index: Dict[str, list] = {}
+    blobs = []
+    offset = 0
+    for name, documents in collections.items():
+        entries = index.setdefault(name, [])
+        for document in documents:
+            blob = _encode(codec, _plain(document))
+            entries.append([str(document['id']), offset, len(blob)])
+            blobs.append(blob)
+            offset += len(blob)
+    header = json.dumps({
+        'version': 1,
+        'codec': codec,
+        'created_at': datetime.now().isoformat(),
+        'collections': index,
+    }, separators=(',', ':')).encode('utf-8')
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(_HEADER_LENGTH.pack(len(header)))
+        f.write(header)
+        for blob in blobs:
+            f.write(blob)
+    os.replace(temp_path, path)
+    return len(MAGIC) + _HEADER_LENGTH.size + len(header) + offset
+
+
+class _LoadedSnapshot:
+    """One mapped snapshot file; replaced as a whole when the file changes"""
+
+    def __init__(self, mapped: mmap.mmap, header: Dict[str, Any], base: int):
+        self.map = mapped
+        self.codec = header['codec']
+        self.base = base
+        self.created_at = header.get('created_at')
+        self.index = {name: {doc_id: (offset, length) for doc_id, offset, length in entries}
+                      for name, entries in header['collections'].items()}
+        self.order = {name: [entry[0] for entry in entries] for name, entries in header['collections'].items()}
+
+    def get(self, collection: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        entry = self.index.get(collection, {}).get(doc_id)
+        if entry is None:
+            return None
+        offset, length = entry
+        start = self.base + offset
+        return _decode(self.codec, self.map[start:start + length])
+
+
+class ContentSnapshot:
+    """Read side of a snapshot file, re-mapped when the file is replaced"""
+
+    def __init__(self, path: Optional[str] = DEFAULT_SNAPSHOT_PATH):
+        self.path = path
+        self._loaded: Optional[_LoadedSnapshot] = None
+        self._mtime: Optional[float] = None
+        self._checked_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _due(self, now: float) -> bool:
+        return self._checked_at is None or now - self._checked_at >= RELOAD_CHECK_SECONDS
+
+    def _current(self) -> Optional[_LoadedSnapshot]:
+        now = time.monotonic()
+        if self.path and self._due(now):
+            with self._lock:
+                self._reload_if_changed(now)
+        return self._loaded
+
+    def _reload_if_changed(self, now: float):
+        if not self._due(now):
+            return  # another thread just checked
+        self._checked_at = now
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return
+        if mtime == self._mtime:
+            return
+        try:
+            self._loaded = self._load()
+            self._mtime = mtime
+        except Exception as e:
+            logger.error(f"Error loading content snapshot {self.path}: {str(e)}")
+
+    def _load(self) -> _LoadedSnapshot:
+        with open(self.path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if mapped[:len(MAGIC)] != MAGIC:
+            mapped.close()
+            raise ValueError("not a content snapshot")
+        header_start = len(MAGIC) + _HEADER_LENGTH.size
+        (header_length,) = _HEADER_LENGTH.unpack(mapped[len(MAGIC):header_start])
+        header = json.loads(mapped[header_start:header_start + header_length])
+        if header['codec'] == 'msgpack' and msgpack is None:
+            mapped.close()
+            raise ValueError("snapshot was written with msgpack, which is not installed")
+
+        # The previous mapping is left to the garbage collector: a reader may still hold it
+        loaded = _LoadedSnapshot(mapped, header, header_start + header_length)
+        logger.info(f"Loaded content snapshot from {loaded.created_at} "
+                    f"({', '.join(f'{len(ids)} {name}' for name, ids in loaded.order.items())})")
+        return loaded
+
+    def available(self) -> bool:
+        return self._current() is not None
+
+    def get(self, collection: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        """A fresh copy of one document, or None"""
+        loaded = self._current()
+        return loaded.get(collection, doc_id) if loaded is not None else None
+
+    def all(self, collection: str) -> List[Dict[str, Any]]:
+        """Fresh copies of every document of a collection, in snapshot order"""
+        loaded = self._current()
+        if loaded is None:
+            return []
+        return [loaded.get(collection, doc_id) for doc_id in loaded.order.get(collection, [])]
+
+    def status(self) -> Dict[str, Any]:
+        loaded = self._current()
+        return {
+            'path': self.path,
+            'loaded': loaded is not None,
+            'created_at': loaded.created_at if loaded else None,
+            'documents': {name: len(ids) for name, ids in loaded.order.items()} if loaded else {},
+        }
+
+
+class ContentSnapshotJob:
+    """Dumps the snapshot collections from Firestore to the snapshot file"""
+
+    def __init__(self, firebase_service, path: str = DEFAULT_SNAPSHOT_PATH):
+        self.firebase_service = firebase_service
+        self.path = path
+        self.metrics = {'documents': {}, 'bytes': 0, 'elapsed_seconds': 0.0}
+
+    def run(self) -> Dict[str, Any]:
+        """Write a fresh snapshot and return its metrics"""
+        if not self.firebase_service or not self.firebase_service.is_available():
+            raise RuntimeError("Firebase not available, cannot snapshot content")
+
+        started = time.perf_counter()
+        collections = {}
+        for name in SNAPSHOT_COLLECTIONS:
+            documents = []
+            for doc in self.firebase_service.db.collection(name).stream():
+                documents.append({**(doc.to_dict() or {}), 'id': doc.id})
+            if name == 'lessons':
+                # Same order as get_all_lessons(); lessons without 'order' go last
+                documents.sort(key=lambda lesson: (lesson.get('order') is None, lesson.get('order') or 0))
+            collections[name] = documents
+            self.metrics['documents'][name] = len(documents)
+
+        self.metrics['bytes'] = write_snapshot(self.path, collections)
+        self.metrics['elapsed_seconds'] = time.perf_counter() - started
+        logger.info(f"Content snapshot written to {self.path}: {self.metrics['documents']}, "
+                    f"{self.metrics['bytes']} bytes in {self.metrics['elapsed_seconds']:.1f}s")
+        return self.metrics
+
+
+@contextmanager
+def _refresh_lock(path: str):
+    """Non-blocking exclusive lock shared by every process refreshing the file; yields whether it was taken"""
+    if fcntl is None:
+        yield True
+        return
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'a') as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class SnapshotRefresher:
+    """Daemon thread rewriting the snapshot once it is older than interval"""
+
+    def __init__(self, firebase_service, path: str, interval: float = DEFAULT_REFRESH_SECONDS):
+        self.firebase_service = firebase_service
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+
+    def start(self):
+        """Start refreshing in this process (no-op if already running here)"""
+        if self._thread and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='content-snapshot', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _age(self) -> float:
+        try:
+            return time.time() - os.stat(self.path).st_mtime
+        except OSError:
+            return float('inf')
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.refresh_if_stale()
+            self._stop.wait(min(self.interval, 60.0))
+
+    def refresh_if_stale(self) -> bool:
+        """Rewrite the file if it is stale and no other process is already doing so"""
+        if self._age() < self.interval or not self._firestore_healthy():
+            return False
+        # Workers share the file: one of them streams the collections, the rest keep reading
+        with _refresh_lock(self.path + '.lock') as acquired:
+            if not acquired or self._age() < self.interval:
+                return False
+            try:
+                ContentSnapshotJob(self.firebase_service, self.path).run()
+                return True
+            except Exception as e:
+                logger.error(f"Error refreshing content snapshot: {str(e)}")
+                return False
+
+    def _firestore_healthy(self) -> bool:
+        return (self.firebase_service is not None and self.firebase_service.is_available()
+                and not any(circuit_open(name) for name in SNAPSHOT_COLLECTIONS))
+
+
+content_snapshot = ContentSnapshot()
+_refresher: Optional[SnapshotRefresher] = None
+
+
+def get_content_snapshot() -> ContentSnapshot:
+    """The process-wide snapshot reader (starting the refresher in this process)"""
+    if _refresher is not None:
+        _refresher.start()
+    return content_snapshot
+
+
+def init_content_snapshot(firebase_service, settings: Optional[Dict[str, Any]] = None):
+    """Point the reader at the configured file and refresh it from Firestore.
+
+    The refresher thread starts on the first get_content_snapshot() call of
+    each process, so boot (and a preloading master) never talks to Firestore.
+    """
+    global _refresher
+    settings = settings or {}
+    if not settings.get('enabled', True):
+        content_snapshot.path = None
+        _refresher = None
+        logger.info("Content snapshot disabled")
+        return
+    content_snapshot.path = settings.get('path') or DEFAULT_SNAPSHOT_PATH
+    _refresher = None
+    if firebase_service is not None:
+        _refresher = SnapshotRefresher(firebase_service, content_snapshot.path,
+                                       settings.get('refresh_seconds', DEFAULT_REFRESH_SECONDS))
@@ -2,21 +2,92 @@
 Secure Firebase service with proper error handling and logging.
 """
 import logging
-import firebase_admin
-from firebase_admin import credentials, firestore, auth
-from typing import Optional, Dict, Any
+import os
+import sys
+import threading
+from typing import Optional, Dict, Any, Tuple
 from datetime import datetime
+from models.user_profile import UserStats
+from services.activity_retention import EXPIRY_FIELD, activity_expiry
+from services.streaks import streak_update_for_activity, streak_for_display
+from services.user_stats import (USER_STATS_COLLECTION, stage_stats_writes, streak_mirror, xp_deltas,
+                                 quiz_deltas, lesson_progress_deltas, combine_deltas)
+from services.achievement_unlocks import stage_achievement_unlocks
+from services.rollups import (ROLLUP_COLLECTION, GRANULARITIES, MAX_SERIES_BUCKETS, bucket_key, bucket_start,
+                              bucket_starts, week_key, month_key, dense_series, add_counters, parse_day)
+from utils.metrics import instrument_firebase_service
+from utils.resilience import guard_firebase_service, fast_failing, report_firestore_error
+from utils.lazy_imports import lazy_module
+
+# firebase_admin and the gRPC Firestore client are imported on first use
+firebase_admin = lazy_module('firebase_admin')
+credentials = lazy_module('firebase_admin.credentials')
+firestore = lazy_module('firebase_admin.firestore')
+auth = lazy_module('firebase_admin.auth')
 
 logger = logging.getLogger(__name__)
 
 class FirebaseService:
     """Secure Firebase service with comprehensive error handling."""
     
-    def __init__(self, config: Dict[str, Any]):
-        """Initialize Firebase service with configuration."""
+    _pending_init = False
+    _init_pid = None
+    
+    def __init__(self, config: Dict[str, Any], lazy: bool = False):
+        """Initialize Firebase service with configuration.
+        
+        With lazy=True the Firebase app and Firestore client are created on
+        first use of `db` (in the worker that needs them) instead of here.
+        """
         self.config = config
         self.db: Optional[firestore.Client] = None
-        self._initialize_firebase()
+        if lazy:
+            self._init_lock = threading.Lock()
+            self._pending_init = True
+        else:
+            self._initialize_firebase()
+            self._init_pid = os.getpid()
+    
+    @property
+    def db(self):
+        if self._pending_init:
+            self._initialize_pending()
+        return self._db
+    
+    @db.setter
+    def db(self, value):
+        self._db = value
+    
+    def _initialize_pending(self):
+        """Run the deferred initialization once; failures leave the service unavailable"""
+        with self._init_lock:
+            if not self._pending_init:
+                return
+            try:
+                self._initialize_firebase()
+                self._init_pid = os.getpid()
+            except Exception as e:
+                logger.error(f"Deferred Firebase initialization failed: {str(e)}")
+                self._db = None
+            finally:
+                self._pending_init = False
+    
+    def reset_after_fork(self):
+        """Drop a client created before fork (gRPC channels are per process) and reconnect lazily"""
+        if self._init_pid in (None, os.getpid()):
+            return
+        firebase_admin_module = sys.modules.get('firebase_admin')
+        if firebase_admin_module is not None:
+            for app in list(firebase_admin_module._apps.values()):
+                try:
+                    firebase_admin_module.delete_app(app)
+                except Exception as e:
+                    logger.error(f"Error deleting inherited Firebase app: {str(e)}")
+        self._db = None
+        self._init_pid = None
+        self._init_lock = threading.Lock()
+        self._pending_init = True
+        logger.info("Firebase client inherited from the master dropped; reconnecting on first use")
     
     def _initialize_firebase(self):
         """Initialize Firebase with proper error handling."""
@@ -76,7 +147,7 @@ class FirebaseService:
     
     def is_available(self) -> bool:
         """Check if Firebase service is available."""
-        return self.db is not None
+        return self.db is not None and not fast_failing()
     
     def get_user(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Get user data with error handling."""
@@ -96,11 +167,12 @@ class FirebaseService:
                 return None
                 
         except Exception as e:
+            report_firestore_error(e)
             logger.error(f"Error retrieving user {user_id}: {str(e)}")
             return None
     
-    def update_user(self, user_id: str, data: Dict[str, Any]) -> bool:
-        """Update user data with validation and error handling."""
+    def update_user(self, user_id: str, data: Dict[str, Any], stats_deltas: Optional[Dict[str, Any]] = None) -> bool:
+        """Update user data (and its user_stats deltas in the same batch) with validation."""
         if not self.is_available():
             logger.warning("Firebase not available, cannot update user")
             return False
@@ -115,15 +187,81 @@ class FirebaseService:
             data['updated_at'] = datetime.now()
             
             user_ref = self.db.collection('users').document(user_id)
-            user_ref.update(data)
+            batch = self.db.batch()
+            batch.update(user_ref, data)
+            if stage_stats_writes(self.db, batch, user_id, stats_deltas):
+                batch.commit()
+            else:
+                user_ref.update(data)
             
             logger.info(f"Updated user {user_id} with {len(data)} fields")
             return True
             
         except Exception as e:
+            report_firestore_error(e)
             logger.error(f"Error updating user {user_id}: {str(e)}")
             return False
     
+    def complete_subtopic(self, user_id: str, lesson_id: str, subtopic_id: str, total_subtopics: int,
+                          lesson_xp: int, category: str, subtopic_xp: int = 50) -> Optional[Dict[str, Any]]:
+        """Add a completed subtopic to the user's lesson progress and award its XP in one transaction.
+
+        The already-completed check reads inside the transaction, so concurrent
+        submits of the same subtopic award XP and stats deltas once. Returns
+        {'added': False, 'user_found': ...} when nothing was written, the XP
+        and progress of the completion otherwise, or None when the write failed.
+        """
+        if not self.is_available():
+            logger.warning("Firebase not available, cannot complete subtopic")
+            return None
+
+        try:
+            user_ref = self.db.collection('users').document(user_id)
+
+            @firestore.transactional
+            def complete_in_transaction(transaction):
+                user_doc = user_ref.get(transaction=transaction)
+                if not user_doc.exists:
+                    return {'added': False, 'user_found': False}
+                user_data = user_doc.to_dict() or {}
+                lesson_progress = user_data.get('lesson_progress') or {}
+                entry = lesson_progress.get(lesson_id) or {'completed': False, 'completed_subtopics': [], 'progress': 0}
+                completed_subtopics = list(entry.get('completed_subtopics') or [])
+                if subtopic_id in completed_subtopics:
+                    return {'added': False, 'user_found': True}
+
+                completed_subtopics.append(subtopic_id)
+                completed_count = len(completed_subtopics)
+                progress = int((completed_count / total_subtopics) * 100) if total_subtopics > 0 else 0
+                was_completed = entry.get('completed', False)
+                lesson_completed = completed_count >= total_subtopics
+                xp_earned = lesson_xp if lesson_completed else subtopic_xp
+
+                lesson_progress[lesson_id] = {**entry, 'completed_subtopics': completed_subtopics, 'progress': progress,
+                                              'completed': was_completed or lesson_completed}
+                transaction.update(user_ref, {
+                    'lesson_progress': lesson_progress,
+                    'xp': firestore.Increment(xp_earned),
+                    'updated_at': datetime.now()
+                })
+                stats_deltas = combine_deltas(
+                    lesson_progress_deltas(category, subtopics=1, lesson_completed=lesson_completed and not was_completed),
+                    xp_deltas(xp_earned)
+                )
+                stage_stats_writes(self.db, transaction, user_id, stats_deltas, user_data=user_data)
+                return {'added': True, 'user_found': True, 'xp_earned': xp_earned, 'progress': progress,
+                        'lesson_completed': lesson_completed}
+
+            result = complete_in_transaction(self.db.transaction())
+            if result['added']:
+                logger.info(f"Completed subtopic {subtopic_id} of {lesson_id} for user {user_id}")
+            return result
+
+        except Exception as e:
+            report_firestore_error(e)
+            logger.error(f"Error completing subtopic for {user_id}: {str(e)}")
+            return None
+
     def create_user(self, user_id: str, user_data: Dict[str, Any]) -> bool:
         """Create new user with validation."""
         if not self.is_available():
@@ -144,6 +282,7 @@ class FirebaseService:
             return True
             
         except Exception as e:
+            report_firestore_error(e)
             logger.error(f"Error creating user {user_id}: {str(e)}")
             return False
     
@@ -161,35 +300,51 @@ class FirebaseService:
                 **result
             }
             
-            # Save to quiz_results collection
-            self.db.collection('quiz_results').add(result_data)
-            
-            # Update user's quiz scores
-            user_ref = self.db.collection('users').document(user_id)
-            user_ref.update({
+            # Save the result, the user's quiz score and their stats together
+            batch = self.db.batch()
+            batch.set(self.db.collection('quiz_results').document(), result_data)
+            batch.update(self.db.collection('users').document(user_id), {
                 f'quiz_scores.{quiz_id}': result.get('score', 0)
             })
+            stage_stats_writes(self.db, batch, user_id, quiz_deltas(result_data))
+            batch.commit()
             
             logger.info(f"Saved quiz result for user {user_id}, quiz {quiz_id}")
             return True
             
         except Exception as e:
+            report_firestore_error(e)
             logger.error(f"Error saving quiz result: {str(e)}")
             return False
         
     def save_quiz_result_by_id(self, result_id: str, result_data: Dict[str, Any]) -> bool:
-        """Save quiz result with result ID and data"""
+        """Save quiz result with result ID and data, counting it in user_stats once"""
         if not self.is_available():
             logger.warning("Firebase not available, cannot save quiz result")
             return False
         
         try:
-            # Save to quiz_results collection with specified ID
-            self.db.collection('quiz_results').document(result_id).set(result_data)
+            result_ref = self.db.collection('quiz_results').document(result_id)
+            user_id = result_data.get('user_id')
+            if not user_id:
+                result_ref.set(result_data)
+                logger.info(f"Saved quiz result with ID: {result_id}")
+                return True
+
+            @firestore.transactional
+            def save_in_transaction(transaction):
+                # A resubmitted result ID overwrites the result but is not counted twice
+                existing = result_ref.get(transaction=transaction)
+                transaction.set(result_ref, result_data)
+                if not existing.exists:
+                    stage_stats_writes(self.db, transaction, user_id, quiz_deltas(result_data))
+
+            save_in_transaction(self.db.transaction())
             logger.info(f"Saved quiz result with ID: {result_id}")
             return True
             
         except Exception as e:
+            report_firestore_error(e)
             logger.error(f"Error saving quiz result: {str(e)}")
             return False
     
@@ -213,6 +368,7 @@ class FirebaseService:
                 return None
                 
         except Exception as e:
+            report_firestore_error(e)
             logger.error(f"Error retrieving lesson {lesson_id}: {str(e)}")
             return None
     
@@ -238,6 +394,7 @@ class FirebaseService:
             return lessons
             
         except Exception as e:
+            report_firestore_error(e)
             logger.error(f"Error retrieving lessons: {str(e)}")
             return []
     
@@ -261,6 +418,7 @@ class FirebaseService:
             return True
             
         except Exception as e:
+            report_firestore_error(e)
             logger.error(f"Error saving lesson {lesson_id}: {str(e)}")
             return False
     
@@ -284,6 +442,7 @@ class FirebaseService:
                 return None
                 
         except Exception as e:
+            report_firestore_error(e)
             logger.error(f"Error retrieving quiz {quiz_id}: {str(e)}")
             return None
     
@@ -306,6 +465,7 @@ class FirebaseService:
             return True
             
         except Exception as e:
+            report_firestore_error(e)
             logger.error(f"Error saving quiz {quiz_id}: {str(e)}")
             return False
     
@@ -320,7 +480,8 @@ class FirebaseService:
             
             # Calculate derived values
             if user_data:
-                user_data['current_streak'] = self._calculate_streak(user_data)
+                # Streak fields are kept on the user doc by record_activity()
+                user_data['current_streak'] = streak_for_display(user_data)
                 user_data['lessons_completed'] = user_data.get('lessons_completed', [])
                 user_data['total_lessons'] = 10  # You can make this dynamic
                 user_data['progress_percentage'] = (len(user_data.get('lessons_completed', [])) / 10) * 100
@@ -331,50 +492,6 @@ class FirebaseService:
             logger.error(f"Error getting user dashboard data: {str(e)}")
             return {}
     
-    def _calculate_streak(self, user_data: Dict[str, Any]) -> int:
-        """Calculate user's current learning streak."""
-        try:
-            # Get user's recent activities
-            activities = self.get_user_activities(user_data.get('uid', ''), limit=30)
-            if not activities:
-                return 0
-            
-            from datetime import datetime, timedelta
-            
-            current_date = datetime.now().date()
-            streak = 0
-            check_date = current_date
-            
-            # Group activities by date
-            activity_dates = set()
-            for activity in activities:
-                if activity.get('timestamp'):
-                    # Handle both Firestore timestamp and datetime objects
-                    activity_date = activity['timestamp']
-                    if hasattr(activity_date, 'date'):
-                        activity_dates.add(activity_date.date())
-                    elif isinstance(activity_date, str):
-                        try:
-                            parsed_date = datetime.fromisoformat(activity_date.replace('Z', '+00:00'))
-                            activity_dates.add(parsed_date.date())
-                        except:
-                            continue
-            
-            # Calculate streak
-            while check_date in activity_dates:
-                streak += 1
-                check_date -= timedelta(days=1)
-                
-                # Prevent infinite loops
-                if streak > 365:
-                    break
-            
-            return streak
-            
-        except Exception as e:
-            logger.error(f"Error calculating streak: {str(e)}")
-            return 0
-    
     def get_user_activities(self, user_id: str, limit: int = 10) -> list:
         """Get user's recent activities."""
         if not self.is_available():
@@ -395,9 +512,354 @@ class FirebaseService:
             return activities
             
         except Exception as e:
+            report_firestore_error(e)
             logger.error(f"Error retrieving user activities: {str(e)}")
             return []
-    
+
+    def get_user_activities_page(self, user_id: str, limit: int = 20,
+                                 after: Optional[tuple] = None) -> Tuple[list, bool]:
+        """Get one page of a user's activities, newest first, and whether more follow.
+
+        Pages are keyed by the (timestamp, id) of the last activity already
+        shown, so deep pages cost the same single query as the first one.
+        """
+        if not self.is_available():
+            logger.warning("Firebase not available, cannot get user activities")
+            return [], False
+
+        try:
+            query = (self.db.collection('activities')
+                     .where('user_id', '==', user_id)
+                     .order_by('timestamp', direction=firestore.Query.DESCENDING)
+                     .order_by('__name__', direction=firestore.Query.DESCENDING))
+            if after:
+                timestamp, activity_id = after
+                query = query.start_after({'timestamp': timestamp, '__name__': activity_id})
+
+            # One extra document tells whether another page exists
+            docs = list(query.limit(limit + 1).stream())
+            activities = []
+            for doc in docs[:limit]:
+                activity_data = doc.to_dict() or {}
+                activity_data['id'] = doc.id
+                activities.append(activity_data)
+            return activities, len(docs) > limit
+
+        except Exception as e:
+            report_firestore_error(e)
+            logger.error(f"Error retrieving user activities page: {str(e)}")
+            return [], False
+
+    def stream_users(self, start_after: Optional[str] = None, page_size: int = 500):
+        """Stream all users ordered by document ID as (uid, data) pairs.
+
+        Pages through the collection with cursors so long-running batch jobs
+        never hold a single stream open, and can resume after a given uid.
+        """
+        if not self.is_available():
+            logger.warning("Firebase not available, cannot stream users")
+            return
+
+        users_ref = self.db.collection('users')
+        cursor = start_after
+
+        while True:
+            query = users_ref.order_by('__name__').limit(page_size)
+            if cursor:
+                query = query.start_after({'__name__': cursor})
+
+            docs = list(query.stream())
+            for doc in docs:
+                yield doc.id, doc.to_dict() or {}
+
+            if len(docs) < page_size:
+                break
+            cursor = docs[-1].id
+
+    def stream_activities(self, page_size: int = 1000):
+        """Stream user_id and timestamp of every activity, paged by document ID."""
+        if not self.is_available():
+            logger.warning("Firebase not available, cannot stream activities")
+            return
+
+        activities_ref = self.db.collection('activities')
+        cursor = None
+
+        while True:
+            query = activities_ref.select(['user_id', 'timestamp']).order_by('__name__').limit(page_size)
+            if cursor:
+                query = query.start_after({'__name__': cursor})
+
+            docs = list(query.stream())
+            for doc in docs:
+                yield doc.to_dict() or {}
+
+            if len(docs) < page_size:
+                break
+            cursor = docs[-1].id
+
+    def stream_quiz_results(self, page_size: int = 1000):
+        """Stream the fields user_stats counts of every quiz result, paged by document ID."""
+        if not self.is_available():
+            logger.warning("Firebase not available, cannot stream quiz results")
+            return
+
+        results_ref = self.db.collection('quiz_results')
+        cursor = None
+
+        while True:
+            query = results_ref.select(['user_id', 'percentage', 'passed', 'duration']).order_by('__name__').limit(page_size)
+            if cursor:
+                query = query.start_after({'__name__': cursor})
+
+            docs = list(query.stream())
+            for doc in docs:
+                yield doc.to_dict() or {}
+
+            if len(docs) < page_size:
+                break
+            cursor = docs[-1].id
+
+    def stream_user_stats(self, page_size: int = 1000):
+        """Stream every user_stats document as (uid, data) pairs, paged by document ID."""
+        if not self.is_available():
+            logger.warning("Firebase not available, cannot stream user stats")
+            return
+
+        stats_ref = self.db.collection(USER_STATS_COLLECTION)
+        cursor = None
+
+        while True:
+            query = stats_ref.order_by('__name__').limit(page_size)
+            if cursor:
+                query = query.start_after({'__name__': cursor})
+
+            docs = list(query.stream())
+            for doc in docs:
+                yield doc.id, doc.to_dict() or {}
+
+            if len(docs) < page_size:
+                break
+            cursor = docs[-1].id
+
+    def record_activity(self, user_id: str, activity_type: str, details: Dict[str, Any], store: bool = True) -> bool:
+        """Add an activity and advance the user's streak in one transaction.
+
+        With store=False (a sampled-out activity) only the streak, user_stats
+        and day rollup are written, so they still count every activity.
+        """
+        if not self.is_available():
+            logger.warning("Firebase not available, cannot record activity")
+            return False
+
+        try:
+            if not self._validate_user_id(user_id):
+                return False
+
+            user_ref = self.db.collection('users').document(user_id)
+            activity_ref = self.db.collection('activities').document()
+
+            @firestore.transactional
+            def record_in_transaction(transaction):
+                user_doc = user_ref.get(transaction=transaction)
+                if store:
+                    transaction.set(activity_ref, {
+                        'user_id': user_id,
+                        'type': activity_type,
+                        'details': details,
+                        'timestamp': firestore.SERVER_TIMESTAMP,
+                        'created_at': datetime.now(),
+                        EXPIRY_FIELD: activity_expiry(activity_type)
+                    })
+                user_data = user_doc.to_dict() or {}
+                streak_update = streak_update_for_activity(user_data) if user_doc.exists else {}
+                if streak_update:
+                    transaction.update(user_ref, streak_update)
+                stage_stats_writes(self.db, transaction, user_id, mirrored=streak_mirror(user_data, streak_update),
+                                   activities=1, user_data=user_data)
+
+            record_in_transaction(self.db.transaction())
+            logger.info(f"Recorded activity {activity_type} for user {user_id}")
+            return True
+
+        except Exception as e:
+            report_firestore_error(e)
+            logger.error(f"Error recording activity for {user_id}: {str(e)}")
+            return False
+
+    def get_precomputed_recommendations(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get the precomputed recommendations document for a user."""
+        if not self.is_available():
+            logger.warning("Firebase not available, cannot get precomputed recommendations")
+            return None
+
+        try:
+            rec_doc = self.db.collection('recommendations').document(user_id).get()
+            if rec_doc.exists:
+                return rec_doc.to_dict()
+            return None
+
+        except Exception as e:
+            report_firestore_error(e)
+            logger.error(f"Error retrieving precomputed recommendations for {user_id}: {str(e)}")
+            return None
+
+    def get_user_achievements(self, user_id: str) -> list:
+        """Get a user's achievement records from user_achievements."""
+        if not self.is_available():
+            logger.warning("Firebase not available, cannot get user achievements")
+            return []
+
+        try:
+            query = self.db.collection('user_achievements').where('user_id', '==', user_id)
+
+            achievements = []
+            for doc in query.stream():
+                achievements.append(doc.to_dict())
+
+            logger.debug(f"Retrieved {len(achievements)} achievements for user {user_id}")
+            return achievements
+
+        except Exception as e:
+            report_firestore_error(e)
+            logger.error(f"Error retrieving user achievements: {str(e)}")
+            return []
+
+    def get_user_stats_doc(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get the materialized user_stats document for a user."""
+        if not self.is_available():
+            logger.warning("Firebase not available, cannot get user stats")
+            return None
+
+        try:
+            stats_doc = self.db.collection(USER_STATS_COLLECTION).document(user_id).get()
+            if stats_doc.exists:
+                return stats_doc.to_dict()
+            return None
+
+        except Exception as e:
+            report_firestore_error(e)
+            logger.error(f"Error retrieving user stats for {user_id}: {str(e)}")
+            return None
+
+    def get_user_stats(self, user_id: str) -> UserStats:
+        """Get aggregate user statistics used by achievement checks."""
+        stats_data = self.get_user_stats_doc(user_id)
+        if stats_data is not None:
+            return UserStats.from_stats_doc(user_id, stats_data)
+        # Not materialized yet (before the rebuild job has run for this user)
+        return UserStats.from_user_doc(user_id, self.get_user(user_id) or {})
+
+    def get_profile_bundle(self, user_id: str, user_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """The user and user_stats documents a profile page needs (pass user_data to skip its read)."""
+        if user_data is None:
+            user_data = self.get_user(user_id) or {}
+        stats_data = self.get_user_stats_doc(user_id)
+        return {
+            'user': user_data,
+            'stats': (UserStats.from_stats_doc(user_id, stats_data) if stats_data is not None
+                      else UserStats.from_user_doc(user_id, user_data)),
+            'user_stats': stats_data
+        }
+
+    def get_rollup_series(self, user_id: str, start, end, granularity: str = 'day') -> Optional[Dict[str, Any]]:
+        """Dense per-bucket XP and activity counters for [start, end] from user_rollups.
+
+        Day granularity reads one document per day still in the day store
+        (compacted days read as zero). Week and month granularity read the
+        compacted bucket documents plus the remaining day documents in range.
+        """
+        if not self.is_available():
+            logger.warning("Firebase not available, cannot get rollup series")
+            return None
+
+        try:
+            start, end = parse_day(start), parse_day(end)
+            if start is None or end is None or start > end or granularity not in GRANULARITIES:
+                logger.error(f"Invalid rollup range {start}..{end} ({granularity})")
+                return None
+            if len(bucket_starts(start, end, granularity)) > MAX_SERIES_BUCKETS:
+                logger.error(f"Rollup range {start}..{end} exceeds {MAX_SERIES_BUCKETS} {granularity} buckets")
+                return None
+
+            user_rollups = self.db.collection(ROLLUP_COLLECTION).document(user_id)
+            first_day = bucket_start(start, granularity)
+            buckets: Dict[str, Dict[str, Any]] = {}
+
+            if granularity != 'day':
+                key = week_key if granularity == 'week' else month_key
+                compacted = (user_rollups.collection(granularity + 's')
+                             .where('key', '>=', key(first_day)).where('key', '<=', key(end)).stream())
+                for doc in compacted:
+                    add_counters(buckets.setdefault(doc.id, {}), doc.to_dict() or {})
+
+            days = (user_rollups.collection('days')
+                    .where('date', '>=', first_day.isoformat()).where('date', '<=', end.isoformat()).stream())
+            for doc in days:
+                day = parse_day(doc.id)
+                if day is not None:
+                    add_counters(buckets.setdefault(bucket_key(day, granularity), {}), doc.to_dict() or {})
+
+            return dense_series(start, end, granularity, buckets)
+
+        except Exception as e:
+            report_firestore_error(e)
+            logger.error(f"Error retrieving rollup series for {user_id}: {str(e)}")
+            return None
+
+    def record_user_stats(self, user_id: str, deltas: Dict[str, Any]) -> bool:
+        """Apply user_stats deltas for an event that has no other write."""
+        if not self.is_available():
+            logger.warning("Firebase not available, cannot record user stats")
+            return False
+
+        try:
+            if not self._validate_user_id(user_id):
+                return False
+
+            batch = self.db.batch()
+            if stage_stats_writes(self.db, batch, user_id, deltas):
+                batch.commit()
+            return True
+
+        except Exception as e:
+            report_firestore_error(e)
+            logger.error(f"Error recording user stats for {user_id}: {str(e)}")
+            return False
+
+    def commit_achievement_unlocks(self, user_id: str, achievements: list, activities: list) -> Optional[list]:
+        """Write achievement unlocks, their XP, activities and streak in one transaction.
+
+        Returns the IDs actually unlocked (achievements already in the user's
+        `achievements` array are skipped, so concurrent checks award XP once),
+        or None when the write failed.
+        """
+        if not self.is_available():
+            logger.warning("Firebase not available, cannot commit achievement unlocks")
+            return None
+
+        if not achievements:
+            return []
+
+        try:
+            user_ref = self.db.collection('users').document(user_id)
+
+            @firestore.transactional
+            def commit_in_transaction(transaction):
+                # Read first: transactions must read before they write
+                user_doc = user_ref.get(transaction=transaction)
+                return stage_achievement_unlocks(self.db, transaction, user_ref, user_doc, user_id,
+                                                 achievements, activities)
+
+            committed = commit_in_transaction(self.db.transaction())
+            logger.info(f"Committed {len(committed)} achievement unlocks for user {user_id}")
+            return committed
+
+        except Exception as e:
+            report_firestore_error(e)
+            logger.error(f"Error committing achievement unlocks for {user_id}: {str(e)}")
+            return None
+
     def get_leaderboard(self, limit: int = 10) -> list:
         """Get global leaderboard."""
         if not self.is_available():
@@ -427,6 +889,7 @@ class FirebaseService:
             return leaderboard
             
         except Exception as e:
+            report_firestore_error(e)
             logger.error(f"Error retrieving leaderboard: {str(e)}")
             return []
     
@@ -456,6 +919,7 @@ class FirebaseService:
                 return None
                 
         except Exception as e:
+            report_firestore_error(e)
             logger.error(f"Error retrieving daily challenge: {str(e)}")
             return None
     
@@ -508,6 +972,7 @@ class FirebaseService:
                 return True
                 
         except Exception as e:
+            report_firestore_error(e)
             logger.error(f"Error creating/updating user {user_id}: {str(e)}")
             return False
     
@@ -532,6 +997,7 @@ class FirebaseService:
                 return None
                 
         except Exception as e:
+            report_firestore_error(e)
             logger.error(f"Error getting user by email {email}: {str(e)}")
             return None
     
@@ -583,6 +1049,7 @@ class FirebaseService:
             return True
             
         except Exception as e:
+            report_firestore_error(e)
             logger.error(f"Error creating user from Google data: {str(e)}")
             return False
     
@@ -617,6 +1084,7 @@ class FirebaseService:
             return True
             
         except Exception as e:
+            report_firestore_error(e)
             logger.error(f"Error setting admin status: {str(e)}")
             return False
     
@@ -636,6 +1104,7 @@ class FirebaseService:
             return True
             
         except Exception as e:
+            report_firestore_error(e)
             logger.error(f"Error saving announcement: {str(e)}")
             return False
     
@@ -656,6 +1125,7 @@ class FirebaseService:
             return None
             
         except Exception as e:
+            report_firestore_error(e)
             logger.error(f"Error getting latest announcement: {str(e)}")
             return None
     
@@ -670,7 +1140,7 @@ class FirebaseService:
             # Use atomic transaction to ensure consistency
             @firestore.transactional
             def update_in_transaction(transaction):
-                user_doc = transaction.get(user_ref)
+                user_doc = user_ref.get(transaction=transaction)
                 
                 if user_doc.exists:
                     current_data = user_doc.to_dict()
@@ -698,6 +1168,7 @@ class FirebaseService:
                         logger.info(f"User {user_id} leveled up to level {new_level}")
                     
                     transaction.update(user_ref, update_data)
+                    stage_stats_writes(self.db, transaction, user_id, xp_deltas(xp_gained), user_data=current_data)
                     
                     logger.info(f"Updated rewards for user {user_id}: +{xp_gained} XP, +{coins_gained} coins")
                     return True
@@ -710,6 +1181,7 @@ class FirebaseService:
             return update_in_transaction(transaction)
             
         except Exception as e:
+            report_firestore_error(e)
             logger.error(f"Error updating user rewards: {str(e)}")
             return False
     
@@ -739,6 +1211,10 @@ class FirebaseService:
             
         return True
 
+# Count reads/writes/latency per collection for /api/system/metrics
+instrument_firebase_service(FirebaseService)
+guard_firebase_service(FirebaseService)
+
 # Legacy support functions for backward compatibility
 # TODO: Remove in Phase 2
 db = None
@@ -0,0 +1,430 @@
+"""
+In-process lesson search for Code with Morais
+
+Inverted index over lesson title, description, tags and block text with BM25
+ranking, prefix/trigram expansion for typeahead, and category/difficulty
+facets stored as integer bitsets (bit N = document slot N).
+
+The index is refreshed incrementally: each lesson is fingerprinted and only
+added, changed or removed lessons are re-indexed when the catalog version
+changes.
+"""
+import bisect
+import hashlib
+import heapq
+import json
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter
+from typing import Optional, List, Dict, Any, Callable, Iterable
+
+logger = logging.getLogger(__name__)
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Field weights applied to term frequencies (BM25F-style)
+FIELD_WEIGHTS = {
+    'title': 3.0,
+    'tags': 2.0,
+    'description': 1.5,
+    'blocks': 1.0,
+}
+
+# Typeahead expansion limits
+MAX_PREFIX_EXPANSIONS = 50
+MIN_PREFIX_LENGTH = 2
+NGRAM_SIZE = 3
+MIN_NGRAM_SIMILARITY = 0.4
+
+# How often the catalog is re-read when no local save bumped the version
+CATALOG_CHECK_SECONDS = 60
+
+# Compact the index once this fraction of slots belongs to removed lessons
+MAX_DEAD_SLOT_RATIO = 0.5
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9_]+')
+STOPWORDS = frozenset({
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in',
+    'is', 'it', 'of', 'on', 'or', 'the', 'this', 'to', 'with', 'you', 'your'
+})
+
+# Block keys whose string values are indexed as block text
+BLOCK_TEXT_KEYS = ('title', 'content', 'text', 'description', 'question', 'explanation', 'instructions')
+
+# Lesson fields returned with each hit
+RESULT_FIELDS = ('id', 'title', 'description', 'category', 'difficulty', 'duration', 'xp_reward')
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase and split text into index terms, dropping stopwords"""
+    return [t for t in TOKEN_PATTERN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def _ngrams(term: str) -> set:
+    """Character trigrams of a padded term"""
+    padded = f" {term} "
+    return {padded[i:i + NGRAM_SIZE] for i in range(len(padded) - NGRAM_SIZE + 1)}
+
+
+def _collect_block_text(value: Any) -> Iterable[str]:
+    """Yield indexable strings from lesson blocks (nested lists/dicts)"""
+    if isinstance(value, str):
+        yield value
+    elif isinstance(value, list):
+        for item in value:
+            yield from _collect_block_text(item)
+    elif isinstance(value, dict):
+        for key in BLOCK_TEXT_KEYS:
+            if key in value:
+                yield from _collect_block_text(value[key])
+
+
+def lesson_fingerprint(lesson: Dict[str, Any]) -> str:
+    """Stable hash of the lesson fields that affect indexing and results"""
+    indexed = {
+        'title': lesson.get('title'),
+        'description': lesson.get('description'),
+        'tags': lesson.get('tags'),
+        'blocks': lesson.get('blocks'),
+        'content': lesson.get('content'),
+        'category': lesson.get('category'),
+        'difficulty': lesson.get('difficulty'),
+        'duration': lesson.get('duration'),
+        'xp_reward': lesson.get('xp_reward'),
+    }
+    payload = json.dumps(indexed, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class LessonSearchIndex:
+    """Incrementally maintained inverted index over the lesson catalog"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reload_lock = threading.Lock()   # one catalog load at a time, outside _lock
+        self._reset()
+        self.catalog_version = None
+        self.last_checked = 0.0
+
+    def _reset(self):
+        """Clear all index structures"""
+        self._docs: List[Optional[Dict[str, Any]]] = []     # slot -> result summary
+        self._doc_terms: List[Optional[Counter]] = []        # slot -> weighted tf
+        self._doc_lengths: List[float] = []
+        self._slots: Dict[str, int] = {}                     # lesson id -> slot
+        self._fingerprints: Dict[str, str] = {}              # lesson id -> fingerprint
+        self._postings: Dict[str, Dict[int, float]] = {}     # term -> {slot: weighted tf}
+        self._facets: Dict[str, Dict[str, int]] = {'category': {}, 'difficulty': {}}
+        self._live_mask = 0
+        self._total_length = 0.0
+        self._live_count = 0
+        self._vocabulary: List[str] = []
+        self._ngram_index: Dict[str, set] = {}
+        self._vocabulary_dirty = False
+        self._term_cache: Dict[str, tuple] = {}
+
+    # ------------------------------------------------------------------
+    # Index maintenance
+    # ------------------------------------------------------------------
+
+    def refresh(self, lessons: List[Dict[str, Any]], catalog_version: Any = None) -> Dict[str, int]:
+        """Apply the current catalog, re-indexing only lessons whose fingerprint changed"""
+        with self._lock:
+            current = {}
+            for lesson in lessons:
+                if lesson.get('id') and not lesson.get('error'):
+                    current[lesson['id']] = lesson
+
+            removed = [lid for lid in self._fingerprints if lid not in current]
+            changed = []
+            for lesson_id, lesson in current.items():
+                fingerprint = lesson_fingerprint(lesson)
+                if self._fingerprints.get(lesson_id) != fingerprint:
+                    changed.append((lesson_id, lesson, fingerprint))
+
+            for lesson_id in removed:
+                self._remove(lesson_id)
+            for lesson_id, lesson, fingerprint in changed:
+                self._remove(lesson_id)
+                self._add(lesson, fingerprint)
+
+            if len(self._docs) and self._live_count / len(self._docs) < 1 - MAX_DEAD_SLOT_RATIO:
+                self._compact(current)
+            if removed or changed:
+                # idf and length normalisation depend on the whole collection
+                self._term_cache = {}
+
+            self.catalog_version = catalog_version
+            self.last_checked = time.monotonic()
+
+            if removed or changed:
+                logger.info(f"Lesson search index updated: {len(changed)} indexed, {len(removed)} removed")
+            return {'indexed': len(changed), 'removed': len(removed)}
+
+    def _add(self, lesson: Dict[str, Any], fingerprint: str):
+        """Index one lesson into a new slot"""
+        slot = len(self._docs)
+        fields = {
+            'title': tokenize(lesson.get('title') or ''),
+            'description': tokenize(lesson.get('description') or ''),
+            'tags': [t for tag in (lesson.get('tags') or []) for t in tokenize(str(tag))],
+            'blocks': [t for text in _collect_block_text([lesson.get('blocks'), lesson.get('content')])
+                       for t in tokenize(text)],
+        }
+
+        terms = Counter()
+        for field_name, tokens in fields.items():
+            weight = FIELD_WEIGHTS[field_name]
+            for token in tokens:
+                terms[token] += weight
+
+        for term, tf in terms.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                self._vocabulary_dirty = True
+            postings[slot] = tf
+
+        doc_length = sum(terms.values())
+        self._docs.append({key: lesson.get(key) for key in RESULT_FIELDS})
+        self._doc_terms.append(terms)
+        self._doc_lengths.append(doc_length)
+        self._slots[lesson['id']] = slot
+        self._fingerprints[lesson['id']] = fingerprint
+        self._total_length += doc_length
+        self._live_count += 1
+
+        bit = 1 << slot
+        self._live_mask |= bit
+        for facet, value in (('category', lesson.get('category')), ('difficulty', lesson.get('difficulty'))):
+            if value:
+                self._facets[facet][value] = self._facets[facet].get(value, 0) | bit
+
+    def _remove(self, lesson_id: str):
+        """Drop a lesson from postings and facets, leaving its slot dead"""
+        slot = self._slots.pop(lesson_id, None)
+        self._fingerprints.pop(lesson_id, None)
+        if slot is None:
+            return
+
+        for term in self._doc_terms[slot]:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(slot, None)
+                if not postings:
+                    del self._postings[term]
+                    self._vocabulary_dirty = True
+
+        bit = 1 << slot
+        self._live_mask &= ~bit
+        for values in self._facets.values():
+            for value in list(values):
+                values[value] &= ~bit
+                if not values[value]:
+                    del values[value]
+
+        self._total_length -= self._doc_lengths[slot]
+        self._live_count -= 1
+        self._docs[slot] = None
+        self._doc_terms[slot] = None
+        self._doc_lengths[slot] = 0.0
+
+    def _compact(self, current: Dict[str, Dict[str, Any]]):
+        """Rebuild from scratch once too many slots are dead"""
+        self._reset()
+        for lesson in current.values():
+            self._add(lesson, lesson_fingerprint(lesson))
+
+    def _ensure_vocabulary(self):
+        """Rebuild the sorted vocabulary and trigram index after term changes"""
+        if not self._vocabulary_dirty:
+            return
+        self._vocabulary = sorted(self._postings)
+        ngram_index: Dict[str, set] = {}
+        for term in self._vocabulary:
+            for gram in _ngrams(term):
+                ngram_index.setdefault(gram, set()).add(term)
+        self._ngram_index = ngram_index
+        self._vocabulary_dirty = False
+
+    # ------------------------------------------------------------------
+    # Querying
+    # ------------------------------------------------------------------
+
+    def _expand_prefix(self, prefix: str) -> List[str]:
+        """Vocabulary terms starting with prefix (bisect over the sorted vocabulary)"""
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        matches = []
+        for term in self._vocabulary[start:start + MAX_PREFIX_EXPANSIONS]:
+            if not term.startswith(prefix):
+                break
+            matches.append(term)
+        return matches
+
+    def _expand_ngrams(self, token: str) -> List[str]:
+        """Vocabulary terms sharing enough trigrams with token (typo/infix tolerance)"""
+        grams = _ngrams(token)
+        overlap = Counter()
+        for gram in grams:
+            for term in self._ngram_index.get(gram, ()):
+                overlap[term] += 1
+        matches = []
+        for term, shared in overlap.most_common(MAX_PREFIX_EXPANSIONS):
+            similarity = shared / len(grams | _ngrams(term))
+            if similarity >= MIN_NGRAM_SIMILARITY:
+                matches.append(term)
+        return matches
+
+    def _term_entry(self, term: str) -> tuple:
+        """BM25 score per slot and posting bitset for a term, cached until the next change"""
+        entry = self._term_cache.get(term)
+        if entry is None:
+            postings = self._postings[term]
+            avg_length = (self._total_length / self._live_count) if self._live_count else 1.0
+            idf = math.log(1 + (self._live_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            scores = {}
+            term_mask = 0
+            for slot, tf in postings.items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self._doc_lengths[slot] / (avg_length or 1.0))
+                scores[slot] = idf * tf * (BM25_K1 + 1) / (tf + norm)
+                term_mask |= 1 << slot
+            entry = self._term_cache[term] = (scores, term_mask)
+        return entry
+
+    def _facet_mask(self, category: str = '', difficulty: str = '') -> int:
+        """Intersect facet bitsets with the live-document mask"""
+        mask = self._live_mask
+        if category:
+            mask &= self._facets['category'].get(category, 0)
+        if difficulty:
+            mask &= self._facets['difficulty'].get(difficulty, 0)
+        return mask
+
+    def _query_terms(self, query: str, prefix: bool) -> List[List[str]]:
+        """Resolve each query token to the index terms it matches"""
+        tokens = tokenize(query)
+        resolved = []
+        for i, token in enumerate(tokens):
+            is_last = i == len(tokens) - 1
+            if token in self._postings and not (prefix and is_last):
+                resolved.append([token])
+                continue
+            candidates = []
+            if is_last and prefix and len(token) >= MIN_PREFIX_LENGTH:
+                candidates = self._expand_prefix(token)
+            if not candidates and token in self._postings:
+                candidates = [token]
+            if not candidates and len(token) >= NGRAM_SIZE:
+                candidates = self._expand_ngrams(token)
+            resolved.append(candidates)
+        return resolved
+
+    def search(self, query: str = '', category: str = '', difficulty: str = '',
+               limit: Optional[int] = None, prefix: bool = True) -> Dict[str, Any]:
+        """
+        Rank lessons for a query with optional facet filters.
+
+        Every query token must match (AND); the last token is treated as a
+        prefix for typeahead. Returns hits plus facet counts over the matches.
+        """
+        with self._lock:
+            self._ensure_vocabulary()
+            mask = self._facet_mask(category, difficulty)
+
+            scores: Dict[int, float] = {}
+            if query.strip():
+                term_groups = self._query_terms(query, prefix)
+                if not term_groups or any(not group for group in term_groups):
+                    mask = 0
+                else:
+                    for group in term_groups:
+                        if len(group) == 1:
+                            group_scores, group_mask = self._term_entry(group[0])
+                        else:
+                            group_scores, group_mask = {}, 0
+                            for term in group:
+                                term_scores, term_mask = self._term_entry(term)
+                                group_mask |= term_mask
+                                for slot, score in term_scores.items():
+                                    if score > group_scores.get(slot, 0.0):
+                                        group_scores[slot] = score
+                        mask &= group_mask
+                        for slot, score in group_scores.items():
+                            scores[slot] = scores.get(slot, 0.0) + score
+
+            slots = self._slots_in(mask)
+            rank = lambda slot: (-scores.get(slot, 0.0), slot)
+            if limit is not None and limit < len(slots):
+                slots = heapq.nsmallest(limit, slots, key=rank)
+            else:
+                slots.sort(key=rank)
+
+            hits = []
+            for slot in slots:
+                hit = dict(self._docs[slot])
+                if slot in scores:
+                    hit['score'] = round(scores[slot], 4)
+                hits.append(hit)
+
+            return {
+                'lessons': hits,
+                'total_count': mask.bit_count(),
+                'facets': {
+                    facet: {value: (bits & mask).bit_count()
+                            for value, bits in values.items() if bits & mask}
+                    for facet, values in self._facets.items()
+                }
+            }
+
+    @staticmethod
+    def _slots_in(mask: int) -> List[int]:
+        """Slot numbers of the set bits in mask"""
+        slots = []
+        while mask:
+            low = mask & -mask
+            slots.append(low.bit_length() - 1)
+            mask ^= low
+        return slots
+
+    def ensure_current(self, loader: Callable[[], List[Dict[str, Any]]], catalog_version: Any = None,
+                       max_age: float = CATALOG_CHECK_SECONDS) -> bool:
+        """Reload the catalog when its version changed or the last check is stale
+
+        The loader (a Firestore read) runs outside the index lock, so searches
+        keep using the current index meanwhile; only the swap in refresh()
+        holds it. While another thread reloads, a populated index is served
+        as is instead of waiting.
+        """
+        if self._is_fresh(catalog_version, max_age):
+            return False
+        if not self._reload_lock.acquire(blocking=not self._live_count):
+            return False
+        try:
+            if self._is_fresh(catalog_version, max_age):
+                return False  # reloaded while this thread waited
+            lessons = loader()
+            self.refresh(lessons, catalog_version)
+            return True
+        finally:
+            self._reload_lock.release()
+
+    def _is_fresh(self, catalog_version: Any, max_age: float) -> bool:
+        with self._lock:
+            return bool(self.catalog_version == catalog_version and self.last_checked
+                        and time.monotonic() - self.last_checked < max_age)
+
+    def __len__(self) -> int:
+        return self._live_count
+
+
+# Global index instance
+lesson_search_index = LessonSearchIndex()
+
+def get_lesson_search_index() -> LessonSearchIndex:
+    """Get the global lesson search index"""
+    return lesson_search_index
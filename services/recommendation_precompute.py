@@ -0,0 +1,272 @@
+"""
+Offline recommendation precompute job for Code with Morais
+Computes top-K recommendations for every user in bulk and stores them in the
+recommendations/{uid} collection so the request path only has to read one doc
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.recommendation_engine import RecommendationEngine
+
+logger = logging.getLogger(__name__)
+
+RECOMMENDATIONS_COLLECTION = 'recommendations'
+DEFAULT_TOP_K = 5
+DEFAULT_CHUNK_SIZE = 200
+DEFAULT_MAX_AGE_SECONDS = 24 * 60 * 60  # Precomputed docs are refreshed nightly
+
+# Fields kept from each recommendation; the full lesson dict is dropped so the
+# stored document stays small
+STORED_FIELDS = [
+    'type', 'lesson_id', 'reason', 'priority', 'confidence', 'score',
+    'display_title', 'display_description', 'estimated_time', 'xp_reward'
+]
+
+# Per-process state for pool workers
+_worker_engine: Optional[RecommendationEngine] = None
+_worker_lessons: List[Dict[str, Any]] = []
+
+
+def _init_worker(all_lessons: List[Dict[str, Any]]):
+    """Build one engine per worker process and keep the lesson catalog around"""
+    global _worker_engine, _worker_lessons
+    _worker_engine = RecommendationEngine()
+    _worker_lessons = all_lessons
+
+
+def _compute_user_recommendations(item: Tuple[str, Dict[str, Any], int]) -> Tuple[str, List[Dict[str, Any]]]:
+    """Compute slim top-K recommendations for a single user (runs in a worker)"""
+    user_id, user_progress, top_k = item
+    engine = _worker_engine or RecommendationEngine()
+    recommendations = engine.generate_personalized_recommendations(
+        user_id, user_progress, _worker_lessons, limit=top_k
+    )
+    return user_id, [
+        {field: rec.get(field) for field in STORED_FIELDS}
+        for rec in recommendations
+    ]
+
+
+def _as_utc(value) -> Optional[datetime]:
+    """Normalize Firestore timestamps, datetimes and ISO strings to aware UTC"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def progress_fingerprint(lesson_progress: Optional[Dict[str, Any]]) -> str:
+    """Stable hash of a user's lesson_progress map"""
+    encoded = json.dumps(lesson_progress or {}, sort_keys=True, default=str)
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+
+
+def is_recommendation_doc_fresh(rec_doc: Optional[Dict[str, Any]],
+                                lesson_progress: Optional[Dict[str, Any]] = None,
+                                max_age_seconds: int = DEFAULT_MAX_AGE_SECONDS) -> bool:
+    """
+    Check whether a precomputed recommendations document can be served.
+
+    A document is stale when it is older than max_age_seconds or when the
+    user's lesson progress no longer matches the progress it was computed
+    from. users.updated_at is not used: logins and XP awards rewrite it too.
+    """
+    if not rec_doc or not rec_doc.get('recommendations'):
+        return False
+
+    generated_at = _as_utc(rec_doc.get('generated_at'))
+    if generated_at is None:
+        return False
+
+    if (datetime.now(timezone.utc) - generated_at).total_seconds() > max_age_seconds:
+        return False
+
+    if lesson_progress is not None and rec_doc.get('progress_fingerprint') != progress_fingerprint(lesson_progress):
+        return False
+
+    return True
+
+
+def get_precomputed_recommendations(firebase_service, user_id: str,
+                                    lesson_progress: Optional[Dict[str, Any]] = None,
+                                    max_age_seconds: int = DEFAULT_MAX_AGE_SECONDS) -> Optional[List[Dict[str, Any]]]:
+    """Return stored recommendations for a user, or None if missing or stale"""
+    if not firebase_service or not firebase_service.is_available():
+        return None
+
+    rec_doc = firebase_service.get_precomputed_recommendations(user_id)
+    if is_recommendation_doc_fresh(rec_doc, lesson_progress, max_age_seconds):
+        return rec_doc['recommendations']
+    return None
+
+
+class PrecomputeCheckpoint:
+    """JSON checkpoint file recording the last user written by the job"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self) -> Dict[str, Any]:
+        """Load checkpoint state, or an empty state if none exists"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable checkpoint {self.path}: {str(e)}")
+            return {}
+
+    def save(self, state: Dict[str, Any]):
+        """Atomically persist checkpoint state"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        """Remove the checkpoint after a completed run"""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class RecommendationPrecomputeJob:
+    """
+    Batch job that streams every user, computes recommendations in a process
+    pool and bulk-writes them to recommendations/{uid}
+    """
+
+    def __init__(self, firebase_service,
+                 top_k: int = DEFAULT_TOP_K,
+                 workers: Optional[int] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 checkpoint_path: str = 'logs/recommendation_precompute.checkpoint.json'):
+        self.firebase_service = firebase_service
+        self.top_k = top_k
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.checkpoint = PrecomputeCheckpoint(checkpoint_path)
+        self.metrics = {
+            'users_processed': 0,
+            'users_failed': 0,
+            'elapsed_seconds': 0.0,
+            'users_per_second': 0.0
+        }
+
+    def run(self, resume: bool = True) -> Dict[str, Any]:
+        """
+        Run the job to completion.
+
+        Args:
+            resume: Continue after the uid recorded in the checkpoint file
+
+        Returns:
+            Throughput metrics for the run
+        """
+        if not self.firebase_service or not self.firebase_service.is_available():
+            raise RuntimeError("Firebase not available, cannot precompute recommendations")
+
+        state = self.checkpoint.load() if resume else {}
+        last_uid = state.get('last_uid')
+        if last_uid:
+            logger.info(f"Resuming recommendation precompute after user {last_uid}")
+
+        all_lessons = self._load_lessons()
+        started = time.perf_counter()
+        writer = self.firebase_service.db.bulk_writer()
+        collection = self.firebase_service.db.collection(RECOMMENDATIONS_COLLECTION)
+
+        with ProcessPoolExecutor(max_workers=self.workers,
+                                 initializer=_init_worker,
+                                 initargs=(all_lessons,)) as pool:
+            chunk = []
+            for user_id, user_data in self.firebase_service.stream_users(start_after=last_uid):
+                chunk.append((user_id, user_data.get('lesson_progress', {}) or {}, self.top_k))
+                if len(chunk) >= self.chunk_size:
+                    self._process_chunk(pool, writer, collection, chunk, started)
+                    chunk = []
+            if chunk:
+                self._process_chunk(pool, writer, collection, chunk, started)
+
+        writer.close()
+        self.checkpoint.clear()
+        self._update_throughput(started)
+        logger.info(
+            f"Recommendation precompute finished: {self.metrics['users_processed']} users "
+            f"in {self.metrics['elapsed_seconds']:.1f}s "
+            f"({self.metrics['users_per_second']:.1f} users/sec)"
+        )
+        return self.metrics
+
+    def _load_lessons(self) -> List[Dict[str, Any]]:
+        """Load the lesson catalog once for every worker"""
+        from models.lesson import get_all_lessons
+        return get_all_lessons()
+
+    def _process_chunk(self, pool, writer, collection, chunk, started: float):
+        """Compute a chunk in the pool, flush its writes and advance the checkpoint"""
+        generated_at = datetime.now(timezone.utc)
+        chunksize = max(1, len(chunk) // (self.workers * 4))
+
+        try:
+            results = list(pool.map(_compute_user_recommendations, chunk, chunksize=chunksize))
+        except Exception as e:
+            logger.error(f"Recommendation chunk failed, retrying per user: {str(e)}")
+            results = []
+            for item in chunk:
+                try:
+                    results.append(pool.submit(_compute_user_recommendations, item).result())
+                except Exception as user_error:
+                    self.metrics['users_failed'] += 1
+                    logger.error(f"Failed to compute recommendations for {item[0]}: {str(user_error)}")
+
+        fingerprints = {user_id: progress_fingerprint(progress) for user_id, progress, _ in chunk}
+        for user_id, recommendations in results:
+            writer.set(collection.document(user_id), {
+                'user_id': user_id,
+                'recommendations': recommendations,
+                'top_k': self.top_k,
+                'progress_fingerprint': fingerprints[user_id],
+                'generated_at': generated_at
+            })
+
+        # Only advance the checkpoint once this chunk is durably written
+        writer.flush()
+        self.metrics['users_processed'] += len(results)
+        self._update_throughput(started)
+        self.checkpoint.save({
+            'last_uid': chunk[-1][0],
+            'users_processed': self.metrics['users_processed'],
+            'updated_at': datetime.now(timezone.utc).isoformat()
+        })
+        logger.info(
+            f"Precomputed {self.metrics['users_processed']} users "
+            f"({self.metrics['users_per_second']:.1f} users/sec)"
+        )
+
+    def _update_throughput(self, started: float):
+        """Refresh elapsed time and users/sec"""
+        elapsed = time.perf_counter() - started
+        self.metrics['elapsed_seconds'] = elapsed
+        self.metrics['users_per_second'] = (
+            self.metrics['users_processed'] / elapsed if elapsed > 0 else 0.0
+        )
@@ -0,0 +1,201 @@
+"""
+Background resource sampler for Code with Morais
+Samples CPU, memory, disk, open FDs and worker RSS into a ring buffer
+
+Status and health endpoints read the latest sample instead of calling psutil
+(cpu_percent(interval=...) sleeps inside the request). One sampler thread
+runs per process; get_resource_sampler() restarts it after a fork so each
+gunicorn worker samples itself.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Optional, Dict, Any, List
+
+from utils.lazy_imports import lazy_module
+
+# Imported by the sampler thread, not at app import
+psutil = lazy_module('psutil')
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SAMPLE_INTERVAL = 5.0      # seconds between samples
+DEFAULT_CAPACITY = 720             # one hour of history at the default interval
+DEFAULT_WINDOWS = (60, 300, 900)   # seconds, for history aggregates
+
+# Numeric sample fields aggregated by history()
+AGGREGATE_FIELDS = (
+    'cpu_percent', 'process_cpu_percent', 'memory_percent', 'memory_used',
+    'disk_percent', 'open_fds', 'rss', 'workers_rss_total',
+)
+
+
+class ResourceSampler:
+    """Ring buffer of periodic resource samples filled by a daemon thread"""
+
+    def __init__(self, interval: float = DEFAULT_SAMPLE_INTERVAL, capacity: int = DEFAULT_CAPACITY,
+                 disk_path: str = '/'):
+        self.interval = interval
+        self.disk_path = disk_path
+        self._samples: deque = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._process: Optional['psutil.Process'] = None
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def start(self):
+        """Start sampling in this process (no-op if already running here)"""
+        # Concurrent first requests in a worker must not start two sampler threads
+        with self._start_lock:
+            if self.is_running():
+                return
+            self._pid = os.getpid()
+            self._process = psutil.Process(self._pid)
+            self._stop.clear()
+            with self._lock:
+                self._samples.clear()  # samples inherited across fork describe the parent
+
+            # Prime the non-blocking CPU counters so the first sample is meaningful
+            psutil.cpu_percent(interval=None)
+            self._process.cpu_percent(interval=None)
+
+            self._thread = threading.Thread(target=self._run, name='resource-sampler', daemon=True)
+            self._thread.start()
+        logger.info(f"Resource sampler started (pid={self._pid}, interval={self.interval}s)")
+
+    def stop(self):
+        """Stop the sampler thread"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval + 1)
+
+    def is_running(self) -> bool:
+        """True when the sampler thread is alive in this process"""
+        return bool(self._thread and self._thread.is_alive() and self._pid == os.getpid())
+
+    def _run(self):
+        """Sampler loop"""
+        while not self._stop.is_set():
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"Error sampling system resources: {str(e)}")
+            self._stop.wait(self.interval)
+
+    # ------------------------------------------------------------------
+    # Sampling
+    # ------------------------------------------------------------------
+
+    def _worker_rss(self) -> Dict[str, int]:
+        """RSS of this worker and its sibling workers under a gunicorn master"""
+        workers = {}
+        try:
+            parent = self._process.parent()
+            if parent and 'gunicorn' in ' '.join(parent.cmdline()):
+                for child in parent.children():
+                    try:
+                        workers[str(child.pid)] = child.memory_info().rss
+                    except (psutil.NoSuchProcess, psutil.AccessDenied):
+                        continue
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+        if not workers:
+            workers[str(self._pid)] = self._process.memory_info().rss
+        return workers
+
+    def sample(self) -> Dict[str, Any]:
+        """Take one sample now and append it to the ring buffer"""
+        if self._process is None or self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._process = psutil.Process(self._pid)
+
+        memory = psutil.virtual_memory()
+        disk = psutil.disk_usage(self.disk_path)
+        try:
+            open_fds = self._process.num_fds()
+        except (AttributeError, psutil.AccessDenied):
+            open_fds = len(self._process.open_files())  # Windows has no num_fds
+        workers = self._worker_rss()
+
+        sample = {
+            'timestamp': time.time(),
+            'pid': self._pid,
+            'cpu_percent': psutil.cpu_percent(interval=None),
+            'process_cpu_percent': self._process.cpu_percent(interval=None),
+            'memory_percent': memory.percent,
+            'memory_used': memory.used,
+            'memory_available': memory.available,
+            'memory_total': memory.total,
+            'disk_percent': disk.percent,
+            'disk_used': disk.used,
+            'disk_free': disk.free,
+            'disk_total': disk.total,
+            'open_fds': open_fds,
+            'rss': self._process.memory_info().rss,
+            'workers_rss': workers,
+            'workers_rss_total': sum(workers.values()),
+        }
+        with self._lock:
+            self._samples.append(sample)
+        return sample
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        """Most recent sample, or None before the first one"""
+        with self._lock:
+            return self._samples[-1] if self._samples else None
+
+    def samples(self, window_seconds: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Samples newer than window_seconds (all when None), oldest first"""
+        with self._lock:
+            samples = list(self._samples)
+        if window_seconds is None:
+            return samples
+        cutoff = time.time() - window_seconds
+        return [s for s in samples if s['timestamp'] >= cutoff]
+
+    def history(self, windows=DEFAULT_WINDOWS) -> Dict[str, Any]:
+        """min/avg/max of each numeric field over each window (seconds)"""
+        result = {}
+        for window in windows:
+            samples = self.samples(window)
+            fields = {}
+            for field in AGGREGATE_FIELDS:
+                values = [s[field] for s in samples if s.get(field) is not None]
+                if values:
+                    fields[field] = {
+                        'min': min(values),
+                        'avg': round(sum(values) / len(values), 2),
+                        'max': max(values),
+                    }
+            result[str(window)] = {'samples': len(samples), 'metrics': fields}
+        return result
+
+
+# Global sampler instance
+resource_sampler = ResourceSampler(
+    interval=float(os.environ.get('RESOURCE_SAMPLE_INTERVAL', DEFAULT_SAMPLE_INTERVAL)),
+    capacity=int(os.environ.get('RESOURCE_SAMPLE_CAPACITY', DEFAULT_CAPACITY))
+)
+
+def get_resource_sampler() -> ResourceSampler:
+    """Get the global sampler, (re)starting it in the current process"""
+    if not resource_sampler.is_running():
+        resource_sampler.start()  # re-checks under the start lock
+    return resource_sampler
+
+def get_latest_resources() -> Dict[str, Any]:
+    """Latest sample, sampling once synchronously if none exists yet"""
+    sampler = get_resource_sampler()
+    return sampler.latest() or sampler.sample()
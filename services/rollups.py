@@ -0,0 +1,263 @@
+"""
+Time-bucketed XP and activity rollups for Code with Morais
+Charts ("XP per day over 30 days", the activity heatmap) read one small
+counter document per bucket instead of range-querying activities
+
+Layout:
+    user_rollups/{uid}/days/{YYYY-MM-DD}     updated by Increment on each event
+    user_rollups/{uid}/weeks/{YYYY-Www}      ISO weeks, filled by compaction
+    user_rollups/{uid}/months/{YYYY-MM}      calendar months, filled by compaction
+
+Day documents are written in the same batch or transaction as the event
+(see services.user_stats.stage_stats_writes). RollupCompactionJob folds day
+documents older than the retention window into their week and month and
+deletes them; FirebaseService.get_rollup_series() merges the compacted
+buckets with whatever day documents remain, so week and month totals are
+the same before and after compaction.
+"""
+import logging
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from utils.lazy_imports import lazy_module
+from services.streaks import local_date, user_timezone
+
+gcloud_firestore = lazy_module('google.cloud.firestore')
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_COLLECTION = 'user_rollups'
+GRANULARITIES = ('day', 'week', 'month')
+BUCKET_COLLECTIONS = {'day': 'days', 'week': 'weeks', 'month': 'months'}
+ROLLUP_FIELDS = ('xp', 'activities', 'lessons_completed', 'subtopics_completed',
+                 'quizzes_completed', 'code_executions', 'time_spent')
+# user_stats delta -> rollup counter
+STATS_TO_ROLLUP = {
+    'xp_earned': 'xp',
+    'lessons_completed': 'lessons_completed',
+    'subtopics_completed': 'subtopics_completed',
+    'quizzes_completed': 'quizzes_completed',
+    'code_executions': 'code_executions',
+    'total_time_spent': 'time_spent',
+}
+DEFAULT_RETENTION_DAYS = 90
+MAX_SERIES_BUCKETS = 400
+# Days folded per batch: one delete each plus at most one week and one
+# month write per 7 days stays below Firestore's 500 writes per batch
+FOLD_PAGE_SIZE = 300
+
+
+def rollup_day(user_data: Optional[Dict[str, Any]] = None, timestamp=None) -> date:
+    """The day bucket of an event, in the user's timezone when the user document is at hand"""
+    return local_date(timestamp or datetime.now(timezone.utc), user_timezone(user_data))
+
+
+def week_key(day: date) -> str:
+    """ISO week bucket id, e.g. '2025-W07'"""
+    year, week, _ = day.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def month_key(day: date) -> str:
+    """Calendar month bucket id, e.g. '2025-02'"""
+    return day.strftime('%Y-%m')
+
+
+def bucket_key(day: date, granularity: str) -> str:
+    """Bucket id of a day at the given granularity"""
+    if granularity == 'week':
+        return week_key(day)
+    if granularity == 'month':
+        return month_key(day)
+    return day.isoformat()
+
+
+def bucket_start(day: date, granularity: str) -> date:
+    """First day of the bucket containing day"""
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def _next_bucket(day: date, granularity: str) -> date:
+    if granularity == 'week':
+        return day + timedelta(days=7)
+    if granularity == 'month':
+        return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return day + timedelta(days=1)
+
+
+def bucket_starts(start: date, end: date, granularity: str) -> List[date]:
+    """First day of every bucket overlapping [start, end]"""
+    starts = []
+    current = bucket_start(start, granularity)
+    while current <= end:
+        starts.append(current)
+        current = _next_bucket(current, granularity)
+    return starts
+
+
+def rollup_deltas(stats_deltas: Optional[Dict[str, Any]] = None, activities: int = 0) -> Dict[str, int]:
+    """Rollup counters for an event from its user_stats deltas"""
+    deltas = {}
+    for stats_field, rollup_field in STATS_TO_ROLLUP.items():
+        value = (stats_deltas or {}).get(stats_field, 0)
+        if value:
+            deltas[rollup_field] = value
+    if activities:
+        deltas['activities'] = activities
+    return deltas
+
+
+def day_update(day: date, deltas: Dict[str, int]) -> Dict[str, Any]:
+    """Document for set(..., merge=True) on a day bucket; empty when nothing changes"""
+    update = {field: gcloud_firestore.Increment(value) for field, value in deltas.items() if value}
+    if update:
+        update['date'] = day.isoformat()
+    return update
+
+
+def bucket_ref(db, user_id: str, granularity: str, key: str):
+    """Reference to one rollup bucket document"""
+    return db.collection(ROLLUP_COLLECTION).document(user_id).collection(BUCKET_COLLECTIONS[granularity]).document(key)
+
+
+def parse_day(value) -> Optional[date]:
+    """A date from 'YYYY-MM-DD' (None when missing or malformed)"""
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def dense_series(start: date, end: date, granularity: str, buckets: Dict[str, Dict[str, Any]],
+                 fields: Iterable[str] = ROLLUP_FIELDS) -> Dict[str, Any]:
+    """Zero-filled series for every bucket in [start, end] from {bucket_key: counters}"""
+    starts = bucket_starts(start, end, granularity)
+    fields = tuple(fields)
+    series = {field: [] for field in fields}
+    for first_day in starts:
+        counters = buckets.get(bucket_key(first_day, granularity)) or {}
+        for field in fields:
+            series[field].append(counters.get(field, 0) or 0)
+    return {
+        'granularity': granularity,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'labels': [first_day.isoformat() for first_day in starts],
+        'series': series,
+    }
+
+
+def regroup_series(series_result: Dict[str, Any], granularity: str) -> Dict[str, Any]:
+    """Re-bucket a day series into weeks or months without reading anything again"""
+    buckets: Dict[str, Dict[str, Any]] = {}
+    fields = tuple(series_result['series'])
+    for index, label in enumerate(series_result['labels']):
+        counters = {field: series_result['series'][field][index] for field in fields}
+        add_counters(buckets.setdefault(bucket_key(parse_day(label), granularity), {}), counters)
+    return dense_series(parse_day(series_result['start']), parse_day(series_result['end']),
+                        granularity, buckets, fields)
+
+
+def add_counters(total: Dict[str, Any], counters: Dict[str, Any]) -> Dict[str, Any]:
+    """Sum rollup counters into total"""
+    for field in ROLLUP_FIELDS:
+        value = counters.get(field, 0) or 0
+        if value:
+            total[field] = total.get(field, 0) + value
+    return total
+
+
+class RollupCompactionJob:
+    """
+    Folds day buckets older than the retention window into weeks and months.
+
+    Each user's old days are folded a page at a time: the batch that
+    increments a week and month also deletes the days it folded, so a day is
+    never counted twice even if the job stops halfway. Run one job at a time.
+    """
+
+    def __init__(self, firebase_service, retention_days: int = DEFAULT_RETENTION_DAYS,
+                 page_size: int = FOLD_PAGE_SIZE, dry_run: bool = False, today: Optional[date] = None):
+        self.firebase_service = firebase_service
+        self.retention_days = retention_days
+        self.page_size = min(page_size, FOLD_PAGE_SIZE)
+        self.dry_run = dry_run
+        self.today = today
+        self.metrics = {
+            'users_scanned': 0,
+            'days_compacted': 0,
+            'users_compacted': 0,
+            'elapsed_seconds': 0.0,
+        }
+
+    def run(self) -> Dict[str, Any]:
+        """Run the compaction to completion and return its metrics"""
+        if not self.firebase_service or not self.firebase_service.is_available():
+            raise RuntimeError("Firebase not available, cannot compact rollups")
+
+        started = time.perf_counter()
+        today = self.today or datetime.now(timezone.utc).date()
+        # Never split a week: only whole weeks before the cutoff are folded
+        cutoff = bucket_start(today - timedelta(days=self.retention_days), 'week')
+        db = self.firebase_service.db
+
+        for user_ref in db.collection(ROLLUP_COLLECTION).list_documents():
+            self.metrics['users_scanned'] += 1
+            query = user_ref.collection('days').where('date', '<', cutoff.isoformat()).order_by('date')
+            compacted = False
+            cursor = None
+            while True:
+                page = query.limit(self.page_size)
+                if cursor is not None:
+                    # Only a dry run pages by cursor; otherwise folded days are deleted
+                    page = page.start_after({'date': cursor})
+                days = list(page.stream())
+                if not days:
+                    break
+                compacted = True
+                self._fold(db, user_ref.id, days)
+                if len(days) < self.page_size:
+                    break
+                if self.dry_run:
+                    cursor = (days[-1].to_dict() or {}).get('date')
+            if compacted:
+                self.metrics['users_compacted'] += 1
+
+        self.metrics['elapsed_seconds'] = time.perf_counter() - started
+        logger.info(
+            f"Rollup compaction finished: {self.metrics['days_compacted']} days of "
+            f"{self.metrics['users_compacted']} users folded before {cutoff.isoformat()} "
+            f"in {self.metrics['elapsed_seconds']:.1f}s"
+        )
+        return self.metrics
+
+    def _fold(self, db, user_id: str, day_docs: list):
+        weeks: Dict[str, Dict[str, Any]] = {}
+        months: Dict[str, Dict[str, Any]] = {}
+        for doc in day_docs:
+            counters = doc.to_dict() or {}
+            day = parse_day(counters.get('date') or doc.id)
+            if day is None:
+                continue
+            add_counters(weeks.setdefault(week_key(day), {}), counters)
+            add_counters(months.setdefault(month_key(day), {}), counters)
+        self.metrics['days_compacted'] += len(day_docs)
+        if self.dry_run:
+            return
+
+        batch = db.batch()
+        for granularity, buckets in (('week', weeks), ('month', months)):
+            for key, counters in buckets.items():
+                update = {field: gcloud_firestore.Increment(value) for field, value in counters.items()}
+                update['key'] = key
+                batch.set(bucket_ref(db, user_id, granularity, key), update, merge=True)
+        for doc in day_docs:
+            batch.delete(doc.reference)
+        batch.commit()
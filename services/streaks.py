@@ -0,0 +1,225 @@
+"""
+Learning streaks for Code with Morais
+Streak state is denormalized onto users/{uid} and advanced whenever an
+activity is recorded, so reading a streak costs no extra queries
+
+Fields on the user document:
+    streak              consecutive active days ending at streak_last_active
+    max_streak          longest streak ever reached
+    streak_last_active  last active day ('YYYY-MM-DD') in the user's timezone
+    timezone            IANA timezone name (optional, defaults to UTC)
+
+The stored streak is only advanced on writes; streak_for_display() treats it
+as broken when the user has been inactive since before yesterday.
+StreakBackfillJob rebuilds the fields for existing users from the
+activities collection.
+"""
+import logging
+import time
+from datetime import datetime, date, timedelta, timezone
+from typing import Any, Dict, Iterable, Optional
+
+try:
+    from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+except ImportError:
+    ZoneInfo = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEZONE = 'UTC'
+MAX_STREAK_DAYS = 3650
+STREAK_FIELDS = ('streak', 'max_streak', 'streak_last_active')
+
+
+def user_timezone(user_data: Optional[Dict[str, Any]]):
+    """The user's tzinfo, falling back to UTC for missing or unknown names"""
+    name = (user_data or {}).get('timezone') or DEFAULT_TIMEZONE
+    if ZoneInfo is None or name == DEFAULT_TIMEZONE:
+        return timezone.utc
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return timezone.utc
+
+
+def is_valid_timezone(name: str) -> bool:
+    """Whether a client-supplied timezone name can be stored"""
+    if not isinstance(name, str) or not name or len(name) > 64:
+        return False
+    if name == DEFAULT_TIMEZONE:
+        return True
+    if ZoneInfo is None:
+        return False
+    try:
+        ZoneInfo(name)
+        return True
+    except (ZoneInfoNotFoundError, ValueError):
+        return False
+
+
+def local_date(timestamp, tz) -> Optional[date]:
+    """Calendar day of a Firestore timestamp, datetime or ISO string in tz"""
+    if timestamp is None:
+        return None
+    if isinstance(timestamp, str):
+        try:
+            timestamp = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if not isinstance(timestamp, datetime):
+        return None
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp.astimezone(tz).date()
+
+
+def _parse_day(value) -> Optional[date]:
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def advance_streak(user_data: Dict[str, Any], activity_day: date) -> Dict[str, Any]:
+    """
+    Fields to write after an activity on activity_day.
+
+    Returns an empty dict when nothing changes (another activity on the same
+    day, or a back-dated activity older than the last active day).
+    """
+    last_active = _parse_day(user_data.get('streak_last_active'))
+    current = user_data.get('streak', 0) or 0
+
+    if last_active is not None and activity_day <= last_active:
+        return {}
+    if last_active is not None and activity_day - last_active == timedelta(days=1):
+        current = min(current + 1, MAX_STREAK_DAYS)
+    else:
+        current = 1
+
+    return {
+        'streak': current,
+        'max_streak': max(current, user_data.get('max_streak', 0) or 0),
+        'streak_last_active': activity_day.isoformat(),
+    }
+
+
+def streak_update_for_activity(user_data: Dict[str, Any], timestamp=None) -> Dict[str, Any]:
+    """advance_streak() for an activity happening at timestamp (default: now)"""
+    activity_day = local_date(timestamp or datetime.now(timezone.utc), user_timezone(user_data))
+    return advance_streak(user_data, activity_day)
+
+
+def streak_for_display(user_data: Optional[Dict[str, Any]], now: Optional[datetime] = None) -> int:
+    """Current streak from the stored fields; 0 once a full day was missed"""
+    if not user_data:
+        return 0
+    last_active = _parse_day(user_data.get('streak_last_active'))
+    if last_active is None:
+        return user_data.get('streak', 0) or 0  # not backfilled yet
+    today = local_date(now or datetime.now(timezone.utc), user_timezone(user_data))
+    if today - last_active > timedelta(days=1):
+        return 0
+    return user_data.get('streak', 0) or 0
+
+
+def compute_streak_state(days: Iterable[date]) -> Dict[str, Any]:
+    """Streak fields from every active day of a user (used by the backfill)"""
+    ordered = sorted(set(days))
+    if not ordered:
+        return {'streak': 0, 'max_streak': 0, 'streak_last_active': None}
+
+    longest = run = 1
+    for previous, day in zip(ordered, ordered[1:]):
+        run = run + 1 if day - previous == timedelta(days=1) else 1
+        longest = max(longest, run)
+
+    # The trailing run is stored as-is; streak_for_display() decides whether
+    # it is still alive, exactly as for incrementally maintained state
+    return {
+        'streak': min(run, MAX_STREAK_DAYS),
+        'max_streak': min(longest, MAX_STREAK_DAYS),
+        'streak_last_active': ordered[-1].isoformat(),
+    }
+
+
+class StreakBackfillJob:
+    """
+    Rebuilds streak fields for every user from the activities collection.
+
+    One pass over users collects timezones, one pass over activities (two
+    projected fields per document) collects active days, and the results are
+    bulk-written with merge so no other user field is touched.
+    """
+
+    def __init__(self, firebase_service, page_size: int = 1000, dry_run: bool = False):
+        self.firebase_service = firebase_service
+        self.page_size = page_size
+        self.dry_run = dry_run
+        self.metrics = {
+            'users_scanned': 0,
+            'activities_scanned': 0,
+            'users_updated': 0,
+            'elapsed_seconds': 0.0,
+        }
+
+    def run(self) -> Dict[str, Any]:
+        """Run the backfill to completion and return its metrics"""
+        if not self.firebase_service or not self.firebase_service.is_available():
+            raise RuntimeError("Firebase not available, cannot backfill streaks")
+
+        started = time.perf_counter()
+        users = {}
+        for user_id, user_data in self.firebase_service.stream_users(page_size=self.page_size):
+            # Keep only what the backfill needs, not whole user documents
+            users[user_id] = {field: user_data.get(field) for field in STREAK_FIELDS + ('timezone',)}
+            self.metrics['users_scanned'] += 1
+
+        zones = {user_id: user_timezone(user_data) for user_id, user_data in users.items()}
+        active_days: Dict[str, set] = {}
+        for activity in self.firebase_service.stream_activities(page_size=self.page_size):
+            self.metrics['activities_scanned'] += 1
+            user_id = activity.get('user_id')
+            if user_id not in zones:
+                continue
+            day = local_date(activity.get('timestamp'), zones[user_id])
+            if day is not None:
+                active_days.setdefault(user_id, set()).add(day)
+
+        writer = None if self.dry_run else self.firebase_service.db.bulk_writer()
+        collection = self.firebase_service.db.collection('users')
+        for user_id, user_data in users.items():
+            state = compute_streak_state(active_days.get(user_id, ()))
+            state = self._merge_live_state(user_data, state)
+            # Activities pruned by retention are gone from the scan; never lower a record
+            state['max_streak'] = max(state['max_streak'], user_data.get('max_streak') or 0)
+            if all(user_data[field] == value for field, value in state.items()):
+                continue
+            self.metrics['users_updated'] += 1
+            if writer is not None:
+                writer.set(collection.document(user_id), state, merge=True)
+
+        if writer is not None:
+            writer.close()
+        self.metrics['elapsed_seconds'] = time.perf_counter() - started
+        logger.info(
+            f"Streak backfill finished: {self.metrics['users_updated']} of "
+            f"{self.metrics['users_scanned']} users updated from "
+            f"{self.metrics['activities_scanned']} activities in {self.metrics['elapsed_seconds']:.1f}s"
+        )
+        return self.metrics
+
+    @staticmethod
+    def _merge_live_state(user_data: Dict[str, Any], state: Dict[str, Any]) -> Dict[str, Any]:
+        """Keep incrementally maintained state that is newer than the scan"""
+        live_last = _parse_day(user_data.get('streak_last_active'))
+        scanned_last = _parse_day(state['streak_last_active'])
+        if live_last is not None and (scanned_last is None or live_last > scanned_last):
+            state = {
+                'streak': user_data.get('streak', 0) or 0,
+                'max_streak': max(state['max_streak'], user_data.get('max_streak', 0) or 0),
+                'streak_last_active': live_last.isoformat(),
+            }
+        return state
@@ -0,0 +1,321 @@
+"""
+Materialized per-user statistics for Code with Morais
+One small user_stats/{uid} document holds every counter the profile stats
+endpoints and achievement checks need, so they read a single document
+instead of deriving counts from users, quiz_results and activities
+
+Each domain event produces a nested dict of plain deltas, e.g.
+    {'quizzes_completed': 1, 'progress_by_category': {'python': {'time_spent': 30}}}
+which stats_update() turns into Firestore Increment transforms.
+stage_stats_writes() adds it, and the matching day rollup (services.rollups),
+to the same batch or transaction as the event's own write, so the counters
+never drift from the data they summarize.
+
+Fields on the stats document:
+    code_executions, code_errors            /run_python calls and failed runs
+    quizzes_completed, quizzes_passed,
+    perfect_quiz_scores, quiz_time_spent    quiz submissions (summed durations)
+    subtopics_completed, lessons_completed  lesson progress
+    total_time_spent                        minutes reported by lesson progress
+    xp_earned, achievements_unlocked        rewards
+    progress_by_category.{category}         completed, subtopics, time_spent
+    streak, max_streak, streak_last_active,
+    timezone                                mirrored from users/{uid}
+
+UserStatsRebuildJob recomputes the documents from the raw collections.
+"""
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from utils.lazy_imports import lazy_module
+from services.streaks import STREAK_FIELDS
+from services.rollups import rollup_day, rollup_deltas, day_update, bucket_ref
+
+gcloud_firestore = lazy_module('google.cloud.firestore')
+
+logger = logging.getLogger(__name__)
+
+USER_STATS_COLLECTION = 'user_stats'
+DEFAULT_CATEGORY = 'python'
+COUNTER_FIELDS = (
+    'code_executions', 'code_errors',
+    'quizzes_completed', 'quizzes_passed', 'perfect_quiz_scores', 'quiz_time_spent',
+    'subtopics_completed', 'lessons_completed', 'total_time_spent',
+    'xp_earned', 'achievements_unlocked',
+)
+CATEGORY_FIELDS = ('completed', 'subtopics', 'time_spent')
+MIRRORED_FIELDS = STREAK_FIELDS + ('timezone',)
+# Counters with no raw source to rebuild from; the rebuild carries them over
+CARRIED_FIELDS = ('code_executions', 'code_errors')
+PASS_PERCENTAGE = 70
+
+
+def lesson_category(lesson: Optional[Dict[str, Any]]) -> str:
+    """Category a lesson's progress is counted under"""
+    return (lesson or {}).get('category') or DEFAULT_CATEGORY
+
+
+def code_execution_deltas(succeeded: bool) -> Dict[str, Any]:
+    """Deltas for one /run_python call"""
+    return {'code_executions': 1, 'code_errors': 0 if succeeded else 1}
+
+
+def quiz_deltas(result_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Deltas for one saved quiz result"""
+    percentage = result_data.get('percentage', 0) or 0
+    passed = result_data.get('passed')
+    if passed is None:
+        passed = percentage >= PASS_PERCENTAGE
+    return {
+        'quizzes_completed': 1,
+        'quizzes_passed': 1 if passed else 0,
+        'perfect_quiz_scores': 1 if percentage >= 100 else 0,
+        'quiz_time_spent': max(0, int(result_data.get('duration', 0) or 0)),
+    }
+
+
+def lesson_progress_deltas(category: str, subtopics: int = 0, lesson_completed: bool = False,
+                           time_spent: int = 0) -> Dict[str, Any]:
+    """Deltas for newly completed subtopics, a newly completed lesson and added time"""
+    time_spent = max(0, int(time_spent or 0))
+    return {
+        'subtopics_completed': subtopics,
+        'lessons_completed': 1 if lesson_completed else 0,
+        'total_time_spent': time_spent,
+        'progress_by_category': {category: {
+            'completed': 1 if lesson_completed else 0,
+            'subtopics': subtopics,
+            'time_spent': time_spent,
+        }},
+    }
+
+
+def xp_deltas(xp: int) -> Dict[str, Any]:
+    """Deltas for an XP award"""
+    return {'xp_earned': max(0, int(xp or 0))}
+
+
+def achievement_deltas(achievements: list) -> Dict[str, Any]:
+    """Deltas for newly unlocked achievements and the XP they award"""
+    return {
+        'achievements_unlocked': len(achievements),
+        'xp_earned': sum(a.get('points', 0) for a in achievements),
+    }
+
+
+def combine_deltas(*deltas: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Sum several delta dicts (nested maps are summed key by key, other values replaced)"""
+    combined: Dict[str, Any] = {}
+    for delta in deltas:
+        for key, value in (delta or {}).items():
+            if isinstance(value, dict):
+                combined[key] = combine_deltas(combined.get(key), value)
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                combined[key] = (combined.get(key) or 0) + value
+            else:
+                combined[key] = value
+    return combined
+
+
+def _increments(deltas: Dict[str, Any]) -> Dict[str, Any]:
+    update = {}
+    for key, value in deltas.items():
+        if isinstance(value, dict):
+            nested = _increments(value)
+            if nested:
+                update[key] = nested
+        elif value:
+            update[key] = gcloud_firestore.Increment(value)
+    return update
+
+
+def stats_update(deltas: Optional[Dict[str, Any]] = None,
+                 mirrored: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Document for set(..., merge=True): Increments for non-zero deltas plus mirrored fields"""
+    update = _increments(deltas or {})
+    update.update({field: value for field, value in (mirrored or {}).items() if field in MIRRORED_FIELDS})
+    if update:
+        update['updated_at'] = gcloud_firestore.SERVER_TIMESTAMP
+    return update
+
+
+def stage_stats_writes(db, writer, user_id: str, deltas: Optional[Dict[str, Any]] = None,
+                       mirrored: Optional[Dict[str, Any]] = None, activities: int = 0,
+                       user_data: Optional[Dict[str, Any]] = None) -> int:
+    """
+    Add an event's user_stats and day rollup writes to a batch or transaction.
+
+    The day bucket uses the user's timezone when user_data is at hand and
+    UTC otherwise. Returns the number of writes staged.
+    """
+    staged = 0
+    stats = stats_update(deltas, mirrored)
+    if stats:
+        writer.set(db.collection(USER_STATS_COLLECTION).document(user_id), stats, merge=True)
+        staged += 1
+    day = rollup_day(user_data)
+    rollup = day_update(day, rollup_deltas(deltas, activities))
+    if rollup:
+        writer.set(bucket_ref(db, user_id, 'day', day.isoformat()), rollup, merge=True)
+        staged += 1
+    return staged
+
+
+def streak_mirror(user_data: Dict[str, Any], streak_update: Dict[str, Any]) -> Dict[str, Any]:
+    """Streak fields (and timezone) to copy onto the stats document after an activity"""
+    if not streak_update:
+        return {}
+    mirrored = dict(streak_update)
+    if user_data.get('timezone'):
+        mirrored['timezone'] = user_data['timezone']
+    return mirrored
+
+
+def empty_stats() -> Dict[str, Any]:
+    """A stats document with every counter at zero"""
+    stats: Dict[str, Any] = {field: 0 for field in COUNTER_FIELDS}
+    stats['progress_by_category'] = {}
+    return stats
+
+
+def stats_summary(stats_doc: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Stats document with missing counters filled in as zero"""
+    summary = empty_stats()
+    for field in COUNTER_FIELDS:
+        summary[field] = (stats_doc or {}).get(field, 0) or 0
+    for category, progress in ((stats_doc or {}).get('progress_by_category') or {}).items():
+        summary['progress_by_category'][category] = {
+            field: (progress or {}).get(field, 0) or 0 for field in CATEGORY_FIELDS
+        }
+    for field in MIRRORED_FIELDS:
+        if (stats_doc or {}).get(field) is not None:
+            summary[field] = stats_doc[field]
+    return summary
+
+
+def stats_from_user_doc(user_data: Dict[str, Any], categories: Dict[str, str]) -> Dict[str, Any]:
+    """Counters derivable from a users/{uid} document (lesson_id -> category in categories)"""
+    stats = empty_stats()
+    for lesson_id, progress in (user_data.get('lesson_progress') or {}).items():
+        if not isinstance(progress, dict):
+            continue
+        stats = combine_deltas(stats, lesson_progress_deltas(
+            categories.get(lesson_id, DEFAULT_CATEGORY),
+            subtopics=len(progress.get('completed_subtopics') or []),
+            lesson_completed=bool(progress.get('completed')),
+            time_spent=progress.get('time_spent', 0),
+        ))
+    xp = max(user_data.get('xp', 0) or 0, user_data.get('total_xp', 0) or 0)
+    stats['xp_earned'] = xp
+    stats['achievements_unlocked'] = len(user_data.get('achievements') or [])
+    for field in MIRRORED_FIELDS:
+        if user_data.get(field) is not None:
+            stats[field] = user_data[field]
+    return stats
+
+
+class UserStatsRebuildJob:
+    """
+    Recomputes every user_stats/{uid} document from the raw collections.
+
+    users, quiz_results, the existing user_stats documents and the lesson
+    catalog are streamed concurrently (each paged by document ID, quiz
+    results projected to the four fields the counters need), then the
+    documents are rewritten with a bulk writer. Code execution counters have
+    no raw source and are carried over from the existing documents.
+    """
+
+    def __init__(self, firebase_service, page_size: int = 1000, dry_run: bool = False, workers: int = 4):
+        self.firebase_service = firebase_service
+        self.page_size = page_size
+        self.dry_run = dry_run
+        self.workers = workers
+        self.metrics = {
+            'users_scanned': 0,
+            'quiz_results_scanned': 0,
+            'stats_scanned': 0,
+            'users_updated': 0,
+            'elapsed_seconds': 0.0,
+        }
+
+    def run(self) -> Dict[str, Any]:
+        """Run the rebuild to completion and return its metrics"""
+        if not self.firebase_service or not self.firebase_service.is_available():
+            raise RuntimeError("Firebase not available, cannot rebuild user stats")
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            categories_future = executor.submit(self._scan_categories)
+            users_future = executor.submit(self._scan_users)
+            quizzes_future = executor.submit(self._scan_quiz_results)
+            existing_future = executor.submit(self._scan_existing_stats)
+            categories = categories_future.result()
+            users = users_future.result()
+            quizzes = quizzes_future.result()
+            existing = existing_future.result()
+
+        writer = None if self.dry_run else self.firebase_service.db.bulk_writer()
+        collection = self.firebase_service.db.collection(USER_STATS_COLLECTION)
+        for user_id, user_data in users.items():
+            stats = combine_deltas(stats_from_user_doc(user_data, categories), quizzes.get(user_id))
+            current = existing.get(user_id)
+            for field in CARRIED_FIELDS:
+                stats[field] = (current or {}).get(field, 0) or 0
+            if current is not None and stats_summary(current) == stats_summary(stats):
+                continue
+            self.metrics['users_updated'] += 1
+            if writer is not None:
+                writer.set(collection.document(user_id), {**stats, 'updated_at': gcloud_firestore.SERVER_TIMESTAMP})
+
+        if writer is not None:
+            writer.close()
+        self.metrics['elapsed_seconds'] = time.perf_counter() - started
+        logger.info(
+            f"User stats rebuild finished: {self.metrics['users_updated']} of "
+            f"{self.metrics['users_scanned']} users updated from "
+            f"{self.metrics['quiz_results_scanned']} quiz results in {self.metrics['elapsed_seconds']:.1f}s"
+        )
+        return self.metrics
+
+    def _scan_categories(self) -> Dict[str, str]:
+        return {lesson.get('id'): lesson_category(lesson) for lesson in self.firebase_service.get_all_lessons()}
+
+    def _scan_users(self) -> Dict[str, Dict[str, Any]]:
+        users = {}
+        for user_id, user_data in self.firebase_service.stream_users(page_size=self.page_size):
+            # Keep only what the counters need, not whole user documents
+            users[user_id] = {
+                'lesson_progress': {
+                    lesson_id: {
+                        'completed': progress.get('completed'),
+                        'completed_subtopics': progress.get('completed_subtopics'),
+                        'time_spent': progress.get('time_spent', 0),
+                    }
+                    for lesson_id, progress in (user_data.get('lesson_progress') or {}).items()
+                    if isinstance(progress, dict)
+                },
+                'xp': user_data.get('xp', 0),
+                'total_xp': user_data.get('total_xp', 0),
+                'achievements': user_data.get('achievements') or [],
+                **{field: user_data.get(field) for field in MIRRORED_FIELDS if user_data.get(field) is not None},
+            }
+            self.metrics['users_scanned'] += 1
+        return users
+
+    def _scan_quiz_results(self) -> Dict[str, Dict[str, Any]]:
+        totals: Dict[str, Dict[str, Any]] = {}
+        for result in self.firebase_service.stream_quiz_results(page_size=self.page_size):
+            self.metrics['quiz_results_scanned'] += 1
+            user_id = result.get('user_id')
+            if user_id:
+                totals[user_id] = combine_deltas(totals.get(user_id), quiz_deltas(result))
+        return totals
+
+    def _scan_existing_stats(self) -> Dict[str, Dict[str, Any]]:
+        existing = {}
+        for user_id, stats in self.firebase_service.stream_user_stats(page_size=self.page_size):
+            existing[user_id] = stats
+            self.metrics['stats_scanned'] += 1
+        return existing
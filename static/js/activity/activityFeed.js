@@ -8,7 +8,7 @@ class ActivityFeed {
     constructor(options = {}) {
         this.config = {
             container: options.container || '.activity-feed',
-            apiEndpoint: options.apiEndpoint || '/api/activities',
+            apiEndpoint: options.apiEndpoint || '/api/dashboard/activity-feed',
             itemsPerPage: options.itemsPerPage || 20,
             maxItems: options.maxItems || 100,
             refreshInterval: options.refreshInterval || 30000, // 30 seconds
@@ -23,8 +23,8 @@ class ActivityFeed {
         this.state = {
             activities: [],
             filteredActivities: [],
-            currentPage: 1,
-            totalPages: 0,
+            nextCursor: null,
+            hasMore: false,
             isLoading: false,
             hasError: false,
             lastUpdate: null,
@@ -312,7 +312,6 @@ class ActivityFeed {
         
         try {
             const data = await this.fetchActivities({
-                page: 1,
                 limit: this.config.itemsPerPage
             });
             
@@ -331,7 +330,7 @@ class ActivityFeed {
      * Load more activities (pagination)
      */
     async loadMoreActivities() {
-        if (this.state.isLoading || this.state.currentPage >= this.state.totalPages) {
+        if (this.state.isLoading || !this.state.hasMore || !this.state.nextCursor) {
             return;
         }
         
@@ -339,15 +338,16 @@ class ActivityFeed {
         this.showLoading();
         
         try {
+            // Opaque cursor from the previous page; the server resumes after it
             const data = await this.fetchActivities({
-                page: this.state.currentPage + 1,
+                cursor: this.state.nextCursor,
                 limit: this.config.itemsPerPage
             });
             
             // Append new activities
             this.state.activities.push(...data.activities);
-            this.state.currentPage = data.currentPage;
-            this.state.totalPages = data.totalPages;
+            this.state.nextCursor = data.next_cursor || null;
+            this.state.hasMore = Boolean(data.has_more);
             
             this.applyFiltersAndSort();
             this.renderActivities();
@@ -365,14 +365,16 @@ class ActivityFeed {
      */
     async refreshActivities() {
         try {
+            // The first page is newest-first; anything not already shown is new
             const data = await this.fetchActivities({
-                since: this.state.lastUpdate,
                 limit: this.config.itemsPerPage
             });
+            const knownIds = new Set(this.state.activities.map(activity => activity.id));
+            const newActivities = (data.activities || []).filter(activity => !knownIds.has(activity.id));
             
-            if (data.activities.length > 0) {
+            if (newActivities.length > 0) {
                 // Prepend new activities
-                this.state.activities.unshift(...data.activities);
+                this.state.activities.unshift(...newActivities);
                 
                 // Limit total items
                 if (this.state.activities.length > this.config.maxItems) {
@@ -383,7 +385,7 @@ class ActivityFeed {
                 this.applyFiltersAndSort();
                 this.renderActivities();
                 
-                this.notifyObservers('newActivities', { count: data.activities.length });
+                this.notifyObservers('newActivities', { count: newActivities.length });
             }
             
         } catch (error) {
@@ -439,8 +441,8 @@ class ActivityFeed {
      */
     processActivityData(data) {
         this.state.activities = data.activities || [];
-        this.state.currentPage = data.currentPage || 1;
-        this.state.totalPages = data.totalPages || 1;
+        this.state.nextCursor = data.next_cursor || null;
+        this.state.hasMore = Boolean(data.has_more);
         
         this.applyFiltersAndSort();
         this.renderActivities();
@@ -647,7 +649,7 @@ class ActivityFeed {
         // Update load more button
         if (this.elements.loadMoreBtn) {
             this.elements.loadMoreBtn.hidden = 
-                this.state.currentPage >= this.state.totalPages || 
+                !this.state.hasMore || 
                 !this.config.enableInfiniteScroll;
         }
         
@@ -924,8 +926,7 @@ class ActivityFeed {
         return {
             activityCount: this.state.activities.length,
             filteredCount: this.state.filteredActivities.length,
-            currentPage: this.state.currentPage,
-            totalPages: this.state.totalPages,
+            hasMore: this.state.hasMore,
             isLoading: this.state.isLoading,
             hasError: this.state.hasError,
             lastUpdate: this.state.lastUpdate
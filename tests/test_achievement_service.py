@@ -0,0 +1,85 @@
+import asyncio
+import pytest
+from benchmarks.fake_firestore import InMemoryFirebaseService
+from models.user_profile import UserStats
+from services.async_firebase_service import set_async_firebase_service
+from services.achievement_service import AchievementService
+
+class FakeFirebaseService:
+    """Records reads and batched commits made by the achievement engine"""
+    def __init__(self, stats, unlocked=None):
+        self.stats = stats
+        self.unlocked = unlocked or []
+        self.reads = 0
+        self.commits = []
+
+    def is_available(self):
+        return True
+
+    async def get_user_achievements(self, user_id):
+        self.reads += 1
+        return [{'id': ach_id, 'unlocked': True} for ach_id in self.unlocked]
+
+    async def get_user_stats(self, user_id):
+        self.reads += 1
+        return self.stats
+
+    async def commit_achievement_unlocks(self, user_id, achievements, activities):
+        self.commits.append((achievements, activities))
+        return [ach['id'] for ach in achievements]
+
+@pytest.fixture
+def fake_service():
+    service = FakeFirebaseService(UserStats(user_id='u1', code_executions=1))
+    set_async_firebase_service(service)
+    yield service
+    set_async_firebase_service(None)
+
+def test_index_buckets_by_action():
+    """Definitions are only indexed under the action they depend on"""
+    index = AchievementService().requirement_index
+    code_ids = {ach.id for ach, _, _ in index['code_executed']}
+    assert code_ids == {'code_runner', 'code_ninja'}
+    assert 'lesson_master' not in code_ids
+
+def test_unrelated_action_does_no_reads(fake_service):
+    """Actions with no dependent definitions never touch Firebase"""
+    service = AchievementService()
+    assert asyncio.run(service.check_achievements('u1', 'dashboard_refresh')) == []
+    assert fake_service.reads == 0
+
+def test_unlocks_commit_in_one_batch(fake_service):
+    """Unlocks are committed once with their activities"""
+    service = AchievementService()
+    unlocked = asyncio.run(service.check_achievements('u1', 'code_executed'))
+    assert [ach.id for ach in unlocked] == ['code_runner']
+    assert len(fake_service.commits) == 1
+    achievements, activities = fake_service.commits[0]
+    assert achievements[0]['id'] == 'code_runner'
+    assert activities[0]['activity_type'] == 'achievement_unlocked'
+    # Shared definitions are not mutated
+    assert not service.get_achievement_by_id('code_runner').unlocked
+
+def test_checks_use_server_counters_only(fake_service):
+    """Repeated checks re-read user_stats and never advance counters themselves"""
+    fake_service.stats = UserStats(user_id='u1', code_executions=499)
+    fake_service.unlocked = ['code_runner']
+    service = AchievementService()
+    for _ in range(3):
+        assert asyncio.run(service.check_achievements('u1', 'code_executed')) == []
+    assert asyncio.run(service.check_achievements('u1', 'xp_earned')) == []
+
+    fake_service.stats = UserStats(user_id='u1', code_executions=500)
+    unlocked = asyncio.run(service.check_achievements('u1', 'code_executed'))
+    assert [ach.id for ach in unlocked] == ['code_ninja']
+
+def test_transaction_skips_already_unlocked_achievements():
+    """A second commit of the same unlock awards no XP and writes no activity"""
+    firebase = InMemoryFirebaseService()
+    firebase.db.collection('users').document('u1').set({'xp': 0, 'achievements': []})
+    achievement = {'id': 'code_runner', 'points': 5, 'unlocked': True}
+    activity = {'activity_type': 'achievement_unlocked', 'data': {'achievement_id': 'code_runner'}}
+    assert firebase.commit_achievement_unlocks('u1', [achievement], [activity]) == ['code_runner']
+    assert firebase.commit_achievement_unlocks('u1', [achievement], [activity]) == []
+    assert firebase.get_user('u1')['xp'] == 5
+    assert len(firebase.get_user_activities('u1')) == 1
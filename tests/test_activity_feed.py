@@ -0,0 +1,59 @@
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+import pytest
+from benchmarks.fake_firestore import InMemoryFirebaseService
+from services.activity_feed import encode_cursor, decode_cursor, ActivityPageCache
+import models.activity as activity_model
+
+def test_cursor_round_trip():
+    """Cursors decode to the (timestamp, id) they were built from; anything else is rejected"""
+    timestamp = datetime(2025, 6, 10, 12, 30, tzinfo=timezone.utc)
+    assert decode_cursor(encode_cursor(timestamp, 'a1')) == (timestamp, 'a1')
+    for bad in ('', 'not-a-cursor', encode_cursor(timestamp, 'a1')[:-4]):
+        with pytest.raises(ValueError):
+            decode_cursor(bad)
+
+def test_activity_pages_follow_cursor(monkeypatch):
+    """Pages walk the feed newest first without gaps or repeats, even across equal timestamps"""
+    service = InMemoryFirebaseService()
+    now = datetime.now(timezone.utc)
+    for i in range(7):
+        service.db.collection('activities').document(f'a{i}').set({
+            'user_id': 'u1', 'type': 'lesson', 'details': {'message': f'#{i}'},
+            'timestamp': now - timedelta(minutes=i // 2)})
+    service.db.collection('activities').document('other').set({'user_id': 'u2', 'timestamp': now})
+    monkeypatch.setattr(activity_model, 'firebase_service', service)
+    monkeypatch.setattr(activity_model, 'activity_page_cache', ActivityPageCache())
+    monkeypatch.setattr('config.get_config', lambda: SimpleNamespace(DEV_MODE=False))
+
+    seen, cursor, pages = [], None, 0
+    while True:
+        page = activity_model.get_activity_page('u1', cursor=cursor, limit=3)
+        seen.extend(activity['id'] for activity in page['activities'])
+        pages += 1
+        if not page['has_more']:
+            break
+        cursor = page['next_cursor']
+    assert pages == 3
+    assert sorted(seen) == [f'a{i}' for i in range(7)] and len(set(seen)) == 7
+    assert seen[0] in ('a0', 'a1')
+
+def test_page_cache_invalidation():
+    """Cached pages expire and are dropped per user"""
+    cache = ActivityPageCache(ttl_seconds=60)
+    cache.set('u1', None, 20, {'activities': [1]})
+    cache.set('u2', None, 20, {'activities': [2]})
+    assert cache.get('u1', None, 20) == {'activities': [1]}
+    cache.invalidate('u1')
+    assert cache.get('u1', None, 20) is None
+    assert cache.get('u2', None, 20) == {'activities': [2]}
+    assert ActivityPageCache(ttl_seconds=-1).get('u1', None, 20) is None
+
+def test_profile_feed_accepts_dev_mock_activities(monkeypatch):
+    """Dev-mode mock items, which carry no id, still render as profile feed entries"""
+    from routes.profile_routes_api import _profile_activity
+    monkeypatch.setattr('config.get_config', lambda: SimpleNamespace(DEV_MODE=True))
+    page = activity_model.get_activity_page('u1')
+    entries = [_profile_activity(activity, position) for position, activity in enumerate(page['activities'], start=1)]
+    assert [entry['id'] for entry in entries] == list(range(1, len(page['activities']) + 1))
+    assert entries[0]['description'] == page['activities'][0]['message']
@@ -0,0 +1,55 @@
+import gzip
+import json
+import types
+from datetime import datetime, timedelta, timezone
+from benchmarks.fake_firestore import InMemoryFirebaseService
+import models.activity as activity_model
+from services.rollups import rollup_day
+from services.activity_retention import (activity_expiry, should_record, ActivityRetentionJob, EXPIRY_FIELD,
+                                         DEFAULT_TTL_DAYS)
+
+def test_ttl_policy_and_sampling():
+    """Each type expires after its own TTL; sampling drops rate-0 types and keeps unlisted ones"""
+    now = datetime(2025, 6, 10, tzinfo=timezone.utc)
+    assert activity_expiry('dashboard_refresh', now) == now + timedelta(days=7)
+    assert activity_expiry('quiz_completed', now) == now + timedelta(days=DEFAULT_TTL_DAYS)
+    assert not should_record('dashboard_refresh', 'dashboard_refresh=0')
+    assert should_record('quiz_completed', 'dashboard_refresh=0')
+    assert should_record('xp_gain', '')
+
+def test_retention_job_archives_and_deletes(tmp_path):
+    """Expired activities are archived then deleted, legacy ones stamped, and a rerun finds nothing"""
+    service = InMemoryFirebaseService()
+    now = datetime.now(timezone.utc)
+    activities = service.db.collection('activities')
+    assert service.record_activity('u1', 'quiz_completed', {'quiz_id': 'q1'})
+    activities.document('old').set({'user_id': 'u1', 'type': 'xp_gain', 'timestamp': now - timedelta(days=40),
+                                    EXPIRY_FIELD: now - timedelta(days=10)})
+    activities.document('legacy_old').set({'user_id': 'u1', 'type': 'dashboard_refresh',
+                                           'timestamp': now - timedelta(days=8)})
+    activities.document('legacy_kept').set({'user_id': 'u1', 'type': 'quiz_completed',
+                                            'timestamp': now - timedelta(days=8)})
+
+    metrics = ActivityRetentionJob(service, archive_dir=str(tmp_path), page_size=2, legacy=True).run()
+    assert (metrics['activities_deleted'], metrics['activities_stamped']) == (2, 1)
+    with gzip.open(metrics['archive_path'], 'rt') as archive:
+        assert sorted(json.loads(line)['id'] for line in archive) == ['legacy_old', 'old']
+    remaining = {doc.id: doc.to_dict() for doc in activities.stream()}
+    assert 'old' not in remaining and 'legacy_old' not in remaining
+    assert all(EXPIRY_FIELD in data for data in remaining.values())
+
+    assert ActivityRetentionJob(service, archive_dir=str(tmp_path), legacy=True).run()['activities_deleted'] == 0
+
+def test_sampled_out_activity_still_counts(monkeypatch):
+    """A dropped activity writes no document but still advances the streak and the day rollup"""
+    service = InMemoryFirebaseService()
+    service.db.collection('users').document('u1').set({'xp': 0})
+    config = types.SimpleNamespace(DEV_MODE=False, ACTIVITY_SAMPLING='dashboard_refresh=0')
+    monkeypatch.setattr('config.get_config', lambda: config)
+    monkeypatch.setattr(activity_model, 'firebase_service', service)
+    assert activity_model.track_activity('u1', 'dashboard_refresh', {})
+
+    assert service.get_user_activities('u1') == []
+    assert service.get_user('u1')['streak'] == 1
+    today = rollup_day()
+    assert service.get_rollup_series('u1', today, today)['series']['activities'] == [1]
@@ -0,0 +1,63 @@
+import gzip
+import json
+from pathlib import Path
+import pytest
+from utils.assets import minify_css, parse_bundle_config, build_assets, is_es_module
+
+def test_minify_css_keeps_strings_and_calc():
+    """Whitespace is collapsed outside strings without breaking calc()"""
+    css = "/* note */\n.a , .b {\n  width: calc(100% - 2px);\n  content: 'a  ,  b';\n}\n"
+    assert minify_css(css) == ".a,.b{width:calc(100% - 2px);content:'a  ,  b'}"
+
+def test_parse_bundle_config_reads_repo_bundles():
+    """Bundles, files and load options come from config/css-bundles.js"""
+    bundles = parse_bundle_config()
+    assert bundles['critical']['files'] == ['static/css/main.css']
+    assert bundles['lessons']['loadStrategy'] == 'lazy'
+    assert bundles['lessons']['pages'] == ['lesson', 'lesson_new']
+
+def test_repo_bundles_list_existing_sources():
+    """Every file named in config/css-bundles.js exists, so the build reads the real sources"""
+    root = Path(__file__).resolve().parent.parent
+    for name, bundle in parse_bundle_config().items():
+        assert [file for file in bundle['files'] if not (root / file).exists()] == [], name
+
+def test_missing_bundle_source_fails_the_build(tmp_path):
+    """A bundle naming a file that does not exist is an error, not a silent fallback"""
+    static = tmp_path / 'static'
+    (static / 'css' / 'bundles').mkdir(parents=True)
+    (static / 'css' / 'bundles' / 'core.css').write_text('.old { color: red; }\n')
+    config = tmp_path / 'config' / 'css-bundles.js'
+    config.parent.mkdir()
+    config.write_text("const CSS_BUNDLES = {\n core: { files: ['static/css/gone.css'] }\n};\n")
+    with pytest.raises(FileNotFoundError, match='static/css/gone.css'):
+        build_assets(static_dir=static, config_path=config, include_js=False)
+
+def test_build_inlines_imports_and_fingerprints(tmp_path):
+    """Imports are inlined, urls made absolute and outputs hashed and gzipped"""
+    static = tmp_path / 'static'
+    (static / 'css' / 'base').mkdir(parents=True)
+    (static / 'css' / 'main.css').write_text("@import url('base/reset.css');\n.main { color: red; }\n")
+    (static / 'css' / 'base' / 'reset.css').write_text("body { background: url('../../img/bg.png'); }\n")
+    (static / 'js').mkdir()
+    (static / 'js' / 'classic.js').write_text("window.x = 1;\n")
+    (static / 'js' / 'module.js').write_text("import { a } from './a.js';\n")
+    config = tmp_path / 'config' / 'css-bundles.js'
+    config.parent.mkdir()
+    config.write_text("const CSS_BUNDLES = {\n critical: { files: ['static/css/main.css'], priority: 'high' }\n};\n")
+
+    manifest = build_assets(static_dir=static, config_path=config)
+
+    entry = manifest['assets']['css/bundles/critical.css']
+    assert manifest['assets']['css/main.css'] == entry
+    built = (static / entry['file']).read_text()
+    assert built == "body{background:url('/static/img/bg.png')}.main{color:red}"
+    assert gzip.decompress((static / (entry['file'] + '.gz')).read_bytes()).decode() == built
+    assert 'js/classic.js' in manifest['assets']
+    assert 'js/module.js' not in manifest['assets']
+    assert json.loads((static / 'dist' / 'manifest.json').read_text())['assets'] == manifest['assets']
+
+def test_es_module_detection():
+    """Top-level import/export marks a script as an ES module"""
+    assert is_es_module("export const A = 1;")
+    assert not is_es_module("// import later\nwindow.A = 1;")
@@ -0,0 +1,45 @@
+import os
+import uuid
+from datetime import datetime, timezone
+import pytest
+from services.async_firebase_service import AsyncFirebaseService, run_async
+
+requires_emulator = pytest.mark.skipif(
+    not os.environ.get('FIRESTORE_EMULATOR_HOST'),
+    reason="requires the Firestore emulator (set FIRESTORE_EMULATOR_HOST)"
+)
+
+@pytest.fixture
+def service():
+    return AsyncFirebaseService({'project_id': os.environ.get('GCLOUD_PROJECT', 'demo-codewithmorais')})
+
+def test_bridge_runs_coroutines_on_one_loop():
+    """The bridge reuses its event loop across calls"""
+    async def current_loop():
+        import asyncio
+        return asyncio.get_running_loop()
+    assert run_async(current_loop()) is run_async(current_loop())
+
+@requires_emulator
+def test_profile_bundle_against_emulator(service):
+    """Unlocks written in one transaction show up in the profile counters"""
+    user_id = f"test-{uuid.uuid4().hex[:8]}"
+    today = datetime.now(timezone.utc).date().isoformat()
+    run_async(service.db.collection('users').document(user_id).set(
+        {'xp': 10, 'streak': 2, 'streak_last_active': today}))
+
+    committed = run_async(service.commit_achievement_unlocks(
+        user_id,
+        [{'id': 'code_runner', 'points': 5, 'unlocked': True}],
+        [{'activity_type': 'achievement_unlocked', 'title': 'Achievement Unlocked: Code Runner'}]
+    ))
+    assert committed
+
+    bundle = run_async(service.get_profile_bundle(user_id))
+    assert bundle['stats'].xp == 15
+    assert bundle['stats'].current_streak == 2
+    assert bundle['stats'].achievements_unlocked == 1
+    assert bundle['user_stats']['achievements_unlocked'] == 1
+    achievements = run_async(service.get_user_achievements(user_id))
+    assert [ach['id'] for ach in achievements] == ['code_runner']
+    assert run_async(service.get_user_activities(user_id))[0]['type'] == 'achievement_unlocked'
@@ -0,0 +1,56 @@
+from firebase_admin import firestore
+from benchmarks.fake_firestore import FakeFirestoreClient, InMemoryFirebaseService
+from benchmarks.seed import build_dataset, seed_database, user_id
+from benchmarks.loadgen import percentile, parse_server_timing, route_key
+from benchmarks.baseline import compare
+
+def test_fake_firestore_queries_and_transforms():
+    """Queries order, filter and page like Firestore; transforms apply on write"""
+    db = FakeFirestoreClient()
+    for name, xp in (('a', 30), ('b', 10), ('c', 20), ('d', 20)):
+        db.collection('users').document(name).set({'xp': xp, 'stats': {'runs': 1}, 'tags': []})
+    db.collection('users').document('no-xp').set({'name': 'x'})
+
+    top = db.collection('users').order_by('xp', direction=firestore.Query.DESCENDING).limit(3).stream()
+    assert [doc.id for doc in top] == ['a', 'c', 'd']
+    assert [doc.id for doc in db.collection('users').where('xp', '>=', 20).stream()] == ['a', 'c', 'd']
+    page = db.collection('users').order_by('__name__').start_after({'__name__': 'b'}).limit(2).get()
+    assert [doc.id for doc in page] == ['c', 'd']
+
+    batch = db.batch()
+    batch.update(db.collection('users').document('b'), {
+        'xp': firestore.Increment(5), 'tags': firestore.ArrayUnion(['x', 'x']), 'stats.runs': 2})
+    batch.commit()
+    assert db.collection('users').document('b').get().to_dict() == {'xp': 15, 'stats': {'runs': 2}, 'tags': ['x']}
+
+def test_in_memory_service_runs_real_service_methods():
+    """Seeded data is served through the unmodified FirebaseService methods"""
+    service = InMemoryFirebaseService()
+    dataset = build_dataset(users=20, lessons=4, activities_per_user=3, seed=7)
+    assert dataset == build_dataset(users=20, lessons=4, activities_per_user=3, seed=7)
+    seed_database(service.db, dataset)
+
+    leaderboard = service.get_leaderboard(5)
+    assert [entry['xp'] for entry in leaderboard] == sorted((u['xp'] for u in dataset['users'].values()),
+                                                             reverse=True)[:5]
+    assert len(service.get_user_activities(user_id(3), limit=2)) == 2
+    assert len(service.get_all_lessons()) == 4
+    assert service.update_user_rewards(user_id(1), 100, 5)
+    assert service.get_user(user_id(1))['pycoins'] == dataset['users'][user_id(1)]['pycoins'] + 5
+
+def test_loadgen_stats_and_baseline_comparison():
+    """Percentiles, Server-Timing parsing and regression detection"""
+    assert percentile(list(range(1, 101)), 95) == 95
+    assert parse_server_timing('firestore;dur=1.5;desc="reads=3 writes=1 calls=2", app;dur=9') == {
+        'firestore_ms': 1.5, 'reads': 3, 'writes': 1, 'calls': 2}
+    assert route_key('GET', '/lesson/bench-lesson-0003') == 'GET /lesson/<id>'
+
+    stats = {'requests': 100, 'rps': 100.0, 'p50_ms': 10.0, 'p95_ms': 20.0, 'p99_ms': 30.0,
+             'error_rate': 0.0, 'firestore_reads_per_request': 4.0, 'firestore_writes_per_request': 1.0}
+    baseline = {'name': 'main', 'summary': {'overall': stats, 'routes': {'GET /dashboard': stats}}}
+    assert compare(baseline, {'overall': stats, 'routes': {'GET /dashboard': stats}})['passed']
+
+    slower = dict(stats, p95_ms=40.0, firestore_reads_per_request=6.0)
+    report = compare(baseline, {'overall': stats, 'routes': {'GET /dashboard': slower}})
+    assert not report['passed']
+    assert {item['metric'] for item in report['regressions']} == {'p95_ms', 'firestore_reads_per_request'}
@@ -0,0 +1,64 @@
+import pytest
+import models.lesson as lesson_model
+import models.quiz as quiz_model
+import services.content_snapshot as content_snapshot
+import utils.resilience as resilience
+from benchmarks.fake_firestore import InMemoryFirebaseService
+from services.content_snapshot import ContentSnapshot, ContentSnapshotJob, write_snapshot
+
+@pytest.fixture
+def snapshot_path(tmp_path, monkeypatch):
+    """Point the process-wide snapshot reader at a temporary file"""
+    path = str(tmp_path / 'content_snapshot.bin')
+    monkeypatch.setattr(content_snapshot, 'content_snapshot', ContentSnapshot(path))
+    resilience.breakers.clear()
+    yield path
+    resilience.breakers.clear()
+
+def test_snapshot_round_trip(tmp_path):
+    """Documents come back in catalog order, as fresh copies, and unknown ids return None"""
+    path = str(tmp_path / 'snap.bin')
+    write_snapshot(path, {'lessons': [{'id': 'b', 'order': 1, 'tags': ['x']}, {'id': 'a', 'order': 2}],
+                          'quizzes': [{'id': 'q1', 'questions': [{'text': 'ok?'}]}]})
+    snapshot = ContentSnapshot(path)
+    assert [lesson['id'] for lesson in snapshot.all('lessons')] == ['b', 'a']
+    snapshot.get('lessons', 'b')['tags'].append('changed')
+    assert snapshot.get('lessons', 'b')['tags'] == ['x']
+    assert snapshot.get('quizzes', 'q1')['questions'][0]['text'] == 'ok?'
+    assert snapshot.get('quizzes', 'missing') is None and snapshot.all('daily_challenges') == []
+    assert snapshot.status()['documents'] == {'lessons': 2, 'quizzes': 1}
+
+def test_models_serve_snapshot_when_firestore_is_down(snapshot_path, monkeypatch):
+    """With the lessons circuit open (or no Firebase at all) the models read the snapshot"""
+    service = InMemoryFirebaseService()
+    service.db.collection('lessons').document('snap-lesson').set({'title': 'From Firestore', 'order': 1})
+    service.db.collection('quizzes').document('snap-quiz').set({'title': 'Snapshot quiz', 'questions': []})
+    assert ContentSnapshotJob(service, snapshot_path).run()['documents']['lessons'] == 1
+
+    monkeypatch.setattr(lesson_model, 'firebase_service', service)
+    breaker = resilience.breakers.get('lessons')
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+    service.db.collection('lessons').document('snap-lesson').delete()
+    assert lesson_model.get_lesson('snap-lesson')['title'] == 'From Firestore'
+    assert [lesson['id'] for lesson in lesson_model.get_all_lessons()] == ['snap-lesson']
+
+    monkeypatch.setattr(quiz_model, 'firebase_service', None)
+    assert quiz_model.get_quiz('snap-quiz')['title'] == 'Snapshot quiz'
+
+@pytest.mark.skipif(content_snapshot.fcntl is None, reason="needs fcntl")
+def test_only_one_process_refreshes_a_stale_snapshot(tmp_path):
+    """While another process holds the refresh lock, a worker skips the Firestore dump"""
+    path = str(tmp_path / 'content_snapshot.bin')
+    service = InMemoryFirebaseService()
+    service.db.collection('lessons').document('l1').set({'title': 'Basics', 'order': 1})
+    refresher = content_snapshot.SnapshotRefresher(service, path, interval=60)
+
+    with open(path + '.lock', 'a') as other_worker:
+        content_snapshot.fcntl.flock(other_worker, content_snapshot.fcntl.LOCK_EX)
+        assert refresher.refresh_if_stale() is False
+        content_snapshot.fcntl.flock(other_worker, content_snapshot.fcntl.LOCK_UN)
+
+    assert refresher.refresh_if_stale() is True
+    assert refresher.refresh_if_stale() is False  # fresh now, nothing to do
+    assert ContentSnapshot(path).get('lessons', 'l1')['title'] == 'Basics'
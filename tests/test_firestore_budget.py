@@ -0,0 +1,76 @@
+import logging
+from flask import Flask, jsonify
+from utils.metrics import instrument_firebase_service
+from utils.firestore_budget import init_firestore_budget, estimate_document_bytes
+from services.async_firebase_service import run_async
+
+class FakeService:
+    def is_available(self):
+        return True
+
+    def get_user_achievements(self, user_id):
+        return [{'id': f'a{i}', 'title': 'Badge'} for i in range(3)]
+
+    def update_user(self, user_id, data):
+        return True
+
+class FakeAsyncService:
+    def is_available(self):
+        return True
+
+    async def get_user(self, user_id):
+        return {'id': user_id, 'xp': 10}
+
+instrument_firebase_service(FakeService)
+instrument_firebase_service(FakeAsyncService)
+
+def _app(**settings):
+    app = Flask(__name__)
+    budget = init_firestore_budget(app, settings)
+    service, async_service = FakeService(), FakeAsyncService()
+
+    @app.route('/page')
+    def page():
+        achievements = service.get_user_achievements('u1')
+        user = run_async(async_service.get_user('u1'))
+        service.update_user('u1', {'seen': True})
+        return jsonify({'achievements': achievements, 'user': user})
+
+    @app.route('/static-page')
+    def static_page():
+        return 'ok'
+
+    return app, budget
+
+def test_server_timing_and_report_include_async_calls():
+    """Sync and run_async calls are billed to the request that made them"""
+    app, budget = _app()
+    client = app.test_client()
+    response = client.get('/page')
+    timing = response.headers.getlist('Server-Timing')
+    assert 'desc="reads=4 writes=1 calls=3"' in timing[0] and timing[1].startswith('app;dur=')
+
+    client.get('/static-page')
+    endpoint = budget.report.report()['endpoints'][0]
+    assert endpoint['endpoint'] == 'page' and endpoint['requests'] == 1
+    assert endpoint['collections'] == {'user_achievements': {'reads': 3, 'writes': 0},
+                                       'users': {'reads': 1, 'writes': 1}}
+    assert endpoint['bytes'] > 0 and endpoint['over_budget'] == 0
+
+def test_over_budget_requests_are_logged_with_call_sites(caplog):
+    """Exceeding max_reads writes a slow-query record naming the caller"""
+    app, budget = _app(max_reads=2)
+    with caplog.at_level(logging.WARNING, logger='firestore.slow'):
+        app.test_client().get('/page')
+
+    slow = budget.report.report()['slow_requests'][0]
+    assert slow['exceeded'] == ['reads 4 > 2']
+    sites = {op['method']: op['call_site'] for op in slow['operations']}
+    assert sites['get_user_achievements'].startswith('tests/test_firestore_budget.py:')
+    assert sites['get_user'].endswith(' page')  # async call attributed to the view
+    assert 'Firestore budget exceeded on GET /page' in caplog.text
+
+def test_estimate_document_bytes():
+    """Strings count UTF-8 bytes plus one; maps add key names and overhead"""
+    assert estimate_document_bytes('héllo') == 7
+    assert estimate_document_bytes({'a': 1, 'b': [True, None]}) == 32 + 2 + 8 + 2 + 2
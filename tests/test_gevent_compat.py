@@ -0,0 +1,50 @@
+import sys
+import types
+from flask import Flask
+import services.firebase_service as firebase_module
+import utils.profiler as profiler_module
+from benchmarks.fake_firestore import InMemoryFirebaseService
+from services.achievement_service import AchievementService
+from services.async_firebase_service import set_async_firebase_service
+from utils.gevent_compat import cooperative_worker
+from utils.profiler import init_profiler
+
+def _app(**settings):
+    app = Flask(__name__)
+    profiler = init_profiler(app, {'token': 'secret', **settings})
+
+    @app.route('/ping')
+    def ping():
+        return 'pong'
+
+    return app, profiler
+
+def test_cooperative_worker_follows_monkey_patching(monkeypatch):
+    """Only a process whose threading module gevent has patched counts as cooperative"""
+    assert cooperative_worker() is False
+    fake_monkey = types.SimpleNamespace(is_module_patched=lambda name: name == 'threading')
+    monkeypatch.setitem(sys.modules, 'gevent.monkey', fake_monkey)
+    assert cooperative_worker() is True
+
+def test_profiler_uses_cprofile_only_under_gevent(monkeypatch):
+    """Sampling requests fall back to cProfile and random sampling is off in cooperative workers"""
+    monkeypatch.setattr(profiler_module, 'cooperative_worker', lambda: True)
+    app, profiler = _app(sample_rate=1)
+    client = app.test_client()
+    assert 'X-Profile-Id' not in client.get('/ping').headers
+
+    response = client.get('/ping', headers={'X-Profile': 'sampling', 'X-Profile-Token': 'secret'})
+    assert profiler.store.get(response.headers['X-Profile-Id'])['mode'] == 'cprofile'
+
+def test_achievements_use_the_sync_service_without_the_async_one(monkeypatch):
+    """With the async service off (gevent workers) checks read and commit through FirebaseService"""
+    firebase = InMemoryFirebaseService()
+    firebase.db.collection('users').document('u1').set({'xp': 0, 'achievements': []})
+    firebase.db.collection('user_stats').document('u1').set({'code_executions': 1})
+    monkeypatch.setattr(firebase_module, 'firebase_service', firebase)
+    set_async_firebase_service(None)
+    service = AchievementService()
+    assert [ach.id for ach in service.check_achievements_sync('u1', 'code_executed')] == ['code_runner']
+    assert service.check_achievements_sync('u1', 'code_executed') == []
+    progress = {ach['id']: ach for ach in service.get_user_achievements_with_progress_sync('u1')}
+    assert progress['code_runner']['unlocked'] and firebase.get_user('u1')['xp'] == 5
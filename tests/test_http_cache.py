@@ -0,0 +1,74 @@
+from flask import Flask, jsonify
+import models.user as user_model
+from benchmarks.fake_firestore import InMemoryFirebaseService
+from dataclasses import replace
+import utils.http_cache as http_cache
+from utils.component_registry import ComponentRegistry
+from utils.http_cache import cached_json
+
+def _app(calls, version):
+    app = Flask(__name__)
+    app.secret_key = 'test'
+
+    @app.route('/api/items/<item_id>')
+    @cached_json(lambda **kwargs: version['value'], max_age=60)
+    def get_item(item_id):
+        calls.append(item_id)
+        return jsonify({'id': item_id})
+
+    return app
+
+def test_matching_etag_skips_the_view():
+    """If-None-Match with the current ETag returns 304 without running the view"""
+    calls, version = [], {'value': 1}
+    client = _app(calls, version).test_client()
+    first = client.get('/api/items/a')
+    assert first.status_code == 200
+    assert first.headers['Cache-Control'] == 'public, max-age=60, must-revalidate'
+    second = client.get('/api/items/a', headers={'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 304
+    assert calls == ['a']
+
+def test_version_bump_changes_etag():
+    """A new content version invalidates the old validator"""
+    calls, version = [], {'value': 1}
+    client = _app(calls, version).test_client()
+    etag = client.get('/api/items/a').headers['ETag']
+    version['value'] = 2
+    response = client.get('/api/items/a', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert client.get('/api/items/b').headers['ETag'] != response.headers['ETag']
+
+def test_progress_version_follows_writes_from_any_worker(monkeypatch):
+    """Progress written without a local bump (e.g. by another worker) changes the version"""
+    firebase = InMemoryFirebaseService()
+    firebase.db.collection('users').document('u1').set({'lesson_progress': {}})
+    monkeypatch.setattr(user_model, 'firebase_service', firebase)
+    before = user_model.get_user_progress_version('u1')
+    firebase.update_user('u1', {'lesson_progress': {'loops': {'completed_subtopics': ['for']}}})
+    assert user_model.get_user_progress_version('u1') != before
+
+def test_build_id_is_stable_without_deploy_variables(monkeypatch, tmp_path):
+    """Without a deploy version, workers derive the same id from git or the asset manifest"""
+    for name in ('GAE_VERSION', 'K_REVISION', 'APP_VERSION'):
+        monkeypatch.delenv(name, raising=False)
+    (tmp_path / '.git' / 'refs' / 'heads').mkdir(parents=True)
+    (tmp_path / '.git' / 'HEAD').write_text('ref: refs/heads/main\n')
+    (tmp_path / '.git' / 'refs' / 'heads' / 'main').write_text('abc123\n')
+    assert http_cache._git_revision(tmp_path) == 'abc123'
+
+    monkeypatch.setattr(http_cache, '_git_revision', lambda: None)
+    manifest = tmp_path / 'manifest.json'
+    manifest.write_text('{"assets": {}}')
+    monkeypatch.setattr(http_cache, 'ASSET_MANIFEST', manifest)
+    assert http_cache.build_id() == http_cache.build_id() == http_cache._manifest_hash(manifest)
+
+def test_component_version_follows_content_not_count():
+    """Editing a registered component changes the registry version even though the count does not"""
+    registry = ComponentRegistry()
+    assert ComponentRegistry().content_version == registry.content_version
+    before, count = registry.content_version, len(registry.components)
+    component = next(iter(registry.components.values()))
+    registry.register_component(replace(component, description=component.description + ' (updated)'))
+    assert len(registry.components) == count and registry.content_version != before
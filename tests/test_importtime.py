@@ -0,0 +1,37 @@
+import sys
+from benchmarks.importtime import parse_importtime, summarize
+from services.firebase_service import FirebaseService
+from utils.lazy_imports import lazy_module
+
+SAMPLE = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     _json
+import time:       900 |       1020 |   json
+import time:      3000 |       4020 | app
+"""
+
+def test_importtime_report():
+    """-X importtime lines parse with depth; runs reduce to medians and package self times"""
+    entries = parse_importtime(SAMPLE)
+    assert [(e['module'], e['depth']) for e in entries] == [('_json', 2), ('json', 1), ('app', 0)]
+    runs = [{'entries': entries, 'boot_ms': 5.0, 'deferred_loaded': []},
+            {'entries': parse_importtime(SAMPLE.replace('3000 |       4020', '5000 |       6020')),
+             'boot_ms': 7.0, 'deferred_loaded': ['grpc']}]
+    summary = summarize(runs, top=2)
+    assert summary['boot_ms'] == 6.0 and summary['deferred_loaded'] == ['grpc']
+    assert [m['module'] for m in summary['slowest_modules']] == ['app', 'json']
+    assert summary['slowest_modules'][0]['self_ms'] == 4.0
+    assert summary['packages'] == {'app': 4.0, 'json': 0.9, '_json': 0.12}
+
+def test_deferred_imports_and_firebase_init(monkeypatch):
+    """Lazy modules import on first attribute access; a lazy FirebaseService connects on first db use"""
+    monkeypatch.delitem(sys.modules, 'tabnanny', raising=False)
+    tabnanny = lazy_module('tabnanny')
+    assert 'tabnanny' not in sys.modules
+    assert callable(tabnanny.check) and 'tabnanny' in sys.modules
+
+    calls = []
+    monkeypatch.setattr(FirebaseService, '_initialize_firebase', lambda self: calls.append(self))
+    service = FirebaseService({}, lazy=True)
+    assert calls == []
+    assert service.db is None and not service.is_available()
+    assert len(calls) == 1
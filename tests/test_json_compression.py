@@ -0,0 +1,49 @@
+import gzip
+import json
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+import pytest
+from flask import Flask, jsonify
+from flask.json.provider import DefaultJSONProvider
+from utils.json_provider import init_json_provider, orjson
+from utils.compression import init_compression
+
+@dataclass
+class Point:
+    x: int
+    y: int
+
+def _app(min_size=100):
+    app = Flask(__name__)
+    init_json_provider(app)
+    init_compression(app, {'min_size': min_size})
+
+    @app.route('/api/big')
+    def big():
+        return jsonify({'items': [{'id': i, 'title': f'Lesson {i}'} for i in range(50)]})
+
+    @app.route('/api/small')
+    def small():
+        return jsonify({'ok': True})
+
+    return app
+
+@pytest.mark.skipif(orjson is None, reason="orjson not installed")
+def test_orjson_output_matches_default_provider():
+    """Dates, UUIDs, dataclasses and key order render like the stdlib provider"""
+    app = _app()
+    payload = {'b': datetime(2025, 7, 1, 12, 30), 'a': uuid.UUID(int=1), 'p': Point(1, 2), 'n': [1.5, None]}
+    expected = DefaultJSONProvider(app).dumps(payload, separators=(',', ':'))
+    assert app.json.dumps(payload) == expected
+    assert json.loads(app.json.response(payload).get_data()) == json.loads(expected)
+
+def test_large_api_responses_are_gzipped():
+    """Responses above min_size are compressed when the client accepts gzip"""
+    client = _app().test_client()
+    response = client.get('/api/big', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(response.data))['items'][49]['id'] == 49
+
+    assert 'Content-Encoding' not in client.get('/api/small', headers={'Accept-Encoding': 'gzip'}).headers
+    assert 'Content-Encoding' not in client.get('/api/big').headers
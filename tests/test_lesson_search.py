@@ -0,0 +1,75 @@
+import threading
+from services.lesson_search import LessonSearchIndex, tokenize
+
+LESSONS = [
+    {
+        'id': 'python-basics', 'title': 'Python Basics', 'description': 'Variables and printing',
+        'category': 'python', 'difficulty': 'beginner', 'tags': ['intro'],
+        'blocks': [{'type': 'text', 'content': 'Use print to display output'}]
+    },
+    {
+        'id': 'functions', 'title': 'Functions', 'description': 'Reusable blocks of code',
+        'category': 'python', 'difficulty': 'intermediate', 'tags': ['def', 'scope'],
+        'blocks': [{'type': 'code_example', 'title': 'Defining functions', 'content': 'def greet(): print("hi")'}]
+    },
+    {
+        'id': 'css-grid', 'title': 'CSS Grid', 'description': 'Two dimensional layouts',
+        'category': 'web', 'difficulty': 'beginner', 'tags': ['layout'], 'blocks': []
+    },
+]
+
+def _index():
+    index = LessonSearchIndex()
+    index.refresh(LESSONS, catalog_version=1)
+    return index
+
+def test_tokenize_drops_stopwords():
+    """Tokens are lowercased and stopwords removed"""
+    assert tokenize('The Print Function') == ['print', 'function']
+
+def test_title_ranks_above_block_text():
+    """Title matches outrank matches found only in block text"""
+    ids = [hit['id'] for hit in _index().search('functions', prefix=False)['lessons']]
+    assert ids == ['functions']
+    ids = [hit['id'] for hit in _index().search('print')['lessons']]
+    assert ids[0] == 'python-basics'
+
+def test_prefix_typeahead_and_facets():
+    """The last token matches as a prefix and facets narrow by bitset"""
+    index = _index()
+    assert [hit['id'] for hit in index.search('pyth')['lessons']] == ['python-basics']
+    results = index.search('', category='python', difficulty='beginner')
+    assert [hit['id'] for hit in results['lessons']] == ['python-basics']
+    assert index.search('lay')['facets']['category'] == {'web': 1}
+
+def test_ngram_matches_misspelling():
+    """Trigram expansion tolerates small typos"""
+    assert [hit['id'] for hit in _index().search('functons', prefix=False)['lessons']] == ['functions']
+
+def test_incremental_refresh_only_reindexes_changes():
+    """Unchanged lessons are skipped; removed lessons drop out of results"""
+    index = _index()
+    updated = [dict(LESSONS[0], title='Python Fundamentals'), LESSONS[1]]
+    assert index.refresh(updated, catalog_version=2) == {'indexed': 1, 'removed': 1}
+    assert index.search('fundamentals')['total_count'] == 1
+    assert index.search('grid')['total_count'] == 0
+    assert len(index) == 2
+
+def test_searches_do_not_wait_for_a_catalog_reload():
+    """The loader runs outside the index lock; concurrent checks serve the current index"""
+    index = _index()
+    loading, release = threading.Event(), threading.Event()
+
+    def slow_loader():
+        loading.set()
+        release.wait(5)
+        return LESSONS[:2]
+
+    reload = threading.Thread(target=index.ensure_current, args=(slow_loader, 2))
+    reload.start()
+    assert loading.wait(5)
+    assert index.search('grid')['total_count'] == 1
+    assert index.ensure_current(slow_loader, 2) is False
+    release.set()
+    reload.join(5)
+    assert index.search('grid')['total_count'] == 0 and index.catalog_version == 2
@@ -0,0 +1,83 @@
+import logging
+import pytest
+from utils.log_pipeline import LoggingPipeline, SharedRotatingFileHandler, parse_sampling, structlog
+from utils.log_reader import LogReader
+
+def _settings(tmp_path, **overrides):
+    settings = {
+        'level': logging.INFO, 'file': str(tmp_path / 'logs' / 'app.log'), 'format': 'text',
+        'rotation': 'size', 'max_bytes': 10 * 1024 * 1024, 'when': 'midnight',
+        'backup_count': 2, 'queue_size': 100, 'sampling': {},
+    }
+    settings.update(overrides)
+    return settings
+
+def _logger(pipeline, name):
+    log = logging.getLogger(name)
+    log.handlers = [pipeline.queue_handler]
+    log.propagate = False
+    log.setLevel(logging.INFO)
+    return log
+
+def test_records_reach_file_through_listener(tmp_path):
+    """Records are written by the listener in the format the log reader parses"""
+    pipeline = LoggingPipeline(_settings(tmp_path))
+    pipeline.start()
+    log = _logger(pipeline, 'pipeline.test')
+    log.info("hello %s", 'world')
+    try:
+        raise ValueError('boom')
+    except ValueError:
+        log.exception("failed")
+    pipeline.stop()
+
+    records = LogReader(pipeline.settings['file']).tail(10)['records']
+    assert [r.message.split('\n')[0] for r in records] == ['hello world', 'failed']
+    assert records[1].level == 'ERROR' and 'ValueError: boom' in records[1].text
+
+def test_sampling_and_drop_counter(tmp_path):
+    """Sampled loggers keep 1 in N INFO records; a full queue drops and counts"""
+    pipeline = LoggingPipeline(_settings(tmp_path, queue_size=5,
+                                         sampling=parse_sampling('pipeline.noisy=0.25')))
+    noisy = _logger(pipeline, 'pipeline.noisy')
+    for i in range(8):
+        noisy.info("block %d", i)
+    noisy.warning("never sampled")
+    assert pipeline.sampling.sampled_out == 6
+    assert pipeline.queue.qsize() == 3
+
+    quiet = _logger(pipeline, 'pipeline.quiet')
+    for i in range(5):
+        quiet.info("line %d", i)  # listener not started, so the queue fills up
+    stats = pipeline.stats()
+    assert stats['queue_size'] == 5 and stats['dropped'] == 3
+
+@pytest.mark.skipif(structlog is None, reason="structlog not installed")
+def test_json_format_is_readable(tmp_path):
+    """JSON lines output is parsed back into records by the log reader"""
+    pipeline = LoggingPipeline(_settings(tmp_path, format='json'))
+    pipeline.start()
+    _logger(pipeline, 'pipeline.json').warning("structured %d", 1)
+    pipeline.stop()
+
+    record = LogReader(pipeline.settings['file']).tail(1)['records'][0]
+    assert record.level == 'WARNING' and record.logger == 'pipeline.json'
+    assert record.message == 'structured 1'
+
+def test_workers_sharing_a_file_rotate_it_once(tmp_path):
+    """When one worker rotates, the other reopens the new file instead of writing to the old one"""
+    path = str(tmp_path / 'app.log')
+    first = SharedRotatingFileHandler(path, maxBytes=200, backupCount=20, encoding='utf-8', delay=True)
+    second = SharedRotatingFileHandler(path, maxBytes=200, backupCount=20, encoding='utf-8', delay=True)
+    for handler in (first, second):
+        handler.setFormatter(logging.Formatter('%(message)s'))
+    records = [logging.LogRecord('w', logging.INFO, __file__, 1, f"line {i:03d} " + 'x' * 40, None, None)
+               for i in range(20)]
+    for i, record in enumerate(records):
+        (first if i % 2 else second).handle(record)
+    first.close()
+    second.close()
+
+    # Oldest file first, as the log reader reads them: every record once, in order
+    lines = [line for name in LogReader(path).files() for line in open(name, encoding='utf-8').read().splitlines()]
+    assert lines == [record.getMessage() for record in records]
@@ -0,0 +1,44 @@
+import os
+from utils.log_reader import LogReader, LogFilter
+
+def _line(i, level='INFO', name='app'):
+    return f"2025-07-01 12:00:{i % 60:02d},000 - {name} - {level} - message {i}\n"
+
+def _write(path, text):
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(text)
+
+def test_tail_reads_rotated_files_as_one_stream(tmp_path):
+    """Tail spans app.log.1 and app.log and folds traceback lines into records"""
+    log = tmp_path / 'app.log'
+    _write(str(log) + '.1', ''.join(_line(i) for i in range(0, 50)))
+    _write(log, ''.join(_line(i) for i in range(50, 55)))
+    _write(log, _line(55, 'ERROR', 'routes.api') + 'Traceback (most recent call last):\n  boom\n')
+
+    reader = LogReader(str(log), block_size=128)
+    records = reader.tail(10)['records']
+    assert [r.message.split('\n')[0] for r in records][:2] == ['message 46', 'message 47']
+    assert records[-1].level == 'ERROR' and records[-1].text.endswith('  boom')
+
+    errors = reader.tail(10, LogFilter(level='warning', logger_name='routes'))['records']
+    assert len(errors) == 1 and errors[0].logger == 'routes.api'
+    assert [r.message for r in reader.tail(5, LogFilter(pattern=r'message 1\d$'))['records']] == \
+        ['message 15', 'message 16', 'message 17', 'message 18', 'message 19']
+
+def test_cursor_follows_new_records_across_rotation(tmp_path):
+    """A cursor returns only new complete records, even after the file rotates"""
+    log = tmp_path / 'app.log'
+    _write(log, ''.join(_line(i) for i in range(3)))
+    reader = LogReader(str(log))
+    cursor = reader.tail(2)['cursor']
+
+    _write(log, _line(3) + _line(4))
+    result = reader.read_from(cursor)
+    # The newest record may still gain continuation lines, so it is held back
+    assert [r.message for r in result['records']] == ['message 3']
+
+    os.rename(log, str(log) + '.1')
+    _write(log, _line(5))
+    result = reader.read_from(result['cursor'])
+    assert [r.message for r in result['records']] == ['message 4']
+    assert reader.read_from(result['cursor'])['records'] == []
@@ -0,0 +1,58 @@
+import pytest
+from flask import Flask
+from utils.metrics import init_metrics, instrument_firebase_service, prometheus_client
+import routes.system_api as system_api
+
+pytestmark = pytest.mark.skipif(prometheus_client is None, reason="prometheus_client not installed")
+
+class FakeFirebaseService:
+    def is_available(self):
+        return True
+
+    def get_user_achievements(self, user_id):
+        return [{'id': 'a'}, {'id': 'b'}, {'id': 'c'}]
+
+    def commit_achievement_unlocks(self, user_id, achievements, activities):
+        return True
+
+def _sample(name, labels):
+    return prometheus_client.REGISTRY.get_sample_value(name, labels) or 0
+
+def test_request_metrics_are_exposed():
+    """Latency histogram and status counter appear at /api/system/metrics"""
+    app = Flask(__name__)
+    init_metrics(app)
+    app.register_blueprint(system_api.system_api_bp)
+
+    @app.route('/ping')
+    def ping():
+        return 'pong'
+
+    client = app.test_client()
+    before = _sample('cwm_http_requests_total', {'method': 'GET', 'endpoint': 'ping', 'status': '200'})
+    client.get('/ping')
+    client.get('/missing')
+    assert _sample('cwm_http_requests_total', {'method': 'GET', 'endpoint': 'ping', 'status': '200'}) == before + 1
+
+    response = client.get('/api/system/metrics')
+    assert response.status_code == 200
+    assert response.headers['Content-Type'].startswith('text/plain')
+    body = response.get_data(as_text=True)
+    assert 'cwm_http_request_duration_seconds_bucket{endpoint="ping"' in body
+    assert 'endpoint="unmatched",method="GET",status="404"' in body
+    assert _sample('cwm_http_requests_in_flight', {}) == 0
+
+def test_firestore_reads_and_writes_counted_per_collection():
+    """Wrapped service methods count billable documents per collection"""
+    instrument_firebase_service(FakeFirebaseService)
+    instrument_firebase_service(FakeFirebaseService)  # idempotent
+    service = FakeFirebaseService()
+    reads = {'collection': 'user_achievements', 'operation': 'read'}
+    writes = {'collection': 'user_achievements', 'operation': 'write'}
+    before_reads, before_writes = _sample('cwm_firestore_documents_total', reads), _sample('cwm_firestore_documents_total', writes)
+
+    service.get_user_achievements('u1')
+    service.commit_achievement_unlocks('u1', [{'id': 'x'}], activities=[{}, {}])
+
+    assert _sample('cwm_firestore_documents_total', reads) == before_reads + 3
+    assert _sample('cwm_firestore_documents_total', writes) == before_writes + 6  # achievement, 2 activities, user, user_stats, rollup
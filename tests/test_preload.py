@@ -0,0 +1,50 @@
+import gc
+import os
+from flask import Flask
+import services.async_firebase_service as async_module
+import services.content_snapshot as content_snapshot
+import services.lesson_search as lesson_search
+from services.content_snapshot import ContentSnapshot, write_snapshot
+from services.firebase_service import FirebaseService
+from services.lesson_search import LessonSearchIndex, get_lesson_search_index
+from utils.preload import warm_shared_state
+
+def test_warm_shared_state_precompiles_and_freezes(tmp_path, monkeypatch):
+    """The master compiles templates, indexes snapshot lessons and freezes the GC"""
+    path = str(tmp_path / 'snap.bin')
+    write_snapshot(path, {'lessons': [{'id': 'loops', 'title': 'Loops in Python', 'order': 1}]})
+    monkeypatch.setattr(content_snapshot, 'content_snapshot', ContentSnapshot(path))
+    monkeypatch.setattr(lesson_search, 'lesson_search_index', LessonSearchIndex())
+    app = Flask('app', root_path=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    try:
+        summary = warm_shared_state(app)
+        assert summary['templates'] > 0 and summary['indexed_lessons'] == 1
+        assert summary['frozen_objects'] > 0
+    finally:
+        gc.unfreeze()
+    assert get_lesson_search_index().search('loops')['lessons'][0]['id'] == 'loops'
+
+def test_clients_are_rebuilt_after_fork(monkeypatch):
+    """Clients created before fork are dropped and rebuilt lazily in the worker"""
+    calls = []
+    monkeypatch.setattr(FirebaseService, '_initialize_firebase', lambda self: calls.append(os.getpid()))
+    service = FirebaseService({}, lazy=True)
+    service.db
+    service.reset_after_fork()
+    assert calls == [os.getpid()] and not service._pending_init  # same process: kept
+
+    service._init_pid = os.getpid() + 1  # as if initialized in the master
+    service.reset_after_fork()
+    assert service._pending_init
+    service.db
+    assert len(calls) == 2
+
+    built = []
+    async_module.defer_async_firebase_service(lambda: built.append(1) or 'client')
+    try:
+        assert async_module.get_async_firebase_service() == 'client'
+        monkeypatch.setattr(async_module, '_built_pid', os.getpid() + 1)
+        async_module.reset_async_firebase_service_after_fork()
+        assert async_module.get_async_firebase_service() == 'client' and len(built) == 2
+    finally:
+        async_module.set_async_firebase_service(None)
@@ -0,0 +1,63 @@
+import time
+from collections import Counter
+from flask import Flask
+from utils.profiler import init_profiler, stacks_from_cprofile, functions_from_stacks, top_functions, collapsed_text
+
+def _busy(ms):
+    end = time.perf_counter() + ms / 1000
+    while time.perf_counter() < end:
+        pass
+
+def _app(**settings):
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    profiler = init_profiler(app, {'token': 'secret', **settings})
+
+    @app.route('/slow')
+    def slow():
+        _busy(30)
+        return 'done'
+
+    return app, profiler
+
+def test_profiles_only_when_triggered_by_admin_or_token():
+    """Anonymous X-Profile headers are ignored; token and admin sessions are honoured"""
+    app, profiler = _app()
+    client = app.test_client()
+    assert 'X-Profile-Id' not in client.get('/slow', headers={'X-Profile': 'cprofile'}).headers
+
+    response = client.get('/slow', headers={'X-Profile': 'cprofile', 'X-Profile-Token': 'secret'})
+    profile = profiler.store.get(response.headers['X-Profile-Id'])
+    assert profile['mode'] == 'cprofile' and profile['endpoint'] == 'slow' and profile['status'] == 200
+    assert any(row['function'].startswith('_busy') for row in top_functions(profile['functions'], 5))
+
+    with client.session_transaction() as sess:
+        sess['is_admin'] = True
+    response = client.get('/slow?__profile=sampling')
+    profile = profiler.store.get(response.headers['X-Profile-Id'])
+    assert profile['mode'] == 'sampling'
+    assert any('_busy' in stack for stack in profile['stacks'])
+
+    routes = profiler.store.list()['routes']
+    assert routes[0]['endpoint'] == 'slow' and routes[0]['profiles'] == 2
+
+def test_random_sampling_and_store_bound():
+    """sample_rate=1 profiles every request; the store keeps only max_profiles"""
+    app, profiler = _app(sample_rate=1, max_profiles=2)
+    client = app.test_client()
+    ids = [client.get('/slow').headers['X-Profile-Id'] for _ in range(3)]
+    assert profiler.store.get(ids[0]) is None
+    assert [p['id'] for p in profiler.store.list()['profiles']] == ids[:0:-1]
+
+def test_collapsed_and_top_tables():
+    """Collapsed stacks render one weighted path per line and feed the function table"""
+    stacks = Counter({'view;query;decode': 3000, 'view;render': 1000})
+    assert collapsed_text(stacks).splitlines() == ['view;query;decode 3000', 'view;render 1000']
+    rows = top_functions(functions_from_stacks(stacks), sort='total')
+    assert rows[0] == {'function': 'view', 'calls': None, 'self_ms': 0.0, 'total_ms': 4.0}
+
+    stats = {
+        ('app.py', 1, 'view'): (1, 1, 0.001, 0.004, {}),
+        ('app.py', 9, 'query'): (1, 1, 0.003, 0.003, {('app.py', 1, 'view'): (1, 1, 0.003, 0.003)}),
+    }
+    assert stacks_from_cprofile(stats) == Counter({'view (app.py:1)': 1000, 'view (app.py:1);query (app.py:9)': 3000})
@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta, timezone
+from services.recommendation_precompute import (
+    PrecomputeCheckpoint, is_recommendation_doc_fresh, get_precomputed_recommendations, progress_fingerprint
+)
+
+class FakeFirebaseService:
+    """Minimal stand-in exposing the precomputed recommendations lookup"""
+    def __init__(self, doc):
+        self.doc = doc
+
+    def is_available(self):
+        return True
+
+    def get_precomputed_recommendations(self, user_id):
+        return self.doc
+
+PROGRESS = {'python-basics': {'completed_subtopics': ['variables'], 'completed': False}}
+
+def _doc(age_seconds):
+    return {
+        'recommendations': [{'lesson_id': 'python-basics', 'score': 0.9}],
+        'progress_fingerprint': progress_fingerprint(PROGRESS),
+        'generated_at': datetime.now(timezone.utc) - timedelta(seconds=age_seconds)
+    }
+
+def test_fresh_doc_is_served():
+    """Recent documents with no newer user update are fresh"""
+    assert is_recommendation_doc_fresh(_doc(60))
+
+def test_old_doc_is_stale():
+    """Documents older than the max age fall back to live compute"""
+    assert not is_recommendation_doc_fresh(_doc(3600), max_age_seconds=600)
+
+def test_progress_change_after_generation_is_stale():
+    """Progress that differs from what the document was computed from invalidates it"""
+    progress = {'python-basics': {'completed_subtopics': ['variables', 'loops'], 'completed': False}}
+    assert not is_recommendation_doc_fresh(_doc(60), lesson_progress=progress)
+
+def test_unchanged_progress_stays_fresh():
+    """Logins and XP awards do not touch lesson_progress, so the document is still served"""
+    same_progress = {'python-basics': {'completed': False, 'completed_subtopics': ['variables']}}
+    assert is_recommendation_doc_fresh(_doc(60), lesson_progress=same_progress)
+    assert not is_recommendation_doc_fresh({**_doc(60), 'progress_fingerprint': None}, lesson_progress=PROGRESS)
+
+def test_missing_doc_returns_none():
+    """Missing documents return None so callers compute live"""
+    assert get_precomputed_recommendations(FakeFirebaseService(None), 'u1') is None
+    recs = get_precomputed_recommendations(FakeFirebaseService(_doc(60)), 'u1')
+    assert recs[0]['lesson_id'] == 'python-basics'
+
+def test_checkpoint_roundtrip(tmp_path):
+    """Checkpoint state survives save/load and clear removes it"""
+    checkpoint = PrecomputeCheckpoint(str(tmp_path / 'state' / 'checkpoint.json'))
+    assert checkpoint.load() == {}
+    checkpoint.save({'last_uid': 'user-042', 'users_processed': 42})
+    assert checkpoint.load()['last_uid'] == 'user-042'
+    checkpoint.clear()
+    assert checkpoint.load() == {}
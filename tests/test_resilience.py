@@ -0,0 +1,77 @@
+import time
+import pytest
+from google.api_core.exceptions import ServiceUnavailable
+from benchmarks.fake_firestore import InMemoryFirebaseService
+import utils.resilience as resilience
+from utils.resilience import (CircuitBreaker, start_request_deadline, reset_request_deadline,
+                              get_resilience_status, CLOSED, OPEN, HALF_OPEN)
+
+@pytest.fixture
+def guarded(monkeypatch):
+    """A request deadline with fast-tripping breakers"""
+    monkeypatch.setitem(resilience._settings, 'call_timeout_ms', 50)
+    monkeypatch.setitem(resilience._settings, 'failure_threshold', 2)
+    resilience.breakers.clear()
+    resilience.last_known_good.clear()
+    token = start_request_deadline(10_000)
+    yield
+    reset_request_deadline(token)
+    resilience.breakers.clear()
+    resilience.last_known_good.clear()
+
+def test_breaker_opens_and_probes():
+    """Consecutive failures open the breaker; after the reset timeout one probe may close it"""
+    breaker = CircuitBreaker('lessons', failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == OPEN and not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert not breaker.allow()  # only one probe at a time
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.allow()
+
+def test_slow_reads_fall_back_to_last_known_good(guarded):
+    """Reads past their deadline serve the last good result, and an open breaker answers without waiting"""
+    service = InMemoryFirebaseService()
+    service.db.collection('users').document('u1').set({'username': 'ada', 'xp': 10})
+    assert service.get_user('u1')['username'] == 'ada'
+
+    service.db.store.latency = 0.3
+    for _ in range(2):
+        assert service.get_user('u1')['username'] == 'ada'
+    assert get_resilience_status()['open_circuits'] == ['users']
+
+    started = time.perf_counter()
+    assert service.get_user('u1')['xp'] == 10
+    assert service.get_user('unknown') is None
+    assert time.perf_counter() - started < 0.1
+
+def test_caught_outages_trip_the_breaker(guarded, monkeypatch):
+    """Outage errors a method catches itself count as failures and serve the last good result"""
+    service = InMemoryFirebaseService()
+    service.db.collection('users').document('u1').set({'username': 'ada'})
+    assert service.get_user('u1')['username'] == 'ada'
+
+    def unavailable():
+        raise ServiceUnavailable('Firestore is unavailable')
+    monkeypatch.setattr(service.db.store, 'round_trip', unavailable)
+    for _ in range(2):
+        assert service.get_user('u1')['username'] == 'ada'
+    assert get_resilience_status()['circuits']['users']['state'] == OPEN
+
+def test_mutating_a_result_does_not_change_the_stale_copy(guarded, monkeypatch):
+    """Progress appended to a returned user before a failed write is not served during an outage"""
+    service = InMemoryFirebaseService()
+    service.db.collection('users').document('u1').set({'lesson_progress': {'loops': {'completed_subtopics': ['for']}}})
+    user = service.get_user('u1')
+    user['lesson_progress']['loops']['completed_subtopics'].append('while')
+    user['current_streak'] = 3
+
+    def unavailable():
+        raise ServiceUnavailable('Firestore is unavailable')
+    monkeypatch.setattr(service.db.store, 'round_trip', unavailable)
+    stale = service.get_user('u1')
+    assert stale['lesson_progress']['loops']['completed_subtopics'] == ['for']
+    assert 'current_streak' not in stale
@@ -0,0 +1,66 @@
+import threading
+import time
+from flask import Flask
+from services.resource_sampler import ResourceSampler
+import routes.system_api as system_api
+
+def test_ring_buffer_keeps_latest_samples():
+    """The buffer is bounded and latest() returns the newest sample"""
+    sampler = ResourceSampler(interval=60, capacity=3)
+    assert sampler.latest() is None
+    for _ in range(5):
+        sampler.sample()
+    assert len(sampler.samples()) == 3
+    latest = sampler.latest()
+    assert latest is sampler.samples()[-1]
+    assert latest['rss'] > 0 and latest['open_fds'] > 0
+    assert 0 <= latest['memory_percent'] <= 100
+
+def test_history_aggregates_min_avg_max_per_window():
+    """history() summarises only samples inside each window"""
+    sampler = ResourceSampler(interval=60, capacity=10)
+    now = time.time()
+    for age, cpu in ((500, 90.0), (30, 10.0), (10, 30.0)):
+        sample = sampler.sample()
+        sample.update(timestamp=now - age, cpu_percent=cpu)
+
+    history = sampler.history((60, 900))
+    assert history['60']['samples'] == 2
+    assert history['60']['metrics']['cpu_percent'] == {'min': 10.0, 'avg': 20.0, 'max': 30.0}
+    assert history['900']['metrics']['cpu_percent']['max'] == 90.0
+
+def test_status_and_history_endpoints_use_sampler():
+    """/api/system/status reads the snapshot and history validates windows"""
+    app = Flask(__name__)
+    app.register_blueprint(system_api.system_api_bp)
+    client = app.test_client()
+
+    start = time.perf_counter()
+    status = client.get('/api/system/status')
+    assert status.status_code == 200
+    assert time.perf_counter() - start < 0.1  # no cpu_percent(interval=0.1) sleep
+    assert 'percent' in status.get_json()['system_resources']['memory_usage']
+
+    history = client.get('/api/system/metrics/history?windows=60,300')
+    assert set(history.get_json()['windows']) == {'60', '300'}
+    assert client.get('/api/system/metrics/history?windows=abc').status_code == 400
+
+def test_concurrent_starts_run_one_sampler_thread(monkeypatch):
+    """Requests racing to start the sampler in a fresh worker start a single thread"""
+    sampler = ResourceSampler(interval=60, capacity=3)
+    started = []
+    original_start = threading.Thread.start
+    def counting_start(thread):
+        if thread.name == 'resource-sampler':
+            started.append(thread)
+            time.sleep(0.01)  # widen the window between the running check and the start
+        original_start(thread)
+    monkeypatch.setattr(threading.Thread, 'start', counting_start)
+
+    racers = [threading.Thread(target=sampler.start) for _ in range(8)]
+    for racer in racers:
+        original_start(racer)
+    for racer in racers:
+        racer.join()
+    sampler.stop()
+    assert len(started) == 1
@@ -0,0 +1,47 @@
+from datetime import date, timedelta
+from benchmarks.fake_firestore import InMemoryFirebaseService
+from services.rollups import (week_key, month_key, bucket_starts, dense_series, regroup_series, rollup_day,
+                              RollupCompactionJob)
+
+def test_buckets_and_dense_series():
+    """Bucket keys follow ISO weeks and months; missing buckets read as zero"""
+    assert week_key(date(2025, 1, 1)) == '2025-W01'
+    assert week_key(date(2024, 12, 30)) == '2025-W01'
+    assert month_key(date(2025, 2, 14)) == '2025-02'
+    assert bucket_starts(date(2025, 1, 30), date(2025, 3, 2), 'month') == [
+        date(2025, 1, 1), date(2025, 2, 1), date(2025, 3, 1)]
+
+    daily = dense_series(date(2025, 6, 1), date(2025, 6, 10), 'day',
+                         {'2025-06-02': {'xp': 10}, '2025-06-09': {'xp': 5, 'activities': 2}})
+    assert daily['series']['xp'] == [0, 10, 0, 0, 0, 0, 0, 0, 5, 0]
+    weekly = regroup_series(daily, 'week')
+    assert weekly['labels'] == ['2025-05-26', '2025-06-02', '2025-06-09']
+    assert (weekly['series']['xp'], weekly['series']['activities']) == ([0, 10, 5], [0, 0, 2])
+
+def test_events_fill_day_buckets_and_compaction_keeps_totals():
+    """Writes increment today's bucket; folding old days into weeks and months keeps totals"""
+    service = InMemoryFirebaseService()
+    service.db.collection('users').document('u1').set({'xp': 0, 'total_xp': 0})
+    assert service.update_user_rewards('u1', 40, 0)
+    assert service.record_user_stats('u1', {'code_executions': 1})
+    assert service.record_activity('u1', 'lesson_started', {})
+    today = rollup_day()
+    series = service.get_rollup_series('u1', today - timedelta(days=6), today)
+    assert len(series['labels']) == 7
+    assert (series['series']['xp'][-1], series['series']['activities'][-1], series['series']['code_executions'][-1]) == (40, 1, 1)
+
+    days = service.db.collection('user_rollups').document('u1').collection('days')
+    for offset in range(200, 230):
+        day = today - timedelta(days=offset)
+        days.document(day.isoformat()).set({'date': day.isoformat(), 'xp': 1})
+    start, end = today - timedelta(days=240), today
+    before = service.get_rollup_series('u1', start, end, 'month')
+
+    dry = RollupCompactionJob(service, dry_run=True, page_size=7).run()
+    assert dry['days_compacted'] == 30 and len(list(days.stream())) == 31
+    metrics = RollupCompactionJob(service, page_size=7).run()
+    assert (metrics['users_compacted'], metrics['days_compacted']) == (1, 30)
+    assert len(list(days.stream())) == 1
+    assert service.get_rollup_series('u1', start, end, 'month') == before
+    assert sum(service.get_rollup_series('u1', start, end, 'week')['series']['xp']) == 70
+    assert RollupCompactionJob(service).run()['days_compacted'] == 0
@@ -0,0 +1,47 @@
+import gzip
+import pytest
+from flask import Flask
+from utils.static_files import init_static_files, content_type_for, hot_asset_cache
+
+@pytest.fixture
+def client(tmp_path):
+    static = tmp_path / 'static'
+    (static / 'js').mkdir(parents=True)
+    source = b"export const answer = 42;\n" * 100
+    (static / 'js' / 'app.js').write_bytes(source)
+    (static / 'js' / 'app.js.gz').write_bytes(gzip.compress(source))
+    app = Flask(__name__, static_folder=str(static))
+    init_static_files(app)
+    return app.test_client()
+
+def test_content_type_table():
+    """ES modules are served with a JavaScript content type"""
+    assert content_type_for('js/app.mjs') == 'application/javascript; charset=utf-8'
+    assert content_type_for('css/main.css') == 'text/css; charset=utf-8'
+
+def test_serves_gzip_variant_when_accepted(client):
+    """Clients accepting gzip get the prebuilt .gz sibling"""
+    response = client.get('/static/js/app.js', headers={'Accept-Encoding': 'br, gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert gzip.decompress(response.data).startswith(b"export const answer")
+
+    plain = client.get('/static/js/app.js')
+    assert 'Content-Encoding' not in plain.headers
+    assert plain.headers['Content-Type'] == 'application/javascript; charset=utf-8'
+
+def test_range_and_conditional_requests(client):
+    """Range requests get identity bytes; matching ETags get 304 from the hot cache"""
+    partial = client.get('/static/js/app.js', headers={'Range': 'bytes=0-5', 'Accept-Encoding': 'gzip'})
+    assert partial.status_code == 206
+    assert partial.data == b"export"
+
+    first = client.get('/static/js/app.js')
+    hits = hot_asset_cache.hits
+    repeat = client.get('/static/js/app.js', headers={'If-None-Match': first.headers['ETag']})
+    assert repeat.status_code == 304
+    assert hot_asset_cache.hits == hits + 1
+
+def test_path_traversal_is_rejected(client):
+    """Paths escaping the static folder 404"""
+    assert client.get('/static/../secret.txt').status_code == 404
@@ -0,0 +1,50 @@
+from datetime import date, datetime, timedelta, timezone
+from benchmarks.fake_firestore import InMemoryFirebaseService
+from services.streaks import (advance_streak, streak_for_display, compute_streak_state, local_date,
+                              user_timezone, StreakBackfillJob)
+
+def test_advance_streak_and_display():
+    """Consecutive days extend the streak, gaps restart it, same-day activity is a no-op"""
+    user = {'streak': 4, 'max_streak': 6, 'streak_last_active': '2025-06-10'}
+    assert advance_streak(user, date(2025, 6, 10)) == {}
+    assert advance_streak(user, date(2025, 6, 9)) == {}
+    assert advance_streak(user, date(2025, 6, 11)) == {
+        'streak': 5, 'max_streak': 6, 'streak_last_active': '2025-06-11'}
+    assert advance_streak(user, date(2025, 6, 13))['streak'] == 1
+
+    now = datetime(2025, 6, 11, 12, tzinfo=timezone.utc)
+    assert streak_for_display(user, now) == 4
+    assert streak_for_display(user, now + timedelta(days=1)) == 0
+
+    # 23:30 UTC is already the next day in Lisbon summer time
+    late = datetime(2025, 6, 10, 23, 30, tzinfo=timezone.utc)
+    assert local_date(late, user_timezone({'timezone': 'Europe/Lisbon'})) == date(2025, 6, 11)
+    assert local_date(late, user_timezone({'timezone': 'Not/AZone'})) == date(2025, 6, 10)
+
+def test_compute_streak_state_from_days():
+    """The backfill keeps the trailing run and the longest run"""
+    days = [date(2025, 6, d) for d in (1, 2, 3, 4, 7, 8)]
+    assert compute_streak_state(days) == {'streak': 2, 'max_streak': 4, 'streak_last_active': '2025-06-08'}
+    assert compute_streak_state([])['streak'] == 0
+
+def test_record_activity_and_backfill():
+    """Recording activities advances the user doc; the backfill rebuilds it from activities"""
+    service = InMemoryFirebaseService()
+    today = datetime.now(timezone.utc)
+    service.db.collection('users').document('u1').set({'xp': 0})
+    service.db.collection('users').document('u2').set({'xp': 0, 'streak': 9})
+
+    assert service.record_activity('u1', 'lesson_started', {'lesson_id': 'l1'})
+    assert service.record_activity('u1', 'quiz_completed', {'quiz_id': 'q1'})
+    user = service.get_user('u1')
+    assert (user['streak'], user['max_streak']) == (1, 1)
+    assert service.get_user_dashboard_data('u1')['current_streak'] == 1
+    assert len(service.get_user_activities('u1')) == 2
+
+    for days_ago in (0, 1, 2, 5):
+        service.db.collection('activities').add({'user_id': 'u2', 'timestamp': today - timedelta(days=days_ago)})
+    metrics = StreakBackfillJob(service, page_size=2).run()
+    assert metrics['activities_scanned'] == 6
+    assert metrics['users_updated'] == 1  # u1's live state already matches
+    u2 = service.get_user('u2')
+    assert (u2['streak'], u2['max_streak'], u2['xp']) == (3, 3, 0)
@@ -0,0 +1,91 @@
+import threading
+from datetime import datetime, timezone
+from benchmarks.fake_firestore import InMemoryFirebaseService
+from services.user_stats import (combine_deltas, lesson_progress_deltas, quiz_deltas, xp_deltas, stats_summary,
+                                 UserStatsRebuildJob)
+
+def test_deltas_combine_and_fill_defaults():
+    """Event deltas sum key by key, including per-category maps"""
+    deltas = combine_deltas(
+        lesson_progress_deltas('python', subtopics=1, lesson_completed=True, time_spent=20),
+        lesson_progress_deltas('python', subtopics=2, time_spent=-5),
+        quiz_deltas({'percentage': 100}),
+        xp_deltas(50)
+    )
+    assert deltas['progress_by_category'] == {'python': {'completed': 1, 'subtopics': 3, 'time_spent': 20}}
+    assert (deltas['quizzes_passed'], deltas['perfect_quiz_scores'], deltas['xp_earned']) == (1, 1, 50)
+    summary = stats_summary({'code_executions': 4})
+    assert (summary['code_executions'], summary['quizzes_completed'], summary['progress_by_category']) == (4, 0, {})
+
+def test_writes_increment_stats_in_the_same_commit():
+    """Quiz results, user updates, rewards and runs all land in user_stats/{uid}"""
+    service = InMemoryFirebaseService()
+    service.db.collection('users').document('u1').set({'xp': 0, 'total_xp': 0, 'pycoins': 0})
+
+    result = {'quiz_id': 'q1', 'user_id': 'u1', 'percentage': 80, 'duration': 30, 'passed': True}
+    assert service.save_quiz_result_by_id('u1_q1_1', result)
+    assert service.save_quiz_result_by_id('u1_q1_1', result)  # resubmission is not counted twice
+    assert service.update_user('u1', {'xp': 50}, stats_deltas=combine_deltas(
+        lesson_progress_deltas('python', subtopics=1), xp_deltas(50)))
+    assert service.update_user_rewards('u1', 100, 5)
+    assert service.record_user_stats('u1', {'code_executions': 1, 'code_errors': 1})
+    assert service.record_activity('u1', 'lesson_started', {})
+
+    stats = service.get_user_stats_doc('u1')
+    assert (stats['quizzes_completed'], stats['quizzes_passed'], stats['quiz_time_spent']) == (1, 1, 30)
+    assert (stats['xp_earned'], stats['subtopics_completed'], stats['code_errors']) == (150, 1, 1)
+    assert stats['progress_by_category']['python']['subtopics'] == 1
+    user_stats = service.get_user_stats('u1')
+    assert (user_stats.xp, user_stats.quizzes_completed, user_stats.current_streak) == (150, 1, 1)
+
+def test_rebuild_recomputes_counters_from_raw_collections():
+    """The rebuild matches incrementally kept counters and carries run counts over"""
+    service = InMemoryFirebaseService()
+    db = service.db
+    db.collection('lessons').document('l1').set({'category': 'basics', 'title': 'L1', 'order': 1})
+    db.collection('users').document('u1').set({'xp': 300, 'achievements': ['a1'], 'lesson_progress': {
+        'l1': {'completed': True, 'completed_subtopics': ['s1', 's2'], 'time_spent': 40}}})
+    db.collection('users').document('u2').set({'xp': 0})
+    for number, percentage in enumerate((50, 100, 90)):
+        db.collection('quiz_results').document(f"r{number}").set({
+            'user_id': 'u1', 'percentage': percentage, 'passed': percentage >= 70, 'duration': 10,
+            'submitted_at': datetime.now(timezone.utc)})
+    db.collection('user_stats').document('u1').set({'code_executions': 7, 'quizzes_completed': 99})
+
+    metrics = UserStatsRebuildJob(service, page_size=2).run()
+    assert (metrics['users_scanned'], metrics['quiz_results_scanned'], metrics['users_updated']) == (2, 3, 2)
+    stats = service.get_user_stats_doc('u1')
+    assert (stats['quizzes_completed'], stats['quizzes_passed'], stats['perfect_quiz_scores']) == (3, 2, 1)
+    assert (stats['code_executions'], stats['xp_earned'], stats['achievements_unlocked']) == (7, 300, 1)
+    assert stats['progress_by_category'] == {'basics': {'completed': 1, 'subtopics': 2, 'time_spent': 40}}
+    assert UserStatsRebuildJob(service).run()['users_updated'] == 0
+
+def test_profile_bundle_reads_only_the_stats_document():
+    """Given the loaded user, the profile bundle costs one read and counts achievements from user_stats"""
+    service = InMemoryFirebaseService()
+    service.db.collection('users').document('u1').set({'xp': 0, 'achievements': []})
+    assert service.commit_achievement_unlocks('u1', [{'id': 'code_runner', 'points': 5}], []) == ['code_runner']
+    user = service.get_user('u1')
+
+    rpcs = service.db.store.rpc_count
+    bundle = service.get_profile_bundle('u1', user_data=user)
+    assert service.db.store.rpc_count == rpcs + 1
+    assert bundle['stats'].achievements_unlocked == 1 and bundle['user'] is user
+
+def test_concurrent_subtopic_submits_count_once():
+    """Racing submits of one subtopic award its XP and stats deltas a single time"""
+    service = InMemoryFirebaseService()
+    service.db.collection('users').document('u1').set({'xp': 10, 'lesson_progress': {}})
+    results = []
+    submits = [threading.Thread(target=lambda: results.append(
+        service.complete_subtopic('u1', 'loops', 'for', 3, lesson_xp=100, category='python'))) for _ in range(4)]
+    for submit in submits:
+        submit.start()
+    for submit in submits:
+        submit.join()
+
+    assert sorted(result['added'] for result in results) == [False, False, False, True]
+    user = service.get_user('u1')
+    assert user['xp'] == 60 and user['lesson_progress']['loops']['completed_subtopics'] == ['for']
+    stats = service.get_user_stats_doc('u1')
+    assert (stats['subtopics_completed'], stats['xp_earned']) == (1, 50)
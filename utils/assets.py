@@ -0,0 +1,373 @@
+"""
+Static asset pipeline for Code with Morais
+Builds fingerprinted, minified and precompressed bundles and resolves them at runtime
+
+Build step (run before deploy, see scripts/deployment/build_assets.py):
+- CSS bundles are read from config/css-bundles.js (a bundle listing a
+  missing source fails the build), local @imports are inlined,
+  url() references are rewritten to absolute /static paths, then the bundle is
+  minified and written as static/dist/css/bundles/<name>.<hash>.css
+- Classic (non-module) scripts under static/js are minified when rjsmin is
+  installed and fingerprinted individually. ES modules are left in place
+  because their relative imports resolve against unhashed filenames.
+- Every output gets .gz (and .br when brotli is installed) siblings and an
+  entry in static/dist/manifest.json
+- Other text files under static/ get .gz/.br siblings in place so the static
+  handler (utils/static_files.py) can serve them precompressed
+
+Runtime: init_assets(app) registers the asset_url() Jinja helper, which maps a
+logical path (e.g. 'css/bundles/lessons.css') to its fingerprinted file and
+falls back to the unbuilt static file when no manifest entry exists.
+Fingerprinted files are served with immutable far-future caching.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+STATIC_DIR = PROJECT_ROOT / 'static'
+BUNDLE_CONFIG = PROJECT_ROOT / 'config' / 'css-bundles.js'
+DIST_DIRNAME = 'dist'
+MANIFEST_NAME = 'manifest.json'
+
+HASH_LENGTH = 10
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+# Script directories that are never shipped to pages
+JS_EXCLUDED_DIRS = ('archive', 'debug')
+
+# Unbuilt static files precompressed in place for the static handler
+PRECOMPRESS_EXTENSIONS = ('.js', '.mjs', '.css', '.svg', '.json', '.map', '.html', '.txt', '.ico')
+PRECOMPRESS_MIN_BYTES = 1024
+
+# Cache-Control for fingerprinted files
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+_BUNDLE_PATTERN = re.compile(r'(\w+)\s*:\s*\{\s*files\s*:\s*\[(.*?)\](.*?)\}', re.DOTALL)
+_STRING_PATTERN = re.compile(r"""['"]([^'"]+)['"]""")
+_OPTION_PATTERN = re.compile(r"(\w+)\s*:\s*(?:'([^']*)'|\[(.*?)\])", re.DOTALL)
+_IMPORT_PATTERN = re.compile(r"""@import\s+(?:url\(\s*)?['"]?([^'")\s;]+)['"]?\s*\)?\s*([^;]*);""")
+_URL_PATTERN = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+_ESM_PATTERN = re.compile(r'^\s*(?:import\s*[\w{*\'"]|export\s)', re.MULTILINE)
+_HASHED_NAME_PATTERN = re.compile(r'\.[0-9a-f]{%d}\.(?:css|js)$' % HASH_LENGTH)
+
+
+# ----------------------------------------------------------------------
+# Bundle configuration
+# ----------------------------------------------------------------------
+
+def parse_bundle_config(config_path: Path = BUNDLE_CONFIG) -> Dict[str, Dict[str, Any]]:
+    """Read CSS_BUNDLES from config/css-bundles.js into {name: {files, priority, ...}}"""
+    source = config_path.read_text(encoding='utf-8')
+    source = re.sub(r'/\*.*?\*/', '', source, flags=re.DOTALL)
+    source = re.sub(r'^\s*//.*$', '', source, flags=re.MULTILINE)
+
+    start = source.index('CSS_BUNDLES')
+    end = source.find('};', start)
+    body = source[start:end]
+
+    bundles = {}
+    for name, files, options in _BUNDLE_PATTERN.findall(body):
+        bundle = {'files': _STRING_PATTERN.findall(files)}
+        for key, value, items in _OPTION_PATTERN.findall(options):
+            bundle[key] = value if value else _STRING_PATTERN.findall(items)
+        bundles[name] = bundle
+    return bundles
+
+
+# ----------------------------------------------------------------------
+# Transforms
+# ----------------------------------------------------------------------
+
+def minify_css(css: str) -> str:
+    """Conservative CSS minifier: strips comments and redundant whitespace outside strings"""
+    out = []
+    i, length = 0, len(css)
+    while i < length:
+        char = css[i]
+        if char in '"\'':
+            end = i + 1
+            while end < length and css[end] != char:
+                end += 2 if css[end] == '\\' else 1
+            out.append(css[i:end + 1])
+            i = end + 1
+        elif css.startswith('/*', i):
+            end = css.find('*/', i + 2)
+            end = length if end == -1 else end + 2
+            if css.startswith('/*!', i):
+                out.append(css[i:end])  # preserve license comments
+            i = end
+        elif char.isspace():
+            while i < length and css[i].isspace():
+                i += 1
+            out.append(' ')
+        else:
+            out.append(char)
+            i += 1
+
+    minified = ''.join(out)
+    # Outside strings only: drop spaces around punctuation that never needs them
+    parts = re.split(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')', minified)
+    for index in range(0, len(parts), 2):
+        segment = re.sub(r'\s*([{};,>])\s*', r'\1', parts[index])
+        segment = re.sub(r':\s+', ':', segment)
+        segment = segment.replace(';}', '}')
+        parts[index] = segment
+    return ''.join(parts).strip()
+
+
+def minify_js(js: str) -> str:
+    """Minify a classic script when rjsmin is available"""
+    if rjsmin is None:
+        return js
+    return rjsmin.jsmin(js)
+
+
+def is_es_module(js: str) -> bool:
+    """Detect ES module syntax (top-level import/export)"""
+    return bool(_ESM_PATTERN.search(js))
+
+
+def _static_url(path: Path, static_dir: Path) -> str:
+    """Absolute URL for a file under the static directory"""
+    return '/static/' + path.relative_to(static_dir).as_posix()
+
+
+def _rewrite_urls(css: str, source: Path, static_dir: Path) -> str:
+    """Rewrite relative url() references so they survive relocation into dist/"""
+    def replace(match):
+        quote, target = match.groups()
+        if re.match(r'^(?:[a-z]+:|/|#|data:)', target, re.IGNORECASE):
+            return match.group(0)
+        resolved = (source.parent / target.split('?')[0].split('#')[0]).resolve()
+        try:
+            suffix = target[len(target.split('?')[0].split('#')[0]):]
+            return f"url({quote}{_static_url(resolved, static_dir)}{suffix}{quote})"
+        except ValueError:
+            return match.group(0)
+    return _URL_PATTERN.sub(replace, css)
+
+
+def inline_css(path: Path, static_dir: Path = STATIC_DIR, seen: Optional[set] = None) -> str:
+    """Read a stylesheet, recursively inlining local @imports without media queries"""
+    seen = set() if seen is None else seen
+    path = path.resolve()
+    if path in seen:
+        return ''
+    seen.add(path)
+
+    try:
+        css = path.read_text(encoding='utf-8')
+    except OSError as e:
+        logger.warning(f"Could not read CSS file {path}: {str(e)}")
+        return ''
+
+    def replace(match):
+        target, media = match.group(1), match.group(2).strip()
+        if media or re.match(r'^(?:[a-z]+:|//)', target, re.IGNORECASE):
+            return match.group(0)  # conditional or remote imports stay as-is
+        imported = (static_dir / target.lstrip('/')) if target.startswith('/') else (path.parent / target)
+        return inline_css(imported, static_dir, seen)
+
+    css = _IMPORT_PATTERN.sub(replace, css)
+    return _rewrite_urls(css, path, static_dir)
+
+
+def _hoist_imports(css: str) -> str:
+    """Move remaining @import/@charset rules to the top so they stay valid after concatenation"""
+    statements = []
+    def collect(match):
+        statements.append(match.group(0))
+        return ''
+    css = re.sub(r'@(?:charset|import)\b[^;]*;', collect, css)
+    charset = [s for s in statements if s.startswith('@charset')][:1]
+    imports = list(dict.fromkeys(s for s in statements if s.startswith('@import')))
+    return '\n'.join(charset + imports + [css])
+
+
+# ----------------------------------------------------------------------
+# Build
+# ----------------------------------------------------------------------
+
+def _compress_siblings(path: Path, content: bytes) -> Dict[str, int]:
+    """Write .gz (and .br when available) next to a file and return their sizes"""
+    gzipped = gzip.compress(content, compresslevel=GZIP_LEVEL, mtime=0)
+    Path(f"{path}.gz").write_bytes(gzipped)
+    sizes = {'gzip_size': len(gzipped)}
+    if brotli is not None:
+        compressed = brotli.compress(content, quality=BROTLI_QUALITY)
+        Path(f"{path}.br").write_bytes(compressed)
+        sizes['br_size'] = len(compressed)
+    return sizes
+
+
+def _write_asset(logical_path: str, content: bytes, dist_dir: Path, static_dir: Path) -> Dict[str, Any]:
+    """Write a fingerprinted file with .gz/.br siblings and return its manifest entry"""
+    digest = hashlib.sha256(content).hexdigest()
+    stem, ext = os.path.splitext(logical_path)
+    output = dist_dir / f"{stem}.{digest[:HASH_LENGTH]}{ext}"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_bytes(content)
+
+    entry = {
+        'file': output.relative_to(static_dir).as_posix(),
+        'size': len(content),
+        'sha256': digest,
+    }
+    entry.update(_compress_siblings(output, content))
+    return entry
+
+
+def precompress_static(static_dir: Path = STATIC_DIR) -> Dict[str, int]:
+    """Write .gz/.br siblings for unbuilt text assets whose variants are missing or stale"""
+    written = skipped = 0
+    dist_dir = static_dir / DIST_DIRNAME
+    for path in static_dir.rglob('*'):
+        if (path.suffix not in PRECOMPRESS_EXTENSIONS or not path.is_file()
+                or dist_dir in path.parents):
+            continue
+        stat = path.stat()
+        if stat.st_size < PRECOMPRESS_MIN_BYTES:
+            continue
+        gz_path = Path(f"{path}.gz")
+        if gz_path.exists() and gz_path.stat().st_mtime >= stat.st_mtime:
+            skipped += 1
+            continue
+        _compress_siblings(path, path.read_bytes())
+        written += 1
+    return {'written': written, 'skipped': skipped}
+
+
+def build_assets(static_dir: Path = STATIC_DIR, config_path: Path = BUNDLE_CONFIG,
+                 include_js: bool = True) -> Dict[str, Any]:
+    """Build all bundles and scripts into static/dist and write the manifest"""
+    project_root = config_path.resolve().parent.parent
+    dist_dir = static_dir / DIST_DIRNAME
+    dist_dir.mkdir(parents=True, exist_ok=True)
+
+    manifest = {
+        'version': 1,
+        'generated': datetime.now().isoformat(),
+        'assets': {},
+        'bundles': {},
+    }
+
+    for name, bundle in parse_bundle_config(config_path).items():
+        sources = [project_root / file for file in bundle['files']]
+        missing = [file for file, path in zip(bundle['files'], sources) if not path.exists()]
+        if missing:
+            # A partial or stale bundle would ship silently; fix config/css-bundles.js instead
+            raise FileNotFoundError(f"Bundle {name} lists missing sources: {', '.join(missing)}")
+        css = '\n'.join(inline_css(path, static_dir) for path in sources)
+        minified = minify_css(_hoist_imports(css)).encode('utf-8')
+        logical_path = f"css/bundles/{name}.css"
+        manifest['assets'][logical_path] = _write_asset(logical_path, minified, dist_dir, static_dir)
+        if len(bundle['files']) == 1:
+            # Single-file bundles (e.g. critical = main.css) also resolve by source path
+            source_path = (project_root / bundle['files'][0]).resolve().relative_to(static_dir.resolve())
+            manifest['assets'][source_path.as_posix()] = manifest['assets'][logical_path]
+        manifest['bundles'][name] = {
+            'asset': logical_path,
+            'files': bundle['files'],
+            'priority': bundle.get('priority'),
+            'loadStrategy': bundle.get('loadStrategy'),
+            'pages': bundle.get('pages', []),
+        }
+
+    if include_js:
+        for path in sorted((static_dir / 'js').rglob('*.js')):
+            relative = path.relative_to(static_dir)
+            if relative.parts[1] in JS_EXCLUDED_DIRS or path.name.endswith('.min.js'):
+                continue
+            source = path.read_text(encoding='utf-8')
+            if is_es_module(source):
+                continue
+            logical_path = relative.as_posix()
+            manifest['assets'][logical_path] = _write_asset(
+                logical_path, minify_js(source).encode('utf-8'), dist_dir, static_dir
+            )
+
+    manifest_path = dist_dir / MANIFEST_NAME
+    tmp_path = manifest_path.with_suffix('.tmp')
+    tmp_path.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding='utf-8')
+    os.replace(tmp_path, manifest_path)
+    return manifest
+
+
+# ----------------------------------------------------------------------
+# Runtime
+# ----------------------------------------------------------------------
+
+class AssetManifest:
+    """Maps logical static paths to fingerprinted files"""
+
+    def __init__(self, manifest_path: Path):
+        self.manifest_path = Path(manifest_path)
+        self.assets: Dict[str, Dict[str, Any]] = {}
+        self.load()
+
+    def load(self):
+        """Load the manifest; a missing manifest means unbuilt assets are served"""
+        try:
+            data = json.loads(self.manifest_path.read_text(encoding='utf-8'))
+            self.assets = data.get('assets', {})
+            logger.info(f"Loaded asset manifest with {len(self.assets)} entries")
+        except FileNotFoundError:
+            self.assets = {}
+            logger.info("No asset manifest found - serving unbuilt static files")
+        except Exception as e:
+            self.assets = {}
+            logger.error(f"Failed to load asset manifest: {str(e)}")
+
+    def resolve(self, filename: str) -> str:
+        """Fingerprinted path relative to static/ (or the original path)"""
+        entry = self.assets.get(filename.lstrip('/'))
+        return entry['file'] if entry else filename
+
+
+def is_fingerprinted(path: str) -> bool:
+    """True for built files whose name carries a content hash"""
+    return f'/{DIST_DIRNAME}/' in path and bool(_HASHED_NAME_PATTERN.search(path))
+
+
+def init_assets(app, manifest_path: Optional[Path] = None) -> AssetManifest:
+    """Register asset_url() and immutable caching for fingerprinted files"""
+    from flask import url_for, request
+
+    static_dir = Path(app.static_folder)
+    manifest = AssetManifest(manifest_path or static_dir / DIST_DIRNAME / MANIFEST_NAME)
+    app.extensions['asset_manifest'] = manifest
+
+    def asset_url(filename: str) -> str:
+        """URL of the built asset for a logical static path"""
+        return url_for('static', filename=manifest.resolve(filename))
+
+    app.jinja_env.globals['asset_url'] = asset_url
+
+    @app.after_request
+    def cache_fingerprinted_assets(response):
+        """Fingerprinted files never change, so let browsers keep them for a year"""
+        if response.status_code in (200, 206, 304) and is_fingerprinted(request.path):
+            response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+    return manifest
@@ -5,8 +5,9 @@ Enables maintainable, self-documenting component library
 """
 
 from typing import Dict, List, Any, Optional, Callable
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, asdict
 from enum import Enum
+import hashlib
 import inspect
 import json
 from pathlib import Path
@@ -128,11 +129,26 @@ class ComponentInfo:
         return f"{{% include '{self.template_path}' with {props_str} %}}"
 
 
+def _stable_value(value):
+    """JSON fallback that is identical in every process (no object addresses)"""
+    if isinstance(value, Enum):
+        return value.value
+    return getattr(value, '__qualname__', type(value).__name__)
+
+
+def _component_digest(component: ComponentInfo) -> str:
+    """Content hash of a component's registered metadata"""
+    encoded = json.dumps(asdict(component), sort_keys=True, default=_stable_value)
+    return hashlib.sha1(encoded.encode('utf-8')).hexdigest()
+
+
 class ComponentRegistry:
     """Central registry for all UI components"""
     
     def __init__(self):
         self.components: Dict[str, ComponentInfo] = {}
+        self._digests: Dict[str, str] = {}
+        self.content_version = ''
         self._initialize_components()
     
     def _initialize_components(self):
@@ -288,6 +304,10 @@ class ComponentRegistry:
     def register_component(self, component: ComponentInfo):
         """Register a new component"""
         self.components[component.name] = component
+        self._digests[component.name] = _component_digest(component)
+        self.content_version = hashlib.sha1(
+            '|'.join(f"{name}:{digest}" for name, digest in sorted(self._digests.items())).encode('utf-8')
+        ).hexdigest()
     
     def get_component_info(self, name: str) -> Optional[ComponentInfo]:
         """Get component information by name"""
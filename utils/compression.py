@@ -0,0 +1,99 @@
+"""
+Dynamic response compression for Code with Morais API blueprints
+gzip/brotli for /api/* responses above a size threshold
+
+Settings come from Config.API_COMPRESSION:
+    enabled         turn the middleware on/off
+    min_size        bytes below which responses are sent as-is
+    gzip_level      zlib level (1 fastest ... 9 smallest)
+    brotli_quality  brotli quality (0 fastest ... 11 smallest); used when the
+                    brotli package is installed and the client accepts br
+    path_prefixes   request path prefixes the middleware applies to
+"""
+import gzip
+import logging
+from typing import Dict, Any, Optional
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_COMPRESSION_CONFIG = {
+    'enabled': True,
+    'min_size': 1024,
+    'gzip_level': 6,
+    'brotli_quality': 4,
+    'path_prefixes': ('/api/',),
+}
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/plain', 'text/html', 'application/javascript')
+
+
+def choose_encoding(accept_encodings) -> Optional[str]:
+    """Preferred content coding the client accepts"""
+    if brotli is not None and accept_encodings.quality('br') > 0:
+        return 'br'
+    if accept_encodings.quality('gzip') > 0:
+        return 'gzip'
+    return None
+
+
+def compress_bytes(data: bytes, encoding: str, settings: Dict[str, Any]) -> bytes:
+    """Compress a body with the configured level for the coding"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=settings['brotli_quality'])
+    return gzip.compress(data, compresslevel=settings['gzip_level'], mtime=0)
+
+
+def init_compression(app, settings: Optional[Dict[str, Any]] = None):
+    """Register the compression after_request hook"""
+    settings = {**DEFAULT_COMPRESSION_CONFIG, **(settings or {})}
+    app.extensions['api_compression'] = settings
+    if not settings['enabled']:
+        logger.info("API response compression disabled")
+        return settings
+
+    prefixes = tuple(settings['path_prefixes'])
+
+    @app.after_request
+    def compress_api_response(response):
+        """Compress eligible API responses"""
+        if (not request.path.startswith(prefixes)
+                or response.status_code < 200 or response.status_code >= 300
+                or response.status_code == 204
+                or response.direct_passthrough
+                or response.is_streamed
+                or 'Content-Encoding' in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        data = response.get_data()
+        if len(data) < settings['min_size']:
+            return response
+
+        try:
+            compressed = compress_bytes(data, encoding, settings)
+        except Exception as e:
+            logger.error(f"Error compressing response for {request.path}: {str(e)}")
+            return response
+
+        response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        # Representations differ per coding, so their strong validators must too
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(f"{etag}-{encoding}", weak=weak)
+        return response
+
+    logger.info(f"API response compression enabled (min_size={settings['min_size']})")
+    return settings
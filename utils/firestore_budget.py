@@ -0,0 +1,303 @@
+"""
+Per-request Firestore accounting for Code with Morais
+Documents, bytes, time and call sites of every Firestore call in a request
+
+FirebaseService and AsyncFirebaseService calls are reported here by the
+wrappers in utils/metrics.py. Each request gets a ledger (a ContextVar, so
+coroutines run through run_async() report into the caller's ledger too).
+When the request finishes:
+    - totals are added to the response as a Server-Timing header,
+    - requests over the read or latency budget are written to the
+      'firestore.slow' logger with their call sites,
+    - per-endpoint aggregates feed the admin report at
+      /api/system/firestore-budget.
+
+Byte counts are estimates of stored document size (Firestore's storage
+size rules) computed from the returned data, not wire bytes.
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from datetime import datetime, date
+from typing import Dict, Any, Optional, List
+
+from flask import request, g
+
+logger = logging.getLogger(__name__)
+slow_logger = logging.getLogger('firestore.slow')
+
+DEFAULT_BUDGET_CONFIG = {
+    'enabled': True,
+    'max_reads': 50,            # documents read per request
+    'max_firestore_ms': 300,    # time spent in Firestore calls per request
+    'max_request_ms': 1000,     # whole request latency
+    'slow_log_size': 100,       # slow requests kept for the admin report
+}
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Frames in these files are the data layer itself, not call sites
+DATA_LAYER_FILES = tuple(os.path.join(PROJECT_ROOT, path) for path in (
+    os.path.join('services', 'firebase_service.py'),
+    os.path.join('services', 'async_firebase_service.py'),
+    os.path.join('utils', 'metrics.py'),
+    os.path.join('utils', 'firestore_budget.py'),
+    os.path.join('utils', 'resilience.py'),
+))
+
+_ledger: ContextVar[Optional['RequestLedger']] = ContextVar('firestore_ledger', default=None)
+_call_site: ContextVar[Optional[str]] = ContextVar('firestore_call_site', default=None)
+
+
+def estimate_document_bytes(value: Any) -> int:
+    """Approximate Firestore storage size of returned data"""
+    if value is None or isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float, datetime, date)):
+        return 8
+    if isinstance(value, str):
+        return len(value.encode('utf-8')) + 1
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, dict):
+        return 32 + sum(len(str(key)) + 1 + estimate_document_bytes(item) for key, item in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sum(estimate_document_bytes(item) for item in value)
+    if hasattr(value, '__dict__'):
+        return estimate_document_bytes(vars(value))
+    return 8
+
+
+def find_call_site(depth: int = 2) -> str:
+    """First project frame outside the data layer, as 'path:line function'"""
+    site = _call_site.get()
+    if site:
+        return site  # captured in the request thread by bind_request_context
+    frame = sys._getframe(depth)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(PROJECT_ROOT) and not filename.startswith(DATA_LAYER_FILES):
+            return f"{os.path.relpath(filename, PROJECT_ROOT)}:{frame.f_lineno} {frame.f_code.co_name}"
+        frame = frame.f_back
+    return 'unknown'
+
+
+class RequestLedger:
+    """Firestore operations of one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.operations: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def add(self, operation: Dict[str, Any]):
+        with self._lock:
+            self.operations.append(operation)
+
+    def totals(self) -> Dict[str, Any]:
+        with self._lock:
+            operations = list(self.operations)
+        totals = {'calls': len(operations), 'reads': 0, 'writes': 0, 'bytes': 0, 'firestore_ms': 0.0,
+                  'collections': {}}
+        for op in operations:
+            key = 'reads' if op['operation'] == 'read' else 'writes'
+            totals[key] += op['documents']
+            totals['bytes'] += op['bytes']
+            totals['firestore_ms'] += op['duration_ms']
+            collection = totals['collections'].setdefault(op['collection'], {'reads': 0, 'writes': 0})
+            collection[key] += op['documents']
+        totals['firestore_ms'] = round(totals['firestore_ms'], 2)
+        return totals
+
+
+def record_operation(collection: str, operation: str, method: str, documents: int,
+                     duration: float, result: Any = None):
+    """Add one Firestore call to the current request's ledger, if any"""
+    ledger = _ledger.get()
+    if ledger is None:
+        return
+    ledger.add({
+        'collection': collection,
+        'operation': operation,
+        'method': method,
+        'documents': documents,
+        'bytes': estimate_document_bytes(result) if operation == 'read' else 0,
+        'duration_ms': round(duration * 1000, 3),
+        'call_site': find_call_site(3),
+    })
+
+
+def request_call_site() -> Optional[str]:
+    """Call site to report work handed to another thread under (None outside requests)"""
+    if _ledger.get() is None:
+        return None
+    return find_call_site(2)
+
+
+def bind_call_site(context, site: Optional[str]):
+    """Report Firestore calls run in a copied context under the given call site"""
+    if site:
+        context.run(_call_site.set, site)
+
+
+def bind_request_context(coro):
+    """Run a coroutine on another thread while reporting into this request's ledger"""
+    ledger = _ledger.get()
+    if ledger is None:
+        return coro
+    site = find_call_site(2)
+
+    async def bound():
+        ledger_token = _ledger.set(ledger)
+        site_token = _call_site.set(site)
+        try:
+            return await coro
+        finally:
+            _call_site.reset(site_token)
+            _ledger.reset(ledger_token)
+
+    return bound()
+
+
+class BudgetReport:
+    """Per-endpoint Firestore aggregates and recent over-budget requests"""
+
+    def __init__(self, slow_log_size: int = 100):
+        self._endpoints: Dict[str, Dict[str, Any]] = {}
+        self._slow = deque(maxlen=slow_log_size)
+        self._lock = threading.Lock()
+
+    def add(self, endpoint: str, totals: Dict[str, Any], request_ms: float):
+        with self._lock:
+            entry = self._endpoints.setdefault(endpoint, {
+                'requests': 0, 'reads': 0, 'writes': 0, 'bytes': 0, 'firestore_ms': 0.0,
+                'max_reads': 0, 'max_firestore_ms': 0.0, 'over_budget': 0, 'collections': {}})
+            entry['requests'] += 1
+            for key in ('reads', 'writes', 'bytes', 'firestore_ms'):
+                entry[key] += totals[key]
+            entry['max_reads'] = max(entry['max_reads'], totals['reads'])
+            entry['max_firestore_ms'] = max(entry['max_firestore_ms'], totals['firestore_ms'])
+            for name, counts in totals['collections'].items():
+                collection = entry['collections'].setdefault(name, {'reads': 0, 'writes': 0})
+                collection['reads'] += counts['reads']
+                collection['writes'] += counts['writes']
+
+    def add_slow(self, record: Dict[str, Any]):
+        with self._lock:
+            self._slow.append(record)
+            endpoint = self._endpoints.get(record['endpoint'])
+            if endpoint:
+                endpoint['over_budget'] += 1
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            endpoints = []
+            for name, entry in self._endpoints.items():
+                requests = entry['requests']
+                endpoints.append({
+                    'endpoint': name,
+                    **{key: value for key, value in entry.items() if key != 'collections'},
+                    'firestore_ms': round(entry['firestore_ms'], 2),
+                    'avg_reads': round(entry['reads'] / requests, 2),
+                    'avg_writes': round(entry['writes'] / requests, 2),
+                    'avg_firestore_ms': round(entry['firestore_ms'] / requests, 2),
+                    'collections': entry['collections'],
+                })
+            slow = list(self._slow)
+        endpoints.sort(key=lambda item: item['avg_reads'], reverse=True)
+        return {'endpoints': endpoints, 'slow_requests': slow[::-1]}
+
+    def clear(self):
+        with self._lock:
+            self._endpoints.clear()
+            self._slow.clear()
+
+
+class FirestoreBudget:
+    """Request hooks that open ledgers, emit Server-Timing and enforce budgets"""
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None):
+        self.settings = {**DEFAULT_BUDGET_CONFIG, **(settings or {})}
+        self.report = BudgetReport(self.settings['slow_log_size'])
+
+    def start(self):
+        g._firestore_ledger_token = _ledger.set(RequestLedger())
+
+    def finish(self, response):
+        ledger = _ledger.get()
+        if ledger is None:
+            return response
+        try:
+            totals = ledger.totals()
+            request_ms = (time.perf_counter() - ledger.started) * 1000
+            response.headers.add('Server-Timing', (
+                f'firestore;dur={totals["firestore_ms"]};'
+                f'desc="reads={totals["reads"]} writes={totals["writes"]} calls={totals["calls"]}"'))
+            response.headers.add('Server-Timing', f'app;dur={request_ms:.2f}')
+
+            endpoint = request.endpoint or 'unmatched'
+            if totals['calls']:
+                self.report.add(endpoint, totals, request_ms)
+            self._check_budget(endpoint, ledger, totals, request_ms)
+        except Exception as e:
+            logger.error(f"Error recording Firestore budget: {str(e)}")
+        return response
+
+    def _check_budget(self, endpoint: str, ledger: RequestLedger, totals: Dict[str, Any], request_ms: float):
+        exceeded = []
+        if totals['reads'] > self.settings['max_reads']:
+            exceeded.append(f"reads {totals['reads']} > {self.settings['max_reads']}")
+        if totals['firestore_ms'] > self.settings['max_firestore_ms']:
+            exceeded.append(f"firestore {totals['firestore_ms']}ms > {self.settings['max_firestore_ms']}ms")
+        if totals['calls'] and request_ms > self.settings['max_request_ms']:
+            exceeded.append(f"request {request_ms:.0f}ms > {self.settings['max_request_ms']}ms")
+        if not exceeded:
+            return
+
+        with ledger._lock:
+            operations = list(ledger.operations)
+        record = {
+            'timestamp': datetime.now().isoformat(),
+            'endpoint': endpoint,
+            'method': request.method,
+            'path': request.path,
+            'request_ms': round(request_ms, 2),
+            'exceeded': exceeded,
+            **{key: totals[key] for key in ('calls', 'reads', 'writes', 'bytes', 'firestore_ms')},
+            'operations': operations,
+        }
+        self.report.add_slow(record)
+        sites = '; '.join(f"{op['call_site']} {op['method']}({op['collection']}) "
+                          f"{op['documents']} docs {op['duration_ms']}ms" for op in operations)
+        slow_logger.warning(f"Firestore budget exceeded on {request.method} {request.path} "
+                            f"({', '.join(exceeded)}): {sites}")
+
+    def teardown(self, exc=None):
+        token = g.pop('_firestore_ledger_token', None)
+        if token is not None:
+            _ledger.reset(token)
+
+
+_budget: Optional[FirestoreBudget] = None
+
+
+def init_firestore_budget(app, settings: Optional[Dict[str, Any]] = None) -> Optional[FirestoreBudget]:
+    """Register per-request Firestore accounting hooks"""
+    global _budget
+    settings = {**DEFAULT_BUDGET_CONFIG, **(settings or {})}
+    if not settings['enabled']:
+        logger.info("Firestore budget tracking disabled")
+        return None
+    _budget = FirestoreBudget(settings)
+    app.before_request(_budget.start)
+    app.after_request(_budget.finish)
+    app.teardown_request(_budget.teardown)
+    return _budget
+
+
+def get_firestore_budget() -> Optional[FirestoreBudget]:
+    return _budget
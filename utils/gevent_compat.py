@@ -0,0 +1,53 @@
+"""
+gevent worker support for Code with Morais
+Routes spend most of their time waiting on Firestore and Piston, so a
+cooperative worker (gunicorn -k gevent) serves many requests per process
+by switching greenlets whenever one blocks on the network
+
+Requirements, and how the app meets them:
+    - monkey.patch_all() must run before anything creates a lock, thread or
+      socket. gunicorn.conf.py calls patch_for_gevent() while the config is
+      loaded, i.e. in the master before the (preloaded) app is imported.
+    - gRPC's C core does its own blocking I/O; grpc.experimental.gevent
+      makes it yield to the hub. patch_for_gevent() installs that too.
+    - The asyncio bridge for AsyncFirebaseService runs an event loop on a
+      thread, which becomes a greenlet once patched, and grpc.aio cannot run
+      under gevent. create_app() leaves the async service off in cooperative
+      workers; the profile routes then read through the sync FirebaseService
+      (get_profile_bundle, the *_sync AchievementService methods).
+    - The stack-sampling profiler reads OS thread frames, which do not map
+      to greenlets. In cooperative workers only explicit cProfile requests
+      are profiled, and those include whatever other greenlets ran meanwhile.
+    - Module-level locks (caches, breakers, ledgers) are held for short,
+      non-blocking sections only, so they never park the hub; the template
+      cache and the background threads (sampler, snapshot refresher, log
+      pipeline) sleep through time/threading, which patch_all makes
+      cooperative.
+"""
+import logging
+import sys
+
+logger = logging.getLogger(__name__)
+
+
+def cooperative_worker() -> bool:
+    """True when gevent has monkey-patched this process"""
+    gevent_monkey = sys.modules.get('gevent.monkey')
+    return bool(gevent_monkey is not None and gevent_monkey.is_module_patched('threading'))
+
+
+def patch_for_gevent() -> bool:
+    """Monkey-patch the standard library and make gRPC cooperative; False if gevent is missing"""
+    try:
+        from gevent import monkey
+    except ImportError:
+        logger.error("gevent worker requested but gevent is not installed")
+        return False
+    if not cooperative_worker():
+        monkey.patch_all()
+    try:
+        import grpc.experimental.gevent as grpc_gevent
+        grpc_gevent.init_gevent()
+    except ImportError:
+        pass  # no gRPC client installed, nothing to make cooperative
+    return True
@@ -0,0 +1,151 @@
+"""
+HTTP caching for read-only JSON APIs
+ETags derived from content versions, conditional GET and Cache-Control headers
+
+The ETag is computed before the view runs, from the endpoint, its arguments
+and a version token describing the content (catalog version, per-user
+progress version, date...). A matching If-None-Match is answered with 304
+without calling the view, so only the version token's own reads (at most one
+document) happen and no JSON is serialized.
+
+BUILD_ID comes from the deploy's version variables, else the git revision
+or the asset manifest hash, so every worker of one deploy agrees on it.
+
+Catalog versions are bumped in-process when content is written. Other worker
+processes do not see those bumps, so every ETag also carries a time bucket
+that bounds how long a stale validator can be honoured. Per-user progress
+versions come from the user document (models.user.get_user_progress_version),
+so progress written by any worker changes them at once.
+"""
+import hashlib
+import logging
+import os
+import time
+from functools import wraps
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+from flask import request, session, make_response
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+ASSET_MANIFEST = PROJECT_ROOT / 'static' / 'dist' / 'manifest.json'
+
+
+def _git_revision(root: Path = PROJECT_ROOT) -> Optional[str]:
+    """Commit checked out in root, read from .git without running git"""
+    try:
+        head = (root / '.git' / 'HEAD').read_text(encoding='utf-8').strip()
+        if not head.startswith('ref: '):
+            return head or None
+        ref = head[5:]
+        ref_path = root / '.git' / ref
+        if ref_path.exists():
+            return ref_path.read_text(encoding='utf-8').strip() or None
+        for line in (root / '.git' / 'packed-refs').read_text(encoding='utf-8').splitlines():
+            if line.endswith(f' {ref}'):
+                return line.split(' ', 1)[0]
+    except OSError:
+        pass
+    return None
+
+
+def _manifest_hash(manifest_path: Optional[Path] = None) -> Optional[str]:
+    """Content hash of the built asset manifest"""
+    try:
+        return hashlib.sha1((manifest_path or ASSET_MANIFEST).read_bytes()).hexdigest()[:16]
+    except OSError:
+        return None
+
+
+def build_id() -> str:
+    """Deployment identifier that every worker process of one deploy agrees on"""
+    return (os.environ.get('GAE_VERSION') or os.environ.get('K_REVISION')
+            or os.environ.get('APP_VERSION') or _git_revision() or _manifest_hash() or 'unversioned')
+
+
+# Deployment identifier; a new deploy invalidates every validator
+BUILD_ID = build_id()
+
+# Upper bound on how long a validator from another worker may be honoured
+DEFAULT_REVALIDATE_SECONDS = 300
+
+DEFAULT_VARY = ('Accept-Encoding',)
+
+# Suffixes the compression middleware appends to validators of encoded bodies
+ENCODED_ETAG_SUFFIXES = ('gzip', 'br')
+
+
+def current_cache_identity() -> str:
+    """Identify the caller for per-user responses without touching Firestore"""
+    return session.get('user_id') or 'anonymous'
+
+
+def compute_etag(*parts) -> str:
+    """Strong ETag from version parts"""
+    digest = hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def _matches(etag: str, if_none_match) -> bool:
+    """Match the validator itself or a content-coded variant of it (see utils/compression.py)"""
+    return any(tag in if_none_match for tag in (etag, *(f"{etag}-{coding}" for coding in ENCODED_ETAG_SUFFIXES)))
+
+
+def _apply_cache_headers(response, etag: str, cache_control: str, vary: Iterable[str]):
+    """Attach validator and caching headers to a response"""
+    response.set_etag(etag.strip('"'))
+    response.headers['Cache-Control'] = cache_control
+    for header in vary:
+        response.vary.add(header)
+    return response
+
+
+def cached_json(version: Callable[..., object], max_age: int = 0, private: bool = False,
+                revalidate_seconds: int = DEFAULT_REVALIDATE_SECONDS,
+                vary: Iterable[str] = DEFAULT_VARY):
+    """
+    Decorate a GET JSON view with version-based ETags and conditional GET.
+
+    `version` receives the view arguments and returns a token that changes
+    whenever the response body would. Private responses are keyed on the
+    session user, vary on Cookie and are never stored by shared caches.
+    """
+    vary = tuple(vary) + (('Cookie',) if private else ())
+    if private:
+        cache_control = f'private, max-age={max_age}, must-revalidate'
+    else:
+        cache_control = f'public, max-age={max_age}, must-revalidate'
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(*args, **kwargs)
+
+            try:
+                etag = compute_etag(
+                    BUILD_ID,
+                    request.endpoint,
+                    sorted(kwargs.items()),
+                    sorted(request.args.items(multi=True)),
+                    current_cache_identity() if private else '',
+                    version(*args, **kwargs),
+                    int(time.time() // revalidate_seconds)
+                )
+            except Exception as e:
+                logger.error(f"Error computing ETag for {request.path}: {str(e)}")
+                return view(*args, **kwargs)
+
+            if _matches(etag.strip('"'), request.if_none_match):
+                response = make_response('', 304)
+                return _apply_cache_headers(response, etag, cache_control, vary)
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            return _apply_cache_headers(response, etag, cache_control, vary)
+
+        return wrapper
+    return decorator
@@ -0,0 +1,79 @@
+"""
+Fast JSON provider for Code with Morais
+orjson-backed Flask JSON provider with a stdlib fallback
+
+Output matches Flask's DefaultJSONProvider: sorted keys, compact separators
+outside debug mode, and the same rendering of dates, decimals, UUIDs and
+dataclasses (orjson passes those through to Flask's default hook).
+When orjson is not installed, or a value is outside what orjson supports
+(e.g. integers wider than 64 bits), the stdlib encoder is used.
+"""
+import logging
+from typing import Any
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+if orjson is not None:
+    ORJSON_OPTIONS = (
+        orjson.OPT_SORT_KEYS
+        | orjson.OPT_NON_STR_KEYS
+        | orjson.OPT_PASSTHROUGH_DATETIME
+        | orjson.OPT_PASSTHROUGH_DATACLASS
+        | orjson.OPT_PASSTHROUGH_SUBCLASS
+    )
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider that serializes with orjson"""
+
+    def _orjson_options(self, indent: bool) -> int:
+        """orjson flags matching this provider's settings"""
+        options = ORJSON_OPTIONS if self.sort_keys else ORJSON_OPTIONS & ~orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps_bytes(self, obj: Any, indent: bool = False) -> bytes:
+        """Serialize to UTF-8 bytes, falling back to the stdlib encoder"""
+        try:
+            return orjson.dumps(obj, default=self.default, option=self._orjson_options(indent))
+        except (orjson.JSONEncodeError, TypeError) as e:
+            logger.debug(f"orjson could not serialize payload, using stdlib: {str(e)}")
+            kwargs = {'indent': 2} if indent else {'separators': (',', ':')}
+            return super().dumps(obj, **kwargs).encode('utf-8')
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        """Serialize to str; custom json.dumps arguments use the stdlib encoder"""
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self.dumps_bytes(obj).decode('utf-8')
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        """Deserialize JSON text or bytes"""
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        """Build a JSON response without the intermediate str"""
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self.dumps_bytes(obj, indent) + b"\n", mimetype=self.mimetype)
+
+
+def init_json_provider(app) -> bool:
+    """Install the orjson provider when available; returns True if installed"""
+    if orjson is None:
+        logger.info("orjson not installed - using the standard JSON provider")
+        return False
+    app.json_provider_class = OrjsonProvider
+    app.json = OrjsonProvider(app)
+    logger.info("orjson JSON provider installed")
+    return True
@@ -0,0 +1,60 @@
+"""
+Deferred imports for Code with Morais
+Heavy dependencies (firebase_admin, google.cloud.firestore, requests, psutil)
+are imported on first attribute access instead of at module import, so a
+worker that boots without touching them does not pay for them
+
+    firestore = lazy_module('firebase_admin.firestore')
+    ...
+    firestore.Query.DESCENDING   # imports firebase_admin.firestore here
+
+`python scripts/development/run_benchmarks.py importtime` reports what the
+app still imports at boot.
+"""
+import importlib
+import threading
+from types import ModuleType
+from typing import Dict
+
+_lock = threading.Lock()
+_proxies: Dict[str, 'LazyModule'] = {}
+
+
+class LazyModule:
+    """Stand-in for a module that imports it on first attribute access"""
+
+    def __init__(self, name: str):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+
+    def _load(self) -> ModuleType:
+        module = self.__dict__['_module']
+        if module is None:
+            # importlib's per-module locks make concurrent first uses safe
+            module = importlib.import_module(self.__dict__['_name'])
+            self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr: str, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self.__dict__['_module'] is not None else 'not loaded'
+        return f"<lazy module '{self.__dict__['_name']}' ({state})>"
+
+
+def lazy_module(name: str) -> LazyModule:
+    """Shared deferred handle for a module (imported on first attribute access)"""
+    proxy = _proxies.get(name)
+    if proxy is None:
+        with _lock:
+            proxy = _proxies.setdefault(name, LazyModule(name))
+    return proxy
+
+
+def loaded_lazy_modules() -> Dict[str, bool]:
+    """Deferred modules and whether each has been imported yet"""
+    return {name: proxy.__dict__['_module'] is not None for name, proxy in sorted(_proxies.items())}
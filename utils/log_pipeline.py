@@ -0,0 +1,303 @@
+"""
+Non-blocking logging pipeline for Code with Morais
+QueueHandler on the request path, QueueListener writing rotated files
+
+Request threads only format the record and put it on a bounded queue; a
+single listener thread does the file and console I/O. When the queue is
+full, DEBUG/INFO records are dropped and counted, while WARNING and above
+wait briefly for space. Noisy INFO paths can be sampled per logger (or per
+logger:function) before they reach the queue.
+
+File output is plain text by default (the format utils/log_reader.py
+parses) or JSON lines when LOG_FORMAT=json and structlog is installed.
+
+Every gunicorn worker appends to the same file. Rollover happens under an
+exclusive lock file, and only in the process that still has the current
+file open; the others notice the rename (as WatchedFileHandler does) and
+reopen, so no process rotates a file another one already rotated.
+"""
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, List
+
+try:
+    import structlog
+except ImportError:
+    structlog = None
+
+try:
+    import fcntl
+except ImportError:  # Windows: rotation is not coordinated across processes
+    fcntl = None
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+CONSOLE_FORMAT = '%(levelname)s: %(message)s'
+
+# Seconds a WARNING+ record may wait for queue space before it is dropped
+BLOCKING_PUT_TIMEOUT = 1.0
+
+
+class SamplingFilter(logging.Filter):
+    """Keep 1 in N records at INFO and below for configured loggers/functions"""
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        # rate 0.1 keeps every 10th record; rate 0 drops them all
+        self.every = {key: (0 if rate <= 0 else max(1, round(1 / rate))) for key, rate in rates.items()}
+        self.counters: Dict[str, int] = {}
+        self.sampled_out = 0
+        self._lock = threading.Lock()
+
+    def _key(self, record: logging.LogRecord) -> Optional[str]:
+        specific = f"{record.name}:{record.funcName}"
+        if specific in self.every:
+            return specific
+        name = record.name
+        while name:
+            if name in self.every:
+                return name
+            name = name.rpartition('.')[0]
+        return None
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO or not self.every:
+            return True
+        key = self._key(record)
+        if key is None:
+            return True
+        every = self.every[key]
+        with self._lock:
+            count = self.counters.get(key, 0)
+            self.counters[key] = count + 1
+            keep = every and count % every == 0
+            if not keep:
+                self.sampled_out += 1
+        return bool(keep)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler over a bounded queue that counts records it cannot enqueue"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            if record.levelno >= logging.WARNING:
+                self.queue.put(record, timeout=BLOCKING_PUT_TIMEOUT)
+            else:
+                self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+
+def parse_sampling(value: str) -> Dict[str, float]:
+    """Parse 'logger=0.1,logger:function=0.05' into a rate mapping"""
+    rates = {}
+    for item in (value or '').split(','):
+        if '=' not in item:
+            continue
+        key, rate = item.rsplit('=', 1)
+        try:
+            rates[key.strip()] = float(rate)
+        except ValueError:
+            continue
+    return rates
+
+
+def _file_formatter(log_format: str) -> logging.Formatter:
+    """Text formatter, or a structlog JSON formatter for LOG_FORMAT=json"""
+    if log_format == 'json':
+        if structlog is not None:
+            return structlog.stdlib.ProcessorFormatter(
+                processor=structlog.processors.JSONRenderer(),
+                foreign_pre_chain=[
+                    structlog.stdlib.add_logger_name,
+                    structlog.stdlib.add_log_level,
+                    structlog.processors.TimeStamper(fmt='iso'),
+                    structlog.processors.format_exc_info,
+                ],
+            )
+        print("⚠️  structlog not installed - falling back to text log format", file=sys.stderr)
+    return logging.Formatter(TEXT_FORMAT)
+
+
+@contextmanager
+def _rotation_lock(path: str):
+    """Exclusive lock shared by every process writing the log file"""
+    if fcntl is None:
+        yield
+        return
+    with open(path, 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class _SharedFileMixin:
+    """Rotation for a log file appended to by several processes"""
+
+    _opened_id = None
+
+    def _open(self):
+        stream = super()._open()
+        stat = os.fstat(stream.fileno())
+        self._opened_id = (stat.st_dev, stat.st_ino)
+        return stream
+
+    def _rotated_elsewhere(self) -> bool:
+        try:
+            stat = os.stat(self.baseFilename)
+        except FileNotFoundError:
+            return True
+        return (stat.st_dev, stat.st_ino) != self._opened_id
+
+    def _reopen(self):
+        if self.stream:
+            self.stream.close()
+        self.stream = self._open()
+
+    def emit(self, record):
+        if self.stream and self._rotated_elsewhere():
+            self._reopen()
+        super().emit(record)
+
+    def doRollover(self):
+        with _rotation_lock(self.baseFilename + '.lock'):
+            if self.stream and self._rotated_elsewhere():
+                # Another worker rotated first: write to its new file
+                self._reopen()
+                if hasattr(self, 'rolloverAt'):
+                    self.rolloverAt = self.computeRollover(int(time.time()))
+                return
+            super().doRollover()
+
+
+class SharedRotatingFileHandler(_SharedFileMixin, logging.handlers.RotatingFileHandler):
+    """Size-based rotation safe across worker processes"""
+
+
+class SharedTimedRotatingFileHandler(_SharedFileMixin, logging.handlers.TimedRotatingFileHandler):
+    """Time-based rotation safe across worker processes"""
+
+
+def _file_handler(settings: Dict[str, Any]) -> logging.Handler:
+    """Size- or time-based rotating file handler"""
+    log_file = settings['file']
+    directory = os.path.dirname(log_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if settings['rotation'] == 'time':
+        return SharedTimedRotatingFileHandler(
+            log_file, when=settings['when'], backupCount=settings['backup_count'],
+            encoding='utf-8', delay=True)
+    return SharedRotatingFileHandler(
+        log_file, maxBytes=settings['max_bytes'], backupCount=settings['backup_count'],
+        encoding='utf-8', delay=True)
+
+
+class LoggingPipeline:
+    """Root QueueHandler plus the listener thread that owns the real handlers"""
+
+    def __init__(self, settings: Dict[str, Any]):
+        self.settings = settings
+        self.queue: queue.Queue = queue.Queue(maxsize=settings['queue_size'])
+        self.queue_handler = DroppingQueueHandler(self.queue)
+        self.sampling = SamplingFilter(settings.get('sampling') or {})
+        self.queue_handler.addFilter(self.sampling)
+
+        level = settings['level']
+        file_handler = _file_handler(settings)
+        file_handler.setLevel(level)
+        file_handler.setFormatter(_file_formatter(settings['format']))
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(level)
+        console_handler.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+        self.handlers: List[logging.Handler] = [file_handler, console_handler]
+        self.listener: Optional[logging.handlers.QueueListener] = None
+
+    def start(self):
+        """Start (or restart, e.g. after fork) the listener thread"""
+        self.listener = logging.handlers.QueueListener(self.queue, *self.handlers, respect_handler_level=True)
+        self.listener.start()
+
+    def stop(self):
+        """Flush queued records and stop the listener"""
+        if self.listener is not None:
+            try:
+                self.listener.stop()
+            except Exception:
+                pass
+            self.listener = None
+        for handler in self.handlers:
+            try:
+                handler.flush()
+            except (ValueError, OSError):
+                pass  # stream already closed at interpreter shutdown
+
+    def after_fork(self):
+        """Listener threads do not survive fork; give the child its own"""
+        self.queue = queue.Queue(maxsize=self.settings['queue_size'])
+        self.queue_handler.queue = self.queue
+        self.listener = None
+        self.start()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'format': self.settings['format'],
+            'rotation': self.settings['rotation'],
+            'queue_size': self.queue.qsize(),
+            'queue_capacity': self.settings['queue_size'],
+            'dropped': self.queue_handler.dropped,
+            'sampled_out': self.sampling.sampled_out,
+        }
+
+
+_pipeline: Optional[LoggingPipeline] = None
+
+
+def install_logging_pipeline(settings: Dict[str, Any]) -> LoggingPipeline:
+    """Route the root logger through a queue; idempotent across reloads"""
+    global _pipeline
+    root = logging.getLogger()
+    if _pipeline is not None:
+        root.removeHandler(_pipeline.queue_handler)
+        _pipeline.stop()
+
+    _pipeline = LoggingPipeline(settings)
+    root.setLevel(settings['level'])
+    root.addHandler(_pipeline.queue_handler)
+    _pipeline.start()
+    return _pipeline
+
+
+def get_logging_stats() -> Optional[Dict[str, Any]]:
+    """Queue depth, drop and sampling counters of the installed pipeline"""
+    return _pipeline.stats() if _pipeline else None
+
+
+def _stop_pipeline():
+    if _pipeline is not None:
+        _pipeline.stop()
+
+
+def _restart_pipeline_in_child():
+    if _pipeline is not None:
+        _pipeline.after_fork()
+
+
+atexit.register(_stop_pipeline)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_restart_pipeline_in_child)
@@ -0,0 +1,264 @@
+"""
+Log file access for Code with Morais admin endpoints
+Reverse block-seeking tail, byte-offset cursors and record filtering
+
+The active log and its rotated siblings (app.log.1, app.log.2, ...) are read
+as one logical stream, oldest first. Nothing here reads a whole file into
+memory: tails seek backwards block by block from the end of the newest file,
+and follow-up reads start from a cursor and stop after a byte budget.
+
+Cursors are opaque strings "<inode>:<offset>". The inode identifies a file
+across rotation (app.log renamed to app.log.1 keeps its inode), so a tail
+that started before a rotation finishes the old file before moving on.
+"""
+import json
+import logging
+import os
+import re
+from dataclasses import dataclass, asdict
+from typing import Optional, List, Iterator, Tuple, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+BLOCK_SIZE = 64 * 1024
+MAX_SCAN_BYTES = 32 * 1024 * 1024   # upper bound on bytes examined per request
+MAX_PATTERN_LENGTH = 200
+
+LEVELS = {'DEBUG': 10, 'INFO': 20, 'WARNING': 30, 'ERROR': 40, 'CRITICAL': 50}
+
+# Matches the file formatter in config/settings.py:
+# '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+RECORD_START = re.compile(
+    r'^(?P<timestamp>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3}) - (?P<logger>.+?) - '
+    r'(?P<level>DEBUG|INFO|WARNING|ERROR|CRITICAL) - (?P<message>.*)$'
+    # JSON lines written with LOG_FORMAT=json (utils/log_pipeline.py)
+    r'|^\{.*"level": ?"\w+".*\}$'
+)
+
+# Suffixes of TimedRotatingFileHandler backups (app.log.2025-07-01[_13-00-00])
+TIMED_SUFFIX = re.compile(r'^\d{4}-\d{2}-\d{2}(_\d{2}(-\d{2}){0,2})?$')
+
+
+@dataclass
+class LogRecord:
+    """One log record; continuation lines (tracebacks) are folded into text"""
+    timestamp: Optional[str]
+    logger: Optional[str]
+    level: Optional[str]
+    message: str
+    text: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class LogFilter:
+    """Minimum level, logger-name prefix and optional regex over the record text"""
+
+    def __init__(self, level: Optional[str] = None, logger_name: Optional[str] = None,
+                 pattern: Optional[str] = None):
+        if level and level.upper() not in LEVELS:
+            raise ValueError(f"Unknown log level: {level}")
+        if pattern and len(pattern) > MAX_PATTERN_LENGTH:
+            raise ValueError(f"Pattern longer than {MAX_PATTERN_LENGTH} characters")
+        self.min_level = LEVELS[level.upper()] if level else None
+        self.logger_name = logger_name
+        try:
+            self.regex = re.compile(pattern) if pattern else None
+        except re.error as e:
+            raise ValueError(f"Invalid pattern: {str(e)}")
+
+    def matches(self, record: LogRecord) -> bool:
+        if self.min_level is not None and LEVELS.get(record.level, 0) < self.min_level:
+            return False
+        if self.logger_name and not (record.logger == self.logger_name
+                                     or (record.logger or '').startswith(self.logger_name + '.')):
+            return False
+        if self.regex and not self.regex.search(record.text):
+            return False
+        return True
+
+
+def parse_record(lines: List[str]) -> LogRecord:
+    """Build a record from its header line and continuation lines"""
+    text = '\n'.join(lines)
+    if lines[0].startswith('{'):
+        try:
+            data = json.loads(lines[0])
+            return LogRecord(data.get('timestamp'), data.get('logger'), (data.get('level') or '').upper() or None,
+                             str(data.get('event', '')), text)
+        except ValueError:
+            pass
+    match = RECORD_START.match(lines[0])
+    if not match or match['timestamp'] is None:
+        return LogRecord(None, None, None, text, text)
+    return LogRecord(match['timestamp'], match['logger'], match['level'],
+                     '\n'.join([match['message']] + lines[1:]), text)
+
+
+class LogReader:
+    """Read the active log and its rotated files as one stream"""
+
+    def __init__(self, path: str, block_size: int = BLOCK_SIZE, max_scan_bytes: int = MAX_SCAN_BYTES):
+        self.path = path
+        self.block_size = block_size
+        self.max_scan_bytes = max_scan_bytes
+
+    # ------------------------------------------------------------------
+    # Files and cursors
+    # ------------------------------------------------------------------
+
+    def files(self) -> List[str]:
+        """Existing log files, oldest first (app.log.N ... app.log.1, app.log)"""
+        directory = os.path.dirname(self.path) or '.'
+        base = os.path.basename(self.path)
+        numbered, timed = [], []
+        if os.path.isdir(directory):
+            for name in os.listdir(directory):
+                if not name.startswith(base + '.'):
+                    continue
+                suffix = name[len(base) + 1:]
+                if suffix.isdigit():
+                    numbered.append((int(suffix), os.path.join(directory, name)))
+                elif TIMED_SUFFIX.match(suffix):
+                    timed.append((suffix, os.path.join(directory, name)))
+        chain = [path for _, path in sorted(timed)]
+        chain += [path for _, path in sorted(numbered, reverse=True)]
+        if os.path.exists(self.path):
+            chain.append(self.path)
+        return chain
+
+    @staticmethod
+    def make_cursor(path: str, offset: int) -> str:
+        return f"{os.stat(path).st_ino}:{offset}"
+
+    @staticmethod
+    def parse_cursor(cursor: str) -> Tuple[int, int]:
+        try:
+            inode, offset = cursor.split(':')
+            return int(inode), int(offset)
+        except (ValueError, AttributeError):
+            raise ValueError(f"Invalid cursor: {cursor}")
+
+    def end_cursor(self) -> Optional[str]:
+        """Cursor at the current end of the stream"""
+        files = self.files()
+        if not files:
+            return None
+        return self.make_cursor(files[-1], os.path.getsize(files[-1]))
+
+    # ------------------------------------------------------------------
+    # Reverse reading
+    # ------------------------------------------------------------------
+
+    def _reverse_lines(self, path: str) -> Iterator[str]:
+        """Lines of one file, last first, read in blocks from the end"""
+        with open(path, 'rb') as f:
+            position = f.seek(0, os.SEEK_END)
+            remainder = b''
+            while position > 0:
+                size = min(self.block_size, position)
+                position -= size
+                f.seek(position)
+                chunk = f.read(size) + remainder
+                lines = chunk.split(b'\n')
+                remainder = lines.pop(0)  # may be the tail of a line in the previous block
+                for line in reversed(lines):
+                    yield line.decode('utf-8', errors='replace').rstrip('\r')
+            yield remainder.decode('utf-8', errors='replace').rstrip('\r')
+
+    def _reverse_records(self) -> Iterator[Tuple[LogRecord, int]]:
+        """Records of the whole stream, newest first, with bytes scanned so far"""
+        scanned = 0
+        for path in reversed(self.files()):
+            pending: List[str] = []
+            skip_trailing = True
+            for line in self._reverse_lines(path):
+                scanned += len(line) + 1
+                if skip_trailing and not line:
+                    continue  # trailing newline at end of file
+                skip_trailing = False
+                pending.append(line)
+                if RECORD_START.match(line):
+                    yield parse_record(list(reversed(pending))), scanned
+                    pending = []
+            if pending:
+                # Continuation lines at the very start of a file whose header was rotated away
+                yield parse_record(list(reversed(pending))), scanned
+
+    def tail(self, lines: int = 100, log_filter: Optional[LogFilter] = None) -> Dict[str, Any]:
+        """Last `lines` matching records (oldest first) and a cursor for follow-up reads"""
+        cursor = self.end_cursor()
+        records: List[LogRecord] = []
+        truncated = False
+        for record, scanned in self._reverse_records():
+            if log_filter is None or log_filter.matches(record):
+                records.append(record)
+                if len(records) >= lines:
+                    break
+            if scanned >= self.max_scan_bytes:
+                truncated = True
+                break
+        records.reverse()
+        return {'records': records, 'cursor': cursor, 'truncated': truncated}
+
+    # ------------------------------------------------------------------
+    # Forward reading from a cursor
+    # ------------------------------------------------------------------
+
+    def _locate(self, cursor: str) -> Tuple[List[str], int]:
+        """Files to read after the cursor and the offset into the first of them"""
+        inode, offset = self.parse_cursor(cursor)
+        files = self.files()
+        for index, path in enumerate(files):
+            stat = os.stat(path)
+            if stat.st_ino == inode:
+                if offset > stat.st_size:
+                    offset = 0  # file was truncated in place (copytruncate rotation)
+                return files[index:], offset
+        # The cursor's file has rotated out of the chain; resume from the oldest one
+        return files, 0
+
+    def read_from(self, cursor: str, max_lines: int = 1000,
+                  log_filter: Optional[LogFilter] = None) -> Dict[str, Any]:
+        """Complete records written after the cursor, oldest first"""
+        files, offset = self._locate(cursor)
+        records: List[LogRecord] = []
+        budget = self.max_scan_bytes
+        next_cursor = cursor
+        pending: List[str] = []
+
+        def flush():
+            if pending:
+                record = parse_record(pending)
+                if log_filter is None or log_filter.matches(record):
+                    records.append(record)
+
+        for path in files:
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                position = offset
+                while budget > 0 and len(records) < max_lines:
+                    raw = f.readline()
+                    if not raw.endswith(b'\n'):
+                        break  # partial line still being written; pick it up next time
+                    budget -= len(raw)
+                    line = raw.decode('utf-8', errors='replace').rstrip('\r\n')
+                    if RECORD_START.match(line) and pending:
+                        flush()
+                        pending = []
+                        next_cursor = self.make_cursor(path, position)
+                    pending.append(line)
+                    position += len(raw)
+                # A file that has been rotated will not grow; its last record is complete
+                if path != files[-1] and pending and len(records) < max_lines and budget > 0:
+                    flush()
+                    pending = []
+                    next_cursor = self.make_cursor(path, position)
+            if budget <= 0 or len(records) >= max_lines:
+                break
+            offset = 0
+
+        # The last record of the active file may still gain traceback lines, so
+        # it is returned on the next read; the cursor points at its header.
+        return {'records': records, 'cursor': next_cursor, 'truncated': budget <= 0}
@@ -0,0 +1,298 @@
+"""
+Prometheus metrics for Code with Morais
+Request latency/status/in-flight, Firestore calls per collection, template
+cache hits, code execution outcomes and queue depths
+
+Metrics are exposed at /api/system/metrics. Under gunicorn, set
+PROMETHEUS_MULTIPROC_DIR to an empty directory shared by the workers: every
+worker then writes its samples to mmap files there, and the endpoint
+aggregates all of them no matter which worker serves the scrape.
+
+prometheus_client is optional; without it every helper is a no-op and the
+endpoint reports that metrics are unavailable.
+"""
+import inspect
+import logging
+import os
+import time
+from functools import wraps
+from typing import Dict, Callable, Optional, Tuple
+
+from flask import request, g
+
+from utils.log_pipeline import get_logging_stats
+from utils.firestore_budget import record_operation
+
+try:
+    import prometheus_client
+    from prometheus_client import Counter, Histogram, Gauge, CollectorRegistry, CONTENT_TYPE_LATEST
+    from prometheus_client import multiprocess
+except ImportError:
+    prometheus_client = None
+
+logger = logging.getLogger(__name__)
+
+MULTIPROC_DIR = os.environ.get('PROMETHEUS_MULTIPROC_DIR') or os.environ.get('prometheus_multiproc_dir')
+
+# Latency buckets (seconds) sized for page renders and Firestore round trips
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FIRESTORE_BUCKETS = (0.002, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+EXECUTION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 15.0)
+
+# FirebaseService method -> (collection, operation, document count)
+# The count is a callable of (args, kwargs, result); None means "one per call",
+# and for reads returning lists the number of documents returned is used.
+# Composite methods (get_user_stats, is_user_admin, ...) are left out because
+# the primitives they call are already counted.
+FIRESTORE_METHODS: Dict[str, Tuple[str, str, Optional[Callable]]] = {
+    'get_user': ('users', 'read', None),
+    'get_user_by_email': ('users', 'read', None),
+    'get_leaderboard': ('users', 'read', None),
+    # the user plus, when stats deltas are passed, user_stats and the day rollup
+    'update_user': ('users', 'write', lambda args, kwargs, result: 1 + 2 * bool(_arg(args, kwargs, 2, 'stats_deltas'))),
+    # the user, user_stats and the day rollup
+    'complete_subtopic': ('users', 'write', lambda args, kwargs, result: 3),
+    'create_user': ('users', 'write', None),
+    'create_user_if_not_exists': ('users', 'write', None),
+    'create_user_from_google': ('users', 'write', None),
+    'set_user_admin': ('users', 'write', None),
+    'update_user_rewards': ('users', 'write', lambda args, kwargs, result: 3),
+    'save_quiz_result': ('quiz_results', 'write', lambda args, kwargs, result: 4),
+    'save_quiz_result_by_id': ('quiz_results', 'write', lambda args, kwargs, result: 3),
+    'get_lesson': ('lessons', 'read', None),
+    'get_all_lessons': ('lessons', 'read', None),
+    'save_lesson': ('lessons', 'write', None),
+    'get_quiz': ('quizzes', 'read', None),
+    'save_quiz': ('quizzes', 'write', None),
+    'get_user_activities': ('activities', 'read', None),
+    # the page plus the one lookahead document
+    'get_user_activities_page': ('activities', 'read', lambda args, kwargs, result: len(result[0]) + int(result[1])),
+    # the activity (unless sampled out), the day rollup and the user's streak fields
+    'record_activity': ('activities', 'write',
+                        lambda args, kwargs, result: 2 + (_arg(args, kwargs, 3, 'store') is not False)),
+    'get_precomputed_recommendations': ('recommendations', 'read', None),
+    'get_user_achievements': ('user_achievements', 'read', None),
+    'commit_achievement_unlocks': (
+        'user_achievements', 'write',
+        lambda args, kwargs, result: len(_arg(args, kwargs, 1, 'achievements') or [])
+        + len(_arg(args, kwargs, 2, 'activities') or []) + 3),
+    'get_user_stats_doc': ('user_stats', 'read', None),
+    'record_user_stats': ('user_stats', 'write', lambda args, kwargs, result: 2),
+    'get_rollup_series': ('user_rollups', 'read', lambda args, kwargs, result: _nonempty_buckets(result)),
+    'get_daily_challenge': ('daily_challenges', 'read', None),
+    'save_announcement': ('announcements', 'write', None),
+    'get_latest_announcement': ('announcements', 'read', None),
+}
+
+
+def _arg(args, kwargs, index, name):
+    """Positional-or-keyword argument of a wrapped method (args excludes self)"""
+    if name in kwargs:
+        return kwargs[name]
+    return args[index] if len(args) > index else None
+
+
+def _nonempty_buckets(series_result) -> int:
+    """Approximate reads of a rollup series: one document per non-empty bucket"""
+    series = (series_result or {}).get('series') or {}
+    if not series:
+        return 1
+    return max(1, sum(1 for values in zip(*series.values()) if any(values)))
+
+
+def _document_count(operation: str, counter: Optional[Callable], args, kwargs, result) -> int:
+    """Billable documents for one call"""
+    if counter is not None:
+        return counter(args, kwargs, result)
+    if operation == 'read' and isinstance(result, list):
+        return max(1, len(result))  # an empty query is still billed one read
+    return 1
+
+
+if prometheus_client is not None:
+    HTTP_REQUESTS = Counter(
+        'cwm_http_requests_total', 'HTTP requests by endpoint and status',
+        ['method', 'endpoint', 'status'])
+    HTTP_LATENCY = Histogram(
+        'cwm_http_request_duration_seconds', 'HTTP request latency by endpoint',
+        ['method', 'endpoint'], buckets=REQUEST_BUCKETS)
+    HTTP_IN_FLIGHT = Gauge(
+        'cwm_http_requests_in_flight', 'Requests currently being handled',
+        multiprocess_mode='livesum')
+
+    FIRESTORE_CALLS = Counter(
+        'cwm_firestore_calls_total', 'FirebaseService calls by collection and operation',
+        ['collection', 'operation', 'method'])
+    FIRESTORE_DOCUMENTS = Counter(
+        'cwm_firestore_documents_total', 'Billable Firestore document reads/writes by collection',
+        ['collection', 'operation'])
+    FIRESTORE_LATENCY = Histogram(
+        'cwm_firestore_call_duration_seconds', 'FirebaseService call latency',
+        ['collection', 'operation'], buckets=FIRESTORE_BUCKETS)
+    FIRESTORE_ERRORS = Counter(
+        'cwm_firestore_errors_total', 'FirebaseService calls that raised',
+        ['collection', 'method'])
+
+    TEMPLATE_CACHE_EVENTS = Counter(
+        'cwm_template_cache_events_total', 'Template cache lookups by result', ['result'])
+
+    CODE_EXECUTIONS = Counter(
+        'cwm_code_executions_total', 'Code execution requests by mode and outcome', ['mode', 'outcome'])
+    CODE_EXECUTION_LATENCY = Histogram(
+        'cwm_code_execution_duration_seconds', 'Code execution latency', ['mode'],
+        buckets=EXECUTION_BUCKETS)
+
+    QUEUE_DEPTH = Gauge(
+        'cwm_queue_depth', 'Items waiting in in-process queues', ['queue'],
+        multiprocess_mode='livesum')
+    LOG_RECORDS_DROPPED = Gauge(
+        'cwm_log_records_dropped', 'Log records dropped because the logging queue was full',
+        multiprocess_mode='livesum')
+
+
+def metrics_available() -> bool:
+    return prometheus_client is not None
+
+
+# ----------------------------------------------------------------------
+# Recording helpers
+# ----------------------------------------------------------------------
+
+def record_template_cache(hit: bool):
+    """Count a template cache lookup"""
+    if prometheus_client is not None:
+        TEMPLATE_CACHE_EVENTS.labels('hit' if hit else 'miss').inc()
+
+
+def record_code_execution(mode: str, outcome: str, duration: float):
+    """Count a code execution and observe its latency"""
+    if prometheus_client is not None:
+        CODE_EXECUTIONS.labels(mode, outcome).inc()
+        CODE_EXECUTION_LATENCY.labels(mode).observe(duration)
+
+
+def record_firestore(collection: str, operation: str, method: str, documents: int, duration: float):
+    """Count one FirebaseService call and its billable documents"""
+    if prometheus_client is not None:
+        FIRESTORE_CALLS.labels(collection, operation, method).inc()
+        FIRESTORE_DOCUMENTS.labels(collection, operation).inc(documents)
+        FIRESTORE_LATENCY.labels(collection, operation).observe(duration)
+
+
+def _update_queue_gauges():
+    """Refresh queue depth gauges from their owners"""
+    stats = get_logging_stats()
+    if stats:
+        QUEUE_DEPTH.labels('logging').set(stats['queue_size'])
+        LOG_RECORDS_DROPPED.set(stats['dropped'])
+
+
+# ----------------------------------------------------------------------
+# FirebaseService instrumentation
+# ----------------------------------------------------------------------
+
+def _record_call(name: str, collection: str, operation: str, counter: Optional[Callable],
+                 args, kwargs, result, duration: float):
+    """Report one completed call to Prometheus and the request's Firestore ledger"""
+    try:
+        documents = _document_count(operation, counter, args, kwargs, result)
+        record_firestore(collection, operation, name, documents, duration)
+        record_operation(collection, operation, name, documents, duration, result)
+    except Exception as e:
+        logger.error(f"Error recording Firestore metrics for {name}: {str(e)}")
+
+
+def _instrument_method(method, name: str, collection: str, operation: str, counter: Optional[Callable]):
+    if inspect.iscoroutinefunction(method):
+        @wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            if not self.is_available():
+                return await method(self, *args, **kwargs)
+            start = time.perf_counter()
+            try:
+                result = await method(self, *args, **kwargs)
+            except Exception:
+                if prometheus_client is not None:
+                    FIRESTORE_ERRORS.labels(collection, name).inc()
+                raise
+            _record_call(name, collection, operation, counter, args, kwargs, result, time.perf_counter() - start)
+            return result
+    else:
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if not self.is_available():
+                return method(self, *args, **kwargs)  # no Firestore round trip to count
+            start = time.perf_counter()
+            try:
+                result = method(self, *args, **kwargs)
+            except Exception:
+                if prometheus_client is not None:
+                    FIRESTORE_ERRORS.labels(collection, name).inc()
+                raise
+            _record_call(name, collection, operation, counter, args, kwargs, result, time.perf_counter() - start)
+            return result
+    wrapper.__instrumented__ = True
+    return wrapper
+
+
+def instrument_firebase_service(service_class):
+    """Wrap the (Async)FirebaseService methods listed in FIRESTORE_METHODS (idempotent)"""
+    for name, (collection, operation, counter) in FIRESTORE_METHODS.items():
+        method = getattr(service_class, name, None)
+        if method is None or getattr(method, '__instrumented__', False):
+            continue
+        setattr(service_class, name, _instrument_method(method, name, collection, operation, counter))
+    return service_class
+
+
+# ----------------------------------------------------------------------
+# Flask integration
+# ----------------------------------------------------------------------
+
+def init_metrics(app):
+    """Register request instrumentation hooks"""
+    if prometheus_client is None:
+        logger.warning("prometheus_client not installed - metrics disabled")
+        return
+
+    @app.before_request
+    def _metrics_start():
+        g._metrics_start = time.perf_counter()
+        g._metrics_in_flight = True
+        HTTP_IN_FLIGHT.inc()
+
+    @app.after_request
+    def _metrics_record(response):
+        start = g.pop('_metrics_start', None)
+        if start is not None:
+            # Unmatched URLs share one label so 404 scans cannot blow up cardinality
+            endpoint = request.endpoint or 'unmatched'
+            HTTP_LATENCY.labels(request.method, endpoint).observe(time.perf_counter() - start)
+            HTTP_REQUESTS.labels(request.method, endpoint, str(response.status_code)).inc()
+        _update_queue_gauges()
+        return response
+
+    @app.teardown_request
+    def _metrics_finish(exc):
+        # teardown runs even when a view raised, so the gauge cannot leak
+        if g.pop('_metrics_in_flight', False):
+            HTTP_IN_FLIGHT.dec()
+
+    logger.info(f"Prometheus metrics enabled (multiprocess={'yes' if MULTIPROC_DIR else 'no'})")
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Prometheus text exposition, aggregated across workers in multiprocess mode"""
+    _update_queue_gauges()
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+    return prometheus_client.generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_worker_dead(pid: int):
+    """Drop a dead gunicorn worker's live gauges (call from the child_exit hook)"""
+    if prometheus_client is not None and MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
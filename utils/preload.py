@@ -0,0 +1,109 @@
+"""
+Gunicorn preload support for Code with Morais
+With `preload_app` the master imports and builds the app once, then forks
+the workers, which share its memory copy-on-write until they write to it
+
+warm_shared_state() runs in the master before the first fork (the
+when_ready hook in gunicorn.conf.py). It builds the immutable data every
+worker would otherwise build on its own:
+    - compiled Jinja templates,
+    - the lesson search index, from the local content snapshot,
+    - the component registry and achievement definitions,
+then moves everything to the permanent GC generation (gc.freeze) so the
+collector does not write to, and thereby copy, those shared pages.
+
+The master never opens a Firestore/gRPC channel or starts a thread: clients
+connect on first use and background threads start on the first request.
+after_worker_fork() (the post_fork hook) re-creates anything that was
+opened in the master anyway and starts this worker's background threads.
+"""
+import gc
+import logging
+import os
+import sys
+import time
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+
+def _compile_templates(app) -> int:
+    """Load every template into the Jinja cache; returns how many compiled"""
+    env = app.jinja_env
+    compiled = 0
+    for name in env.list_templates(extensions=('html', 'jinja', 'j2', 'txt', 'xml')):
+        try:
+            env.get_template(name)
+            compiled += 1
+        except Exception as e:
+            logger.debug(f"Template {name} not precompiled: {str(e)}")
+    return compiled
+
+
+def _build_search_index() -> int:
+    """Index the snapshot's lessons so workers start with a populated index"""
+    from services.content_snapshot import content_snapshot
+    from services.lesson_search import get_lesson_search_index
+    from models.lesson import get_lesson_catalog_version, _enhance_lesson_data
+
+    # The module-level reader, not get_content_snapshot(): that starts the refresher thread
+    lessons = content_snapshot.all('lessons')
+    if not lessons:
+        return 0
+    for lesson in lessons:
+        _enhance_lesson_data(lesson)
+    get_lesson_search_index().refresh(lessons, get_lesson_catalog_version())
+    return len(lessons)
+
+
+def firestore_connected() -> bool:
+    """True when this process has initialized firebase_admin (and its gRPC channels)"""
+    firebase_admin = sys.modules.get('firebase_admin')
+    return bool(firebase_admin is not None and firebase_admin._apps)
+
+
+def warm_shared_state(app) -> Dict[str, Any]:
+    """Build shared read-only state in the preloading master, then freeze the GC"""
+    started = time.perf_counter()
+    summary: Dict[str, Any] = {}
+    try:
+        summary['templates'] = _compile_templates(app)
+    except Exception as e:
+        logger.error(f"Error precompiling templates: {str(e)}")
+    try:
+        summary['indexed_lessons'] = _build_search_index()
+    except Exception as e:
+        logger.error(f"Error building the lesson search index: {str(e)}")
+
+    from utils.component_registry import component_registry
+    from services.achievement_service import achievement_service
+    summary['components'] = len(component_registry.components)
+    summary['achievements'] = len(achievement_service.achievement_definitions)
+
+    if firestore_connected():
+        logger.warning("Firestore was initialized in the preloading master; workers will reconnect after fork")
+
+    gc.collect()
+    if hasattr(gc, 'freeze'):
+        gc.freeze()
+        summary['frozen_objects'] = gc.get_freeze_count()
+    summary['elapsed_seconds'] = round(time.perf_counter() - started, 3)
+    logger.info(f"Shared state warmed in master (pid={os.getpid()}): {summary}")
+    return summary
+
+
+def after_worker_fork():
+    """Re-create per-process clients and threads in a freshly forked worker"""
+    from services.firebase_service import get_firebase_service
+    from services.async_firebase_service import reset_async_firebase_service_after_fork
+    from services.resource_sampler import get_resource_sampler
+    from services.content_snapshot import get_content_snapshot
+
+    # gRPC channels do not survive fork: drop any the master opened
+    firebase_service = get_firebase_service()
+    if firebase_service is not None and hasattr(firebase_service, 'reset_after_fork'):
+        firebase_service.reset_after_fork()
+    reset_async_firebase_service_after_fork()
+
+    get_resource_sampler()
+    get_content_snapshot()
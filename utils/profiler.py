@@ -0,0 +1,387 @@
+"""
+Opt-in request profiler for Code with Morais
+Per-request cProfile or stack sampling, aggregated per route
+
+A request is profiled when:
+    - an admin session (or a caller presenting PROFILER_TOKEN) sends the
+      X-Profile header or the __profile query flag ("cprofile" or "sampling"), or
+    - 1 in PROFILER_SAMPLE_RATE requests is picked at random (sampling mode).
+
+cProfile is deterministic but slows the request down; the sampling profiler
+reads the request thread's stack every few milliseconds from one shared
+background thread, cheap enough to leave on for a fraction of production
+traffic. Profiles are kept in a bounded in-memory store and exported as
+collapsed stacks (flamegraph.pl / speedscope input) or top-N function tables
+from /api/system/profiles.
+"""
+import cProfile
+import logging
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from typing import Dict, Any, Optional, List, Tuple
+
+from flask import request, session, g
+
+from utils.gevent_compat import cooperative_worker
+
+logger = logging.getLogger(__name__)
+
+MODES = ('cprofile', 'sampling')
+PROFILE_HEADER = 'X-Profile'
+PROFILE_QUERY_FLAG = '__profile'
+
+DEFAULT_PROFILER_CONFIG = {
+    'enabled': True,              # honour explicit triggers
+    'sample_rate': 0,             # profile 1 in N requests at random (0 = off)
+    'sample_interval_ms': 5,      # stack sampling period
+    'max_profiles': 50,           # individual profiles kept in memory
+    'max_stacks_per_route': 5000, # distinct collapsed stacks kept per route aggregate
+    'token': None,                # lets non-session callers (curl) trigger profiles
+}
+
+MAX_STACK_DEPTH = 128
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _frame_label(filename: str, line: int, name: str) -> str:
+    """Readable frame name; project files are shown relative to the repo root"""
+    if filename.startswith(PROJECT_ROOT):
+        filename = os.path.relpath(filename, PROJECT_ROOT)
+    elif filename.startswith('~') or filename.startswith('<'):
+        return name if filename == '~' else f"{name} {filename}"
+    else:
+        filename = os.path.basename(filename)
+    return f"{name} ({filename}:{line})"
+
+
+# ----------------------------------------------------------------------
+# Converting raw profiles into collapsed stacks and function tables
+# ----------------------------------------------------------------------
+
+def stacks_from_cprofile(stats: Dict) -> Counter:
+    """
+    Approximate collapsed stacks (weights in microseconds) from cProfile data.
+
+    cProfile records caller/callee edges rather than full stacks, so each
+    function's own time is attributed to the path formed by repeatedly
+    following its heaviest caller.
+    """
+    paths: Dict[Tuple, Tuple[str, ...]] = {}
+
+    def path(func, seen=()):
+        if func in paths:
+            return paths[func]
+        callers = stats[func][4]
+        label = _frame_label(*func)
+        if not callers or func in seen or len(seen) >= MAX_STACK_DEPTH:
+            result = (label,)
+        else:
+            heaviest = max(callers, key=lambda caller: callers[caller][3])
+            result = (path(heaviest, seen + (func,)) if heaviest in stats else ()) + (label,)
+        paths[func] = result
+        return result
+
+    stacks = Counter()
+    for func, (_, _, tottime, _, _) in stats.items():
+        weight = int(tottime * 1_000_000)
+        if weight > 0:
+            stacks[';'.join(path(func))] += weight
+    return stacks
+
+
+def functions_from_cprofile(stats: Dict) -> Dict[str, Dict[str, Any]]:
+    """Per-function calls, self and total milliseconds from cProfile data"""
+    functions = {}
+    for func, (_, ncalls, tottime, cumtime, _) in stats.items():
+        functions[_frame_label(*func)] = {
+            'calls': ncalls,
+            'self_ms': tottime * 1000,
+            'total_ms': cumtime * 1000,
+        }
+    return functions
+
+
+def functions_from_stacks(stacks: Counter) -> Dict[str, Dict[str, Any]]:
+    """Self and inclusive milliseconds per frame from collapsed stacks"""
+    functions: Dict[str, Dict[str, Any]] = {}
+    for stack, weight in stacks.items():
+        frames = stack.split(';')
+        for frame in set(frames):
+            entry = functions.setdefault(frame, {'calls': None, 'self_ms': 0.0, 'total_ms': 0.0})
+            entry['total_ms'] += weight / 1000
+        functions[frames[-1]]['self_ms'] += weight / 1000
+    return functions
+
+
+def top_functions(functions: Dict[str, Dict[str, Any]], limit: int = 30, sort: str = 'self') -> List[Dict[str, Any]]:
+    """Top-N rows of a function table sorted by self or total time"""
+    key = 'total_ms' if sort == 'total' else 'self_ms'
+    rows = sorted(functions.items(), key=lambda item: item[1][key], reverse=True)[:limit]
+    return [{'function': name, 'calls': data['calls'], 'self_ms': round(data['self_ms'], 3),
+             'total_ms': round(data['total_ms'], 3)} for name, data in rows]
+
+
+def collapsed_text(stacks: Counter) -> str:
+    """Brendan Gregg collapsed-stack format: 'frame;frame;frame weight' per line"""
+    return '\n'.join(f"{stack} {weight}" for stack, weight in stacks.most_common()) + '\n'
+
+
+# ----------------------------------------------------------------------
+# Stack sampler
+# ----------------------------------------------------------------------
+
+class StackSampler:
+    """One background thread sampling the stacks of registered request threads"""
+
+    def __init__(self, interval_ms: float = 5):
+        self.interval = interval_ms / 1000
+        self._sessions: Dict[int, Counter] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+
+    def _ensure_running(self):
+        if self._thread and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+        self._thread.start()
+
+    def start(self, thread_id: int) -> Counter:
+        stacks = Counter()
+        with self._lock:
+            self._sessions[thread_id] = stacks
+            self._ensure_running()
+            self._wake.set()
+        return stacks
+
+    def stop(self, thread_id: int) -> Counter:
+        with self._lock:
+            return self._sessions.pop(thread_id, Counter())
+
+    def _run(self):
+        last = time.perf_counter()
+        while True:
+            with self._lock:
+                thread_ids = list(self._sessions)
+                if not thread_ids:
+                    self._wake.clear()
+            if not thread_ids:
+                self._wake.wait()  # idle until a profiled request starts
+                last = time.perf_counter()
+                continue
+
+            time.sleep(self.interval)
+            now = time.perf_counter()
+            weight = int((now - last) * 1_000_000)
+            last = now
+
+            frames = sys._current_frames()
+            samples = []
+            for thread_id in thread_ids:
+                frame = frames.get(thread_id)
+                labels = []
+                while frame is not None and len(labels) < MAX_STACK_DEPTH:
+                    code = frame.f_code
+                    labels.append(_frame_label(code.co_filename, code.co_firstlineno, code.co_name))
+                    frame = frame.f_back
+                if labels:
+                    samples.append((thread_id, ';'.join(reversed(labels))))
+            with self._lock:
+                for thread_id, stack in samples:
+                    stacks = self._sessions.get(thread_id)
+                    if stacks is not None:
+                        stacks[stack] += weight
+
+
+# ----------------------------------------------------------------------
+# Profile store
+# ----------------------------------------------------------------------
+
+class RouteAggregate:
+    """Merged profiles of one endpoint"""
+
+    def __init__(self, endpoint: str, max_stacks: int):
+        self.endpoint = endpoint
+        self.max_stacks = max_stacks
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.stacks = Counter()
+
+    def add(self, profile: Dict[str, Any]):
+        self.count += 1
+        self.total_ms += profile['duration_ms']
+        self.max_ms = max(self.max_ms, profile['duration_ms'])
+        self.stacks.update(profile['stacks'])
+        if len(self.stacks) > self.max_stacks:
+            # Keep the heaviest stacks; the long tail carries little weight
+            self.stacks = Counter(dict(self.stacks.most_common(self.max_stacks // 2)))
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'endpoint': self.endpoint,
+            'profiles': self.count,
+            'avg_ms': round(self.total_ms / self.count, 2) if self.count else 0,
+            'max_ms': round(self.max_ms, 2),
+        }
+
+
+class ProfileStore:
+    """Bounded store of recent profiles plus per-route aggregates"""
+
+    def __init__(self, max_profiles: int = 50, max_stacks_per_route: int = 5000):
+        self.max_profiles = max_profiles
+        self.max_stacks_per_route = max_stacks_per_route
+        self._profiles: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._routes: Dict[str, RouteAggregate] = {}
+        self._lock = threading.Lock()
+
+    def add(self, profile: Dict[str, Any]):
+        with self._lock:
+            self._profiles[profile['id']] = profile
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+            route = self._routes.get(profile['endpoint'])
+            if route is None:
+                route = self._routes[profile['endpoint']] = RouteAggregate(
+                    profile['endpoint'], self.max_stacks_per_route)
+            route.add(profile)
+
+    def get(self, profile_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._profiles.get(profile_id)
+
+    def route(self, endpoint: str) -> Optional[RouteAggregate]:
+        with self._lock:
+            return self._routes.get(endpoint)
+
+    def list(self) -> Dict[str, Any]:
+        with self._lock:
+            profiles = [summarize_profile(p) for p in reversed(self._profiles.values())]
+            routes = sorted((r.summary() for r in self._routes.values()), key=lambda r: r['avg_ms'], reverse=True)
+        return {'profiles': profiles, 'routes': routes}
+
+    def clear(self):
+        with self._lock:
+            self._profiles.clear()
+            self._routes.clear()
+
+
+def summarize_profile(profile: Dict[str, Any]) -> Dict[str, Any]:
+    """Profile metadata without the stack data"""
+    return {key: value for key, value in profile.items() if key not in ('stacks', 'functions')}
+
+
+# ----------------------------------------------------------------------
+# Flask integration
+# ----------------------------------------------------------------------
+
+class RequestProfiler:
+    """before/teardown request hooks that start and collect profiles"""
+
+    def __init__(self, settings: Dict[str, Any]):
+        self.settings = {**DEFAULT_PROFILER_CONFIG, **(settings or {})}
+        self.store = ProfileStore(self.settings['max_profiles'], self.settings['max_stacks_per_route'])
+        self.sampler = StackSampler(self.settings['sample_interval_ms'])
+
+    def requested_mode(self) -> Optional[str]:
+        """Profiling mode for the current request, or None"""
+        flag = request.headers.get(PROFILE_HEADER) or request.args.get(PROFILE_QUERY_FLAG)
+        if flag and self.settings['enabled'] and self._authorized():
+            if cooperative_worker():
+                return 'cprofile'  # greenlets have no OS thread stack to sample
+            return flag if flag in MODES else 'cprofile'
+        if cooperative_worker():
+            return None
+        rate = self.settings['sample_rate']
+        if rate and random.randrange(rate) == 0:
+            return 'sampling'
+        return None
+
+    def _authorized(self) -> bool:
+        token = self.settings.get('token')
+        if token and request.headers.get('X-Profile-Token') == token:
+            return True
+        return bool(session.get('is_admin'))
+
+    def start(self):
+        mode = self.requested_mode()
+        if mode is None:
+            return
+        g._profile = {'mode': mode, 'start': time.perf_counter(), 'thread_id': threading.get_ident(),
+                      'id': uuid.uuid4().hex[:12]}
+        if mode == 'cprofile':
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+                g._profile['profiler'] = profile
+                return
+            except ValueError:
+                # Another thread already holds the interpreter's profiler slot
+                if cooperative_worker():
+                    g.pop('_profile')
+                    return
+                g._profile['mode'] = 'sampling'
+        self.sampler.start(g._profile['thread_id'])
+
+    def tag_response(self, response):
+        active = g.get('_profile')
+        if active is not None:
+            response.headers['X-Profile-Id'] = active['id']
+            active['status'] = response.status_code
+        return response
+
+    def finish(self, exc=None):
+        active = g.pop('_profile', None)
+        if active is None:
+            return
+        try:
+            duration_ms = (time.perf_counter() - active['start']) * 1000
+            if active['mode'] == 'cprofile':
+                active['profiler'].disable()
+                stats = pstats.Stats(active['profiler']).stats
+                stacks, functions = stacks_from_cprofile(stats), functions_from_cprofile(stats)
+            else:
+                stacks = self.sampler.stop(active['thread_id'])
+                functions = functions_from_stacks(stacks)
+            self.store.add({
+                'id': active['id'],
+                'mode': active['mode'],
+                'endpoint': request.endpoint or 'unmatched',
+                'method': request.method,
+                'path': request.path,
+                'status': active.get('status', 500 if exc else None),
+                'duration_ms': round(duration_ms, 2),
+                'timestamp': time.time(),
+                'stacks': stacks,
+                'functions': functions,
+            })
+        except Exception as e:
+            logger.error(f"Error collecting request profile: {str(e)}")
+
+
+_profiler: Optional[RequestProfiler] = None
+
+
+def init_profiler(app, settings: Optional[Dict[str, Any]] = None) -> RequestProfiler:
+    """Register the profiler hooks on the app"""
+    global _profiler
+    _profiler = RequestProfiler(settings)
+    app.before_request(_profiler.start)
+    app.after_request(_profiler.tag_response)
+    app.teardown_request(_profiler.finish)
+    app.extensions['request_profiler'] = _profiler
+    logger.info(f"Request profiler ready (sample_rate=1/{_profiler.settings['sample_rate'] or 'off'})")
+    return _profiler
+
+
+def get_profiler() -> Optional[RequestProfiler]:
+    return _profiler
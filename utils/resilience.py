@@ -0,0 +1,428 @@
+"""
+Firestore resilience for Code with Morais
+Per-call deadlines from a per-request budget, a circuit breaker per
+collection, and last-known-good reads while a breaker is open
+
+The (Async)FirebaseService methods listed in utils.metrics.FIRESTORE_METHODS
+are wrapped by guard_firebase_service(). Inside a request:
+    - reads run with a deadline of min(call_timeout_ms, what is left of
+      request_budget_ms); a read that misses it is abandoned,
+    - writes are never abandoned (they may still commit), but a write slower
+      than its deadline counts as a failure,
+    - a call that raises, or whose method catches a Firestore outage error
+      and reports it with report_firestore_error(), counts as a failure,
+    - failure_threshold consecutive failures on a collection open its
+      breaker; calls then fail fast for reset_timeout_seconds, after which
+      one probe call decides whether it closes again,
+    - a read that fails fast, times out or fails returns the last good result of
+      the same call when one is cached, otherwise the method's own
+      "Firebase not available" value.
+
+Outside requests (batch jobs, CLIs) calls run unguarded. Breaker states are
+reported by /api/system/health.
+"""
+import asyncio
+import copy
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from contextvars import ContextVar, copy_context
+from functools import wraps
+from typing import Any, Dict, List, Optional
+
+from flask import g
+
+from utils.firestore_budget import request_call_site, bind_call_site
+from utils.metrics import FIRESTORE_METHODS
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RESILIENCE_CONFIG = {
+    'enabled': True,
+    'call_timeout_ms': 3000,        # deadline of a single Firestore call
+    'request_budget_ms': 6000,      # Firestore time available to a whole request
+    'failure_threshold': 5,         # consecutive failures that open a breaker
+    'reset_timeout_seconds': 30,    # time a breaker stays open before a probe
+    'last_known_good_size': 2048,   # read results kept for fallback
+    'max_workers': 32,              # threads running reads with a deadline
+}
+
+# Reads whose last good result may be served while Firestore is failing
+LAST_KNOWN_GOOD_METHODS = frozenset({
+    'get_user', 'get_lesson', 'get_all_lessons', 'get_quiz', 'get_daily_challenge',
+    'get_latest_announcement', 'get_leaderboard', 'get_user_stats_doc',
+})
+
+CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+_settings: Dict[str, Any] = dict(DEFAULT_RESILIENCE_CONFIG)
+_deadline: ContextVar[Optional[float]] = ContextVar('firestore_deadline', default=None)
+_fast_fail: ContextVar[bool] = ContextVar('firestore_fast_fail', default=False)
+_in_guarded_call: ContextVar[bool] = ContextVar('firestore_guarded_call', default=False)
+_call_errors: ContextVar[Optional[List[Exception]]] = ContextVar('firestore_call_errors', default=None)
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with a single half-open probe"""
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.fast_failures = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may go to Firestore now"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._probing = False
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self.fast_failures += 1
+            return False
+
+    def is_open(self) -> bool:
+        """True while calls are being failed fast (not once a probe is due)"""
+        with self._lock:
+            return self.state == OPEN and time.monotonic() - self.opened_at < self.reset_timeout
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info(f"Firestore circuit for {self.name} closed")
+            self.state = CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+                logger.warning(f"Firestore circuit for {self.name} opened after {self.failures} failures")
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            retry_in = None
+            if self.state == OPEN:
+                retry_in = round(max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at)), 1)
+            return {
+                'state': self.state,
+                'consecutive_failures': self.failures,
+                'fast_failures': self.fast_failures,
+                'retry_in_seconds': retry_in,
+            }
+
+
+class BreakerRegistry:
+    """One breaker per Firestore collection, created on first use"""
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, collection: str) -> CircuitBreaker:
+        breaker = self._breakers.get(collection)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(collection, CircuitBreaker(
+                    collection, _settings['failure_threshold'], _settings['reset_timeout_seconds']))
+        return breaker
+
+    def is_open(self, collection: str) -> bool:
+        breaker = self._breakers.get(collection)
+        return breaker is not None and breaker.is_open()
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {name: breaker.snapshot() for name, breaker in sorted(breakers.items())}
+
+    def clear(self):
+        with self._lock:
+            self._breakers.clear()
+
+
+class LastKnownGood:
+    """LRU of good read results, keyed by method and arguments.
+
+    Results are deep-copied when stored and again when served: callers
+    mutate the dicts they get back (dashboard fields, progress appended
+    before a write that may fail), and none of that may leak into what an
+    outage later serves.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key: str) -> Any:
+        with self._lock:
+            return self._entries.get(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+breakers = BreakerRegistry()
+last_known_good = LastKnownGood(DEFAULT_RESILIENCE_CONFIG['last_known_good_size'])
+
+
+class _CallExecutor:
+    """Thread pool for reads with a deadline, recreated in forked workers"""
+
+    def __init__(self):
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=_settings['max_workers'],
+                                                    thread_name_prefix='firestore-call')
+                self._pid = os.getpid()
+            executor = self._executor
+        return executor.submit(fn, *args)
+
+
+_executor = _CallExecutor()
+
+
+def fast_failing() -> bool:
+    """True while a guarded call is falling back; FirebaseService.is_available() honours it"""
+    return _fast_fail.get()
+
+
+def circuit_open(collection: str) -> bool:
+    """True while a collection's breaker fails calls fast, so callers can go straight to a local copy"""
+    return breakers.is_open(collection)
+
+
+def _is_outage(error: Exception) -> bool:
+    """Errors that say Firestore is unhealthy, not that the call itself was wrong"""
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    api_errors = sys.modules.get('google.api_core.exceptions')
+    return api_errors is not None and isinstance(
+        error, (api_errors.ServerError, api_errors.TooManyRequests, api_errors.RetryError))
+
+
+def report_firestore_error(error: Exception):
+    """Report an error a guarded method caught itself, so its breaker still counts it"""
+    errors = _call_errors.get()
+    if errors is not None and _is_outage(error):
+        errors.append(error)
+
+
+def start_request_deadline(budget_ms: Optional[float] = None):
+    """Give the current context a Firestore time budget; returns a token for reset"""
+    budget_ms = _settings['request_budget_ms'] if budget_ms is None else budget_ms
+    return _deadline.set(time.monotonic() + budget_ms / 1000)
+
+
+def reset_request_deadline(token):
+    _deadline.reset(token)
+
+
+def call_timeout() -> Optional[float]:
+    """Seconds the next Firestore call may take, or None outside a request budget"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return min(_settings['call_timeout_ms'] / 1000, deadline - time.monotonic())
+
+
+def _cache_key(name: str, args, kwargs) -> str:
+    return repr((name, args, sorted(kwargs.items())))
+
+
+def _is_good(result) -> bool:
+    # Methods report errors as None / [] / {} / False, so only real data is kept
+    return result is not None and result is not False and result != [] and result != {}
+
+
+def _stale(name: str, args, kwargs):
+    if name not in LAST_KNOWN_GOOD_METHODS:
+        return None
+    value = last_known_good.get(_cache_key(name, args, kwargs))
+    return copy.deepcopy(value) if value is not None else None
+
+
+def _remember(name: str, args, kwargs, result):
+    if name in LAST_KNOWN_GOOD_METHODS and _is_good(result):
+        last_known_good.set(_cache_key(name, args, kwargs), copy.deepcopy(result))
+
+
+def _degraded(method, self, args, kwargs):
+    """The method's own 'Firebase not available' result, without touching Firestore"""
+    token = _fast_fail.set(True)
+    try:
+        return method(self, *args, **kwargs)
+    finally:
+        _fast_fail.reset(token)
+
+
+async def _degraded_async(method, self, args, kwargs):
+    token = _fast_fail.set(True)
+    try:
+        return await method(self, *args, **kwargs)
+    finally:
+        _fast_fail.reset(token)
+
+
+def _guard_method(method, name: str, collection: str, operation: str):
+    if asyncio.iscoroutinefunction(method):
+        @wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            timeout = call_timeout()
+            if timeout is None or not _settings['enabled'] or not self.is_available():
+                return await method(self, *args, **kwargs)
+            breaker = breakers.get(collection)
+            if timeout <= 0 or not breaker.allow():
+                stale = _stale(name, args, kwargs)
+                return stale if stale is not None else await _degraded_async(method, self, args, kwargs)
+
+            start = time.monotonic()
+            errors: List[Exception] = []
+            token = _call_errors.set(errors)
+            try:
+                if operation == 'read':
+                    result = await asyncio.wait_for(method(self, *args, **kwargs), timeout)
+                else:
+                    result = await method(self, *args, **kwargs)
+            except asyncio.TimeoutError:
+                breaker.record_failure()
+                logger.warning(f"Firestore {name} missed its {timeout * 1000:.0f}ms deadline")
+                stale = _stale(name, args, kwargs)
+                return stale if stale is not None else await _degraded_async(method, self, args, kwargs)
+            except Exception:
+                breaker.record_failure()
+                raise
+            finally:
+                _call_errors.reset(token)
+            return _finish(breaker, name, args, kwargs, result, time.monotonic() - start, timeout, errors)
+    else:
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            timeout = call_timeout()
+            if timeout is None or not _settings['enabled'] or _in_guarded_call.get() or not self.is_available():
+                return method(self, *args, **kwargs)
+            breaker = breakers.get(collection)
+            if timeout <= 0 or not breaker.allow():
+                stale = _stale(name, args, kwargs)
+                return stale if stale is not None else _degraded(method, self, args, kwargs)
+
+            start = time.monotonic()
+            errors: List[Exception] = []
+            token = _call_errors.set(errors)
+            try:
+                if operation == 'read':
+                    result = _run_with_deadline(method, self, args, kwargs, timeout)
+                else:
+                    result = method(self, *args, **kwargs)
+            except FutureTimeout:
+                breaker.record_failure()
+                logger.warning(f"Firestore {name} missed its {timeout * 1000:.0f}ms deadline")
+                stale = _stale(name, args, kwargs)
+                return stale if stale is not None else _degraded(method, self, args, kwargs)
+            except Exception:
+                breaker.record_failure()
+                raise
+            finally:
+                _call_errors.reset(token)
+            return _finish(breaker, name, args, kwargs, result, time.monotonic() - start, timeout, errors)
+    wrapper.__guarded__ = True
+    return wrapper
+
+
+def _run_with_deadline(method, self, args, kwargs, timeout: float):
+    """Run a read on the pool, in a copy of this context, and wait at most timeout"""
+    context = copy_context()
+    context.run(_in_guarded_call.set, True)
+    bind_call_site(context, request_call_site())
+    future = _executor.submit(context.run, lambda: method(self, *args, **kwargs))
+    try:
+        return future.result(timeout)
+    except FutureTimeout:
+        future.cancel()
+        raise
+
+
+def _finish(breaker: CircuitBreaker, name: str, args, kwargs, result, duration: float, timeout: float,
+            errors: List[Exception]):
+    """Record the call's outcome; returns its result, or the last good one if it reported an outage"""
+    if errors:
+        breaker.record_failure()  # the method caught and reported a Firestore error
+        stale = _stale(name, args, kwargs)
+        return stale if stale is not None else result
+    if duration > timeout:
+        breaker.record_failure()  # a write that finished, but too late
+    else:
+        breaker.record_success()
+    _remember(name, args, kwargs, result)
+    return result
+
+
+def guard_firebase_service(service_class):
+    """Wrap the (Async)FirebaseService methods listed in FIRESTORE_METHODS (idempotent)"""
+    for name, (collection, operation, _) in FIRESTORE_METHODS.items():
+        method = getattr(service_class, name, None)
+        if method is None or getattr(method, '__guarded__', False):
+            continue
+        setattr(service_class, name, _guard_method(method, name, collection, operation))
+    return service_class
+
+
+def get_resilience_status() -> Dict[str, Any]:
+    """Breaker states for the health endpoint"""
+    circuits = breakers.snapshot()
+    return {
+        'enabled': _settings['enabled'],
+        'open_circuits': [name for name, state in circuits.items() if state['state'] != CLOSED],
+        'circuits': circuits,
+    }
+
+
+def init_resilience(app, settings: Optional[Dict[str, Any]] = None):
+    """Apply settings and give every request a Firestore deadline"""
+    _settings.update(settings or {})
+    last_known_good.max_entries = _settings['last_known_good_size']
+    breakers.clear()
+    if not _settings['enabled']:
+        logger.info("Firestore circuit breakers disabled")
+        return
+
+    @app.before_request
+    def _start_firestore_deadline():
+        g._firestore_deadline_token = start_request_deadline()
+
+    @app.teardown_request
+    def _reset_firestore_deadline(exc=None):
+        token = g.pop('_firestore_deadline_token', None)
+        if token is not None:
+            reset_request_deadline(token)
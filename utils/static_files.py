@@ -0,0 +1,170 @@
+"""
+Static file serving for Code with Morais
+Replaces Flask's default static view with precompressed-variant negotiation
+
+- Prebuilt .br/.gz siblings (written by scripts/deployment/build_assets.py)
+  are served when the client's Accept-Encoding allows them
+- Large files go through send_file, which uses the server's file wrapper
+  (sendfile under gunicorn) and handles conditional and Range requests
+- Small hot assets are kept in an in-memory LRU, keyed by path, encoding and
+  mtime, so repeated requests skip the filesystem read
+- Content types come from a precomputed extension table instead of being
+  patched on every response
+"""
+import logging
+import mimetypes
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple, Dict
+
+from flask import request, abort, send_file, Response, current_app
+from werkzeug.security import safe_join
+
+logger = logging.getLogger(__name__)
+
+# Extension -> Content-Type, computed once (ES modules need a JavaScript type)
+MIME_TYPES: Dict[str, str] = {
+    '.js': 'application/javascript; charset=utf-8',
+    '.mjs': 'application/javascript; charset=utf-8',
+    '.css': 'text/css; charset=utf-8',
+    '.json': 'application/json',
+    '.map': 'application/json',
+    '.html': 'text/html; charset=utf-8',
+    '.txt': 'text/plain; charset=utf-8',
+    '.md': 'text/markdown; charset=utf-8',
+    '.svg': 'image/svg+xml',
+    '.png': 'image/png',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.gif': 'image/gif',
+    '.webp': 'image/webp',
+    '.ico': 'image/x-icon',
+    '.woff': 'font/woff',
+    '.woff2': 'font/woff2',
+    '.ttf': 'font/ttf',
+    '.wasm': 'application/wasm',
+}
+
+# Preferred order when several encodings are acceptable
+ENCODINGS: Tuple[Tuple[str, str], ...] = (('br', '.br'), ('gzip', '.gz'))
+
+# Files at or below this size are held in memory once read
+HOT_ASSET_MAX_BYTES = 64 * 1024
+HOT_CACHE_MAX_ENTRIES = 256
+
+
+def content_type_for(filename: str) -> str:
+    """Content-Type for a static file from the extension table"""
+    ext = os.path.splitext(filename)[1].lower()
+    content_type = MIME_TYPES.get(ext)
+    if content_type is None:
+        content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        MIME_TYPES[ext] = content_type
+    return content_type
+
+
+class HotAssetCache:
+    """Small LRU of (path, encoding) -> file bytes, invalidated by mtime/size"""
+
+    def __init__(self, max_entries: int = HOT_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, int, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, path: str, encoding: str, stat: os.stat_result) -> bytes:
+        """Return file bytes, reading from disk only when missing or changed"""
+        key = (path, encoding)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == stat.st_mtime and entry[1] == stat.st_size:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+
+        with open(path, 'rb') as f:
+            data = f.read()
+
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = (stat.st_mtime, stat.st_size, data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return data
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters for diagnostics"""
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+hot_asset_cache = HotAssetCache()
+
+
+def _stat(path: str) -> Optional[os.stat_result]:
+    """stat() a regular file, or None"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat if os.path.isfile(path) else None
+
+
+def _negotiate(path: str) -> Tuple[str, str, os.stat_result]:
+    """Pick the best precompressed variant the client accepts"""
+    identity = _stat(path)
+    if identity is None:
+        abort(404)
+
+    # Range requests are answered from the identity representation
+    if 'Range' not in request.headers:
+        accepted = request.accept_encodings
+        for encoding, suffix in ENCODINGS:
+            if accepted.quality(encoding) > 0:
+                variant = _stat(path + suffix)
+                if variant is not None and variant.st_mtime >= identity.st_mtime:
+                    return path + suffix, encoding, variant
+    return path, 'identity', identity
+
+
+def serve_static(filename: str):
+    """Serve a file from the static folder with encoding negotiation"""
+    static_folder = current_app.static_folder
+    path = safe_join(static_folder, filename)
+    if path is None:
+        abort(404)
+
+    served_path, encoding, stat = _negotiate(path)
+    content_type = content_type_for(filename)
+    max_age = current_app.get_send_file_max_age(filename)
+
+    if stat.st_size <= HOT_ASSET_MAX_BYTES:
+        data = hot_asset_cache.get(served_path, encoding, stat)
+        response = Response(data, mimetype=None, content_type=content_type)
+        response.set_etag(f"{int(stat.st_mtime)}-{stat.st_size}-{encoding}")
+        response.last_modified = int(stat.st_mtime)
+        response = response.make_conditional(request, accept_ranges=True, complete_length=len(data))
+    else:
+        response = send_file(served_path, mimetype=content_type, conditional=True,
+                             etag=True, last_modified=stat.st_mtime)
+        response.headers['Content-Type'] = content_type
+
+    if encoding != 'identity':
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+
+    if max_age is None:
+        response.cache_control.no_cache = True
+    else:
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+    return response
+
+
+def init_static_files(app):
+    """Route the app's static endpoint through serve_static"""
+    app.view_functions['static'] = serve_static
+    logger.info("Precompressed static file handler installed")
@@ -6,6 +6,7 @@ Builds on existing template caching to provide enterprise-level performance
 
 import hashlib
 import json
+import logging
 import time
 from typing import Dict, Any, Optional, List, Callable, Union
 from datetime import datetime, timedelta
@@ -16,10 +17,13 @@ import weakref
 from pathlib import Path
 import pickle
 import os
-from flask import current_app, request, session
+from flask import request, session
 from jinja2 import Template
-import redis
 from contextlib import contextmanager
+from utils.metrics import record_template_cache
+
+# Module logger: the cleanup thread and lazy construction run outside any app context
+logger = logging.getLogger(__name__)
 
 
 @dataclass
@@ -275,7 +279,7 @@ class CacheInvalidator:
             try:
                 rule(context, self)
             except Exception as e:
-                current_app.logger.error(f"Cache invalidation rule error: {e}")
+                logger.error(f"Cache invalidation rule error: {e}")
 
 
 class AdvancedTemplateCache:
@@ -306,7 +310,7 @@ class AdvancedTemplateCache:
                 import redis
                 self.redis_client = redis.from_url(redis_url)
             except ImportError:
-                current_app.logger.warning("Redis not available, using memory cache only")
+                logger.warning("Redis not available, using memory cache only")
         
         # Thread safety
         self._lock = threading.RLock()
@@ -333,17 +337,20 @@ class AdvancedTemplateCache:
             
             if entry is None:
                 self.stats.misses += 1
+                record_template_cache(hit=False)
                 return None
             
             # Check TTL
             if entry.is_expired(self.default_ttl):
                 self.delete(cache_key)
                 self.stats.misses += 1
+                record_template_cache(hit=False)
                 return None
             
             # Update access stats
             entry.update_access()
             self.stats.hits += 1
+            record_template_cache(hit=True)
             
             return entry.content
     
@@ -397,7 +404,7 @@ class AdvancedTemplateCache:
                         content
                     )
                 except Exception as e:
-                    current_app.logger.warning(f"Redis cache error: {e}")
+                    logger.warning(f"Redis cache error: {e}")
     
     def delete(self, cache_key: str) -> bool:
         """Delete cache entry"""
@@ -505,7 +512,7 @@ class AdvancedTemplateCache:
                         self._save_cache_to_disk()
                         
                 except Exception as e:
-                    current_app.logger.error(f"Cache cleanup error: {e}")
+                    logger.error(f"Cache cleanup error: {e}")
         
         cleanup_thread = threading.Thread(target=cleanup_worker, daemon=True)
         cleanup_thread.start()
@@ -525,13 +532,13 @@ class AdvancedTemplateCache:
     def _save_cache_to_disk(self):
         """Save cache to disk for persistence"""
         try:
+            # Copy under the lock; pickling a dict other threads/greenlets mutate can fail midway
+            with self._lock:
+                snapshot = {'entries': dict(self.entries), 'stats': self.stats}
             with open(self.cache_file, 'wb') as f:
-                pickle.dump({
-                    'entries': self.entries,
-                    'stats': self.stats
-                }, f)
+                pickle.dump(snapshot, f)
         except Exception as e:
-            current_app.logger.error(f"Cache persistence save error: {e}")
+            logger.error(f"Cache persistence save error: {e}")
     
     def _load_cache_from_disk(self):
         """Load cache from disk"""
@@ -542,11 +549,30 @@ class AdvancedTemplateCache:
                     self.entries = data.get('entries', {})
                     self.stats = data.get('stats', CacheStats())
         except Exception as e:
-            current_app.logger.error(f"Cache persistence load error: {e}")
+            logger.error(f"Cache persistence load error: {e}")
+
+
+# Global cache instance, built on first use: construction loads the pickle
+# and starts the cleanup thread, which importing this module should not do
+_template_cache: Optional[AdvancedTemplateCache] = None
+_template_cache_lock = threading.Lock()
+
+
+def get_template_cache() -> AdvancedTemplateCache:
+    """The process-wide template cache, created on first call"""
+    global _template_cache
+    if _template_cache is None:
+        with _template_cache_lock:
+            if _template_cache is None:
+                _template_cache = AdvancedTemplateCache()
+    return _template_cache
 
 
-# Global cache instance
-template_cache = AdvancedTemplateCache()
+def __getattr__(name: str):
+    # `from utils.template_cache import template_cache` keeps working
+    if name == 'template_cache':
+        return get_template_cache()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def smart_cached_component(template_path: str, 
@@ -568,10 +594,10 @@ def smart_cached_component(template_path: str,
             context.update(dict(zip(func.__code__.co_varnames, args)))
             
             # Generate cache key
-            cache_key = template_cache.cache_key(template_path, context, cache_type)
+            cache_key = get_template_cache().cache_key(template_path, context, cache_type)
             
             # Try to get from cache
-            cached_content = template_cache.get(cache_key)
+            cached_content = get_template_cache().get(cache_key)
             if cached_content:
                 return cached_content
             
@@ -581,7 +607,7 @@ def smart_cached_component(template_path: str,
             render_time = (time.time() - start_time) * 1000
             
             # Cache the result
-            template_cache.set(
+            get_template_cache().set(
                 cache_key=cache_key,
                 content=result,
                 ttl=ttl,
@@ -601,33 +627,33 @@ def cache_invalidation_context(tags: List[str] = None,
                               dependencies: List[str] = None):
     """Context manager for batch cache invalidation"""
     try:
-        yield template_cache.invalidator
+        yield get_template_cache().invalidator
     finally:
         if tags:
             for tag in tags:
-                template_cache.invalidate_by_tag(tag)
+                get_template_cache().invalidate_by_tag(tag)
         
         if dependencies:
             for dep in dependencies:
-                template_cache.invalidate_by_dependency(dep)
+                get_template_cache().invalidate_by_dependency(dep)
 
 
 # Helper functions for easy integration
 def invalidate_user_cache(user_id: str):
     """Invalidate all cache entries for a specific user"""
-    template_cache.invalidate_by_pattern(f"user_{user_id}")
+    get_template_cache().invalidate_by_pattern(f"user_{user_id}")
 
 
 def invalidate_lesson_cache(lesson_id: str):
     """Invalidate all cache entries for a specific lesson"""
-    template_cache.invalidate_by_dependency(f"lesson_{lesson_id}")
+    get_template_cache().invalidate_by_dependency(f"lesson_{lesson_id}")
 
 
 def invalidate_component_cache(component_name: str):
     """Invalidate all cache entries for a specific component"""
-    template_cache.invalidate_by_tag(f"component_{component_name}")
+    get_template_cache().invalidate_by_tag(f"component_{component_name}")
 
 
 def get_cache_performance() -> Dict[str, Any]:
     """Get current cache performance metrics"""
-    return template_cache.get_stats()
+    return get_template_cache().get_stats()